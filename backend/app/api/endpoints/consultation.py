@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any
 
@@ -53,71 +54,13 @@ async def chat_message(
             logger.info(f"Ollama API URL: {OLLAMA_API_URL}")
             logger.info(f"Ollama Model: {OLLAMA_MODEL}")
             
-                # Comprehensive Ollama connectivity diagnostics
-            import httpx
-            import socket
-            import subprocess
-            from urllib.parse import urlparse
-            
-            ollama_checks = []
-            
-            try:
-                # 1. Check basic socket connectivity
-                parsed_url = urlparse(OLLAMA_API_URL)
-                host = parsed_url.hostname or "localhost"
-                port = parsed_url.port or 11434
-                
-                logger.info(f"Testing socket connectivity to {host}:{port}")
-                try:
-                    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                    s.settimeout(2)
-                    s.connect((host, port))
-                    s.close()
-                    ollama_checks.append("✓ Socket connection: SUCCESS")
-                except Exception as socket_exc:
-                    ollama_checks.append(f"✗ Socket connection: FAILED - {str(socket_exc)}")
-                
-                # 2. Check with curl
-                logger.info(f"Testing curl to {OLLAMA_API_URL}/api/tags")
-                try:
-                    result = subprocess.run(f"curl -s -m 5 {OLLAMA_API_URL}/api/tags", 
-                                          shell=True, capture_output=True, text=True)
-                    if result.returncode == 0 and result.stdout:
-                        ollama_checks.append("✓ Curl request: SUCCESS")
-                    else:
-                        ollama_checks.append(f"✗ Curl request: FAILED - {result.stderr}")
-                except Exception as curl_exc:
-                    ollama_checks.append(f"✗ Curl execution: FAILED - {str(curl_exc)}")
-                
-                # 3. Check with httpx client
-                logger.info("Testing direct connection to Ollama API...")
-                try:
-                    async with httpx.AsyncClient(timeout=10.0) as client:
-                        response = await client.get(f"{OLLAMA_API_URL}/api/tags")
-                        if response.status_code == 200:
-                            ollama_checks.append("✓ HTTPX request: SUCCESS")
-                            models = response.json().get("models", [])
-                            logger.info(f"Available models: {[m.get('name') for m in models]}")
-                            
-                            # Check if the configured model exists
-                            model_names = [m.get('name') for m in models if 'name' in m]
-                            if OLLAMA_MODEL in model_names or f"{OLLAMA_MODEL}:latest" in model_names:
-                                ollama_checks.append(f"✓ Model '{OLLAMA_MODEL}' found")
-                            else:
-                                ollama_checks.append(f"✗ Model '{OLLAMA_MODEL}' not found in available models: {model_names}")
-                        else:
-                            ollama_checks.append(f"✗ HTTPX request: FAILED - Status {response.status_code}")
-                            logger.error(f"Response: {response.text}")
-                except Exception as e:
-                    ollama_checks.append(f"✗ HTTPX request: FAILED - {str(e)}")
-            
-            except Exception as diag_exc:
-                logger.error(f"✗ Ollama diagnostics error: {str(diag_exc)}")
-            
-            # Log all the check results
-            logger.info("OLLAMA CONNECTIVITY CHECKS:")
-            for check in ollama_checks:
-                logger.info(check)
+            # Connectivity check is cached by the shared provider, so this is cheap per message
+            from app.services.ollama_provider import get_ollama_provider
+            health_error = await get_ollama_provider().check_health()
+            if health_error:
+                logger.error(f"✗ Ollama health check: {health_error}")
+            else:
+                logger.info("✓ Ollama health check: SUCCESS")
             logger.info("=" * 50)
         
         # Process user message and get AI response
@@ -199,6 +142,43 @@ async def chat_message(
             "error_details": str(e) if message.role == "admin" else "Internal server error"
         }
 
+@router.post("/chat/stream")
+async def chat_message_stream(
+    message: consultation_models.MessageBase, 
+    session_id: int = None, 
+    template_id: str = None,
+    healthcare_template_id: str = None,
+    db: Session = Depends(get_db), 
+    current_user = Depends(get_current_user)
+):
+    """
+    Streaming variant of /chat.
+    
+    Returns server-sent events: "start" with the session ID, "token" for each
+    generated fragment, then "done" with the same payload /chat returns (or
+    "error"). The assistant message is saved once the stream completes; if the
+    client disconnects, generation is cancelled and nothing is saved.
+    """
+    import logging
+    logger = logging.getLogger(__name__)
+    logger.info(f"CONSULTATION CHAT STREAM API CALLED (session {session_id})")
+    
+    template_to_use = healthcare_template_id or template_id
+    events = ai_service.stream_message(
+        message.content,
+        message.role,
+        session_id,
+        current_user.id if current_user else None,
+        db,
+        template_to_use
+    )
+    
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/sessions", response_model=List[consultation_models.ConsultationSession])
 async def get_user_sessions(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
     """Get all consultation sessions for the current user"""
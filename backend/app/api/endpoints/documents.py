@@ -1,13 +1,21 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query
-from typing import List, Optional, Dict, Any
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional, Dict, Any, BinaryIO
 from pydantic import BaseModel, Field
+import asyncio
+import logging
 import uuid
 from datetime import datetime
 import os
 import shutil
 import re
 
+from app.services.document_registry import get_document_registry
 from app.services.healthcare_classifier import HealthcareDocumentClassifier
+from app.services.ingest_queue import get_ingest_queue
+from app.services.response_cache import get_response_cache
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -61,6 +69,8 @@ class Document(BaseModel):
     upload_date: str
     file_size: int
     status: str  # processed, pending, error
+    job_id: Optional[str] = None
+    error: Optional[str] = None
     
     # Healthcare-specific fields
     healthcare_category: Optional[str] = None
@@ -68,12 +78,11 @@ class Document(BaseModel):
     clinical_specialties: Optional[List[str]] = None
     data_sensitivity: Optional[str] = None
 
-# Mock storage - in a real app, this would be in a database
-documents = []
-
 # Directory to store uploaded files
 UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "documents")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Bytes copied per read/write when saving uploads
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
 @router.get("/", response_model=List[Document])
 async def get_documents(
@@ -85,38 +94,23 @@ async def get_documents(
     data_sensitivity: Optional[str] = None
 ):
     """Get list of all documents with healthcare-specific filtering options"""
-    filtered_docs = documents
-    
-    # Apply filters if specified
-    if industry:
-        filtered_docs = [doc for doc in filtered_docs if doc.get("industry") == industry]
-    
-    if service_type:
-        filtered_docs = [doc for doc in filtered_docs if doc.get("service_type") == service_type]
-    
-    if healthcare_category:
-        filtered_docs = [doc for doc in filtered_docs if doc.get("healthcare_category") == healthcare_category]
-        
-    if compliance_framework:
-        filtered_docs = [doc for doc in filtered_docs if doc.get("compliance_frameworks") and 
-                        compliance_framework in doc.get("compliance_frameworks", [])]
-    
-    if clinical_specialty:
-        filtered_docs = [doc for doc in filtered_docs if doc.get("clinical_specialties") and 
-                        clinical_specialty in doc.get("clinical_specialties", [])]
-    
-    if data_sensitivity:
-        filtered_docs = [doc for doc in filtered_docs if doc.get("data_sensitivity") == data_sensitivity]
-    
-    return filtered_docs
+    filters = {
+        "industry": industry,
+        "service_type": service_type,
+        "healthcare_category": healthcare_category,
+        "compliance_framework": compliance_framework,
+        "clinical_specialty": clinical_specialty,
+        "data_sensitivity": data_sensitivity
+    }
+    return await run_in_threadpool(get_document_registry().list_documents, filters)
 
 @router.get("/{document_id}", response_model=Document)
 async def get_document(document_id: str):
     """Get a specific document by ID"""
-    for doc in documents:
-        if doc["id"] == document_id:
-            return doc
-    raise HTTPException(status_code=404, detail="Document not found")
+    document = await run_in_threadpool(get_document_registry().get, document_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return document
 
 @router.post("/upload")
 async def upload_document(
@@ -128,52 +122,155 @@ async def upload_document(
     clinical_specialties: Optional[str] = Form(None),   # Comma-separated values
     data_sensitivity: Optional[str] = Form(None)
 ):
-    """Upload one or more documents with healthcare-specific metadata"""
+    """
+    Upload one or more documents with healthcare-specific metadata.
+    
+    Files are streamed to disk off the event loop and each is queued for
+    classification and indexing; documents are returned with status
+    "pending" and a job_id to poll at /jobs/{job_id}. Once the ingest queue
+    is full, the remaining files are not saved and are listed under
+    "rejected"; if no file was accepted the request fails with 503.
+    """
+    overrides = {
+        "industry": industry,
+        "service_type": service_type,
+        "healthcare_category": healthcare_category,
+        "compliance_frameworks": compliance_frameworks.split(",") if compliance_frameworks else None,
+        "clinical_specialties": clinical_specialties.split(",") if clinical_specialties else None,
+        "data_sensitivity": data_sensitivity
+    }
+    ingest_queue = get_ingest_queue()
+    registry = get_document_registry()
     result = []
+    rejected = []
     for file in files:
-        # Generate unique ID and determine file size
-        doc_id = str(uuid.uuid4())
-        content = await file.read()
-        file_size = len(content)
+        filename = os.path.basename(file.filename or "upload")
+        if rejected:
+            rejected.append({"filename": filename, "error": "ingest queue full"})
+            continue
         
-        # Save file
-        file_path = os.path.join(UPLOAD_DIR, f"{doc_id}_{file.filename}")
-        with open(file_path, "wb") as f:
-            f.write(content)
-        
-        # Process content for healthcare classification
-        content_str = content.decode('utf-8', errors='ignore')
-        healthcare_metadata = extract_healthcare_metadata(content_str, file.filename)
+        # Generate unique ID and stream the file to disk in chunks
+        doc_id = str(uuid.uuid4())
+        file_path = os.path.join(UPLOAD_DIR, f"{doc_id}_{filename}")
+        file_size = await run_in_threadpool(save_upload, file.file, file_path)
         
-        # Create document record
-        document = {
+        # Register the document before queueing it; classification fields are filled in by the job
+        document = await run_in_threadpool(registry.add, {
             "id": doc_id,
-            "filename": file.filename,
-            "title": os.path.splitext(file.filename)[0],
-            "upload_date": datetime.now().isoformat(),
+            "filename": filename,
+            "title": os.path.splitext(filename)[0],
+            "upload_date": datetime.now(),
             "file_size": file_size,
-            "status": "processed",  # In a real app, this would be "pending" until processed
-            
-            # Add industry from form or auto-detected
-            "industry": industry or healthcare_metadata.get("industry"),
-            "service_type": service_type or healthcare_metadata.get("service_type"),
-            
-            # Add healthcare-specific fields
-            "healthcare_category": healthcare_category or healthcare_metadata.get("healthcare_category"),
-            "compliance_frameworks": (
-                compliance_frameworks.split(",") if compliance_frameworks 
-                else healthcare_metadata.get("compliance_frameworks")
-            ),
-            "clinical_specialties": (
-                clinical_specialties.split(",") if clinical_specialties 
-                else healthcare_metadata.get("clinical_specialties")
-            ),
-            "data_sensitivity": data_sensitivity or healthcare_metadata.get("data_sensitivity")
-        }
-        documents.append(document)
-        result.append(document)
+            "status": "pending",
+            **overrides
+        })
+        try:
+            job = await ingest_queue.submit(process_upload, document, file_path, overrides,
+                                            document_id=doc_id, filename=filename)
+        except asyncio.QueueFull:
+            await run_in_threadpool(registry.delete, doc_id)
+            os.remove(file_path)
+            rejected.append({"filename": filename, "error": "ingest queue full"})
+            continue
+        document = await run_in_threadpool(registry.update, doc_id, {"job_id": job["id"]}) or document
+        result.append({key: value for key, value in document.items() if key != "chunk_ids"})
+    
+    if not result:
+        raise HTTPException(status_code=503, detail="Too many documents waiting to be processed, retry later")
+    return {
+        "message": f"Accepted {len(result)} of {len(files)} documents for processing",
+        "status": "pending",
+        "documents": result,
+        "rejected": rejected
+    }
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Get the status of a document processing job"""
+    job = get_ingest_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    document = None
+    if job.get("document_id"):
+        document = await run_in_threadpool(get_document_registry().get, job["document_id"])
+    if document is not None:
+        document = {key: value for key, value in document.items() if key != "chunk_ids"}
+    return {**job, "document": document}
+
+def save_upload(source: BinaryIO, file_path: str) -> int:
+    """Copy an uploaded file to disk in fixed-size chunks and return its size"""
+    with open(file_path, "wb") as f:
+        shutil.copyfileobj(source, f, UPLOAD_CHUNK_SIZE)
+        return f.tell()
+
+def read_document_text(file_path: str) -> str:
+    """
+    Extract a document's text with the ingestion parser, falling back to the raw bytes.
+    
+    Parses on the calling ingest worker thread; a process pool per upload
+    would fork the API server for every document.
+    """
+    from app.services.document_processor import get_document_processor
+    
+    try:
+        return get_document_processor().load_file(file_path)["content"]
+    except Exception as e:
+        logger.warning(f"Could not parse {file_path} ({e}), classifying raw text")
+    with open(file_path, "rb") as f:
+        return f.read().decode('utf-8', errors='ignore')
+
+def process_upload(document: Dict[str, Any], file_path: str, overrides: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Classify and index an uploaded document (runs on an ingest worker thread).
+    
+    Fields given in the upload form take precedence over detected ones. A
+    document deleted while its job was pending or running is not indexed.
+    """
+    registry = get_document_registry()
+    if registry.get(document["id"]) is None:
+        logger.info(f"Document {document['id']} was deleted before processing, skipping")
+        return {"chunks": 0, "deleted": True}
+    try:
+        content = read_document_text(file_path)
+        healthcare_metadata = extract_healthcare_metadata(content, document["filename"])
+        # Form fields win over detected ones, including fields the classifier does not return
+        fields = {**healthcare_metadata, **{key: value for key, value in overrides.items() if value}}
         
-    return {"message": f"Successfully uploaded {len(files)} documents", "documents": result}
+        # Imported here so the embedding model only loads once a document is indexed
+        from app.services.vector_store import get_vector_store
+        vector_store = get_vector_store()
+        index_metadata = {
+            **fields, "source": file_path, "filename": document["filename"], "title": document["title"]
+        }
+        if registry.get(document["id"]) is None:
+            logger.info(f"Document {document['id']} was deleted during processing, not indexing it")
+            return {"chunks": 0, "deleted": True}
+        chunk_ids = vector_store.upsert_document(document["id"], content, index_metadata)
+        vector_store.save_indexes()
+    except Exception as e:
+        registry.update(document["id"], {"status": "error", "error": str(e)})
+        raise
+    
+    if registry.update(document["id"], {**fields, "status": "processed", "chunk_ids": chunk_ids}) is None:
+        # Deleted while its chunks were being indexed; the delete could not see them
+        remove_from_index(chunk_ids)
+        return {"chunks": 0, "deleted": True}
+    invalidate_answers("document uploaded")
+    return {"chunks": len(chunk_ids), **fields}
+
+def remove_from_index(chunk_ids: List[str]) -> None:
+    """Delete a document's chunks from the knowledge base"""
+    from app.services.vector_store import get_vector_store
+    vector_store = get_vector_store()
+    vector_store.delete_chunks(chunk_ids)
+    vector_store.save_indexes()
+    invalidate_answers("document deleted")
+
+def invalidate_answers(reason: str) -> None:
+    """Drop cached answers that may be grounded on a changed knowledge base"""
+    response_cache = get_response_cache()
+    if response_cache is not None:
+        response_cache.invalidate(reason)
 
 # Create classifier instance
 healthcare_classifier = HealthcareDocumentClassifier()
@@ -198,19 +295,20 @@ def extract_healthcare_metadata(content: str, filename: str) -> Dict[str, Any]:
 @router.delete("/{document_id}")
 async def delete_document(document_id: str):
     """Delete a document"""
-    for idx, doc in enumerate(documents):
-        if doc["id"] == document_id:
-            # Remove from list
-            deleted = documents.pop(idx)
-            
-            # Delete file if exists
-            file_path = os.path.join(UPLOAD_DIR, f"{document_id}_{deleted['filename']}")
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                
-            return {"message": "Document deleted successfully"}
-            
-    raise HTTPException(status_code=404, detail="Document not found")
+    deleted = await run_in_threadpool(get_document_registry().delete, document_id)
+    if deleted is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    # Delete file if exists
+    file_path = os.path.join(UPLOAD_DIR, f"{document_id}_{deleted['filename']}")
+    if os.path.exists(file_path):
+        os.remove(file_path)
+    
+    # Remove the document's chunks from the knowledge base
+    if deleted.get("chunk_ids"):
+        await run_in_threadpool(remove_from_index, deleted["chunk_ids"])
+        
+    return {"message": "Document deleted successfully"}
 
 @router.get("/metadata/options")
 async def get_metadata_options():
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Query, HTTPException
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import os
 
 from app.services.healthcare_rag import HealthcareRAGSystem
+from app.services.retrieval_executor import get_retrieval_executor
 
 router = APIRouter()
 
@@ -11,6 +12,9 @@ router = APIRouter()
 DOCUMENT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "documents")
 healthcare_rag = HealthcareRAGSystem(DOCUMENT_DIR)
 
+# Maximum number of queries accepted by one batch search request
+MAX_BATCH_QUERIES = int(os.environ.get("CHAKRA_MAX_BATCH_QUERIES", "32"))
+
 # Data models
 class SearchResult(BaseModel):
     chunk_id: str
@@ -20,6 +24,14 @@ class SearchResult(BaseModel):
     chunk_text: str
     relevance_score: float
 
+class BatchSearchRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_QUERIES)
+    top_k: int = Field(5, ge=1)
+
+class BatchSearchResult(BaseModel):
+    query: str
+    results: List[SearchResult]
+
 class Citation(BaseModel):
     doc_id: str
     document_title: str
@@ -48,6 +60,25 @@ async def search_documents(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error searching documents: {str(e)}")
 
+def _search_many(queries: List[str], top_k: int) -> List[List[Dict[str, Any]]]:
+    """Initialize the RAG system if needed and search for all queries in one pass"""
+    if not healthcare_rag.initialized:
+        healthcare_rag.initialize()
+    return healthcare_rag.search_many(queries, top_k)
+
+@router.post("/search/batch", response_model=List[BatchSearchResult])
+async def search_documents_batch(request: BatchSearchRequest):
+    """Search healthcare documents for several queries in a single request"""
+    try:
+        # Initialization (model load) and search are blocking, so run them off the event loop
+        results = await get_retrieval_executor().run(_search_many, request.queries, request.top_k)
+        return [
+            {"query": query, "results": query_results}
+            for query, query_results in zip(request.queries, results)
+        ]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching documents: {str(e)}")
+
 @router.get("/ask", response_model=RAGResponse)
 async def ask_healthcare_question(
     question: str = Query(..., description="The healthcare SLA question")
@@ -80,5 +111,7 @@ async def check_rag_health():
         "status": "healthy",
         "initialized": healthcare_rag.initialized,
         "document_count": len(healthcare_rag.document_store) if healthcare_rag.initialized else 0,
-        "vector_store_size": len(healthcare_rag.vector_store) if healthcare_rag.initialized else 0
+        "vector_store_size": len(healthcare_rag.dense_index),
+        "dense_index": healthcare_rag.dense_index.stats(),
+        "keyword_index": healthcare_rag.keyword_index.stats()
     }
\ No newline at end of file
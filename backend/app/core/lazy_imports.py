@@ -0,0 +1,102 @@
+"""
+Lazy imports for heavy optional libraries.
+
+Modules such as chromadb, sentence-transformers, unstructured and openai take
+seconds to import. Services bind them with lazy_module() so importing the API
+does not pay that cost; the library is imported the first time one of its
+attributes is used, and the import time is recorded for startup reporting.
+"""
+import time
+import logging
+import importlib
+import threading
+from types import ModuleType
+from typing import Any, Dict, Optional
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+_import_timings: Dict[str, float] = {}
+_import_lock = threading.Lock()
+
+
+class LazyModule:
+    """
+    A stand-in for a module that imports it on first attribute access.
+
+    Attribute lookups and assignments are forwarded to the real module every
+    time, so patching the real module (e.g. in tests) is seen through the
+    stand-in.
+    """
+
+    def __init__(self, name: str):
+        """
+        Initialize the stand-in.
+
+        Args:
+            name: Dotted name of the module to import
+        """
+        self._name = name
+        self._module: Optional[ModuleType] = None
+
+    def load(self) -> ModuleType:
+        """Import the module if it is not imported yet and return it."""
+        if self._module is None:
+            with _import_lock:
+                if self._module is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    elapsed = time.perf_counter() - start
+                    _import_timings[self._name] = elapsed
+                    logger.info(f"Imported {self._name} in {elapsed:.2f}s")
+                    self._module = module
+        return self._module
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the module has been imported through this stand-in."""
+        return self._module is not None
+
+    def __getattr__(self, attr: str) -> Any:
+        if attr in ("_name", "_module"):
+            # Not yet set (e.g. during copy); avoid recursing into load()
+            raise AttributeError(attr)
+        return getattr(self.load(), attr)
+
+    def __setattr__(self, attr: str, value: Any) -> None:
+        # Module settings such as openai.api_key must land on the real module
+        if attr in ("_name", "_module"):
+            object.__setattr__(self, attr, value)
+        else:
+            setattr(self.load(), attr, value)
+
+    def __delattr__(self, attr: str) -> None:
+        delattr(self.load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_module(name: str) -> LazyModule:
+    """
+    Bind a module without importing it.
+
+    Args:
+        name: Dotted name of the module
+
+    Returns:
+        LazyModule that imports the module on first attribute access
+    """
+    return LazyModule(name)
+
+
+def import_timings() -> Dict[str, float]:
+    """
+    Get the import time of each lazily imported module.
+
+    Returns:
+        Dictionary mapping module name to import time in seconds
+    """
+    with _import_lock:
+        return dict(_import_timings)
@@ -1,9 +1,48 @@
+import time
+
+_import_start = time.perf_counter()
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 
 from app.api.api import api_router
+from app.services.retrieval_executor import get_retrieval_executor
+from app.services.ollama_provider import close_ollama_provider
+from app.services.ingest_queue import get_ingest_queue, close_ingest_queue
+from app.services.response_cache import get_response_cache
+from app.services.reranker import get_reranker
+from app.services.parse_cache import get_parsed_document_cache
+from app.services.warmup import get_startup_report
+
+logger = logging.getLogger(__name__)
+
+# Time spent importing the app and its routes; heavy libraries load during warm-up
+get_startup_report().app_import_seconds = round(time.perf_counter() - _import_start, 3)
 
-app = FastAPI(title="Chakra - SLM AI Assistant")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup_report = get_startup_report()
+    warmup_task = None
+    if startup_report.mode == "blocking":
+        await run_in_threadpool(startup_report.warm_up)
+    elif startup_report.mode == "background":
+        warmup_task = asyncio.create_task(run_in_threadpool(startup_report.warm_up))
+    logger.info(f"Startup complete (warm-up {startup_report.status})")
+    yield
+    if warmup_task is not None:
+        await warmup_task
+    await close_ingest_queue()
+    await close_ollama_provider()
+
+
+app = FastAPI(title="Chakra - SLM AI Assistant", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -21,6 +60,22 @@ app.include_router(api_router)
 async def root():
     return {"message": "Welcome to Chakra SLM AI Assistant API"}
 
+@app.get("/ready")
+async def readiness_check():
+    startup_report = get_startup_report().to_dict()
+    return JSONResponse(startup_report, status_code=200 if startup_report["ready"] else 503)
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    response_cache = get_response_cache()
+    reranker = get_reranker()
+    parse_cache = get_parsed_document_cache()
+    return {
+        "status": "healthy",
+        "startup": get_startup_report().to_dict(),
+        "retrieval": get_retrieval_executor().stats(),
+        "response_cache": response_cache.stats() if response_cache else None,
+        "reranker": reranker.stats() if reranker else None,
+        "parse_cache": parse_cache.stats() if parse_cache else None,
+        "ingest_queue": get_ingest_queue().stats()
+    }
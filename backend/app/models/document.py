@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Integer, DateTime, func
-from app.models.database import Base
+from sqlalchemy import Column, String, Integer, DateTime, JSON, ForeignKey, Index, Table, func
+from app.core.database import Base
 import uuid
 
 class Document(Base):
@@ -8,8 +8,37 @@ class Document(Base):
     id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
     filename = Column(String, nullable=False)
     title = Column(String, nullable=False)
-    industry = Column(String, nullable=True)
-    service_type = Column(String, nullable=True)
+    industry = Column(String, nullable=True, index=True)
+    service_type = Column(String, nullable=True, index=True)
     upload_date = Column(DateTime, default=func.now())
     file_size = Column(Integer)
-    status = Column(String, default="pending")  # processed, pending, error
\ No newline at end of file
+    status = Column(String, default="pending")  # processed, pending, error
+
+    # Healthcare-specific fields; multi-valued ones are also indexed in the tables below
+    healthcare_category = Column(String, nullable=True, index=True)
+    data_sensitivity = Column(String, nullable=True, index=True)
+    compliance_frameworks = Column(JSON, nullable=True)
+    clinical_specialties = Column(JSON, nullable=True)
+
+    # Processing state
+    job_id = Column(String, nullable=True)
+    error = Column(String, nullable=True)
+    chunk_ids = Column(JSON, nullable=True)
+
+
+# One row per (document, value) so multi-valued fields are filtered through an index
+document_compliance_frameworks = Table(
+    "document_compliance_frameworks",
+    Base.metadata,
+    Column("document_id", String, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True),
+    Column("framework", String, primary_key=True),
+    Index("ix_document_compliance_frameworks_framework", "framework", "document_id"),
+)
+
+document_clinical_specialties = Table(
+    "document_clinical_specialties",
+    Base.metadata,
+    Column("document_id", String, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True),
+    Column("specialty", String, primary_key=True),
+    Index("ix_document_clinical_specialties_specialty", "specialty", "document_id"),
+)
@@ -11,20 +11,35 @@ This service handles AI-powered consultation functionality, including:
 from sqlalchemy.orm import Session
 import os
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, AsyncGenerator
 import json
 
 from app.models import database as db_models
 from app.core.config import LLM_PROVIDER
 from .llm_provider import LLMProvider
 from .openai_provider import OpenAIProvider
-from .ollama_provider import OllamaProvider
+from .ollama_provider import get_ollama_provider
+from .metadata_filters import HEALTHCARE_INDUSTRY_VALUES, metadata_filter
 from .prompts import get_industry_prompt
 from .rag_service import get_rag_service
+from .retrieval_executor import get_retrieval_executor
+from .response_cache import ResponseCache, get_response_cache
+from .tokenizer import get_token_counter
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Provider replies that report a failure rather than an answer; never cached
+PROVIDER_ERROR_PREFIXES = (
+    "I encountered an issue with my local knowledge system",
+    "I couldn't connect to the local AI system",
+    "The request to the local AI system timed out",
+    "I'm having trouble",
+    "All model fallbacks failed",
+    "Streaming failed",
+    "Error",
+)
+
 def get_llm_provider() -> LLMProvider:
     """
     Factory function to get the configured LLM provider.
@@ -36,7 +51,7 @@ def get_llm_provider() -> LLMProvider:
     
     if provider_name == "ollama":
         logger.info("Using Ollama LLM provider")
-        return OllamaProvider()
+        return get_ollama_provider()
     else:
         logger.info("Using OpenAI LLM provider")
         return OpenAIProvider()
@@ -325,7 +340,7 @@ async def process_consultation_message(
     if LLM_PROVIDER.lower() == "openai":
         llm_provider = OpenAIProvider()
     else:
-        llm_provider = OllamaProvider()
+        llm_provider = get_ollama_provider()
     
     # Generate AI response
     try:
@@ -847,13 +862,189 @@ def force_stage_transition(db: Session, session_id: int) -> Dict[str, Any]:
         session.session_state['completed_stages'] = completed_stages
         
 
-async def get_ai_response(messages: list, use_rag: bool = False) -> Dict[str, Any]:
+async def prepare_rag_messages(provider: LLMProvider, messages: list, query: str) -> Tuple[list, List[Dict[str, Any]], List[str]]:
+    """
+    Retrieve knowledge base context for a query and add it to the messages.
+    
+    Args:
+        provider: LLM provider the RAG service is bound to
+        messages: List of message dictionaries with 'role' and 'content' keys
+        query: The user's query to retrieve context for
+        
+    Returns:
+        Tuple of the augmented messages, the metadata of the cited sources and
+        the IDs of the retrieved chunks
+    """
+    # Use RAG service for enhanced responses
+    logger.info(f"Using RAG for response generation with query: {query[:50]}...")
+    logger.debug(f"RAG query full text: {query}")
+    
+    # Get RAG service and log its initialization
+    # The first call loads the embedding model, so keep it off the event loop
+    rag_service = await get_retrieval_executor().run(get_rag_service, provider)
+    logger.info(f"RAG service retrieved, using {provider.__class__.__name__} as LLM provider")
+    
+    # Check if any message contains healthcare keywords or if we're in a healthcare template
+    healthcare_related = False
+    for msg in messages:
+        if msg.get("role") == "system" and isinstance(msg.get("content"), str):
+            if "healthcare" in msg.get("content").lower() or "hipaa" in msg.get("content").lower():
+                healthcare_related = True
+                break
+    
+    if not healthcare_related:
+        # Standard RAG flow, no sources are reported
+        context_obj = await rag_service.aget_relevant_context(
+            query, include_sources=True, token_budget=rag_service.context_token_budget(messages)
+        )
+        chunk_ids = [source.get("id", "") for source in context_obj.sources]
+        return rag_service.augment_messages(messages, context_obj.text), [], chunk_ids
+    
+    # Apply filter for healthcare documents and get context with sources
+    logger.info(f"Retrieving healthcare-specific context with sources")
+    filter_criteria = metadata_filter({"industry": HEALTHCARE_INDUSTRY_VALUES})
+    context_obj = await rag_service.aget_relevant_context(
+        query, filter_criteria=filter_criteria, include_sources=True,
+        token_budget=rag_service.context_token_budget(messages)
+    )
+    
+    # Extract context text and sources
+    context_text = context_obj.text if hasattr(context_obj, 'text') else str(context_obj)
+    sources = context_obj.sources if hasattr(context_obj, 'sources') else []
+    chunk_ids = [source.get("id", "") for source in sources]
+    
+    # Log source information
+    if sources:
+        logger.info(f"Found {len(sources)} relevant healthcare sources")
+        for i, src in enumerate(sources):
+            metadata = src.get("metadata", {})
+            title = metadata.get("title", "Unknown")
+            source_id = metadata.get("source", "Unknown")
+            logger.info(f"  Source {i+1}: {title} ({source_id})")
+    
+    # Create augmented messages with the retrieved context
+    augmented_messages = [dict(m) for m in messages]
+    system_msg = next((m for m in augmented_messages if m["role"] == "system"), None)
+    
+    if system_msg:
+        system_msg["content"] = system_msg["content"] + f"\n\nUse the following healthcare information:\n\n{context_text}\n\nInclude source citations like [Source 1], [Source 2], etc. when referencing specific information."
+    else:
+        augmented_messages.insert(0, {
+            "role": "system",
+            "content": f"You are an AI assistant specialized in healthcare SLAs and regulations. Use the following healthcare information to help answer:\n\n{context_text}\n\nInclude source citations like [Source 1], [Source 2], etc. when referencing specific information."
+        })
+    
+    return augmented_messages, [source.get("metadata", {}) for source in sources], chunk_ids
+
+
+async def lookup_cached_response(
+    provider: LLMProvider,
+    messages: list,
+    query: Optional[str],
+    chunk_ids: List[str],
+    template_stage: Optional[str] = None,
+    use_embedding: bool = False
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Look up a cached response for a query.
+    
+    Args:
+        provider: LLM provider that would generate the response
+        messages: Messages before RAG augmentation
+        query: The user's query
+        chunk_ids: IDs of the chunks retrieved for the query
+        template_stage: Template and stage identifier, if any
+        use_embedding: Whether to embed the query for a similarity lookup
+        
+    Returns:
+        Tuple of the cached response (None on a miss) and the lookup to pass
+        to store_cached_response (None if caching is disabled)
+    """
+    response_cache = get_response_cache()
+    if response_cache is None or not query:
+        return None, None
+    
+    system_prompts = [msg["content"] for msg in messages if msg.get("role") == "system"]
+    # Prior turns of the conversation; the last user message is the query itself
+    history = [msg for msg in messages if msg.get("role") != "system"]
+    if history and history[-1].get("role") == "user":
+        history = history[:-1]
+    model_name = getattr(provider, "model", LLM_PROVIDER)
+    lookup = {
+        "prompt": query,
+        "scope": ResponseCache.make_scope(model_name, template_stage, chunk_ids, system_prompts, history),
+        "embedding": None
+    }
+    
+    if use_embedding:
+        try:
+            rag_service = get_rag_service(provider)
+            lookup["embedding"] = await rag_service.aembed_query(query)
+        except Exception as e:
+            logger.warning(f"Could not embed query for response cache lookup: {e}")
+    
+    cached = response_cache.get(lookup["prompt"], lookup["scope"], lookup["embedding"])
+    if cached is not None:
+        logger.info(f"Serving cached response for query: {query[:50]}...")
+    return cached, lookup
+
+
+def count_token_usage(provider: LLMProvider, messages: list, completion: str) -> Dict[str, int]:
+    """
+    Count the prompt and completion tokens of a generation with the model's tokenizer.
+    
+    Args:
+        provider: LLM provider that generated the completion
+        messages: Messages sent to the provider (after RAG augmentation)
+        completion: Generated text
+        
+    Returns:
+        Dictionary with prompt_tokens, completion_tokens and total_tokens
+    """
+    counter = get_token_counter(getattr(provider, "model", None))
+    prompt_tokens = sum(counter.count_messages(messages))
+    completion_tokens = counter.count(completion)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+# Usage recorded for answers served from the response cache, which consume no model tokens
+CACHED_TOKEN_USAGE = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+
+
+def store_cached_response(lookup: Optional[Dict[str, Any]], response: Dict[str, Any]) -> None:
+    """
+    Cache a generated response unless it reports a provider failure.
+    
+    Args:
+        lookup: Lookup returned by lookup_cached_response
+        response: Response dictionary with 'text' and 'sources'
+    """
+    response_cache = get_response_cache()
+    text = response.get("text", "")
+    if response_cache is None or lookup is None or not text.strip():
+        return
+    if text.startswith(PROVIDER_ERROR_PREFIXES) or "[Response stream interrupted]" in text:
+        return
+    cached = {key: value for key, value in response.items() if key != "usage"}
+    response_cache.put(lookup["prompt"], lookup["scope"], cached, lookup["embedding"])
+
+
+async def get_ai_response(messages: list, use_rag: bool = False,
+                          template_stage: Optional[str] = None) -> Dict[str, Any]:
     """
     Get a response from the configured LLM provider, optionally using RAG.
     
+    Responses are cached by prompt, template stage, retrieved chunks and
+    model, so repeated questions skip generation.
+    
     Args:
         messages: List of message dictionaries with 'role' and 'content' keys
         use_rag: Whether to use RAG for context augmentation
+        template_stage: Template and stage identifier used to scope cached responses
         
     Returns:
         Dictionary with response text and sources, or just a string response
@@ -866,32 +1057,12 @@ async def get_ai_response(messages: list, use_rag: bool = False) -> Dict[str, An
         # Get the configured provider
         provider = get_llm_provider()
         
-        # If using Ollama, perform environment checks
+        # If using Ollama, check it is reachable (cached by the shared provider)
         if provider_name == "ollama":
-            from app.core.config import OLLAMA_API_URL, OLLAMA_MODEL
-            import socket
-            from urllib.parse import urlparse
-            
-            # Parse the API URL
-            parsed_url = urlparse(OLLAMA_API_URL)
-            host = parsed_url.hostname or "localhost"
-            port = parsed_url.port or 11434
-            
-            # Log Ollama configuration
-            logger.info(f"Ollama API URL: {OLLAMA_API_URL}")
-            logger.info(f"Ollama model: {OLLAMA_MODEL}")
-            
-            # Quick socket connectivity check
-            try:
-                logger.info(f"Quick connectivity check to {host}:{port}")
-                s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                s.settimeout(2)
-                s.connect((host, port))
-                s.close()
-                logger.info(f"✓ Socket connectivity check passed")
-            except Exception as socket_exc:
-                logger.error(f"✗ Socket connectivity check failed: {str(socket_exc)}")
-                return f"I'm having trouble connecting to the Ollama service. Please ensure Ollama is running at {host}:{port}."
+            health_error = await provider.check_health()
+            if health_error:
+                logger.error(f"✗ Ollama health check failed: {health_error}")
+                return f"I'm having trouble connecting to the Ollama service. {health_error}"
         
         # Extract the user's query (last user message)
         query = None
@@ -900,86 +1071,29 @@ async def get_ai_response(messages: list, use_rag: bool = False) -> Dict[str, An
                 query = msg.get("content")
                 break
                 
+        use_rag = bool(use_rag and query)
+        chunk_ids = []
+        if use_rag:
+            augmented_messages, sources, chunk_ids = await prepare_rag_messages(provider, messages, query)
+        
+        # Repeated questions grounded on the same chunks reuse the earlier answer
+        cached, cache_lookup = await lookup_cached_response(
+            provider, messages, query, chunk_ids, template_stage, use_embedding=use_rag
+        )
+        if cached is not None:
+            cached["usage"] = dict(CACHED_TOKEN_USAGE)
+            return cached
+        
         # Generate response based on whether to use RAG
-        if use_rag and query:
-            # Use RAG service for enhanced responses
-            logger.info(f"Using RAG for response generation with query: {query[:50]}...")
-            logger.debug(f"RAG query full text: {query}")
-            
-            # Get RAG service and log its initialization
-            rag_service = get_rag_service(provider)
-            logger.info(f"RAG service retrieved, using {provider.__class__.__name__} as LLM provider")
-            
-            # Check for healthcare context to apply domain-specific filters
-            filter_criteria = None
-            healthcare_related = False
-            
-            # Check if any message contains healthcare keywords or if we're in a healthcare template
-            for msg in messages:
-                if msg.get("role") == "system" and isinstance(msg.get("content"), str):
-                    if "healthcare" in msg.get("content").lower() or "hipaa" in msg.get("content").lower():
-                        healthcare_related = True
-                        break
-            
-            # Apply filter for healthcare documents if this is healthcare-related
-            if healthcare_related:
-                filter_criteria = {"industry": "healthcare"}
-                logger.info(f"Applying healthcare-specific filter to RAG search")
-            
-            # Generate response with RAG, potentially with filter criteria
-            logger.debug(f"Calling generate_response_with_rag with {len(messages)} messages")
-            if filter_criteria:
-                # Get context with sources
-                logger.info(f"Retrieving healthcare-specific context with sources")
-                context_obj = rag_service.get_relevant_context(query, filter_criteria=filter_criteria, include_sources=True)
-                
-                # Extract context text and sources
-                context_text = context_obj.text if hasattr(context_obj, 'text') else str(context_obj)
-                sources = context_obj.sources if hasattr(context_obj, 'sources') else []
-                
-                # Log source information
-                if sources:
-                    logger.info(f"Found {len(sources)} relevant healthcare sources")
-                    for i, src in enumerate(sources):
-                        metadata = src.get("metadata", {})
-                        title = metadata.get("title", "Unknown")
-                        source_id = metadata.get("source", "Unknown")
-                        logger.info(f"  Source {i+1}: {title} ({source_id})")
-                
-                # Create augmented messages with the retrieved context
-                augmented_messages = messages.copy()
-                system_msg = next((m for m in augmented_messages if m["role"] == "system"), None)
-                
-                if system_msg:
-                    system_msg["content"] = system_msg["content"] + f"\n\nUse the following healthcare information:\n\n{context_text}\n\nInclude source citations like [Source 1], [Source 2], etc. when referencing specific information."
-                else:
-                    augmented_messages.insert(0, {
-                        "role": "system",
-                        "content": f"You are an AI assistant specialized in healthcare SLAs and regulations. Use the following healthcare information to help answer:\n\n{context_text}\n\nInclude source citations like [Source 1], [Source 2], etc. when referencing specific information."
-                    })
-                
-                # Generate the response with augmented messages
-                response_text = await provider.generate_response(augmented_messages)
-                logger.info(f"Generated response using healthcare-filtered RAG context")
-                
-                # Prepare response with sources
-                response = {
-                    "text": response_text,
-                    "sources": [source.get("metadata", {}) for source in sources]
-                }
-            else:
-                # Standard RAG flow
-                response_text = await rag_service.generate_response_with_rag(messages, query)
-                # No sources for standard flow
-                response = {"text": response_text, "sources": []}
+        if use_rag:
+            # Generate the response with augmented messages
+            response_text = await provider.generate_response(augmented_messages)
+            response = {"text": response_text, "sources": sources,
+                        "usage": count_token_usage(provider, augmented_messages, response_text)}
             
             # Log successful response generation
-            if isinstance(response, dict) and "text" in response:
-                logger.info(f"Successfully generated RAG response ({len(response['text'])} chars) with {len(response['sources'])} sources")
-                logger.debug(f"RAG response preview: {response['text'][:100]}...")
-            else:
-                logger.info(f"Successfully generated RAG response ({len(response)} chars)")
-                logger.debug(f"RAG response preview: {response[:100]}...")
+            logger.info(f"Successfully generated RAG response ({len(response['text'])} chars) with {len(response['sources'])} sources")
+            logger.debug(f"RAG response preview: {response['text'][:100]}...")
         else:
             # Standard response generation
             logger.info(f"Calling provider.generate_response with {len(messages)} messages (standard mode)")
@@ -989,7 +1103,8 @@ async def get_ai_response(messages: list, use_rag: bool = False) -> Dict[str, An
                 max_tokens=800
             )
             # Format as consistent dictionary response
-            response = {"text": response_text, "sources": []}
+            response = {"text": response_text, "sources": [],
+                        "usage": count_token_usage(provider, messages, response_text)}
             logger.info(f"Successfully generated standard response ({len(response_text)} chars)")
         
         # Check if the response text is an error message from the provider
@@ -1003,7 +1118,8 @@ async def get_ai_response(messages: list, use_rag: bool = False) -> Dict[str, An
             logger.error(f"Ollama provider returned error string: {response}")
             error_response = f"I'm having trouble accessing my knowledge base. Technical details: {response}"
             return {"text": error_response, "sources": []}
-            
+        
+        store_cached_response(cache_lookup, response)
         return response
         
     except Exception as e:
@@ -1024,7 +1140,7 @@ async def get_ai_response(messages: list, use_rag: bool = False) -> Dict[str, An
             return "I'm having trouble processing your request. Please try again later."
 
 
-async def process_message(
+def _prepare_message_context(
     content: str,
     role: str,
     session_id: Optional[int],
@@ -1032,7 +1148,21 @@ async def process_message(
     db: Session,
     template_id: Optional[str] = None
 ) -> Dict[str, Any]:
-    """Process a message and return an AI response."""
+    """
+    Save an incoming message and build the LLM conversation for it.
+    
+    Args:
+        content: Message content
+        role: Message role
+        session_id: Existing consultation session ID, or None to create one
+        user_id: ID of the user sending the message
+        db: Database session
+        template_id: Template to use when creating a new session
+        
+    Returns:
+        Dictionary with the session, template data, current stage (and its
+        template/stage identifier), formatted messages and whether RAG should be used
+    """
     
     # Get or create a new consultation session
     session = None
@@ -1270,8 +1400,41 @@ Extract the requested information and provide appropriate guidance.
         use_rag = False
         logger.info("Not using RAG for short conversation")
     
-    # Get response with or without RAG
-    response_data = await get_ai_response(openai_messages, use_rag=use_rag)
+    return {
+        "session": session,
+        "template_data": template_data,
+        "current_stage": current_stage,
+        "template_stage": f"{template_data['id']}:{current_stage['id']}" if template_data and current_stage else None,
+        "messages": openai_messages,
+        "use_rag": use_rag
+    }
+
+
+def _complete_message(
+    content: str,
+    role: str,
+    user_id: Optional[int],
+    db: Session,
+    prepared: Dict[str, Any],
+    response_data: Any
+) -> Dict[str, Any]:
+    """
+    Save the assistant reply, advance template progress and build the API response.
+    
+    Args:
+        content: The user's message content
+        role: The user's message role
+        user_id: ID of the user sending the message
+        db: Database session
+        prepared: Context returned by _prepare_message_context
+        response_data: Response from get_ai_response (dict with text and sources, or a string)
+        
+    Returns:
+        Response dictionary with the message, session ID and optional progress and sources
+    """
+    session = prepared["session"]
+    template_data = prepared["template_data"]
+    current_stage = prepared["current_stage"]
     
     # Check if we got a response with sources
     sources = []
@@ -1281,10 +1444,18 @@ Extract the requested information and provide appropriate guidance.
         # RAG response with sources
         response_text = response_data["text"]
         sources = response_data.get("sources", [])
+        usage = response_data.get("usage")
         logger.info(f"Received response with {len(sources)} citation sources")
     else:
         # Regular text response
         response_text = response_data
+        usage = None
+    
+    if usage is None:
+        # Error replies carry no usage; count the exchange with the model's tokenizer
+        counter = get_token_counter(getattr(get_llm_provider(), "model", None))
+        prompt_tokens = counter.count_message({"role": role, "content": content})
+        usage = {"total_tokens": prompt_tokens + counter.count(response_text)}
     
     # Save AI response to database
     ai_message = db_models.Message(
@@ -1297,6 +1468,14 @@ Extract the requested information and provide appropriate guidance.
     # Update response to include sources if available
     response = response_text
     
+    # Track token usage for every reply, including template stage replies
+    db.add(db_models.TokenUsage(
+        user_id=user_id,
+        tokens_consumed=usage["total_tokens"],
+        endpoint="chat",
+        session_id=session.id
+    ))
+    
     # Update template progression if this is a template-based session
     if current_stage and role == "user" and template_data:
         # Extract outputs from the AI response (would need advanced extraction logic)
@@ -1371,15 +1550,6 @@ Extract the requested information and provide appropriate guidance.
                 db.commit()
                 return response_with_completion
     
-    # Track token usage
-    # This is simplified; real implementation would calculate actual token usage
-    token_usage = db_models.TokenUsage(
-        user_id=user_id,
-        tokens_consumed=len(content) + len(response),  # Simplified estimation
-        endpoint="chat",
-        session_id=session.id
-    )
-    db.add(token_usage)
     db.commit()
     
     # Standard response for non-template sessions
@@ -1392,4 +1562,131 @@ Extract the requested information and provide appropriate guidance.
     if sources:
         response_obj["sources"] = sources
     
-    return response_obj
\ No newline at end of file
+    return response_obj
+
+
+async def process_message(
+    content: str,
+    role: str,
+    session_id: Optional[int],
+    user_id: Optional[int],
+    db: Session,
+    template_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """Process a message and return an AI response."""
+    prepared = _prepare_message_context(content, role, session_id, user_id, db, template_id)
+    
+    # Get response with or without RAG
+    response_data = await get_ai_response(
+        prepared["messages"],
+        use_rag=prepared["use_rag"],
+        template_stage=prepared["template_stage"]
+    )
+    
+    return _complete_message(content, role, user_id, db, prepared, response_data)
+
+
+def _sse_event(event: str, data: Any) -> str:
+    """
+    Format a server-sent event.
+    
+    Args:
+        event: Event name
+        data: JSON-serializable payload
+        
+    Returns:
+        The encoded event, terminated by a blank line
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_message(
+    content: str,
+    role: str,
+    session_id: Optional[int],
+    user_id: Optional[int],
+    db: Session,
+    template_id: Optional[str] = None
+) -> AsyncGenerator[str, None]:
+    """
+    Process a message and stream the AI response as server-sent events.
+    
+    Emits a "start" event with the session ID, a "token" event per generated
+    chunk and a final "done" event carrying the same payload process_message
+    returns. The assistant message is only persisted once the stream has
+    completed; if the client disconnects the upstream generation is closed
+    and nothing is saved.
+    
+    Args:
+        content: Message content
+        role: Message role
+        session_id: Existing consultation session ID, or None to create one
+        user_id: ID of the user sending the message
+        db: Database session
+        template_id: Template to use when creating a new session
+        
+    Yields:
+        Encoded server-sent events
+    """
+    prepared = _prepare_message_context(content, role, session_id, user_id, db, template_id)
+    yield _sse_event("start", {"session_id": prepared["session"].id})
+    
+    provider = get_llm_provider()
+    messages = prepared["messages"]
+    sources = []
+    chunk_ids = []
+    
+    try:
+        if LLM_PROVIDER.lower() == "ollama":
+            health_error = await provider.check_health()
+            if health_error:
+                logger.error(f"✗ Ollama health check failed: {health_error}")
+                yield _sse_event("error", {"detail": f"I'm having trouble connecting to the Ollama service. {health_error}"})
+                return
+        
+        query = next((msg.get("content") for msg in reversed(messages) if msg.get("role") == "user"), None)
+        use_rag = bool(prepared["use_rag"] and query)
+        if use_rag:
+            messages, sources, chunk_ids = await prepare_rag_messages(provider, messages, query)
+        
+        cached, cache_lookup = await lookup_cached_response(
+            provider, prepared["messages"], query, chunk_ids, prepared["template_stage"], use_embedding=use_rag
+        )
+    except Exception as e:
+        logger.error(f"Error preparing streamed response: {e}")
+        yield _sse_event("error", {"detail": "I'm having trouble processing your request. Please try again later."})
+        return
+    
+    if cached is not None:
+        cached["usage"] = dict(CACHED_TOKEN_USAGE)
+        yield _sse_event("token", {"token": cached["text"]})
+        yield _sse_event("done", _complete_message(content, role, user_id, db, prepared, cached))
+        return
+    
+    chunks = []
+    if hasattr(provider, "stream_response"):
+        upstream = provider.stream_response(messages=messages, temperature=0.7, max_tokens=800)
+        try:
+            async for chunk in upstream:
+                chunks.append(chunk)
+                yield _sse_event("token", {"token": chunk})
+        except Exception as e:
+            logger.error(f"Error streaming AI response: {e}")
+            yield _sse_event("error", {"detail": "The response stream was interrupted. Please try again."})
+            return
+        finally:
+            # Closing the generator releases the upstream HTTP stream when the
+            # client disconnects and this generator is cancelled or closed
+            await upstream.aclose()
+    else:
+        # Providers without streaming support produce the reply in one chunk
+        response_text = await provider.generate_response(messages=messages, temperature=0.7, max_tokens=800)
+        chunks.append(response_text)
+        yield _sse_event("token", {"token": response_text})
+    
+    response_text = "".join(chunks)
+    response_data = {"text": response_text, "sources": sources,
+                     "usage": count_token_usage(provider, messages, response_text)}
+    logger.info(f"Streamed response complete ({len(response_data['text'])} chars), saving assistant message")
+    store_cached_response(cache_lookup, response_data)
+    yield _sse_event("done", _complete_message(content, role, user_id, db, prepared, response_data))
@@ -0,0 +1,364 @@
+"""
+BM25 Inverted Index for Keyword Retrieval
+
+This module provides functionality for:
+- Scoring documents against keyword queries with Okapi BM25
+- Storing postings compactly as parallel arrays of document numbers and term frequencies
+- Adding and deleting documents incrementally
+- Persisting the index to disk and memory-mapping the postings on load
+"""
+
+import os
+import re
+import json
+import math
+import logging
+import threading
+from array import array
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Configuration constants
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Rebuild the postings once this fraction of indexed documents has been deleted
+COMPACT_DELETED_RATIO = 0.25
+META_FILENAME = "bm25_meta.json"
+ARRAY_FILENAMES = ("postings_docs", "postings_tfs", "term_offsets", "doc_lengths", "live")
+
+TOKEN_PATTERN = re.compile(r"\b\w+\b")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lower-case word terms.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of terms in order of appearance
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    An inverted index scored with BM25.
+
+    Each term owns two parallel uint32 arrays: the numbers of the documents
+    containing it (ascending) and its frequency in each. Deletes are
+    tombstones, and like other inverted indexes the tombstoned postings still
+    count towards document frequency until the index is compacted, which
+    happens automatically once enough documents are deleted.
+
+    Postings of a loaded index stay memory-mapped; a term's postings are only
+    copied into memory when a new document adds to them.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        """
+        Initialize an empty index.
+
+        Args:
+            k1: Term frequency saturation parameter
+            b: Document length normalization parameter
+        """
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._terms: Dict[str, int] = {}
+        self._doc_keys: List[Optional[str]] = []
+        self._doc_numbers: Dict[str, int] = {}
+        self._doc_lengths = array("I")
+        self._live = bytearray()
+        self._total_length = 0
+        # Postings loaded from disk (memory-mapped) and per-term in-memory overrides
+        self._base_docs = np.zeros(0, dtype=np.uint32)
+        self._base_tfs = np.zeros(0, dtype=np.uint32)
+        self._base_offsets = np.zeros(1, dtype=np.int64)
+        self._postings: Dict[int, Tuple[array, array]] = {}
+
+    def __len__(self) -> int:
+        """Return the number of live documents."""
+        with self._lock:
+            return len(self._doc_numbers)
+
+    def __contains__(self, key: str) -> bool:
+        """Return whether a document key is indexed."""
+        return key in self._doc_numbers
+
+    def add(self, key: str, text: str) -> None:
+        """
+        Index a document, replacing any document with the same key.
+
+        Args:
+            key: Unique document key
+            text: Document text
+        """
+        terms = tokenize(text)
+        with self._lock:
+            if key in self._doc_numbers:
+                self.delete(key)
+
+            doc_no = len(self._doc_keys)
+            self._doc_keys.append(key)
+            self._doc_numbers[key] = doc_no
+            self._doc_lengths.append(len(terms))
+            self._live.append(1)
+            self._total_length += len(terms)
+
+            for term, tf in Counter(terms).items():
+                term_id = self._terms.get(term)
+                if term_id is None:
+                    term_id = len(self._terms)
+                    self._terms[term] = term_id
+                docs, tfs = self._writable_postings(term_id)
+                docs.append(doc_no)
+                tfs.append(tf)
+
+    def add_many(self, items: List[Tuple[str, str]]) -> None:
+        """
+        Index several documents.
+
+        Args:
+            items: List of (key, text) pairs
+        """
+        for key, text in items:
+            self.add(key, text)
+
+    def delete(self, key: str) -> bool:
+        """
+        Remove a document from the index.
+
+        Args:
+            key: Document key
+
+        Returns:
+            True if the document was indexed
+        """
+        with self._lock:
+            doc_no = self._doc_numbers.pop(key, None)
+            if doc_no is None:
+                return False
+
+            self._live[doc_no] = 0
+            self._doc_keys[doc_no] = None
+            self._total_length -= self._doc_lengths[doc_no]
+
+            deleted = len(self._doc_keys) - len(self._doc_numbers)
+            if deleted > COMPACT_DELETED_RATIO * len(self._doc_keys):
+                self.compact()
+            return True
+
+    def search(self, query: str, top_k: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Score documents against a keyword query.
+
+        Only the postings of the query terms are read, so the cost depends on
+        how many documents contain those terms rather than on the index size.
+
+        Args:
+            query: Query text
+            top_k: Number of results to return, or None for every matching document
+
+        Returns:
+            List of (key, score) pairs sorted by descending score
+        """
+        query_terms = set(tokenize(query))
+        with self._lock:
+            num_live = len(self._doc_numbers)
+            if not num_live:
+                return []
+
+            avg_length = self._total_length / num_live or 1.0
+            doc_lengths = np.frombuffer(self._doc_lengths, dtype=np.uint32)
+            num_docs = len(self._doc_keys)
+            scores = np.zeros(num_docs, dtype=np.float32)
+
+            for term in query_terms:
+                term_id = self._terms.get(term)
+                if term_id is None:
+                    continue
+                docs, tfs = self._read_postings(term_id)
+                if not len(docs):
+                    continue
+                idf = math.log(1 + (num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                tfs = tfs.astype(np.float32)
+                length_norm = 1 - self.b + self.b * doc_lengths[docs] / avg_length
+                scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + self.k1 * length_norm)
+
+            scores *= np.frombuffer(bytes(self._live), dtype=np.uint8)
+            matches = np.flatnonzero(scores)
+            if top_k is not None and len(matches) > top_k:
+                matches = matches[np.argpartition(-scores[matches], top_k - 1)[:top_k]]
+            matches = matches[np.argsort(-scores[matches], kind="stable")]
+            return [(self._doc_keys[doc_no], float(scores[doc_no])) for doc_no in matches]
+
+    def compact(self) -> None:
+        """Rebuild the postings without deleted documents and renumber the rest."""
+        with self._lock:
+            renumber = np.full(len(self._doc_keys), -1, dtype=np.int64)
+            live_numbers = [doc_no for doc_no, alive in enumerate(self._live) if alive]
+            renumber[live_numbers] = np.arange(len(live_numbers))
+
+            postings = {}
+            for term, term_id in self._terms.items():
+                docs, tfs = self._read_postings(term_id)
+                keep = renumber[docs] >= 0
+                if keep.any():
+                    postings[term] = (renumber[docs[keep]].astype(np.uint32), tfs[keep])
+
+            self._doc_keys = [self._doc_keys[doc_no] for doc_no in live_numbers]
+            self._doc_numbers = {key: doc_no for doc_no, key in enumerate(self._doc_keys)}
+            self._doc_lengths = array("I", (self._doc_lengths[doc_no] for doc_no in live_numbers))
+            self._live = bytearray(b"\x01" * len(live_numbers))
+            self._set_postings(postings)
+            logger.debug(f"Compacted BM25 index to {len(self._doc_keys)} documents and {len(self._terms)} terms")
+
+    def save(self, directory: str) -> None:
+        """
+        Persist the index to a directory.
+
+        Deleted documents are compacted away first. Each file is written to a
+        temporary name and renamed into place.
+
+        Args:
+            directory: Directory to write the index files to
+        """
+        with self._lock:
+            if len(self._doc_keys) != len(self._doc_numbers):
+                self.compact()
+            os.makedirs(directory, exist_ok=True)
+
+            terms = sorted(self._terms, key=self._terms.get)
+            docs_parts, tfs_parts, offsets = [], [], [0]
+            for term in terms:
+                docs, tfs = self._read_postings(self._terms[term])
+                docs_parts.append(docs)
+                tfs_parts.append(tfs)
+                offsets.append(offsets[-1] + len(docs))
+
+            arrays = {
+                "postings_docs": np.concatenate(docs_parts).astype(np.uint32) if docs_parts else np.zeros(0, np.uint32),
+                "postings_tfs": np.concatenate(tfs_parts).astype(np.uint32) if tfs_parts else np.zeros(0, np.uint32),
+                "term_offsets": np.asarray(offsets, dtype=np.int64),
+                "doc_lengths": np.frombuffer(self._doc_lengths, dtype=np.uint32),
+                "live": np.frombuffer(bytes(self._live), dtype=np.uint8),
+            }
+            for name, values in arrays.items():
+                path = os.path.join(directory, f"{name}.npy")
+                with open(path + ".tmp", "wb") as f:
+                    np.save(f, values)
+                os.replace(path + ".tmp", path)
+
+            meta = {"k1": self.k1, "b": self.b, "terms": terms, "doc_keys": self._doc_keys}
+            meta_path = os.path.join(directory, META_FILENAME)
+            with open(meta_path + ".tmp", "w") as f:
+                json.dump(meta, f)
+            os.replace(meta_path + ".tmp", meta_path)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "BM25Index":
+        """
+        Load an index saved with save().
+
+        Args:
+            directory: Directory containing the index files
+            mmap: Whether to memory-map the postings instead of reading them
+
+        Returns:
+            The loaded index
+        """
+        with open(os.path.join(directory, META_FILENAME)) as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None)
+            for name in ARRAY_FILENAMES
+        }
+
+        index = cls(k1=meta["k1"], b=meta["b"])
+        index._terms = {term: term_id for term_id, term in enumerate(meta["terms"])}
+        index._doc_keys = meta["doc_keys"]
+        index._doc_numbers = {key: doc_no for doc_no, key in enumerate(index._doc_keys) if key is not None}
+        index._doc_lengths = array("I", np.asarray(arrays["doc_lengths"], dtype=np.uint32).tobytes())
+        index._live = bytearray(np.asarray(arrays["live"], dtype=np.uint8).tobytes())
+        index._total_length = sum(length for length, alive in zip(index._doc_lengths, index._live) if alive)
+        index._base_docs = arrays["postings_docs"]
+        index._base_tfs = arrays["postings_tfs"]
+        index._base_offsets = arrays["term_offsets"]
+        return index
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        """
+        Check whether a saved index exists in a directory.
+
+        Args:
+            directory: Directory to check
+
+        Returns:
+            True if all index files are present
+        """
+        names = [META_FILENAME] + [f"{name}.npy" for name in ARRAY_FILENAMES]
+        return all(os.path.exists(os.path.join(directory, name)) for name in names)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get index statistics.
+
+        Returns:
+            Dictionary with document, deleted document, term and posting counts
+        """
+        num_postings = int(self._base_offsets[-1]) + sum(
+            len(docs) for docs, _ in self._postings.values()
+        ) - sum(self._base_length(term_id) for term_id in self._postings)
+        return {
+            "documents": len(self._doc_numbers),
+            "deleted": len(self._doc_keys) - len(self._doc_numbers),
+            "terms": len(self._terms),
+            "postings": num_postings,
+        }
+
+    def _base_length(self, term_id: int) -> int:
+        """Return the number of on-disk postings of a term."""
+        if term_id + 1 >= len(self._base_offsets):
+            return 0
+        return int(self._base_offsets[term_id + 1] - self._base_offsets[term_id])
+
+    def _read_postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return a term's document numbers and term frequencies as arrays."""
+        if term_id in self._postings:
+            docs, tfs = self._postings[term_id]
+            return np.frombuffer(docs, dtype=np.uint32), np.frombuffer(tfs, dtype=np.uint32)
+        if term_id + 1 >= len(self._base_offsets):
+            return np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.uint32)
+        start, end = int(self._base_offsets[term_id]), int(self._base_offsets[term_id + 1])
+        return self._base_docs[start:end], self._base_tfs[start:end]
+
+    def _writable_postings(self, term_id: int) -> Tuple[array, array]:
+        """Return a term's growable postings, copying on-disk postings on first write."""
+        postings = self._postings.get(term_id)
+        if postings is None:
+            docs, tfs = self._read_postings(term_id)
+            postings = (array("I", np.asarray(docs, dtype=np.uint32).tobytes()),
+                        array("I", np.asarray(tfs, dtype=np.uint32).tobytes()))
+            self._postings[term_id] = postings
+        return postings
+
+    def _set_postings(self, postings: Dict[str, Tuple[np.ndarray, np.ndarray]]) -> None:
+        """Replace all postings with in-memory arrays, keyed by term."""
+        self._terms = {}
+        self._postings = {}
+        self._base_docs = np.zeros(0, dtype=np.uint32)
+        self._base_tfs = np.zeros(0, dtype=np.uint32)
+        self._base_offsets = np.zeros(1, dtype=np.int64)
+        for term_id, (term, (docs, tfs)) in enumerate(postings.items()):
+            self._terms[term] = term_id
+            self._postings[term_id] = (array("I", docs.astype(np.uint32).tobytes()),
+                                       array("I", tfs.astype(np.uint32).tobytes()))
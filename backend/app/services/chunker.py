@@ -0,0 +1,247 @@
+"""
+Structure-Aware Document Chunking
+
+This module provides functionality for:
+- Parsing document text into blocks under a hierarchy of section headings
+- Keeping tables, lists and metric definitions whole instead of cutting them mid-way
+- Packing blocks into chunks sized by tokens, never across section boundaries
+- Recording each chunk's section path (e.g. "4. Availability > 4.2 Maintenance")
+"""
+
+import os
+import re
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.services.context_packer import estimate_tokens
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Configuration constants
+LIGHTWEIGHT_MODE = os.environ.get("CHAKRA_LIGHTWEIGHT_MODE", "false").lower() == "true"
+# Target chunk size; sentence-transformer models truncate input at 256-512 word pieces
+CHUNK_TOKENS = int(os.environ.get("CHAKRA_CHUNK_TOKENS", "128" if LIGHTWEIGHT_MODE else "256"))
+SECTION_PATH_SEPARATOR = " > "
+# Headings longer than this are treated as text
+MAX_HEADING_CHARS = 100
+
+MARKDOWN_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+# "4. Availability", "4.2 Maintenance Windows", "Section 3: Support"
+NUMBERED_HEADING = re.compile(r"^(?:[Ss]ection\s+)?(\d+(?:\.\d+)*)\.?[:)]?\s+([A-Z][^.!?]*)$")
+TABLE_LINE = re.compile(r"^\s*\|.*\|\s*$|\t")
+LIST_LINE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+NUMBERED_LIST_LINE = re.compile(r"^\s*\d+[.)]\s+")
+# "Uptime: 99.95%", "- **Response Time**: 15 minutes"
+DEFINITION_LINE = re.compile(r"^\s*(?:[-*•]\s+)?(?:\*\*)?[^:.!?]{1,60}?(?:\*\*)?\s*:\s*\S")
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+
+def _heading(line: str) -> Optional[Tuple[int, str]]:
+    """
+    Recognize a section heading line.
+
+    Returns:
+        (level, title) for markdown ("## Title") and numbered ("4.2 Title")
+        headings, or None if the line is not a heading
+    """
+    stripped = line.strip()
+    if not stripped or len(stripped) > MAX_HEADING_CHARS:
+        return None
+    match = MARKDOWN_HEADING.match(stripped)
+    if match:
+        return len(match.group(1)), match.group(2).strip("* ")
+    match = NUMBERED_HEADING.match(stripped)
+    if match and not stripped.endswith(":"):
+        return match.group(1).count(".") + 1, stripped
+    return None
+
+
+def _in_numbered_list(lines: List[str], index: int) -> bool:
+    """
+    Check whether a line is an item of a numbered list.
+
+    A numbered line directly preceded or followed by another numbered line
+    ("1. Critical outage" / "2. Major degradation") is a list item, not a
+    section heading.
+    """
+    if not NUMBERED_LIST_LINE.match(lines[index]):
+        return False
+    neighbours = lines[max(index - 1, 0):index] + lines[index + 1:index + 2]
+    return any(NUMBERED_LIST_LINE.match(line) for line in neighbours)
+
+
+def _block_kind(lines: List[str]) -> str:
+    """Classify a block as "table", "list", "definition" or splittable "text"."""
+    if all(TABLE_LINE.search(line) for line in lines):
+        return "table"
+    if all(DEFINITION_LINE.match(line) for line in lines):
+        return "definition"
+    if LIST_LINE.match(lines[0]):
+        return "list"
+    return "text"
+
+
+def parse_blocks(text: str) -> List[Dict[str, Any]]:
+    """
+    Parse document text into blocks under their section headings.
+
+    A block is a run of non-blank lines. Heading lines start a new section;
+    a heading of level n closes any open section of level n or deeper.
+
+    Args:
+        text: Document text, with markdown or numbered section headings
+
+    Returns:
+        Blocks in document order, each with 'text', 'kind', 'section_path'
+        (list of heading titles) and 'heading' (True for heading lines)
+    """
+    blocks: List[Dict[str, Any]] = []
+    sections: List[Tuple[int, str]] = []
+    lines: List[str] = []
+
+    def flush():
+        if lines:
+            blocks.append({
+                "text": "\n".join(lines),
+                "kind": _block_kind(lines),
+                "section_path": [title for _, title in sections],
+                "heading": False,
+            })
+            lines.clear()
+
+    text_lines = text.splitlines()
+    for index, line in enumerate(text_lines):
+        if not line.strip():
+            flush()
+            continue
+        heading = None if _in_numbered_list(text_lines, index) else _heading(line)
+        if heading is not None:
+            flush()
+            level, title = heading
+            while sections and sections[-1][0] >= level:
+                sections.pop()
+            sections.append((level, title))
+            blocks.append({
+                "text": line.strip(),
+                "kind": "heading",
+                "section_path": [title for _, title in sections],
+                "heading": True,
+            })
+        else:
+            lines.append(line.rstrip())
+    flush()
+    return blocks
+
+
+class StructuredChunker:
+    """
+    Splits documents into token-sized chunks that follow their section structure.
+
+    Blocks of one section are packed together up to the token limit and a chunk
+    never spans two sections. A section's heading starts its first chunk. Only
+    narrative paragraphs are split (at sentence boundaries) when they exceed the
+    limit; tables, lists and metric definitions are kept whole even if that
+    makes a chunk larger than the limit.
+    """
+
+    def __init__(self, max_tokens: int = CHUNK_TOKENS,
+                 count_tokens: Callable[[str], int] = estimate_tokens):
+        """
+        Initialize the chunker.
+
+        Args:
+            max_tokens: Target maximum number of tokens per chunk
+            count_tokens: Function returning the token count of a string
+        """
+        self.max_tokens = max_tokens
+        self.count_tokens = count_tokens
+
+    def _fits(self, parts: List[str]) -> bool:
+        """Check whether parts joined into one chunk stay within the token limit."""
+        return self.count_tokens("\n\n".join(parts)) <= self.max_tokens
+
+    def _split_text(self, text: str, head: List[str]) -> List[str]:
+        """
+        Split an oversized paragraph into pieces of whole sentences.
+
+        The first piece is sized to fit after head (the parts already in the
+        current chunk) and the rest to the full chunk size.
+        """
+        pieces: List[str] = []
+        current: List[str] = []
+        for sentence in SENTENCE_BOUNDARY.split(text):
+            if current and not self._fits(head + [" ".join(current + [sentence])]):
+                pieces.append(" ".join(current))
+                current, head = [], []
+            current.append(sentence)
+        if current:
+            pieces.append(" ".join(current))
+        return pieces
+
+    def chunk(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Split document text into chunks.
+
+        Args:
+            text: Document text
+
+        Returns:
+            Chunks in document order, each with 'text', 'section_path'
+            (headings joined with " > ", "" before the first heading) and 'tokens'
+        """
+        chunks: List[Dict[str, Any]] = []
+        parts: List[str] = []
+        has_content = False
+        section: List[str] = []
+
+        def flush():
+            nonlocal has_content
+            if parts:
+                chunk_text = "\n\n".join(parts)
+                chunks.append({
+                    "text": chunk_text,
+                    "section_path": SECTION_PATH_SEPARATOR.join(section),
+                    "tokens": self.count_tokens(chunk_text),
+                })
+            parts.clear()
+            has_content = False
+
+        for block in parse_blocks(text):
+            if block["heading"]:
+                # Headings with no content yet (e.g. a chapter heading directly
+                # followed by its first subsection) start the next chunk together
+                if has_content:
+                    flush()
+                section = block["section_path"]
+                parts.append(block["text"])
+                continue
+
+            section = block["section_path"]
+            pieces = [block["text"]]
+            if block["kind"] == "text" and not self._fits(parts + pieces):
+                # Split at sentences, filling the current chunk first if its first sentence fits
+                if has_content and not self._fits(parts + [SENTENCE_BOUNDARY.split(block["text"])[0]]):
+                    flush()
+                pieces = self._split_text(block["text"], list(parts))
+            for piece in pieces:
+                if has_content and not self._fits(parts + [piece]):
+                    flush()
+                parts.append(piece)
+                has_content = True
+        flush()
+
+        logger.debug(f"Split document into {len(chunks)} chunks")
+        return chunks
+
+    def split_text(self, text: str) -> List[str]:
+        """
+        Split document text into chunk texts.
+
+        Args:
+            text: Document text
+
+        Returns:
+            Chunk texts in document order
+        """
+        return [chunk["text"] for chunk in self.chunk(text)]
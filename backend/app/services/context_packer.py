@@ -0,0 +1,151 @@
+"""
+Token-Budgeted Context Packing for RAG Prompts
+
+This module provides functionality for:
+- Ranking retrieved chunks by relevance score
+- Removing duplicated and overlapping chunk text produced by chunk overlap
+- Packing whole chunks into a token budget instead of truncating mid-chunk
+- Recording which chunks were dropped and why
+"""
+
+import os
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Shortest shared text treated as chunk overlap rather than coincidence
+MIN_OVERLAP_CHARS = 20
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of text (~4 characters per token).
+
+    Args:
+        text: Text to count
+
+    Returns:
+        Estimated token count
+    """
+    return len(text) // 4 if text else 0
+
+
+class PackedContext:
+    """
+    Retrieved context packed into a token budget.
+
+    Attributes:
+        text: Formatted context with [Source n] headers
+        sources: Results included in the context, in citation order
+        dropped: Results left out, each with its id, source, reason and token cost
+        tokens: Token count of text
+    """
+
+    def __init__(self, text: str = "", sources: Optional[List[Dict[str, Any]]] = None,
+                 dropped: Optional[List[Dict[str, Any]]] = None, tokens: int = 0):
+        self.text = text
+        self.sources = sources or []
+        self.dropped = dropped or []
+        self.tokens = tokens
+
+    def __str__(self) -> str:
+        return self.text
+
+
+def _overlap_length(first: str, second: str, max_overlap: int) -> int:
+    """Return the length of the longest suffix of first that is a prefix of second."""
+    for length in range(min(len(first), len(second), max_overlap), MIN_OVERLAP_CHARS - 1, -1):
+        if first.endswith(second[:length]):
+            return length
+    return 0
+
+
+def _document_key(result: Dict[str, Any]) -> str:
+    """Return the identifier of the document a result was chunked from."""
+    metadata = result.get("metadata") or {}
+    return metadata.get("document_id") or metadata.get("source") or ""
+
+
+def _source_label(result: Dict[str, Any]) -> str:
+    """Return the file name (and section path) shown in a result's [Source n] header."""
+    metadata = result.get("metadata") or {}
+    source = (metadata.get("source") or "").split(os.path.sep)[-1] or "UNKNOWN SOURCE"
+    section = metadata.get("section_path")
+    return f"{source} > {section}" if section else source
+
+
+def _dropped_entry(result: Dict[str, Any], reason: str, tokens: int = 0) -> Dict[str, Any]:
+    """Describe a result that was left out of the packed context."""
+    return {
+        "id": result.get("id"),
+        "source": _source_label(result),
+        "score": result.get("score"),
+        "reason": reason,
+        "tokens": tokens,
+    }
+
+
+def pack_context(results: List[Dict[str, Any]], token_budget: int, max_overlap: int,
+                 count_tokens: Callable[[str], int] = estimate_tokens) -> PackedContext:
+    """
+    Pack the best retrieved chunks into a token budget.
+
+    Chunks are taken in the order given, best first, so the ranking of the
+    retriever or reranker is kept whatever its score scale. A chunk whose text is already
+    contained in a packed chunk of the same document is dropped, and text it
+    shares with a neighbouring packed chunk (from CHUNK_OVERLAP) is trimmed so
+    it is only paid for once. Chunks are never cut: one that does not fit is
+    dropped and smaller, lower-ranked chunks may still fill the budget.
+
+    Args:
+        results: Ranked search results with 'content', 'metadata' and optional 'id' and 'score'
+        token_budget: Maximum number of tokens of packed context
+        max_overlap: Maximum overlap between neighbouring chunks, in characters
+        count_tokens: Function returning the token count of a string
+
+    Returns:
+        PackedContext with the packed text, included sources and dropped chunks
+    """
+    ranked = list(results)
+    packed: List[Dict[str, Any]] = []
+    packed_texts: List[str] = []
+    parts: List[str] = []
+    dropped: List[Dict[str, Any]] = []
+    used_tokens = 0
+
+    for result in ranked:
+        content = result.get("content", "")
+        document = _document_key(result)
+        same_document = [text for other, text in zip(packed, packed_texts) if _document_key(other) == document]
+
+        if not content.strip() or any(content in text for text in same_document):
+            dropped.append(_dropped_entry(result, "duplicate"))
+            continue
+
+        # Trim text shared with the previous or next chunk of the same document
+        for text in same_document:
+            head = _overlap_length(text, content, max_overlap)
+            if head:
+                content = content[head:]
+            tail = _overlap_length(content, text, max_overlap)
+            if tail:
+                content = content[:-tail]
+
+        part = f"[Source {len(packed) + 1}: {_source_label(result)}]\n{content}\n"
+        tokens = count_tokens(part)
+        if used_tokens + tokens > token_budget:
+            dropped.append(_dropped_entry(result, "budget", tokens))
+            continue
+
+        packed.append(result)
+        packed_texts.append(result.get("content", ""))
+        parts.append(part)
+        used_tokens += tokens
+
+    if dropped:
+        logger.info(f"Packed {len(packed)} chunks ({used_tokens}/{token_budget} tokens), dropped "
+                    + ", ".join(f"{d['source']} ({d['reason']})" for d in dropped))
+
+    return PackedContext("\n".join(parts), packed, dropped, used_tokens)
@@ -3,42 +3,80 @@ Document Processing Service for RAG Implementation
 
 This module provides functionality for:
 - Loading SLA documents from various formats (PDF, DOCX, TXT)
+- Parsing many documents in parallel worker processes with per-file timeouts
+- Quarantining files that repeatedly fail, time out or crash the parser
+- Reusing cached parse results for files whose content has not changed
 - Processing and preparing documents for embedding
 - Extracting metadata like industry, service type, etc.
 """
 
 import os
+import time
 import logging
 import json
-from typing import List, Dict, Any, Optional
+import sqlite3
+import multiprocessing
+from importlib import metadata as importlib_metadata
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
 from pathlib import Path
 import tempfile
 import re
 
-# Unstructured imports for document loading
-from unstructured.partition.auto import partition
-from unstructured.staging.base import convert_to_dict
-from unstructured.documents.elements import Title, NarrativeText, Text, ListItem
+from app.core.lazy_imports import lazy_module
+from app.services.parse_cache import get_parsed_document_cache, hash_file
+
+# Unstructured modules for document loading, imported on first use
+unstructured_partition = lazy_module("unstructured.partition.auto")
+unstructured_elements = lazy_module("unstructured.documents.elements")
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
 # Configure document directories
 DEFAULT_DOCUMENT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "documents")
+SUPPORTED_EXTENSIONS = ['.pdf', '.docx', '.txt', '.md', '.json']
+
+# Parallel ingestion configuration
+INGEST_WORKERS = int(os.environ.get("CHAKRA_INGEST_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+INGEST_FILE_TIMEOUT = float(os.environ.get("CHAKRA_INGEST_FILE_TIMEOUT", "300"))
+# Parser workers start fresh ("spawn") rather than forking a process that may
+# already run threads and hold torch/tokenizers locks, which can deadlock them
+INGEST_START_METHOD = os.environ.get("CHAKRA_INGEST_START_METHOD", "spawn")
+try:
+    UNSTRUCTURED_VERSION = importlib_metadata.version("unstructured")
+except importlib_metadata.PackageNotFoundError:
+    UNSTRUCTURED_VERSION = "unknown"
+# Bump when element rendering or metadata extraction changes so cached parses are redone
+DOCUMENT_FORMAT_VERSION = 2
+PARSER_VERSION = f"unstructured-{UNSTRUCTURED_VERSION}/format-{DOCUMENT_FORMAT_VERSION}"
+QUARANTINE_PATH = os.environ.get(
+    "CHAKRA_INGEST_QUARANTINE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "ingest_quarantine.json")
+)
+
+
+def _load_file_in_worker(document_dir: str, file_path: str) -> Dict[str, Any]:
+    """Parse one file in a pool worker process."""
+    return DocumentProcessor(document_dir).load_file(file_path)
+
 
 class DocumentProcessor:
     """
     Service for loading and processing SLA documents for the RAG system.
     """
     
-    def __init__(self, document_dir: str = DEFAULT_DOCUMENT_DIR):
+    def __init__(self, document_dir: str = DEFAULT_DOCUMENT_DIR, quarantine_path: str = QUARANTINE_PATH):
         """
         Initialize the document processor.
         
         Args:
             document_dir: Directory containing SLA documents
+            quarantine_path: JSON file recording files that failed to parse
         """
         self.document_dir = document_dir
+        self.quarantine_path = quarantine_path
         os.makedirs(document_dir, exist_ok=True)
         logger.info(f"Initialized document processor with directory: {document_dir}")
     
@@ -46,6 +84,9 @@ class DocumentProcessor:
         """
         Load and process a single document file.
         
+        Files parsed before with the same content and parser version are
+        served from the parsed-document cache without partitioning.
+        
         Args:
             file_path: Path to the document file
             
@@ -59,27 +100,93 @@ class DocumentProcessor:
             if not os.path.exists(file_path):
                 raise FileNotFoundError(f"File not found: {file_path}")
             
+            content_hash, cached = self._load_cached(file_path)
+            if cached is not None:
+                return cached
+            
             # Partition the document
-            elements = partition(filename=file_path)
+            elements = unstructured_partition.partition(filename=file_path)
             
-            # Convert elements to text
-            content = "\n\n".join([str(element) for element in elements])
+            # Convert elements to text, keeping titles and tables recognizable to the chunker
+            content = "\n\n".join(self._element_text(element) for element in elements)
             
             # Extract metadata
             metadata = self._extract_metadata(file_path, content, elements)
             
-            return {
+            document = {
                 "content": content,
                 "metadata": metadata
             }
+            self._store_cached(content_hash, document)
+            return document
         except Exception as e:
             logger.error(f"Error loading document {file_path}: {str(e)}")
             raise
     
+    def _load_cached(self, file_path: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Look up a file in the parsed-document cache.
+        
+        Returns:
+            Tuple of (content hash, cached document with path metadata
+            refreshed or None); the hash is None if the cache is disabled
+        """
+        try:
+            cache = get_parsed_document_cache()
+            if cache is None:
+                return None, None
+            content_hash = hash_file(file_path)
+        except (sqlite3.Error, OSError) as e:
+            # An unusable cache (read-only data directory, locked database) only costs a parse
+            logger.warning(f"Parsed-document cache unavailable for {file_path}: {str(e)}")
+            return None, None
+        try:
+            document = cache.get(PARSER_VERSION, content_hash)
+        except sqlite3.Error as e:
+            logger.warning(f"Parsed-document cache lookup failed for {file_path}: {str(e)}")
+            return content_hash, None
+        if document is not None:
+            # The same content may have been parsed under another path
+            document["metadata"].update(self._path_metadata(file_path))
+            logger.info(f"Loaded cached parse of {file_path}")
+        return content_hash, document
+    
+    def _store_cached(self, content_hash: Optional[str], document: Dict[str, Any]) -> None:
+        """Store a parsed document in the parsed-document cache."""
+        if content_hash is None:
+            return
+        try:
+            cache = get_parsed_document_cache()
+            if cache is not None:
+                cache.put(PARSER_VERSION, content_hash, document)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Could not cache parsed document: {str(e)}")
+    
+    @staticmethod
+    def _element_text(element: Any) -> str:
+        """
+        Render a parsed element as text for chunking.
+        
+        Titles become markdown headings at their nesting depth and tables
+        become a single table row, so section boundaries survive the
+        conversion to text and tables are never split.
+        """
+        text = str(element)
+        category = getattr(element, "category", None)
+        if category == "Title":
+            depth = getattr(element.metadata, "category_depth", None) or 0
+            return f"{'#' * min(depth + 1, 6)} {text}"
+        if category == "Table":
+            return f"| {' '.join(text.split())} |"
+        return text
+    
     def load_directory(self, dir_path: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Load all documents from a directory.
         
+        Files are parsed in parallel worker processes; use iter_directory to
+        consume documents as they finish instead of waiting for all of them.
+        
         Args:
             dir_path: Directory path to load from, defaults to the configured document_dir
             
@@ -87,34 +194,207 @@ class DocumentProcessor:
             List of document dictionaries
         """
         dir_path = dir_path or self.document_dir
-        logger.info(f"Loading all documents from directory: {dir_path}")
+        documents = list(self.iter_directory(dir_path))
+        logger.info(f"Loaded {len(documents)} documents from {dir_path}")
+        return documents
+    
+    def iter_directory(self, dir_path: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Load all documents from a directory, yielding each as soon as it is parsed.
         
-        documents = []
+        Files that fail are logged and skipped.
+        
+        Args:
+            dir_path: Directory path to load from, defaults to the configured document_dir
+            
+        Yields:
+            Document dictionaries in completion order
+        """
+        dir_path = dir_path or self.document_dir
+        logger.info(f"Loading all documents from directory: {dir_path}")
         
         # Check if directory exists
         if not os.path.exists(dir_path):
             logger.warning(f"Directory not found: {dir_path}")
-            return documents
+            return
         
-        # Get all files with supported extensions
-        supported_extensions = ['.pdf', '.docx', '.txt', '.md', '.json']
-        files = [
-            os.path.join(dir_path, f) for f in os.listdir(dir_path)
-            if os.path.isfile(os.path.join(dir_path, f)) and 
-            any(f.lower().endswith(ext) for ext in supported_extensions)
-        ]
+        for file_path, doc, error in self.iter_load_files(self.list_files(dir_path)):
+            if doc is not None:
+                yield doc
+    
+    def iter_load_files(self, file_paths: Iterable[str], max_workers: int = INGEST_WORKERS,
+                        timeout: float = INGEST_FILE_TIMEOUT) -> Iterator[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]:
+        """
+        Parse files in a process pool, yielding each result as soon as it is ready.
         
-        # Process each file
-        for file_path in files:
+        At most max_workers files are in flight at once, so memory stays
+        bounded however many files are passed. A file that raises is reported
+        as failed. A file that runs past the timeout, or that crashes a worker
+        when parsed on its own, is quarantined: the pool is restarted, other
+        in-flight files are retried, and the file is skipped by later runs
+        until it changes.
+        
+        Args:
+            file_paths: Paths of the files to parse
+            max_workers: Number of worker processes (1 parses in this process, without timeouts)
+            timeout: Seconds a single file may take to parse
+            
+        Yields:
+            Tuples of (file path, document dictionary or None, error message or None)
+        """
+        quarantine = self._load_quarantine()
+        pending = []
+        for file_path in file_paths:
+            entry = quarantine.get(os.path.abspath(file_path))
+            if entry and self._file_signature(file_path) == entry.get("signature"):
+                logger.warning(f"Skipping quarantined file {file_path}: {entry.get('reason')}")
+                yield file_path, None, f"quarantined: {entry.get('reason')}"
+                continue
+            
+            # Unchanged files are served from the parse cache without reaching the pool
             try:
-                doc = self.load_file(file_path)
-                documents.append(doc)
-            except Exception as e:
-                logger.error(f"Error processing {file_path}: {str(e)}")
+                _, cached = self._load_cached(file_path)
+            except OSError as e:
+                yield file_path, None, str(e)
                 continue
+            if cached is not None:
+                yield file_path, cached, None
+            else:
+                pending.append(file_path)
         
-        logger.info(f"Loaded {len(documents)} documents from {dir_path}")
-        return documents
+        if not pending:
+            return
+        if max_workers <= 1:
+            for file_path in pending:
+                try:
+                    yield file_path, self.load_file(file_path), None
+                except Exception as e:
+                    logger.error(f"Error processing {file_path}: {str(e)}")
+                    yield file_path, None, str(e)
+            return
+        
+        # Files that were in flight when a worker crashed are retried one at a time,
+        # so a file that crashes the parser is identified and quarantined on its own
+        suspects: List[str] = []
+        pool = self._new_pool(max_workers)
+        in_flight: Dict[Any, Tuple[str, float]] = {}
+        isolating = False
+        try:
+            while pending or suspects or in_flight:
+                if not in_flight:
+                    isolating = bool(suspects)
+                limit = 1 if isolating else max_workers
+                while len(in_flight) < limit and (suspects or pending):
+                    file_path = suspects.pop(0) if isolating else pending.pop(0)
+                    future = pool.submit(_load_file_in_worker, self.document_dir, file_path)
+                    in_flight[future] = (file_path, time.monotonic())
+                
+                done, _ = wait(list(in_flight), timeout=1.0, return_when=FIRST_COMPLETED)
+                crashed = False
+                for future in done:
+                    file_path, _ = in_flight[future]
+                    try:
+                        document = future.result()
+                    except BrokenProcessPool:
+                        crashed = True
+                        continue
+                    except Exception as e:
+                        del in_flight[future]
+                        logger.error(f"Error processing {file_path}: {str(e)}")
+                        yield file_path, None, str(e)
+                        continue
+                    del in_flight[future]
+                    yield file_path, document, None
+                
+                now = time.monotonic()
+                timed_out = [path for path, started in in_flight.values() if now - started > timeout]
+                if not crashed and not timed_out:
+                    continue
+                
+                # A hung or crashed worker cannot be cancelled, so restart the pool
+                interrupted = [path for path, _ in in_flight.values() if path not in timed_out]
+                in_flight.clear()
+                self._terminate_pool(pool)
+                pool = self._new_pool(max_workers)
+                
+                for file_path in timed_out:
+                    reason = f"timed out after {timeout:.0f}s"
+                    self._quarantine_file(file_path, reason)
+                    yield file_path, None, f"quarantined: {reason}"
+                if crashed and len(interrupted) == 1 and not timed_out:
+                    reason = "crashed the parser"
+                    self._quarantine_file(interrupted[0], reason)
+                    yield interrupted[0], None, f"quarantined: {reason}"
+                else:
+                    suspects.extend(interrupted)
+        finally:
+            self._terminate_pool(pool)
+    
+    @staticmethod
+    def _new_pool(max_workers: int) -> ProcessPoolExecutor:
+        """Start a parser pool whose workers do not inherit this process's threads."""
+        return ProcessPoolExecutor(max_workers=max_workers,
+                                   mp_context=multiprocessing.get_context(INGEST_START_METHOD))
+    
+    @staticmethod
+    def _terminate_pool(pool: ProcessPoolExecutor) -> None:
+        """Shut down a process pool, killing workers that are still parsing."""
+        for process in list(getattr(pool, "_processes", {}).values()):
+            if process.is_alive():
+                process.kill()
+        pool.shutdown(wait=True, cancel_futures=True)
+    
+    @staticmethod
+    def _file_signature(file_path: str) -> List[float]:
+        """Return the modification time and size identifying a file's current version."""
+        stat = os.stat(file_path)
+        return [stat.st_mtime, stat.st_size]
+    
+    def _load_quarantine(self) -> Dict[str, Any]:
+        """Load the quarantine list, returning an empty one if missing or invalid."""
+        if not os.path.exists(self.quarantine_path):
+            return {}
+        try:
+            with open(self.quarantine_path, "r", encoding="utf-8") as f:
+                quarantine = json.load(f)
+            return quarantine if isinstance(quarantine, dict) else {}
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable quarantine list {self.quarantine_path}: {str(e)}")
+            return {}
+    
+    def _quarantine_file(self, file_path: str, reason: str) -> None:
+        """Record a file that must not be parsed again until it changes."""
+        logger.error(f"Quarantining {file_path}: {reason}")
+        quarantine = self._load_quarantine()
+        quarantine[os.path.abspath(file_path)] = {
+            "signature": self._file_signature(file_path),
+            "reason": reason,
+        }
+        os.makedirs(os.path.dirname(self.quarantine_path), exist_ok=True)
+        tmp_path = f"{self.quarantine_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(quarantine, f, indent=2)
+        os.replace(tmp_path, self.quarantine_path)
+    
+    def list_files(self, dir_path: Optional[str] = None) -> List[str]:
+        """
+        List the supported document files in a directory.
+        
+        Args:
+            dir_path: Directory path to list, defaults to the configured document_dir
+            
+        Returns:
+            Sorted list of file paths
+        """
+        dir_path = dir_path or self.document_dir
+        if not os.path.exists(dir_path):
+            return []
+        
+        return sorted(
+            os.path.join(dir_path, f) for f in os.listdir(dir_path)
+            if os.path.isfile(os.path.join(dir_path, f)) and 
+            any(f.lower().endswith(ext) for ext in SUPPORTED_EXTENSIONS)
+        )
     
     def save_document(self, content: str, metadata: Dict[str, Any], file_name: Optional[str] = None) -> str:
         """
@@ -153,6 +433,15 @@ class DocumentProcessor:
         logger.info(f"Saved document to {file_path}")
         return file_path
     
+    @staticmethod
+    def _path_metadata(file_path: str) -> Dict[str, Any]:
+        """Return the metadata derived from a document's path."""
+        return {
+            "source": file_path,
+            "filename": os.path.basename(file_path),
+            "file_type": os.path.splitext(file_path)[1].lower().replace('.', ''),
+        }
+    
     def _extract_metadata(self, file_path: str, content: str, elements: List[Any]) -> Dict[str, Any]:
         """
         Extract metadata from document content and file information.
@@ -165,15 +454,11 @@ class DocumentProcessor:
         Returns:
             Dictionary of metadata
         """
-        metadata = {
-            "source": file_path,
-            "filename": os.path.basename(file_path),
-            "file_type": os.path.splitext(file_path)[1].lower().replace('.', ''),
-        }
+        metadata = self._path_metadata(file_path)
         
         # Extract document title from first title element if available
         for element in elements:
-            if isinstance(element, Title):
+            if isinstance(element, unstructured_elements.Title):
                 metadata["title"] = str(element)
                 break
         
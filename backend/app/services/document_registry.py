@@ -0,0 +1,232 @@
+"""
+Persistent Registry of Uploaded Documents
+
+This module provides functionality for:
+- Storing uploaded documents and their classification in the application database
+- Indexing single-valued metadata columns and multi-valued fields (one row per value)
+- Filtering documents with the same filter spec as vector search, in one indexed query
+- Upgrading an existing documents table with missing columns and indexes
+"""
+
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, insert, inspect, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import SessionLocal
+from app.models.document import Document, document_clinical_specialties, document_compliance_frameworks
+from app.services.metadata_filters import MULTI_VALUE_FILTER_FIELDS, SCALAR_FILTER_FIELDS, FilterValue
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Multi-valued document field -> (value table, value column)
+VALUE_TABLES = {
+    "compliance_frameworks": (document_compliance_frameworks, "framework"),
+    "clinical_specialties": (document_clinical_specialties, "specialty"),
+}
+
+
+class DocumentRegistry:
+    """
+    Documents table shared by all API workers.
+
+    Filters on industry, service type, healthcare category and data
+    sensitivity use the column indexes; compliance framework and clinical
+    specialty filters use the (value, document_id) index of their value table
+    as a subquery, so any combination runs as a single SELECT.
+    """
+
+    def __init__(self, session_factory: sessionmaker = SessionLocal):
+        """
+        Initialize the registry. Tables are created or upgraded on first use.
+
+        Args:
+            session_factory: Factory for database sessions
+        """
+        self._session_factory = session_factory
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    def _ensure_schema(self) -> None:
+        """Create the registry tables, adding columns and indexes missing from an older documents table."""
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            engine = self._session_factory.kw["bind"]
+            tables = [Document.__table__, document_compliance_frameworks, document_clinical_specialties]
+            Document.metadata.create_all(bind=engine, tables=tables)
+
+            existing = {column["name"] for column in inspect(engine).get_columns(Document.__tablename__)}
+            with engine.begin() as conn:
+                for column in Document.__table__.columns:
+                    if column.name not in existing:
+                        column_type = column.type.compile(dialect=engine.dialect)
+                        logger.info(f"Adding column {column.name} to {Document.__tablename__}")
+                        conn.execute(text(f"ALTER TABLE {Document.__tablename__} ADD COLUMN {column.name} {column_type}"))
+                for index in Document.__table__.indexes:
+                    index.create(bind=conn, checkfirst=True)
+            self._schema_ready = True
+
+    @staticmethod
+    def _to_dict(document: Document) -> Dict[str, Any]:
+        """Convert a document row to the API representation."""
+        return {
+            "id": document.id,
+            "filename": document.filename,
+            "title": document.title,
+            "industry": document.industry,
+            "service_type": document.service_type,
+            "upload_date": document.upload_date.isoformat() if document.upload_date else None,
+            "file_size": document.file_size,
+            "status": document.status,
+            "job_id": document.job_id,
+            "error": document.error,
+            "healthcare_category": document.healthcare_category,
+            "compliance_frameworks": document.compliance_frameworks,
+            "clinical_specialties": document.clinical_specialties,
+            "data_sensitivity": document.data_sensitivity,
+            "chunk_ids": document.chunk_ids,
+        }
+
+    @staticmethod
+    def _set_values(db, document_id: str, field: str, values: Optional[List[str]]) -> None:
+        """Replace the value rows of a multi-valued field."""
+        table, column = VALUE_TABLES[field]
+        db.execute(delete(table).where(table.c.document_id == document_id))
+        distinct = list(dict.fromkeys(value for value in values or [] if value))
+        if distinct:
+            db.execute(insert(table), [{"document_id": document_id, column: value} for value in distinct])
+
+    def add(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Register a document.
+
+        Args:
+            document: Document fields; upload_date may be a datetime or an ISO string
+
+        Returns:
+            The stored document
+        """
+        self._ensure_schema()
+        fields = {key: value for key, value in document.items() if key in Document.__table__.columns}
+        if isinstance(fields.get("upload_date"), str):
+            fields["upload_date"] = datetime.fromisoformat(fields["upload_date"])
+        with self._session_factory() as db:
+            row = Document(**fields)
+            db.add(row)
+            db.flush()
+            for field in VALUE_TABLES:
+                self._set_values(db, row.id, field, fields.get(field))
+            db.commit()
+            return self._to_dict(row)
+
+    def update(self, document_id: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Update a document's fields.
+
+        Args:
+            document_id: Document ID
+            fields: Fields to set; unknown keys are ignored
+
+        Returns:
+            The updated document, or None if it does not exist
+        """
+        self._ensure_schema()
+        with self._session_factory() as db:
+            row = db.get(Document, document_id)
+            if row is None:
+                return None
+            for key, value in fields.items():
+                if key in Document.__table__.columns and key != "id":
+                    setattr(row, key, value)
+                if key in VALUE_TABLES:
+                    self._set_values(db, document_id, key, value)
+            db.commit()
+            return self._to_dict(row)
+
+    def get(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a document by ID.
+
+        Returns:
+            The document, or None if it does not exist
+        """
+        self._ensure_schema()
+        with self._session_factory() as db:
+            row = db.get(Document, document_id)
+            return self._to_dict(row) if row is not None else None
+
+    def delete(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Delete a document and its value rows.
+
+        Returns:
+            The deleted document, or None if it does not exist
+        """
+        self._ensure_schema()
+        with self._session_factory() as db:
+            row = db.get(Document, document_id)
+            if row is None:
+                return None
+            deleted = self._to_dict(row)
+            for table, _ in VALUE_TABLES.values():
+                db.execute(delete(table).where(table.c.document_id == document_id))
+            db.delete(row)
+            db.commit()
+            return deleted
+
+    def list_documents(self, filters: Optional[Dict[str, Optional[FilterValue]]] = None) -> List[Dict[str, Any]]:
+        """
+        List documents matching a filter spec, oldest upload first.
+
+        Args:
+            filters: Mapping of filter name (see metadata_filters.FILTER_FIELDS)
+                to a value, a list of accepted values, or None
+
+        Returns:
+            Matching documents
+
+        Raises:
+            ValueError: If a filter name is unknown
+        """
+        self._ensure_schema()
+        statement = select(Document)
+        for name, value in (filters or {}).items():
+            if value is None or value == "" or value == []:
+                continue
+            values = [value] if isinstance(value, str) else list(value)
+            if name in SCALAR_FILTER_FIELDS:
+                statement = statement.where(getattr(Document, name).in_(values))
+            elif name in MULTI_VALUE_FILTER_FIELDS:
+                table, column = VALUE_TABLES[MULTI_VALUE_FILTER_FIELDS[name]]
+                statement = statement.where(Document.id.in_(
+                    select(table.c.document_id).where(table.c[column].in_(values))
+                ))
+            else:
+                raise ValueError(f"Unknown document filter: {name}")
+        statement = statement.order_by(Document.upload_date)
+
+        with self._session_factory() as db:
+            return [self._to_dict(row) for row in db.scalars(statement)]
+
+
+_document_registry = None
+
+
+def get_document_registry() -> DocumentRegistry:
+    """
+    Get the document registry.
+
+    Returns:
+        DocumentRegistry instance
+    """
+    global _document_registry
+    if _document_registry is None:
+        _document_registry = DocumentRegistry()
+    return _document_registry
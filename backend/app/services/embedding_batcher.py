@@ -0,0 +1,151 @@
+"""
+Micro-Batching for Concurrent Embedding Requests
+
+This module provides functionality for:
+- Collecting embedding requests that arrive within a few milliseconds of each other
+- Encoding them in one model forward pass instead of one pass per request
+- Fanning the embeddings back out to the waiting callers
+- Reporting batch sizes and wait times
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Configuration constants
+EMBED_MICRO_BATCHING = os.environ.get("CHAKRA_EMBED_MICRO_BATCHING", "true").lower() == "true"
+# A batch is encoded once it holds this many texts or its first request has waited max wait ms
+EMBED_BATCH_MAX_SIZE = int(os.environ.get("CHAKRA_EMBED_BATCH_MAX_SIZE", "32"))
+EMBED_BATCH_MAX_WAIT_MS = float(os.environ.get("CHAKRA_EMBED_BATCH_MAX_WAIT_MS", "5"))
+
+
+class EmbeddingBatcher:
+    """
+    Merges concurrent small embedding requests into shared model batches.
+
+    Callers block in encode() while a dispatcher thread gathers requests: the
+    first request opens a batch, which is encoded as soon as it reaches
+    max_batch_size texts or max_wait_ms have passed. Requests of max_batch_size
+    texts or more are already full batches and are encoded directly.
+    """
+
+    def __init__(self, encode: Callable[[List[str]], Any], max_batch_size: int = EMBED_BATCH_MAX_SIZE,
+                 max_wait_ms: float = EMBED_BATCH_MAX_WAIT_MS):
+        """
+        Initialize the batcher. The dispatcher thread starts on the first request.
+
+        Args:
+            encode: Function embedding a list of texts, returning one vector per text
+            max_batch_size: Maximum number of texts encoded in one batch
+            max_wait_ms: Maximum time the first request of a batch waits for more requests
+        """
+        self._encode = encode
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._requests: "queue.Queue[Tuple[List[str], Future]]" = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "batches": 0, "texts": 0, "direct": 0, "max_batch_texts": 0,
+                       "total_wait": 0.0}
+
+    def _start(self) -> None:
+        """Start the dispatcher thread if it is not running."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._dispatch, name="embedding-batcher", daemon=True)
+                self._thread.start()
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts, sharing a model batch with concurrent callers.
+
+        Args:
+            texts: List of texts to embed
+
+        Returns:
+            List of embedding vectors, one per text
+        """
+        if not texts:
+            return []
+        if len(texts) >= self.max_batch_size:
+            with self._stats_lock:
+                self._stats["direct"] += 1
+            return np.asarray(self._encode(texts), dtype=np.float32).tolist()
+
+        self._start()
+        future: Future = Future()
+        self._requests.put((list(texts), future))
+        return future.result()
+
+    def _dispatch(self) -> None:
+        """Gather requests into batches and encode them, forever."""
+        while True:
+            batch = [self._requests.get()]
+            opened = time.perf_counter()
+            size = len(batch[0][0])
+            deadline = opened + self.max_wait_ms / 1000
+            while size < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request[0])
+            self._run_batch(batch, time.perf_counter() - opened)
+
+    def _run_batch(self, batch: List[Tuple[List[str], Future]], waited: float) -> None:
+        """Encode one batch and hand each caller its embeddings."""
+        texts = [text for request_texts, _ in batch for text in request_texts]
+        try:
+            embeddings = np.asarray(self._encode(texts), dtype=np.float32).tolist()
+        except Exception as e:
+            logger.error(f"Embedding batch of {len(texts)} texts failed: {str(e)}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        if len(batch) == 1:
+            batch[0][1].set_result(embeddings)
+        else:
+            offset = 0
+            for request_texts, future in batch:
+                future.set_result(embeddings[offset:offset + len(request_texts)])
+                offset += len(request_texts)
+
+        with self._stats_lock:
+            self._stats["requests"] += len(batch)
+            self._stats["batches"] += 1
+            self._stats["texts"] += len(texts)
+            self._stats["max_batch_texts"] = max(self._stats["max_batch_texts"], len(texts))
+            self._stats["total_wait"] += waited
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get batching statistics.
+
+        Returns:
+            Dictionary with request/batch/text counters, average batch size and average batch wait
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        batches = stats["batches"]
+        stats["avg_batch_texts"] = stats["texts"] / batches if batches else 0.0
+        stats["avg_wait_ms"] = stats.pop("total_wait") / batches * 1000 if batches else 0.0
+        stats["max_batch_size"] = self.max_batch_size
+        stats["max_wait_ms"] = self.max_wait_ms
+        return stats
@@ -0,0 +1,317 @@
+"""
+Persistent Embedding Cache for RAG Implementation
+
+This module provides functionality for:
+- Caching document embeddings on disk, keyed by model name and chunk text hash
+- Sharing cached vectors across processes through a single SQLite file
+- Evicting least recently used vectors once the cache exceeds its size cap
+- Keeping recent query embeddings in memory so repeated queries skip the model
+- Reporting hit/miss counters so cache effectiveness can be monitored
+"""
+
+import os
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Sequence
+
+import numpy as np
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Configuration constants
+DEFAULT_CACHE_FILENAME = "embedding_cache.sqlite3"
+DEFAULT_MAX_CACHE_MB = int(os.environ.get("CHAKRA_EMBEDDING_CACHE_MAX_MB", "512"))
+CACHE_ENABLED = os.environ.get("CHAKRA_EMBEDDING_CACHE", "true").lower() == "true"
+# Query embeddings kept in memory per process (0 disables the query cache)
+QUERY_EMBEDDING_CACHE_SIZE = int(os.environ.get("CHAKRA_QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+# SQLite limits the number of bound parameters per statement
+MAX_SQL_VARIABLES = 500
+
+
+class EmbeddingCache:
+    """
+    An on-disk, content-addressed cache of embedding vectors.
+
+    Vectors are stored as packed float32 blobs. The cache is safe to share
+    between processes: SQLite serialises writers and WAL mode lets readers
+    proceed concurrently.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_CACHE_MB * 1024 * 1024):
+        """
+        Initialize the embedding cache.
+
+        Args:
+            path: Path of the SQLite file backing the cache
+            max_bytes: Maximum total size of stored vectors before LRU eviction
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                nbytes INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)")
+        self._conn.commit()
+        self._total_bytes = self._sum_bytes_locked()
+        logger.info(f"Initialized embedding cache at {path} (max {max_bytes // (1024 * 1024)} MB)")
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        """
+        Build the content-addressed cache key for a chunk of text.
+
+        Args:
+            model_name: Name of the embedding model
+            text: Chunk text
+
+        Returns:
+            Hex digest identifying the (model, text) pair
+        """
+        digest = hashlib.sha256()
+        digest.update(model_name.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get_many(self, model_name: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """
+        Look up cached embeddings for a list of texts.
+
+        Args:
+            model_name: Name of the embedding model
+            texts: Texts to look up
+
+        Returns:
+            List aligned with texts holding a vector, or None on a miss
+        """
+        keys = [self.make_key(model_name, text) for text in texts]
+        found: Dict[str, List[float]] = {}
+
+        with self._lock:
+            unique_keys = list(dict.fromkeys(keys))
+            for start in range(0, len(unique_keys), MAX_SQL_VARIABLES):
+                batch = unique_keys[start:start + MAX_SQL_VARIABLES]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+
+            results = [found.get(key) for key in keys]
+            hits = sum(1 for result in results if result is not None)
+            self._stats["hits"] += hits
+            self._stats["misses"] += len(results) - hits
+
+        return results
+
+    def put_many(self, model_name: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        """
+        Store embeddings for a list of texts and evict old entries if needed.
+
+        Args:
+            model_name: Name of the embedding model
+            texts: Texts that were embedded
+            vectors: Embedding vectors aligned with texts
+        """
+        if not texts:
+            return
+
+        now = time.time()
+        rows = []
+        for text, vector in zip(texts, vectors):
+            packed = np.asarray(vector, dtype=np.float32)
+            blob = packed.tobytes()
+            rows.append((self.make_key(model_name, text), model_name, int(packed.shape[0]), blob, len(blob), now))
+
+        with self._lock:
+            # Rows being replaced no longer count towards the running total
+            keys = list(dict.fromkeys(row[0] for row in rows))
+            for start in range(0, len(keys), MAX_SQL_VARIABLES):
+                batch = keys[start:start + MAX_SQL_VARIABLES]
+                placeholders = ",".join("?" * len(batch))
+                self._total_bytes -= self._conn.execute(
+                    f"SELECT COALESCE(SUM(nbytes), 0) FROM embeddings WHERE key IN ({placeholders})",
+                    batch
+                ).fetchone()[0]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, dim, vector, nbytes, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._total_bytes += sum({row[0]: row[4] for row in rows}.values())
+            self._stats["writes"] += len(rows)
+            self._evict_locked()
+            self._conn.commit()
+
+    def _sum_bytes_locked(self) -> int:
+        """Scan the table for the total size of stored vectors."""
+        return self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM embeddings").fetchone()[0]
+
+    def _evict_locked(self) -> None:
+        """Evict least recently used entries until the cache fits its size cap."""
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        # Other processes share the file, so resync with the table before evicting
+        self._total_bytes = self._sum_bytes_locked()
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        excess = self._total_bytes - self.max_bytes
+        freed = 0
+        evicted_keys = []
+        for key, nbytes in self._conn.execute("SELECT key, nbytes FROM embeddings ORDER BY last_access ASC"):
+            evicted_keys.append((key,))
+            freed += nbytes
+            if freed >= excess:
+                break
+
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", evicted_keys)
+        self._total_bytes -= freed
+        self._stats["evictions"] += len(evicted_keys)
+        logger.info(f"Evicted {len(evicted_keys)} embeddings ({freed} bytes) from cache")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with hit/miss counters, hit rate, entry count and size
+        """
+        with self._lock:
+            entries, total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM embeddings"
+            ).fetchone()
+            stats = dict(self._stats)
+
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["entries"] = entries
+        stats["bytes"] = total_bytes
+        stats["max_bytes"] = self.max_bytes
+        return stats
+
+    def clear(self) -> None:
+        """Remove all cached embeddings."""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._total_bytes = 0
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class QueryEmbeddingCache:
+    """
+    An in-memory LRU cache of query text to embedding vector.
+
+    Queries repeat far more often than document chunks change (common user
+    questions, fixed probe queries), and a query embedding depends only on
+    the query text and the model, so entries never need invalidating.
+    """
+
+    def __init__(self, max_entries: int = QUERY_EMBEDDING_CACHE_SIZE):
+        """
+        Initialize the query embedding cache.
+
+        Args:
+            max_entries: Maximum number of cached query embeddings
+        """
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get_many(self, queries: Sequence[str]) -> List[Optional[List[float]]]:
+        """
+        Look up cached embeddings for a list of queries.
+
+        Args:
+            queries: Query texts
+
+        Returns:
+            List aligned with queries holding a vector, or None on a miss
+        """
+        results: List[Optional[List[float]]] = []
+        with self._lock:
+            for query in queries:
+                vector = self._vectors.get(query)
+                if vector is not None:
+                    self._vectors.move_to_end(query)
+                    results.append(vector.tolist())
+                else:
+                    results.append(None)
+            hits = sum(1 for result in results if result is not None)
+            self._stats["hits"] += hits
+            self._stats["misses"] += len(results) - hits
+        return results
+
+    def put_many(self, queries: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        """
+        Store embeddings for a list of queries, evicting the least recently used.
+
+        Args:
+            queries: Query texts that were embedded
+            vectors: Embedding vectors aligned with queries
+        """
+        with self._lock:
+            for query, vector in zip(queries, vectors):
+                self._vectors[query] = np.asarray(vector, dtype=np.float32)
+                self._vectors.move_to_end(query)
+            while len(self._vectors) > self.max_entries:
+                self._vectors.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with hit/miss counters, hit rate and entry count
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._vectors)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        return stats
+
+    def clear(self) -> None:
+        """Remove all cached query embeddings."""
+        with self._lock:
+            self._vectors.clear()
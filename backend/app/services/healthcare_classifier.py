@@ -4,6 +4,7 @@ Provides functions to analyze and classify SLA documents related to healthcare.
 """
 
 import re
+from collections import defaultdict
 from typing import Dict, List, Any, Optional, Tuple
 
 # Healthcare terminology dictionaries for classification
@@ -67,6 +68,135 @@ COMPLIANCE_FRAMEWORKS = {
     ]
 }
 
+CLINICAL_SPECIALTIES = [
+    "Cardiology", "Radiology", "Pediatrics", "Oncology", 
+    "Neurology", "Orthopedics", "Primary Care", "Emergency Medicine", 
+    "Surgery", "Obstetrics", "Gynecology", "Psychiatry", "Dermatology",
+    "Ophthalmology", "Endocrinology", "Gastroenterology", "Urology"
+]
+
+# High sensitivity indicators (matched case-insensitively at a word boundary)
+HIGH_SENSITIVITY_PATTERNS = [
+    r'PHI\b', r'ePHI\b', r'protected health information\b',
+    r'sensitive\s+patient\s+data\b', r'medical\s+record\b',
+    r'substance\s+(use|abuse)\b', r'mental\s+health\b', r'HIV\b',
+    r'genetic\b', r'biometric\b'
+]
+
+SERVICE_TYPE_PATTERNS = {
+    service_type: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+    for service_type, patterns in {
+        "EHR Hosting": [
+            r'\b(EHR|electronic health record|EMR|electronic medical record)\b.{0,30}\b(hosting|cloud|infrastructure|platform)\b',
+            r'\b(hosting|cloud|infrastructure|platform).{0,30}\b(EHR|electronic health record|EMR|electronic medical record)\b'
+        ],
+        "Telemedicine Platform": [
+            r'\b(telemedicine|telehealth|virtual care|video consult|remote care)\b',
+            r'\bvirtual\s(visit|appointment|consultation)\b'
+        ],
+        "Patient Portal": [
+            r'\b(patient portal|patient access|patient engagement)\b',
+            r'\bpatient.{0,10}\bportal\b'
+        ],
+        "Health Information Exchange": [
+            r'\b(HIE|health information exchange|health data exchange)\b',
+            r'\bexchange.{0,20}(health|medical|clinical).{0,20}information\b'
+        ],
+        "Medical Imaging Storage": [
+            r'\b(PACS|picture archiving|radiology storage|medical image|imaging repository)\b',
+            r'\b(CT|MRI|ultrasound|X-ray|radiograph).{0,30}(storage|archive)\b'
+        ]
+    }.items()
+}
+
+WORD = re.compile(r'\w+')
+
+
+class TermMatcher:
+    """
+    Counts many word-bounded patterns in one pass over a text.
+
+    Every pattern starts with a literal word. Patterns are grouped by that
+    first word, so each word of the text is looked up once and only the
+    patterns that can start there are tried, anchored at that position.
+    Each pattern is counted exactly as re.findall would count it after a
+    word boundary: over non-overlapping matches, independently of the other
+    patterns.
+    """
+    
+    def __init__(self):
+        self.labels: List[Any] = []
+        self._patterns: List[re.Pattern] = []
+        self._by_first_word: Dict[str, List[int]] = defaultdict(list)
+    
+    def add(self, label: Any, pattern: str) -> None:
+        """
+        Register a pattern.
+        
+        Args:
+            label: Key the pattern's count is reported under
+            pattern: Lowercase regex matched after a word boundary; must start with a literal word
+        """
+        first_word = WORD.match(pattern)
+        if first_word is None:
+            raise ValueError(f"Pattern must start with a word: {pattern}")
+        self._by_first_word[first_word.group(0)].append(len(self._patterns))
+        self._patterns.append(re.compile(pattern))
+        self.labels.append(label)
+    
+    def scan(self, text: str) -> Tuple[int, Dict[Any, int]]:
+        """
+        Count every pattern in a lowercased text.
+        
+        Args:
+            text: Lowercased text to scan
+            
+        Returns:
+            Tuple of (number of words in text, match count per label of the patterns that matched)
+        """
+        counts: Dict[int, int] = defaultdict(int)
+        # End of each pattern's last match, so matches of one pattern never overlap
+        last_end: Dict[int, int] = {}
+        word_count = 0
+        for word in WORD.finditer(text):
+            word_count += 1
+            candidates = self._by_first_word.get(word.group(0))
+            if not candidates:
+                continue
+            start = word.start()
+            for index in candidates:
+                if last_end.get(index, 0) > start:
+                    continue
+                match = self._patterns[index].match(text, start)
+                if match:
+                    counts[index] += 1
+                    last_end[index] = match.end()
+        
+        label_counts: Dict[Any, int] = defaultdict(int)
+        for index, count in counts.items():
+            label_counts[self.labels[index]] += count
+        return word_count, dict(label_counts)
+
+
+def _build_term_matcher() -> TermMatcher:
+    """Build the matcher for every term list used in classification."""
+    matcher = TermMatcher()
+    for category, terms in HEALTHCARE_TERMS.items():
+        for term in terms:
+            matcher.add(("category", category), re.escape(term.lower()) + r'\b')
+    for framework, indicators in COMPLIANCE_FRAMEWORKS.items():
+        for indicator in indicators:
+            matcher.add(("framework", framework), re.escape(indicator.lower()) + r'\b')
+    for specialty in CLINICAL_SPECIALTIES:
+        matcher.add(("specialty", specialty), re.escape(specialty.lower()) + r'\b')
+    for pattern in HIGH_SENSITIVITY_PATTERNS:
+        matcher.add(("sensitive", None), pattern.lower())
+    return matcher
+
+
+TERM_MATCHER = _build_term_matcher()
+
+
 class HealthcareDocumentClassifier:
     """Classifier for healthcare-specific documents"""
     
@@ -88,8 +218,11 @@ class HealthcareDocumentClassifier:
             "confidence_score": 0.0
         }
         
+        # Count all terms in a single pass over the text
+        matches = self._scan(content)
+        
         # Check if this is a healthcare document
-        healthcare_score, category_scores = self._calculate_healthcare_score(content)
+        healthcare_score, category_scores = self._calculate_healthcare_score(content, matches)
         
         if healthcare_score > 0.4:  # 40% confidence threshold
             classification["is_healthcare"] = True
@@ -114,24 +247,29 @@ class HealthcareDocumentClassifier:
             classification["service_type"] = self._detect_service_type(content)
             
             # Detect compliance frameworks
-            classification["compliance_frameworks"] = self._detect_compliance_frameworks(content)
+            classification["compliance_frameworks"] = self._detect_compliance_frameworks(content, matches)
             
             # Detect clinical specialties
-            classification["clinical_specialties"] = self._detect_clinical_specialties(content)
+            classification["clinical_specialties"] = self._detect_clinical_specialties(content, matches)
             
             # Determine data sensitivity
             classification["data_sensitivity"] = self._determine_data_sensitivity(
                 content, 
-                classification["compliance_frameworks"]
+                classification["compliance_frameworks"],
+                matches
             )
         
         return classification
     
-    def _calculate_healthcare_score(self, content: str) -> Tuple[float, Dict[str, float]]:
+    @staticmethod
+    def _scan(content: str) -> Tuple[int, Dict[Any, int]]:
+        """Count the words and all classification terms of the document in one pass"""
+        return TERM_MATCHER.scan(content.lower())
+    
+    def _calculate_healthcare_score(self, content: str,
+                                    matches: Optional[Tuple[int, Dict[Any, int]]] = None) -> Tuple[float, Dict[str, float]]:
         """Calculate how likely the document is related to healthcare"""
-        # Normalize content for better matching
-        normalized_content = content.lower()
-        word_count = len(re.findall(r'\w+', normalized_content))
+        word_count, counts = matches or self._scan(content)
         
         if word_count == 0:
             return 0.0, {}
@@ -140,13 +278,8 @@ class HealthcareDocumentClassifier:
         category_scores = {}
         total_matches = 0
         
-        for category, terms in HEALTHCARE_TERMS.items():
-            category_count = 0
-            for term in terms:
-                matches = len(re.findall(r'\b' + re.escape(term.lower()) + r'\b', normalized_content))
-                if matches > 0:
-                    category_count += matches
-            
+        for category in HEALTHCARE_TERMS:
+            category_count = counts.get(("category", category), 0)
             category_scores[category] = category_count / word_count
             total_matches += category_count
         
@@ -157,81 +290,35 @@ class HealthcareDocumentClassifier:
     
     def _detect_service_type(self, content: str) -> Optional[str]:
         """Detect the healthcare service type from the document content"""
-        service_type_patterns = {
-            "EHR Hosting": [
-                r'\b(EHR|electronic health record|EMR|electronic medical record)\b.{0,30}\b(hosting|cloud|infrastructure|platform)\b',
-                r'\b(hosting|cloud|infrastructure|platform).{0,30}\b(EHR|electronic health record|EMR|electronic medical record)\b'
-            ],
-            "Telemedicine Platform": [
-                r'\b(telemedicine|telehealth|virtual care|video consult|remote care)\b',
-                r'\bvirtual\s(visit|appointment|consultation)\b'
-            ],
-            "Patient Portal": [
-                r'\b(patient portal|patient access|patient engagement)\b',
-                r'\bpatient.{0,10}\bportal\b'
-            ],
-            "Health Information Exchange": [
-                r'\b(HIE|health information exchange|health data exchange)\b',
-                r'\bexchange.{0,20}(health|medical|clinical).{0,20}information\b'
-            ],
-            "Medical Imaging Storage": [
-                r'\b(PACS|picture archiving|radiology storage|medical image|imaging repository)\b',
-                r'\b(CT|MRI|ultrasound|X-ray|radiograph).{0,30}(storage|archive)\b'
-            ]
-        }
-        
         normalized_content = content.lower()
         
-        for service_type, patterns in service_type_patterns.items():
+        for service_type, patterns in SERVICE_TYPE_PATTERNS.items():
             for pattern in patterns:
-                if re.search(pattern, normalized_content, re.IGNORECASE):
+                if pattern.search(normalized_content):
                     return service_type
         
         return None
     
-    def _detect_compliance_frameworks(self, content: str) -> List[str]:
+    def _detect_compliance_frameworks(self, content: str,
+                                      matches: Optional[Tuple[int, Dict[Any, int]]] = None) -> List[str]:
         """Detect regulatory compliance frameworks mentioned in the document"""
-        frameworks = []
-        normalized_content = content.lower()
-        
-        for framework, indicators in COMPLIANCE_FRAMEWORKS.items():
-            for indicator in indicators:
-                if re.search(r'\b' + re.escape(indicator.lower()) + r'\b', normalized_content):
-                    if framework not in frameworks:
-                        frameworks.append(framework)
-                    break
-        
-        return frameworks
+        _, counts = matches or self._scan(content)
+        return [framework for framework in COMPLIANCE_FRAMEWORKS if counts.get(("framework", framework))]
     
-    def _detect_clinical_specialties(self, content: str) -> List[str]:
+    def _detect_clinical_specialties(self, content: str,
+                                     matches: Optional[Tuple[int, Dict[Any, int]]] = None) -> List[str]:
         """Detect clinical specialties mentioned in the document"""
-        specialties = []
-        specialty_list = [
-            "Cardiology", "Radiology", "Pediatrics", "Oncology", 
-            "Neurology", "Orthopedics", "Primary Care", "Emergency Medicine", 
-            "Surgery", "Obstetrics", "Gynecology", "Psychiatry", "Dermatology",
-            "Ophthalmology", "Endocrinology", "Gastroenterology", "Urology"
-        ]
-        
-        for specialty in specialty_list:
-            if re.search(r'\b' + re.escape(specialty) + r'\b', content, re.IGNORECASE):
-                specialties.append(specialty)
-        
-        return specialties
+        _, counts = matches or self._scan(content)
+        return [specialty for specialty in CLINICAL_SPECIALTIES if counts.get(("specialty", specialty))]
     
-    def _determine_data_sensitivity(self, content: str, compliance_frameworks: List[str]) -> str:
+    def _determine_data_sensitivity(self, content: str, compliance_frameworks: List[str],
+                                    matches: Optional[Tuple[int, Dict[Any, int]]] = None) -> str:
         """Determine the data sensitivity level based on content and compliance frameworks"""
-        # Check for high sensitivity indicators
-        high_sensitivity_patterns = [
-            r'\bPHI\b', r'\bePHI\b', r'\bprotected health information\b',
-            r'\bsensitive\s+patient\s+data\b', r'\bmedical\s+record\b',
-            r'\bsubstance\s+(use|abuse)\b', r'\bmental\s+health\b', r'\bHIV\b',
-            r'\bgenetic\b', r'\bbiometric\b'
-        ]
+        _, counts = matches or self._scan(content)
         
-        for pattern in high_sensitivity_patterns:
-            if re.search(pattern, content, re.IGNORECASE):
-                return "High"
+        # Check for high sensitivity indicators
+        if counts.get(("sensitive", None)):
+            return "High"
         
         # Consider compliance frameworks
         if "HIPAA" in compliance_frameworks or "42 CFR Part 2" in compliance_frameworks:
@@ -240,4 +327,4 @@ class HealthcareDocumentClassifier:
             return "Medium"
             
         # Default sensitivity
-        return "Medium"
\ No newline at end of file
+        return "Medium"
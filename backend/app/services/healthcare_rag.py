@@ -7,9 +7,20 @@ import os
 from datetime import datetime
 import re
 import json
+import tempfile
 
-# This would use langchain and other dependencies in a real implementation
-# For this hackathon prototype, we'll create a simplified version
+import numpy as np
+
+from app.services.bm25_index import BM25Index
+from app.services.quantized_index import QuantizedEmbeddingIndex, EMBEDDING_QUANTIZATION, rescore
+from app.services.chunker import StructuredChunker
+
+# Weight of cosine similarity in hybrid scoring
+HYBRID_DENSE_WEIGHT = float(os.environ.get("CHAKRA_HEALTHCARE_DENSE_WEIGHT", "0.5"))
+# Dense candidates considered per requested result
+DENSE_CANDIDATE_FACTOR = 4
+# Codes kept for chunk embeddings ("none" keeps exact float32 vectors)
+DENSE_INDEX_MODE = "float32" if EMBEDDING_QUANTIZATION == "none" else EMBEDDING_QUANTIZATION
 
 class HealthcareRAGSystem:
     """
@@ -20,14 +31,25 @@ class HealthcareRAGSystem:
         """Initialize the RAG system with the path to documents"""
         self.document_dir = document_dir
         self.document_store = []
-        self.vector_store = {}
         self.healthcare_terms = self._load_healthcare_terms()
+        self.dense_weight = HYBRID_DENSE_WEIGHT
+        self.chunker = StructuredChunker()
+        # Flat list of (document, chunk) pairs; positions are the index's chunk numbers
+        self.chunk_refs: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+        self.chunk_numbers: Dict[str, int] = {}
+        # BM25 inverted index over chunk text, keyed by chunk ID
+        self.keyword_index = BM25Index()
+        # Dense index of chunk embeddings keyed by chunk ID (empty without a model)
+        self.dense_index = QuantizedEmbeddingIndex(DENSE_INDEX_MODE)
+        # Full-precision embeddings by chunk number, memory-mapped from disk for rescoring
+        self.full_vectors: Optional[np.ndarray] = None
         self.initialized = False
     
     def initialize(self):
         """Initialize the system by loading and indexing documents"""
         self._load_documents()
         self._create_embeddings()
+        self._build_index()
         self.initialized = True
         return {"status": "success", "documents_indexed": len(self.document_store)}
     
@@ -77,10 +99,7 @@ class HealthcareRAGSystem:
             return {"status": "error", "message": str(e)}
     
     def _create_embeddings(self):
-        """Create embeddings for all documents in the store"""
-        # In a real implementation, this would use a proper embedding model
-        # For this prototype, we'll simulate the process
-        
+        """Chunk all documents in the store and build the dense index of chunk embeddings"""
         for document in self.document_store:
             # Clear existing chunks
             document["chunks"] = []
@@ -95,71 +114,67 @@ class HealthcareRAGSystem:
                     # Split into chunks (simplified)
                     chunks = self._chunk_document(content, document["id"])
                     document["chunks"] = chunks
-                    
-                    # Create simulated embeddings for each chunk
-                    for chunk in chunks:
-                        chunk_id = chunk["id"]
-                        self.vector_store[chunk_id] = self._simulate_embedding(chunk["text"])
                         
             except Exception as e:
                 print(f"Error processing document {document['filename']}: {e}")
-    
-    def _chunk_document(self, content: str, doc_id: str) -> List[Dict[str, Any]]:
-        """Split document into chunks optimized for healthcare content"""
-        # In a real implementation, this would use more sophisticated chunking
-        # For this prototype, we'll use simple paragraph-based chunking
-        
-        chunks = []
         
-        # Split by sections (headers)
-        sections = re.split(r'\n#{1,6} ', content)
+        self.chunk_refs = [(doc, chunk) for doc in self.document_store for chunk in doc.get("chunks", [])]
         
-        for i, section in enumerate(sections):
-            if i == 0 and not section.strip():
-                continue
-                
-            # Further split large sections into smaller chunks
-            if len(section) > 1000:
-                paragraphs = re.split(r'\n\n+', section)
-                for j, para in enumerate(paragraphs):
-                    if not para.strip():
-                        continue
-                    
-                    chunk_id = f"{doc_id}_c{i}_{j}"
-                    chunks.append({
-                        "id": chunk_id,
-                        "doc_id": doc_id,
-                        "text": para,
-                        "section_idx": i,
-                        "para_idx": j
-                    })
-            else:
-                chunk_id = f"{doc_id}_c{i}"
-                chunks.append({
-                    "id": chunk_id,
-                    "doc_id": doc_id,
-                    "text": section,
-                    "section_idx": i,
-                    "para_idx": 0
-                })
-        
-        return chunks
+        # Embed all chunks in one batch with the knowledge base embedding model
+        self.dense_index = QuantizedEmbeddingIndex(DENSE_INDEX_MODE)
+        if self.chunk_refs:
+            try:
+                from app.services.vector_store import get_vector_store
+                vectors = np.asarray(
+                    get_vector_store()._get_embeddings([chunk["text"] for _, chunk in self.chunk_refs]),
+                    dtype=np.float32
+                )
+                self.dense_index.add_many([chunk["id"] for _, chunk in self.chunk_refs], vectors)
+                if self.dense_index.mode != "float32":
+                    self.full_vectors = self._memory_map(vectors)
+            except Exception as e:
+                print(f"Dense index unavailable, using keyword search only: {e}")
     
-    def _simulate_embedding(self, text: str) -> List[float]:
-        """
-        Create a simulated embedding vector for text
-        In a real implementation, this would use a proper embedding model
-        """
-        # For this prototype, we'll return a simple hash-based vector
-        # This is just for simulation purposes
-        import hashlib
-        
-        # Create a deterministic but simplified "embedding"
-        hash_obj = hashlib.md5(text.encode('utf-8'))
-        hash_bytes = hash_obj.digest()
-        
-        # Convert bytes to a list of 8 float values between -1 and 1
-        return [(b / 128) - 1 for b in hash_bytes[:8]]
+    @staticmethod
+    def _memory_map(vectors: np.ndarray) -> np.ndarray:
+        """Move vectors to a temporary file and map them read-only, so rows are paged in on demand"""
+        fd, path = tempfile.mkstemp(suffix=".npy")
+        os.close(fd)
+        try:
+            np.save(path, vectors)
+            return np.load(path, mmap_mode="r")
+        finally:
+            # The mapping stays valid after the file is unlinked
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
+    def _build_index(self):
+        """Build the BM25 inverted index over all chunks"""
+        self.keyword_index = BM25Index()
+        self.keyword_index.add_many([(chunk["id"], chunk["text"]) for _, chunk in self.chunk_refs])
+        self.chunk_numbers = {chunk["id"]: chunk_no for chunk_no, (_, chunk) in enumerate(self.chunk_refs)}
+    
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """Scale vectors to unit length so dot products are cosine similarities"""
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+    
+    def _chunk_document(self, content: str, doc_id: str) -> List[Dict[str, Any]]:
+        """Split document into token-sized chunks that follow its section headings"""
+        return [
+            {
+                "id": f"{doc_id}_c{i}",
+                "doc_id": doc_id,
+                "text": chunk["text"],
+                "section_path": chunk["section_path"],
+                "chunk_idx": i
+            }
+            for i, chunk in enumerate(self.chunker.chunk(content))
+        ]
     
     def _load_healthcare_terms(self) -> Dict[str, List[str]]:
         """Load healthcare terminology for query enhancement"""
@@ -194,43 +209,88 @@ class HealthcareRAGSystem:
         Search for relevant document chunks based on the query
         Returns the top_k most relevant chunks with document reference information
         """
+        return self.search_many([query], top_k)[0]
+    
+    def search_many(self, queries: List[str], top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Search for relevant document chunks for several queries in one pass
+        Keyword scores come from the BM25 inverted index, so only chunks that share
+        a term with the query are visited; when embeddings are available they are
+        combined with cosine similarity over the dense index (hybrid scoring)
+        Returns one list of top_k results per query, in the same order as queries
+        """
         if not self.initialized:
             self.initialize()
         
-        # Enhance query with healthcare terminology
-        enhanced_query = self.enhance_query(query)
+        if not queries:
+            return []
         
-        # In a real implementation, this would use vector similarity search
-        # For this prototype, we'll use keyword matching as a simplified approach
+        # Embed all queries in one batch for the dense index
+        query_vectors = None
+        if len(self.dense_index):
+            try:
+                from app.services.vector_store import get_vector_store
+                query_vectors = self._normalize(
+                    np.asarray(get_vector_store()._embed_queries(queries), dtype=np.float32)
+                )
+            except Exception as e:
+                print(f"Query embedding failed, using keyword search only: {e}")
         
         results = []
-        query_terms = set(re.findall(r'\b\w+\b', enhanced_query.lower()))
+        for query_idx, query in enumerate(queries):
+            # Enhance queries with healthcare terminology for keyword matching
+            keyword_scores = {
+                self.chunk_numbers[chunk_id]: score
+                for chunk_id, score in self.keyword_index.search(self.enhance_query(query))
+            }
+            dense_scores = self._dense_scores(query_vectors[query_idx], top_k) if query_vectors is not None else {}
+            results.append(self._rank(keyword_scores, dense_scores, top_k))
+        return results
+    
+    def _dense_scores(self, query_vector: np.ndarray, top_k: int) -> Dict[int, float]:
+        """
+        Return cosine similarities of the closest chunks in the dense index
+        Quantized candidates are re-scored with the full-precision embeddings
+        stored at indexing time, which are memory-mapped rather than held in memory
+        """
+        num_candidates = top_k * DENSE_CANDIDATE_FACTOR
+        hits = self.dense_index.search(query_vector, num_candidates)[0]
+        if self.dense_index.mode != "float32" and self.full_vectors is not None and hits:
+            chunk_ids = [chunk_id for chunk_id, _ in hits]
+            rows = [self.chunk_numbers[chunk_id] for chunk_id in chunk_ids]
+            vectors = np.asarray(self.full_vectors[rows], dtype=np.float32)
+            hits = rescore(query_vector, chunk_ids, vectors, num_candidates)
+        return {self.chunk_numbers[chunk_id]: score for chunk_id, score in hits}
+    
+    def _rank(self, keyword_scores: Dict[int, float], dense_scores: Dict[int, float], top_k: int) -> List[Dict[str, Any]]:
+        """Combine normalized BM25 and cosine scores and format the top_k chunks"""
+        max_keyword = max(keyword_scores.values(), default=0.0) or 1.0
+        dense_weight = self.dense_weight if dense_scores else 0.0
         
-        for doc in self.document_store:
-            for chunk in doc.get("chunks", []):
-                chunk_text = chunk["text"].lower()
-                
-                # Count matching terms
-                match_score = 0
-                for term in query_terms:
-                    if term in chunk_text:
-                        match_score += 1
-                
-                # Only include results with at least one matching term
-                if match_score > 0:
-                    # Add document metadata and relevance score
-                    results.append({
-                        "chunk_id": chunk["id"],
-                        "doc_id": doc["id"],
-                        "document_title": doc["title"],
-                        "document_filename": doc["filename"],
-                        "chunk_text": chunk["text"],
-                        "relevance_score": match_score / len(query_terms)
-                    })
+        combined = {}
+        for chunk_no in set(keyword_scores) | set(dense_scores):
+            keyword = keyword_scores.get(chunk_no, 0.0) / max_keyword
+            dense = max(dense_scores.get(chunk_no, 0.0), 0.0)
+            score = dense_weight * dense + (1 - dense_weight) * keyword
+            # Only include results with some relevance
+            if score > 0:
+                combined[chunk_no] = score
         
-        # Sort by relevance score and return top_k results
-        results.sort(key=lambda x: x["relevance_score"], reverse=True)
-        return results[:top_k]
+        ranked = sorted(combined.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        results = []
+        for chunk_no, score in ranked:
+            doc, chunk = self.chunk_refs[chunk_no]
+            # Add document metadata and relevance score
+            results.append({
+                "chunk_id": chunk["id"],
+                "doc_id": doc["id"],
+                "document_title": doc["title"],
+                "document_filename": doc["filename"],
+                "chunk_text": chunk["text"],
+                "section_path": chunk.get("section_path", ""),
+                "relevance_score": score
+            })
+        return results
     
     def generate_with_citations(self, query: str, context_chunks: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
         """
@@ -0,0 +1,182 @@
+"""
+Background Queue for Document Ingestion Jobs
+
+This module provides functionality for:
+- Accepting ingestion jobs (classification, parsing, indexing) without blocking requests
+- Running jobs on a small bounded pool of worker threads, off the event loop
+- Tracking each job's status (pending, processing, processed, error) for status polling
+- Reporting queue depth and job counters
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.retrieval_executor import BoundedExecutor
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Configuration constants
+INGEST_QUEUE_WORKERS = int(os.environ.get("CHAKRA_INGEST_QUEUE_WORKERS", "2"))
+INGEST_QUEUE_MAX_PENDING = int(os.environ.get("CHAKRA_INGEST_QUEUE_MAX_PENDING", "256"))
+# Finished jobs kept for status lookups before the oldest are forgotten
+INGEST_JOB_HISTORY = int(os.environ.get("CHAKRA_INGEST_JOB_HISTORY", "1000"))
+
+
+class IngestQueue:
+    """
+    An asyncio job queue whose jobs run on a bounded thread pool.
+
+    submit() records a pending job and returns at once. Worker tasks on the
+    event loop take jobs in order and run each job's blocking function on
+    the ingest executor, so CPU-heavy classification and indexing never run
+    on the event loop.
+    """
+
+    def __init__(self, workers: int = INGEST_QUEUE_WORKERS, max_pending: int = INGEST_QUEUE_MAX_PENDING,
+                 history: int = INGEST_JOB_HISTORY):
+        """
+        Initialize the ingest queue. Worker tasks start on the first submit.
+
+        Args:
+            workers: Number of jobs processed concurrently
+            max_pending: Maximum number of jobs waiting to be processed
+            history: Number of finished jobs kept for status lookups
+        """
+        self.workers = workers
+        self.max_pending = max_pending
+        self.history = history
+        self.executor = BoundedExecutor(max_workers=workers, max_queue=workers, name="ingest")
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._stats = {"submitted": 0, "processed": 0, "failed": 0}
+
+    def _start(self) -> None:
+        """Start the worker tasks on the running event loop."""
+        if self._tasks and not all(task.done() for task in self._tasks):
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Started {self.workers} ingest workers")
+
+    async def submit(self, func: Callable[..., Any], *args, **info) -> Dict[str, Any]:
+        """
+        Queue a blocking job.
+
+        Args:
+            func: Blocking callable run on a worker thread; its return value becomes the job result
+            *args: Positional arguments for func
+            **info: Extra fields recorded on the job (e.g. document_id, filename)
+
+        Returns:
+            The job record, with status "pending"
+
+        Raises:
+            asyncio.QueueFull: If max_pending jobs are already waiting
+        """
+        self._start()
+        job = {
+            "id": str(uuid.uuid4()),
+            "status": "pending",
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+            **info,
+        }
+        self._queue.put_nowait((job, func, args))
+        self._jobs[job["id"]] = job
+        self._stats["submitted"] += 1
+        self._forget_finished()
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a job.
+
+        Args:
+            job_id: ID returned by submit
+
+        Returns:
+            The job record, or None if the job is unknown or was forgotten
+        """
+        return self._jobs.get(job_id)
+
+    async def _worker(self, number: int) -> None:
+        """Process queued jobs until cancelled."""
+        while True:
+            job, func, args = await self._queue.get()
+            job["status"] = "processing"
+            job["started_at"] = time.time()
+            try:
+                job["result"] = await self.executor.run(func, *args)
+                job["status"] = "processed"
+                self._stats["processed"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ingest job {job['id']} failed: {str(e)}")
+                job["status"] = "error"
+                job["error"] = str(e)
+                self._stats["failed"] += 1
+            finally:
+                job["finished_at"] = time.time()
+                self._queue.task_done()
+
+    def _forget_finished(self) -> None:
+        """Drop the oldest finished jobs beyond the history limit."""
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in ("processed", "error")]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get queue statistics.
+
+        Returns:
+            Dictionary with job counters, pending depth and executor statistics
+        """
+        return {
+            **self._stats,
+            "pending": self._queue.qsize() if self._queue else 0,
+            "executor": self.executor.stats(),
+        }
+
+    async def close(self) -> None:
+        """Cancel the worker tasks and shut down the executor."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.executor.shutdown()
+
+
+_ingest_queue = None
+
+
+def get_ingest_queue() -> IngestQueue:
+    """
+    Get the shared ingest queue singleton.
+
+    Returns:
+        IngestQueue instance
+    """
+    global _ingest_queue
+    if _ingest_queue is None:
+        _ingest_queue = IngestQueue()
+    return _ingest_queue
+
+
+async def close_ingest_queue() -> None:
+    """Stop the shared ingest queue, if it was started."""
+    global _ingest_queue
+    if _ingest_queue is not None:
+        await _ingest_queue.close()
+        _ingest_queue = None
@@ -0,0 +1,106 @@
+"""
+Document Metadata Filters
+
+This module provides functionality for:
+- A single filter spec for documents (industry, service type, compliance framework, ...)
+- Flattening list metadata into scalar fields that the vector database can index
+- Translating a filter spec into a vector database `where` clause
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+# Filters matching a single-valued document field of the same name
+SCALAR_FILTER_FIELDS = ("industry", "service_type", "healthcare_category", "data_sensitivity")
+# Filters matching one value of a multi-valued document field: filter name -> field name
+MULTI_VALUE_FILTER_FIELDS = {
+    "compliance_framework": "compliance_frameworks",
+    "clinical_specialty": "clinical_specialties",
+}
+FILTER_FIELDS = SCALAR_FILTER_FIELDS + tuple(MULTI_VALUE_FILTER_FIELDS)
+
+# Industry values that mean healthcare: the document parser's label and the classifier's
+HEALTHCARE_INDUSTRY_VALUES = ["healthcare", "Healthcare - General"]
+
+FilterValue = Union[str, Sequence[str]]
+
+
+def flag_key(filter_name: str, value: str) -> str:
+    """
+    Build the metadata key flagging one value of a multi-valued field.
+
+    Args:
+        filter_name: Multi-valued filter name (e.g. "compliance_framework")
+        value: Field value (e.g. "HIPAA")
+
+    Returns:
+        Metadata key such as "compliance_framework:HIPAA"
+    """
+    return f"{filter_name}:{value}"
+
+
+def flatten_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert document metadata into scalar-only chunk metadata.
+
+    Vector database metadata values must be scalars. Each value of a
+    multi-valued field becomes a boolean flag key that filters can match,
+    and the list itself is kept as a comma-separated string for display.
+    Other non-scalar values and None are dropped.
+
+    Args:
+        metadata: Document metadata, possibly with list values
+
+    Returns:
+        Metadata with only str, int, float and bool values
+    """
+    flat = {}
+    list_fields = {field: name for name, field in MULTI_VALUE_FILTER_FIELDS.items()}
+    for key, value in metadata.items():
+        if isinstance(value, (str, int, float, bool)):
+            flat[key] = value
+        elif isinstance(value, (list, tuple)) and key in list_fields:
+            values = [str(item) for item in value if item]
+            if values:
+                flat[key] = ", ".join(values)
+            for item in values:
+                flat[flag_key(list_fields[key], item)] = True
+    return flat
+
+
+def _condition(field: str, value: FilterValue) -> Dict[str, Any]:
+    """Build an equality (or, for several values, membership) condition."""
+    if isinstance(value, (list, tuple)):
+        return {field: {"$in": list(value)}}
+    return {field: {"$eq": value}}
+
+
+def metadata_filter(filters: Dict[str, Optional[FilterValue]]) -> Optional[Dict[str, Any]]:
+    """
+    Translate a filter spec into a vector database `where` clause.
+
+    Args:
+        filters: Mapping of filter name (see FILTER_FIELDS) to a value, a list
+            of accepted values, or None to not filter on that field
+
+    Returns:
+        `where` clause, or None if no filter is set
+
+    Raises:
+        ValueError: If a filter name is unknown
+    """
+    conditions: List[Dict[str, Any]] = []
+    for name, value in filters.items():
+        if value is None or value == "" or value == []:
+            continue
+        if name in SCALAR_FILTER_FIELDS:
+            conditions.append(_condition(name, value))
+        elif name in MULTI_VALUE_FILTER_FIELDS:
+            values = [value] if isinstance(value, str) else list(value)
+            flags = [{flag_key(name, item): {"$eq": True}} for item in values]
+            conditions.append(flags[0] if len(flags) == 1 else {"$or": flags})
+        else:
+            raise ValueError(f"Unknown document filter: {name}")
+
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
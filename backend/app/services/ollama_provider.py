@@ -10,11 +10,20 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 
 from .llm_provider import LLMProvider
-from app.core.config import OLLAMA_API_URL, OLLAMA_MODEL, LLM_PROVIDER
+from .tokenizer import get_token_counter
+from app.core.config import (
+    OLLAMA_API_URL, OLLAMA_MODEL, LLM_PROVIDER,
+    OLLAMA_CONNECT_TIMEOUT, OLLAMA_READ_TIMEOUT, OLLAMA_MAX_CONNECTIONS,
+    OLLAMA_MAX_RETRIES, OLLAMA_RETRY_BACKOFF, OLLAMA_HEALTH_CHECK_TTL, OLLAMA_CONTEXT_WINDOW
+)
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Failures worth retrying: the request never reached Ollama or the connection dropped
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.ReadError, httpx.RemoteProtocolError)
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+
 class OllamaProvider(LLMProvider):
     """Ollama provider implementation for local LLM integration."""
     
@@ -27,11 +36,22 @@ class OllamaProvider(LLMProvider):
         self.api_url = api_url.rstrip("/")
         self.model = OLLAMA_MODEL or "mistral"
         
+        # Context window (num_ctx) requested from Ollama; prompts are pruned to fit it
+        self.context_window = OLLAMA_CONTEXT_WINDOW
+        
         # Rate limiting configuration
         self.request_timestamps = []
         self.max_requests_per_minute = 20  # Adjust based on your Ollama instance capacity
         self.request_window = 60  # Window in seconds
         
+        # Pooled keep-alive HTTP client, created lazily on first request
+        self._client: Optional[httpx.AsyncClient] = None
+        
+        # Cached health check state
+        self._health_checked_at: Optional[float] = None
+        self._health_error: Optional[str] = None
+        self._health_ttl = OLLAMA_HEALTH_CHECK_TTL
+        
         logger.info(f"Initialized Ollama provider with URL: {self.api_url} and model: {self.model}")
     
     async def apply_rate_limit(self):
@@ -70,10 +90,110 @@ class OllamaProvider(LLMProvider):
             logger.info("Rate limiting was cancelled")
             raise  # Re-raise to propagate cancellation properly
     
+    def _get_client(self) -> httpx.AsyncClient:
+        """
+        Get the provider's long-lived HTTP client, creating it on first use.
+        
+        The client keeps connections to Ollama alive between requests so each
+        chat message reuses a pooled connection instead of opening a new one.
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.api_url,
+                timeout=httpx.Timeout(OLLAMA_READ_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_keepalive_connections=OLLAMA_MAX_CONNECTIONS,
+                    max_connections=OLLAMA_MAX_CONNECTIONS
+                )
+            )
+        return self._client
+    
+    async def aclose(self):
+        """Close the pooled HTTP client."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+    
+    async def check_health(self, force: bool = False) -> Optional[str]:
+        """
+        Check that Ollama is reachable, caching the result.
+        
+        Successful checks are cached for OLLAMA_HEALTH_CHECK_TTL seconds and
+        failures for a few seconds, so the /api/tags call is not repeated on
+        every chat message.
+        
+        Args:
+            force: Ignore any cached result
+            
+        Returns:
+            None if Ollama is healthy, otherwise a user-facing error message
+        """
+        now = time.monotonic()
+        if not force and self._health_checked_at is not None and now - self._health_checked_at < self._health_ttl:
+            return self._health_error
+        
+        error = None
+        try:
+            response = await self._get_client().get("/api/tags", timeout=OLLAMA_CONNECT_TIMEOUT * 2)
+            if response.status_code == 200:
+                model_names = [m.get('name') for m in response.json().get("models", []) if m.get('name')]
+                logger.info(f"Ollama health check passed. Available models: {model_names}")
+                if not any(self.model in name for name in model_names):
+                    logger.warning(f"⚠️ Configured model '{self.model}' not found in available models")
+            else:
+                logger.error(f"✗ Ollama health check failed: Status {response.status_code}")
+                error = f"Ollama service returned error: Status {response.status_code}. Please check if Ollama is running correctly."
+        except httpx.HTTPError as e:
+            logger.error(f"✗ Ollama health check failed: {str(e)}")
+            error = f"Ollama service at {self.api_url} is unreachable. Please check your configuration and ensure Ollama is running."
+        
+        self._health_error = error
+        self._health_checked_at = now
+        # Re-check failures sooner so recovery is noticed quickly
+        self._health_ttl = OLLAMA_HEALTH_CHECK_TTL if error is None else min(OLLAMA_HEALTH_CHECK_TTL, 5.0)
+        return error
+    
+    def _invalidate_health(self):
+        """Forget the cached health check result."""
+        self._health_checked_at = None
+    
+    async def _post_with_retry(self, path: str, payload: Dict[str, Any]) -> httpx.Response:
+        """
+        POST to the Ollama API, retrying transient connection failures with backoff.
+        
+        Read timeouts are not retried, since re-running a slow generation
+        would only double its cost.
+        
+        Args:
+            path: API path, e.g. "/api/generate"
+            payload: JSON payload
+            
+        Returns:
+            The HTTP response
+        """
+        attempt = 0
+        while True:
+            try:
+                response = await self._get_client().post(path, json=payload)
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= OLLAMA_MAX_RETRIES:
+                    return response
+                logger.warning(f"Ollama returned status {response.status_code}, retrying")
+            except RETRYABLE_ERRORS as e:
+                self._invalidate_health()
+                if attempt >= OLLAMA_MAX_RETRIES:
+                    raise
+                logger.warning(f"Ollama request failed ({e.__class__.__name__}: {str(e)}), retrying")
+            
+            delay = OLLAMA_RETRY_BACKOFF * (2 ** attempt)
+            attempt += 1
+            logger.info(f"Retry {attempt}/{OLLAMA_MAX_RETRIES} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+    
     async def generate_response(self, 
                               messages: List[Dict[str, str]], 
                               max_tokens: Optional[int] = None,
-                              temperature: Optional[float] = 0.7) -> str:
+                              temperature: Optional[float] = 0.7,
+                              model: Optional[str] = None) -> str:
         """
         Generate a response using the local Ollama API.
         
@@ -81,268 +201,56 @@ class OllamaProvider(LLMProvider):
             messages: List of message dictionaries with 'role' and 'content' keys
             max_tokens: Maximum number of tokens to generate
             temperature: Temperature for controlling randomness
+            model: Model for this request only, defaults to the configured model
             
         Returns:
             Generated text response as a string
         """
+        model = model or self.model
         # Apply rate limiting
         await self.apply_rate_limit()
         
         # Apply context management to prevent token overflow
-        managed_messages = await self.manage_context(messages)
-        
-        # Simple logging
-        logger.info("=" * 50)
-        logger.info("OLLAMA REQUEST START")
-        logger.info(f"API URL: {self.api_url}")
-        logger.info(f"Model: {self.model}")
-        logger.info(f"Original messages count: {len(messages)}")
-        logger.info(f"Managed messages count: {len(managed_messages)}")
-        logger.info("=" * 50)
+        managed_messages = await self.manage_context(messages, self.context_window - (max_tokens or 800))
+        logger.info(f"Ollama request to {self.api_url} with model {model} "
+                    f"({len(messages)} messages, {len(managed_messages)} after context management)")
         
         # Use the managed messages instead of original
         messages = managed_messages
         
-        # Health check Ollama before making request
-        try:
-            # Test connectivity with multiple methods
-            logger.info(f"Testing Ollama connectivity at {self.api_url}")
-            
-            # Method 1: HTTPX direct
-            try:
-                async with httpx.AsyncClient(timeout=10.0) as client:
-                    logger.info("Trying HTTPX direct connection...")
-                    health_resp = await client.get(f"{self.api_url}/api/tags")
-                    if health_resp.status_code == 200:
-                        logger.info("✓ HTTPX connection successful!")
-                        models = health_resp.json().get("models", [])
-                        model_names = [m.get('name') for m in models if m.get('name')]
-                        logger.info(f"Available models: {model_names}")
-                        # Check if our configured model exists
-                        if not any(self.model in name for name in model_names):
-                            logger.warning(f"⚠️ Configured model '{self.model}' not found in available models")
-                    else:
-                        logger.error(f"✗ HTTPX connection failed: Status {health_resp.status_code}")
-                        logger.error(f"Response: {health_resp.text}")
-                        return f"Ollama service returned error: Status {health_resp.status_code}. Please check if Ollama is running correctly."
-            except Exception as httpx_exc:
-                logger.error(f"✗ HTTPX connection error: {str(httpx_exc)}")
-                
-                # Method 2: Subprocess with curl
-                try:
-                    logger.info("Trying curl subprocess as fallback...")
-                    import subprocess
-                    import json
-                    
-                    curl_cmd = f"curl -s -m 5 {self.api_url}/api/tags"
-                    result = subprocess.run(curl_cmd, shell=True, capture_output=True, text=True)
-                    
-                    if result.returncode == 0 and result.stdout:
-                        logger.info("✓ Curl connection successful!")
-                        try:
-                            curl_data = json.loads(result.stdout)
-                            models = curl_data.get("models", [])
-                            if models:
-                                logger.info(f"Models via curl: {[m.get('name') for m in models if m.get('name')]}")
-                                # We were able to connect, so we can proceed
-                                return
-                        except json.JSONDecodeError:
-                            logger.error(f"✗ Curl response not valid JSON: {result.stdout[:100]}")
-                    else:
-                        logger.error(f"✗ Curl command failed: {result.stderr}")
-                        
-                except Exception as curl_exc:
-                    logger.error(f"✗ Curl fallback error: {str(curl_exc)}")
-                    
-                # Method 3: Network diagnostic info
-                try:
-                    logger.info("Gathering network diagnostic information...")
-                    # Parse URL to get host and port
-                    from urllib.parse import urlparse
-                    parsed_url = urlparse(self.api_url)
-                    host = parsed_url.hostname or 'localhost'
-                    port = parsed_url.port or 11434
-                    
-                    # Check connectivity with socket
-                    import socket
-                    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                    s.settimeout(2)
-                    try:
-                        s.connect((host, port))
-                        logger.info(f"✓ Socket connection to {host}:{port} successful!")
-                        s.close()
-                    except Exception as sock_exc:
-                        logger.error(f"✗ Socket connection to {host}:{port} failed: {str(sock_exc)}")
-                        return f"Cannot connect to Ollama service at {host}:{port}. Please check if Ollama is running and accessible."
-                    
-                except Exception as diag_exc:
-                    logger.error(f"✗ Network diagnostic error: {str(diag_exc)}")
-                    
-                # If we got here, something is wrong with the API itself
-                return f"Ollama service at {self.api_url} is unreachable. Please check your configuration and ensure Ollama is running."
-                
-        except Exception as health_exc:
-            logger.error(f"✗ Ollama health check failed: {str(health_exc)}")
-            return f"Ollama service is not reachable. Error: {str(health_exc)}. Please ensure Ollama is running at {self.api_url}."
+        # Health check Ollama before making request (cached between calls)
+        health_error = await self.check_health()
+        if health_error:
+            return health_error
+        
         try:
-            # Enhanced logging for debugging
-            logger.info("=" * 50)
-            logger.info(f"Ollama Provider: Generating response with model: {self.model}")
-            logger.info(f"Ollama API URL: {self.api_url}")
-            logger.info(f"Input messages: {len(messages)} messages")
-            logger.info(f"Temperature: {temperature}, Max tokens: {max_tokens or 'default'}")
-            logger.info("=" * 50)
-            
-            # Log a sample of the input messages
-            if messages:
-                logger.info(f"First message role: {messages[0]['role']}")
-                logger.info(f"First message content sample: {messages[0]['content'][:50]}...")
-            
             # Convert OpenAI-style messages to Ollama format
-            prompt = self._format_messages(messages)
-            logger.info(f"Formatted prompt sample: {prompt[:150]}...")  # Log first 150 chars
+            prompt = self._format_messages(messages, model)
+            logger.debug(f"Formatted prompt sample: {prompt[:150]}...")
             
             # Prepare request payload
             payload = {
-                "model": self.model,
+                "model": model,
                 "prompt": prompt,
                 "stream": False,
                 "options": {
                     "num_predict": max_tokens or 800,
+                    "num_ctx": self.context_window,
                     "temperature": temperature
                 }
             }
-            logger.debug(f"Request payload: {payload}")
-            
-            # Log detailed request payload for debugging
-            logger.info(f"Request payload: model={payload['model']}, stream={payload['stream']}")
             logger.info(f"Options: {payload['options']}")
-
-            # Try direct curl command for debugging
-            import subprocess
-            try:
-                logger.info("Testing Ollama with curl command...")
-                curl_cmd = f"curl -s -X POST {self.api_url}/api/generate -H 'Content-Type: application/json' -d '{{\"model\":\"{self.model}\",\"prompt\":\"Hello\",\"stream\":false}}'"
-                result = subprocess.run(curl_cmd, shell=True, capture_output=True, text=True)
-                logger.info(f"Curl test result: {result.stdout[:100]}...")
-            except Exception as curl_error:
-                logger.error(f"Curl test failed: {str(curl_error)}")
             
-            # Use the most direct, proven method that works with curl
-            logger.info(f"Sending request to Ollama API at: {self.api_url}/api/generate")
+            response = await self._post_with_retry("/api/generate", payload)
             
-            try:
-                # Convert OpenAI-style messages to Ollama format
-                prompt = self._format_messages(messages)
-                logger.info(f"Formatted prompt sample: {prompt[:100]}...")
-                
-                # Use the same exact approach that works with curl
-                import subprocess
-                import json
-                import tempfile
-                
-                # Create a temporary file for the JSON payload to avoid shell escaping issues
-                with tempfile.NamedTemporaryFile(mode='w+', suffix='.json', delete=False) as temp:
-                    # Write the payload to the temp file
-                    json.dump({
-                        "model": self.model,
-                        "prompt": prompt,
-                        "stream": False
-                    }, temp)
-                    temp.flush()  # Make sure it's written to disk
-                    temp_path = temp.name  # Store the path for use after the file is closed
-                
-                logger.info("Using subprocess with curl and temporary file - proven working method")
-                
-                # Use curl with the payload from file to avoid shell escaping issues
-                curl_cmd = f"curl -s -X POST {self.api_url}/api/generate -H 'Content-Type: application/json' -d @{temp_path}"
-                logger.info(f"Running curl command with payload from file: {temp_path}")
-                
-                # Execute the curl command
-                result = subprocess.run(curl_cmd, shell=True, capture_output=True, text=True)
-                
-                # Clean up the temporary file
-                import os
-                try:
-                    os.unlink(temp_path)
-                except Exception as cleanup_error:
-                    logger.warning(f"Failed to clean up temporary file: {str(cleanup_error)}")
-                logger.info(f"Curl command completed with return code: {result.returncode}")
-                
-                # Process the response
-                if result.returncode == 0 and result.stdout:
-                    logger.info(f"Curl output received, length: {len(result.stdout)}")
-                    try:
-                        # Parse JSON response
-                        json_response = json.loads(result.stdout)
-                        response_text = json_response.get('response', '')
-                        logger.info(f"Success! Response sample: {response_text[:50]}...")
-                        return response_text
-                    except json.JSONDecodeError as je:
-                        logger.error(f"Error parsing JSON: {je}")
-                        # If can't parse JSON but have output, return it
-                        if result.stdout.strip():
-                            return f"Parsing error, raw output: {result.stdout[:200]}"
-                        else:
-                            return "Empty response from Ollama"
-                else:
-                    logger.error(f"Curl command failed: {result.stderr}")
-                    return f"Error: {result.stderr[:200]}"
-            except Exception as e:
-                logger.error(f"Subprocess execution failed: {str(e)}")
-                return f"Error connecting to Ollama: {str(e)}"
-                
-            except Exception as curl_exc:
-                logger.warning(f"Curl attempt failed: {str(curl_exc)}")
+            if response.status_code == 200:
+                response_text = response.json().get("response", "No response generated")
+                logger.info(f"Success! Response sample: {response_text[:50]}...")
+                return response_text
             
-            # Fallback to httpx if curl fails
-            try:
-                logger.info("Falling back to httpx client...")
-                async with httpx.AsyncClient(
-                    timeout=90.0,         # Long timeout
-                    verify=False,         # Disable SSL verification for local connections
-                    http2=False,          # Disable HTTP/2 which can sometimes cause issues
-                    limits=httpx.Limits(max_keepalive_connections=5, max_connections=10)
-                ) as client:
-                    response = await client.post(
-                        f"{self.api_url}/api/generate",
-                        json=payload
-                    )
-                
-                # Check for successful response from second attempt
-                if response.status_code == 200:
-                    result = response.json()
-                    logger.info("Successfully received response from Ollama (second attempt)")
-                    logger.info(f"Response sample: {result.get('response', '')[:100]}...")
-                    return result.get("response", "No response generated")
-                else:
-                    logger.error(f"Ollama API error (second attempt): Status {response.status_code}")
-                    logger.error(f"Response text: {response.text}")
-                    return f"I encountered an issue with my local knowledge system (Status: {response.status_code}). Please try again."
-                    
-            except Exception as e:
-                logger.error(f"Connection attempts failed: {str(e)}")
-                
-                # Final fallback - try simple command-line curl
-                try:
-                    logger.info("Final fallback attempt: Using simple curl command...")
-                    # Use a very simple curl command with minimal options
-                    simple_curl_cmd = f"curl -s {self.api_url}/api/tags"
-                    result = subprocess.run(simple_curl_cmd, shell=True, capture_output=True, text=True)
-                    
-                    if result.returncode == 0 and result.stdout:
-                        logger.info("Basic Ollama connectivity works, but generation failed")
-                        
-                        # Return a more informative message about the connection status
-                        return "I can connect to Ollama, but message processing failed. This could be due to high system load or model issues."
-                    else:
-                        logger.error(f"Basic Ollama connectivity failed: {result.stderr}")
-                        
-                except Exception as curl_error:
-                    logger.error(f"Final fallback error: {str(curl_error)}")
-                
-                # If all attempts fail, return a detailed error message
-                return "I'm having trouble connecting to the Ollama LLM service. Please verify Ollama is running correctly and has the 'mistral' model installed."
+            logger.error(f"Ollama API error: Status {response.status_code}")
+            logger.error(f"Response text: {response.text}")
+            return f"I encountered an issue with my local knowledge system (Status: {response.status_code}). Please try again."
                 
         except httpx.ConnectError as e:
             logger.error(f"Ollama connection error: {str(e)}")
@@ -350,27 +258,29 @@ class OllamaProvider(LLMProvider):
             return "I couldn't connect to the local AI system. Please check if Ollama is running on your machine."
         except httpx.TimeoutException as e:
             logger.error(f"Ollama request timed out: {str(e)}")
-            logger.error(f"Consider using a smaller model than {self.model}")
+            logger.error(f"Consider using a smaller model than {model}")
             return "The request to the local AI system timed out. The model might be too large for your hardware."
         except Exception as e:
             logger.error(f"Ollama error: {str(e)}", exc_info=True)
-            logger.error(f"API URL: {self.api_url}, Model: {self.model}")
+            logger.error(f"API URL: {self.api_url}, Model: {model}")
             # Don't return the error message to the user
             return "I'm having trouble accessing my knowledge base. Please try again later."
     
-    def _format_messages(self, messages: List[Dict[str, str]]) -> str:
+    def _format_messages(self, messages: List[Dict[str, str]], model: Optional[str] = None) -> str:
         """
         Convert OpenAI-style messages to Ollama prompt format.
         
         Args:
             messages: List of message dictionaries with 'role' and 'content' keys
+            model: Model the prompt is for, defaults to the configured model
             
         Returns:
             Formatted prompt string for Ollama
         """
+        model = model or self.model
         # First try to detect if this is a Llama2 based model
-        is_llama_model = "llama" in self.model.lower()
-        is_mistral_model = "mistral" in self.model.lower()
+        is_llama_model = "llama" in model.lower()
+        is_mistral_model = "mistral" in model.lower()
         
         # Extract system message if present
         system_content = ""
@@ -396,7 +306,7 @@ class OllamaProvider(LLMProvider):
             # Generic format that works with most models
             formatted_prompt = self._format_generic(system_content, user_messages, assistant_messages)
         
-        logger.debug(f"Formatted prompt for model {self.model}: {formatted_prompt[:100]}...")
+        logger.debug(f"Formatted prompt for model {model}: {formatted_prompt[:100]}...")
         return formatted_prompt
     
     def _format_llama2(self, system_content: str, user_messages: List[str], assistant_messages: List[str]) -> str:
@@ -490,7 +400,6 @@ class OllamaProvider(LLMProvider):
         Returns:
             Generated text response as a string with fallback model notification
         """
-        # Store original model
         original_model = self.model
         
         # Define fallback models in order of preference
@@ -510,14 +419,12 @@ class OllamaProvider(LLMProvider):
         
         logger.warning(f"Attempting fallback from {original_model} to smaller models")
         
-        # Try each fallback model
+        # Try each fallback model; the model is passed per request because the
+        # provider instance is shared with concurrent requests
         for fallback_model in models_to_try:
             try:
                 logger.info(f"Trying fallback model: {fallback_model}")
-                self.model = fallback_model
-                
-                # Generate response with fallback model
-                result = await self.generate_response(messages, max_tokens, temperature)
+                result = await self.generate_response(messages, max_tokens, temperature, model=fallback_model)
                 logger.info(f"Fallback to {fallback_model} succeeded")
                 
                 # Return the result with a notice that we used a fallback model
@@ -527,8 +434,6 @@ class OllamaProvider(LLMProvider):
                 logger.error(f"Fallback to {fallback_model} failed: {str(e)}")
                 continue
         
-        # If all fallbacks fail, restore original model and return error
-        self.model = original_model
         return "All model fallbacks failed. Please try again later or with a simpler request."
         
     async def stream_response(self, 
@@ -537,7 +442,8 @@ class OllamaProvider(LLMProvider):
                             temperature: Optional[float] = 0.7):
         """
         Stream response tokens one by one for real-time display.
-        Handles cancellation gracefully.
+        Handles cancellation gracefully: cancelling the consumer or closing the
+        generator closes the upstream request without emitting further text.
         
         Args:
             messages: List of message dictionaries with 'role' and 'content' keys
@@ -547,12 +453,13 @@ class OllamaProvider(LLMProvider):
         Yields:
             Text fragments as they are generated
         """
+        tokens_sent = 0
         try:
             # Apply rate limiting
             await self.apply_rate_limit()
             
             # Apply context management to prevent token overflow
-            managed_messages = await self.manage_context(messages)
+            managed_messages = await self.manage_context(messages, self.context_window - (max_tokens or 800))
             
             # Format the messages for Ollama
             prompt = self._format_messages(managed_messages)
@@ -564,55 +471,60 @@ class OllamaProvider(LLMProvider):
                 "stream": True,  # Enable streaming
                 "options": {
                     "num_predict": max_tokens or 800,
+                    "num_ctx": self.context_window,
                     "temperature": temperature
                 }
             }
             
             logger.info(f"Starting streaming response with model: {self.model}")
         
-            # Direct HTTPX approach for streaming
-            async with httpx.AsyncClient(timeout=90.0) as client:
-                async with client.stream("POST", f"{self.api_url}/api/generate", 
-                                        json=payload, timeout=None) as response:
-                    if response.status_code != 200:
-                        error_text = await response.aread()
-                        logger.error(f"Streaming error {response.status_code}: {error_text}")
-                        yield f"Error {response.status_code}: Could not generate streaming response"
-                        return
-                    
-                    buffer = ""
-                    async for chunk in response.aiter_text():
-                        try:
-                            # Ollama streaming returns JSON objects
-                            if chunk.strip():
-                                data = json.loads(chunk)
-                                if "response" in data:
-                                    token = data["response"]
-                                    buffer += token
-                                    yield token
+            # Stream over the pooled client; generation may run longer than the read timeout
+            client = self._get_client()
+            async with client.stream("POST", "/api/generate", 
+                                    json=payload, timeout=httpx.Timeout(None, connect=OLLAMA_CONNECT_TIMEOUT)) as response:
+                if response.status_code != 200:
+                    error_text = await response.aread()
+                    logger.error(f"Streaming error {response.status_code}: {error_text}")
+                    yield f"Error {response.status_code}: Could not generate streaming response"
+                    return
+                
+                buffer = ""
+                async for chunk in response.aiter_lines():
+                    try:
+                        # Ollama streaming returns JSON objects
+                        if chunk.strip():
+                            data = json.loads(chunk)
+                            if "response" in data:
+                                token = data["response"]
+                                buffer += token
+                                tokens_sent += 1
+                                yield token
+                            
+                            # Check for done flag
+                            if data.get("done", False):
+                                logger.info("Streaming response completed")
+                                break
                                 
-                                # Check for done flag
-                                if data.get("done", False):
-                                    logger.info("Streaming response completed")
-                                    break
-                                    
-                        except json.JSONDecodeError:
-                            logger.warning(f"Failed to parse streaming chunk: {chunk[:50]}...")
-                            continue
+                    except json.JSONDecodeError:
+                        logger.warning(f"Failed to parse streaming chunk: {chunk[:50]}...")
+                        continue
                         
         except asyncio.CancelledError:
+            # Leaving the stream context has already closed the upstream request
             logger.info("Streaming response was cancelled")
-            yield "\n[Response generation cancelled]"
             raise  # Re-raise to propagate cancellation
         except Exception as e:
             logger.error(f"Streaming error: {str(e)}")
+            if tokens_sent:
+                # Restarting generation would repeat text the consumer already has
+                yield "\n[Response stream interrupted]"
+                return
             # Try subprocess with curl for streaming as fallback
             try:
                 async for token in self._stream_with_curl(messages, max_tokens, temperature):
                     yield token
             except asyncio.CancelledError:
                 logger.info("Streaming fallback was cancelled")
-                yield "\n[Response generation cancelled]"
                 raise  # Re-raise to propagate cancellation
             
     async def _stream_with_curl(self, 
@@ -640,6 +552,7 @@ class OllamaProvider(LLMProvider):
                     "stream": True,
                     "options": {
                         "num_predict": max_tokens or 800,
+                        "num_ctx": self.context_window,
                         "temperature": temperature
                     }
                 }, temp)
@@ -682,14 +595,6 @@ class OllamaProvider(LLMProvider):
                 
         except asyncio.CancelledError:
             logger.info("Curl streaming was cancelled")
-            if process:
-                # Kill the subprocess on cancellation
-                process.terminate()
-                try:
-                    process.wait(timeout=1)
-                except subprocess.TimeoutExpired:
-                    process.kill()
-            yield "\n[Response generation cancelled]"
             raise  # Re-raise to propagate cancellation
                 
         except Exception as curl_err:
@@ -715,20 +620,28 @@ class OllamaProvider(LLMProvider):
             
     def count_tokens(self, text: str) -> int:
         """
-        Estimate token count for context management.
-        This is a simple approximation. Different models tokenize differently.
+        Count tokens for context management with the model's tokenizer.
+        Falls back to an estimate when no vocabulary is available for the model.
         
         Args:
             text: The text to count tokens for
             
         Returns:
-            Estimated token count
+            Token count
         """
-        # Simple estimation: ~4 chars per token for English text
-        # This is a rough estimate; actual tokenization varies by model
-        if not text:
-            return 0
-        return len(text) // 4
+        return get_token_counter(self.model).count(text)
+    
+    def count_message_tokens(self, message: Dict[str, str]) -> int:
+        """
+        Count the tokens a message occupies in the prompt, including formatting overhead.
+        
+        Args:
+            message: Message dictionary with 'role' and 'content' keys
+            
+        Returns:
+            Token count
+        """
+        return get_token_counter(self.model).count_message(message)
 
     async def manage_context(self, messages: List[Dict[str, str]], max_tokens: int = 4000) -> List[Dict[str, str]]:
         """
@@ -748,7 +661,7 @@ class OllamaProvider(LLMProvider):
             total_tokens = 0
             
             for msg in messages:
-                tokens = self.count_tokens(msg.get("content", ""))
+                tokens = self.count_message_tokens(msg)
                 token_counts.append(tokens)
                 total_tokens += tokens
                 
@@ -762,29 +675,34 @@ class OllamaProvider(LLMProvider):
             
             # Always keep system messages
             system_msgs = [msg for msg in messages if msg["role"] == "system"]
-            system_tokens = sum(self.count_tokens(msg.get("content", "")) for msg in system_msgs)
+            system_tokens = sum(self.count_message_tokens(msg) for msg in system_msgs)
             
             # Non-system messages that we can include in our budget
             other_msgs = [msg for msg in messages if msg["role"] != "system"]
             remaining_budget = max_tokens - system_tokens
             
-            # Strategy: Keep most recent messages, but always include the first user message
-            # for context. This preserves the initial query and recent conversation.
+            # Strategy: Always keep the latest message (the turn being answered), then
+            # the first user message for context, then as many recent messages as fit.
+            # This preserves the current query, the initial query and recent conversation.
+            latest_msg = other_msgs.pop() if other_msgs else None
+            if latest_msg:
+                remaining_budget -= self.count_message_tokens(latest_msg)
+            
             first_user_msg = next((msg for msg in other_msgs if msg["role"] == "user"), None)
+            first_msgs = []
             recent_msgs = []
             
             if first_user_msg:
-                first_msg_tokens = self.count_tokens(first_user_msg.get("content", ""))
+                first_msg_tokens = self.count_message_tokens(first_user_msg)
                 if first_msg_tokens <= remaining_budget:
-                    recent_msgs.append(first_user_msg)
+                    first_msgs.append(first_user_msg)
                     remaining_budget -= first_msg_tokens
                     # Remove from other_msgs to avoid duplication
-                    if first_user_msg in other_msgs:
-                        other_msgs.remove(first_user_msg)
+                    other_msgs.remove(first_user_msg)
             
             # Add most recent messages until we run out of budget
             for msg in reversed(other_msgs):
-                tokens = self.count_tokens(msg.get("content", ""))
+                tokens = self.count_message_tokens(msg)
                 if tokens <= remaining_budget:
                     recent_msgs.insert(0, msg)  # Insert at beginning to maintain order
                     remaining_budget -= tokens
@@ -806,8 +724,8 @@ class OllamaProvider(LLMProvider):
                             # Skip this message if summarization fails
             
             # Combine system messages and recent messages
-            pruned_messages = system_msgs + recent_msgs
-            new_total = sum(self.count_tokens(msg.get("content", "")) for msg in pruned_messages)
+            pruned_messages = system_msgs + first_msgs + recent_msgs + ([latest_msg] if latest_msg else [])
+            new_total = sum(self.count_message_tokens(msg) for msg in pruned_messages)
             
             logger.info(f"Pruned context to {new_total} tokens ({len(pruned_messages)} messages)")
             return pruned_messages
@@ -894,6 +812,7 @@ class OllamaProvider(LLMProvider):
                 "stream": False,
                 "options": {
                     "num_predict": max_tokens or 800,
+                    "num_ctx": self.context_window,
                     "temperature": temperature
                 }
             }
@@ -918,4 +837,25 @@ class OllamaProvider(LLMProvider):
             return f"Error connecting to Ollama service: {str(e)}"
         except Exception as e:
             logger.error(f"Error in generate_response_sync: {str(e)}")
-            return f"Error generating response: {str(e)}"
\ No newline at end of file
+            return f"Error generating response: {str(e)}"
+
+
+# Shared provider instance so the pooled HTTP client and rate limit state persist
+_ollama_provider = None
+
+def get_ollama_provider() -> OllamaProvider:
+    """
+    Get the shared Ollama provider instance.
+    
+    Returns:
+        OllamaProvider instance
+    """
+    global _ollama_provider
+    if _ollama_provider is None:
+        _ollama_provider = OllamaProvider()
+    return _ollama_provider
+
+async def close_ollama_provider():
+    """Close the shared provider's pooled HTTP client, if one was created."""
+    if _ollama_provider is not None:
+        await _ollama_provider.aclose()
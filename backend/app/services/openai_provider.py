@@ -1,12 +1,16 @@
 """
 OpenAI provider implementation for the LLM provider interface.
 """
-import openai
 import logging
 from typing import List, Dict, Any, Optional
 
 from .llm_provider import LLMProvider
+from .tokenizer import get_token_counter
 from app.core.config import OPENAI_API_KEY, OPENAI_MODEL
+from app.core.lazy_imports import lazy_module
+
+# Imported on first use; see app.core.lazy_imports
+openai = lazy_module("openai")
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -47,6 +51,18 @@ class OpenAIProvider(LLMProvider):
             logger.error(f"OpenAI error: {str(e)}")
             return "I'm having trouble connecting to my knowledge source. Please try again later."
             
+    def count_tokens(self, text: str) -> int:
+        """
+        Count tokens with the model's tokenizer.
+        
+        Args:
+            text: The text to count tokens for
+            
+        Returns:
+            Token count
+        """
+        return get_token_counter(self.model).count(text)
+    
     def generate_response_sync(self, 
                               messages: List[Dict[str, str]], 
                               max_tokens: Optional[int] = None,
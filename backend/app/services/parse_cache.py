@@ -0,0 +1,248 @@
+"""
+Persistent Parsed-Document Cache for RAG Ingestion
+
+This module provides functionality for:
+- Caching parsed document text and extracted metadata on disk
+- Keying entries by file content hash and parser version, so edits and parser upgrades miss
+- Sharing cached documents across ingestion worker processes through a single SQLite file
+- Evicting least recently used documents once the cache exceeds its size cap
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Configuration constants
+PARSE_CACHE_ENABLED = os.environ.get("CHAKRA_PARSE_CACHE", "true").lower() == "true"
+PARSE_CACHE_PATH = os.environ.get(
+    "CHAKRA_PARSE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "parse_cache.sqlite3")
+)
+DEFAULT_MAX_PARSE_CACHE_MB = int(os.environ.get("CHAKRA_PARSE_CACHE_MAX_MB", "256"))
+
+
+def hash_file(path: str) -> str:
+    """
+    Compute the SHA-256 digest of a file's contents.
+
+    Args:
+        path: Path of the file
+
+    Returns:
+        Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ParsedDocumentCache:
+    """
+    An on-disk cache of parsed documents keyed by content hash and parser version.
+
+    Entries hold the document text rendered from the parsed elements and the
+    metadata extracted from it, as JSON. Path-dependent metadata is refreshed
+    by the caller, so a file that is copied or renamed still hits.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_PARSE_CACHE_MB * 1024 * 1024):
+        """
+        Initialize the parsed-document cache.
+
+        Args:
+            path: Path of the SQLite file backing the cache
+            max_bytes: Maximum total size of stored documents before LRU eviction
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS parsed_documents (
+                key TEXT PRIMARY KEY,
+                parser_version TEXT NOT NULL,
+                document TEXT NOT NULL,
+                nbytes INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_parsed_documents_last_access ON parsed_documents(last_access)"
+        )
+        self._conn.commit()
+        self._total_bytes = self._sum_bytes_locked()
+        logger.info(f"Initialized parsed-document cache at {path} (max {max_bytes // (1024 * 1024)} MB)")
+
+    @staticmethod
+    def make_key(parser_version: str, content_hash: str) -> str:
+        """
+        Build the cache key of a parsed file.
+
+        Args:
+            parser_version: Version of the parser and of the text/metadata extraction
+            content_hash: SHA-256 digest of the file contents
+
+        Returns:
+            Hex digest identifying the (parser version, content) pair
+        """
+        return hashlib.sha256(f"{parser_version}\0{content_hash}".encode("utf-8")).hexdigest()
+
+    def get(self, parser_version: str, content_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a parsed document.
+
+        Args:
+            parser_version: Version of the parser and of the text/metadata extraction
+            content_hash: SHA-256 digest of the file contents
+
+        Returns:
+            Document dictionary with content and metadata, or None on a miss
+        """
+        key = self.make_key(parser_version, content_hash)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT document FROM parsed_documents WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            self._conn.execute(
+                "UPDATE parsed_documents SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            self._stats["hits"] += 1
+        return json.loads(row[0])
+
+    def put(self, parser_version: str, content_hash: str, document: Dict[str, Any]) -> None:
+        """
+        Store a parsed document and evict old entries if needed.
+
+        Args:
+            parser_version: Version of the parser and of the text/metadata extraction
+            content_hash: SHA-256 digest of the file contents
+            document: Document dictionary with content and metadata
+        """
+        serialized = json.dumps(document)
+        key = self.make_key(parser_version, content_hash)
+        with self._lock:
+            # A replaced row no longer counts towards the running total
+            self._total_bytes -= self._conn.execute(
+                "SELECT COALESCE(SUM(nbytes), 0) FROM parsed_documents WHERE key = ?", (key,)
+            ).fetchone()[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO parsed_documents (key, parser_version, document, nbytes, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, parser_version, serialized, len(serialized), time.time())
+            )
+            self._total_bytes += len(serialized)
+            self._stats["writes"] += 1
+            self._evict_locked()
+            self._conn.commit()
+
+    def _sum_bytes_locked(self) -> int:
+        """Scan the table for the total size of stored documents."""
+        return self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM parsed_documents").fetchone()[0]
+
+    def _evict_locked(self) -> None:
+        """Evict least recently used entries until the cache fits its size cap."""
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        # Other processes share the file, so resync with the table before evicting
+        self._total_bytes = self._sum_bytes_locked()
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        excess = self._total_bytes - self.max_bytes
+        freed = 0
+        evicted_keys = []
+        for key, nbytes in self._conn.execute("SELECT key, nbytes FROM parsed_documents ORDER BY last_access ASC"):
+            evicted_keys.append((key,))
+            freed += nbytes
+            if freed >= excess:
+                break
+
+        self._conn.executemany("DELETE FROM parsed_documents WHERE key = ?", evicted_keys)
+        self._total_bytes -= freed
+        self._stats["evictions"] += len(evicted_keys)
+        logger.info(f"Evicted {len(evicted_keys)} parsed documents ({freed} bytes) from cache")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with hit/miss counters, hit rate, entry count and size
+        """
+        with self._lock:
+            entries, total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM parsed_documents"
+            ).fetchone()
+            stats = dict(self._stats)
+
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["entries"] = entries
+        stats["bytes"] = total_bytes
+        stats["max_bytes"] = self.max_bytes
+        return stats
+
+    def clear(self) -> None:
+        """Remove all cached documents."""
+        with self._lock:
+            self._conn.execute("DELETE FROM parsed_documents")
+            self._conn.commit()
+            self._total_bytes = 0
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+_parse_cache = None
+_parse_cache_pid = None
+_parse_cache_lock = threading.Lock()
+
+
+def get_parsed_document_cache() -> Optional[ParsedDocumentCache]:
+    """
+    Get the parsed-document cache of the current process.
+
+    Ingestion worker processes each open their own connection; a connection
+    inherited from a forked parent is never reused. Threads of one process
+    share a single connection.
+
+    Returns:
+        ParsedDocumentCache instance, or None if the cache is disabled
+
+    Raises:
+        sqlite3.Error: If the cache database cannot be opened
+    """
+    global _parse_cache, _parse_cache_pid
+    if not PARSE_CACHE_ENABLED:
+        return None
+    if _parse_cache is not None and _parse_cache_pid == os.getpid():
+        return _parse_cache
+    with _parse_cache_lock:
+        if _parse_cache is None or _parse_cache_pid != os.getpid():
+            _parse_cache = ParsedDocumentCache(PARSE_CACHE_PATH)
+            _parse_cache_pid = os.getpid()
+        return _parse_cache
@@ -4,13 +4,6 @@ import base64
 from datetime import datetime
 from typing import Dict, Any
 
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib.enums import TA_CENTER, TA_RIGHT
-
 def generate_sla_pdf(template_data: Dict[str, Any], output_path: str = None) -> str:
     """
     Generate a PDF document from SLA template data.
@@ -24,6 +17,14 @@ def generate_sla_pdf(template_data: Dict[str, Any], output_path: str = None) ->
         If output_path is provided: path to saved PDF file
         Otherwise: base64-encoded PDF data string
     """
+    # reportlab is imported here so that importing the API does not load it
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib import colors
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+
     # Use a buffer if no output path is provided
     buffer = io.BytesIO() if not output_path else None
     
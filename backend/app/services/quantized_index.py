@@ -0,0 +1,361 @@
+"""
+Quantized Embedding Index for Dense Retrieval
+
+This module provides functionality for:
+- Storing unit-normalized embeddings as int8 (scalar quantized) or binary codes
+- Brute-force scanning the codes block by block to find dense candidates
+- Re-scoring the best candidates with full-precision vectors
+- Persisting the codes to disk and memory-mapping them on load
+- Measuring recall of the quantized search against the float32 baseline
+"""
+
+import os
+import json
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Configuration constants
+QUANTIZATION_MODES = ("float32", "int8", "binary")
+# "none" keeps dense search in the vector database; lightweight nodes quantize by default
+EMBEDDING_QUANTIZATION = os.environ.get(
+    "CHAKRA_EMBEDDING_QUANTIZATION",
+    "int8" if os.environ.get("CHAKRA_LIGHTWEIGHT_MODE", "false").lower() == "true" else "none"
+).lower()
+# Candidates re-scored at full precision per requested result
+RESCORE_FACTORS = {"float32": 1, "int8": 4, "binary": 10}
+# Rows converted to float per block while scanning, bounding scratch memory
+SCAN_BLOCK_ROWS = 16384
+# Rebuild the codes once this fraction of indexed rows has been deleted
+COMPACT_DELETED_RATIO = 0.25
+META_FILENAME = "quantized_meta.json"
+ARRAY_FILENAMES = ("codes", "scales")
+
+# Number of set bits in every byte value, for Hamming distances over packed codes
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint16)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale vectors to unit length so dot products are cosine similarities."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class QuantizedEmbeddingIndex:
+    """
+    A brute-force dense index over quantized embeddings.
+
+    In int8 mode every row stores one signed byte per dimension plus a float32
+    scale (max |x| / 127), a ~4x reduction over float32. In binary mode every
+    row stores one sign bit per dimension, a 32x reduction, and rows are
+    compared by Hamming distance. Scores from either mode are approximate, so
+    search() returns extra candidates for the caller to re-score with
+    rescore(). The float32 mode keeps exact vectors and is the baseline.
+
+    Deletes are tombstones; the codes are compacted once enough rows are
+    deleted. Codes of a loaded index stay memory-mapped until rows are added.
+    """
+
+    def __init__(self, mode: str = "int8", dimension: Optional[int] = None):
+        """
+        Initialize an empty index.
+
+        Args:
+            mode: One of "float32", "int8" or "binary"
+            dimension: Embedding dimension (taken from the first vectors added if omitted)
+        """
+        if mode not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization mode '{mode}', expected one of {QUANTIZATION_MODES}")
+        self.mode = mode
+        self.dimension = dimension
+        self._lock = threading.RLock()
+        self._keys: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._codes: Optional[np.ndarray] = None
+        self._scales = np.zeros(0, dtype=np.float32)
+        self._live = np.zeros(0, dtype=bool)
+
+    def __len__(self) -> int:
+        """Return the number of live rows."""
+        return len(self._rows)
+
+    def __contains__(self, key: str) -> bool:
+        """Return True if a row with this key is indexed."""
+        return key in self._rows
+
+    def _quantize(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Encode unit-normalized vectors as codes and per-row scales."""
+        if self.mode == "float32":
+            return vectors.astype(np.float32), np.ones(len(vectors), dtype=np.float32)
+        if self.mode == "binary":
+            return np.packbits(vectors > 0, axis=1), np.ones(len(vectors), dtype=np.float32)
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def add_many(self, keys: Sequence[str], vectors: np.ndarray) -> None:
+        """
+        Add rows to the index, replacing rows with the same keys.
+
+        Args:
+            keys: Row keys (e.g. chunk IDs)
+            vectors: Embeddings, one row per key
+        """
+        if not len(keys):
+            return
+        vectors = _normalize(vectors)
+        with self._lock:
+            if self.dimension is None:
+                self.dimension = vectors.shape[1]
+            for key in keys:
+                self._tombstone(key)
+
+            codes, scales = self._quantize(vectors)
+            start = len(self._keys)
+            self._codes = codes if self._codes is None or not len(self._keys) else np.concatenate([self._codes, codes])
+            self._scales = np.concatenate([self._scales, scales])
+            self._live = np.concatenate([self._live, np.ones(len(keys), dtype=bool)])
+            for offset, key in enumerate(keys):
+                self._keys.append(key)
+                self._rows[key] = start + offset
+
+    def delete(self, key: str) -> bool:
+        """
+        Delete a row from the index.
+
+        Args:
+            key: Key of the row to delete
+
+        Returns:
+            True if the row was indexed
+        """
+        with self._lock:
+            if not self._tombstone(key):
+                return False
+            deleted = len(self._keys) - len(self._rows)
+            if deleted > COMPACT_DELETED_RATIO * len(self._keys):
+                self.compact()
+            return True
+
+    def _tombstone(self, key: str) -> bool:
+        """Mark a row as deleted without compacting."""
+        row = self._rows.pop(key, None)
+        if row is None:
+            return False
+        self._keys[row] = None
+        self._live[row] = False
+        return True
+
+    def compact(self) -> None:
+        """Drop deleted rows from the codes."""
+        with self._lock:
+            keep = np.flatnonzero(self._live)
+            if self._codes is not None:
+                self._codes = np.ascontiguousarray(self._codes[keep])
+            self._scales = self._scales[keep]
+            self._live = np.ones(len(keep), dtype=bool)
+            self._keys = [self._keys[row] for row in keep]
+            self._rows = {key: row for row, key in enumerate(self._keys)}
+
+    def _approximate_scores(self, queries: np.ndarray, codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+        """Score a block of codes against unit-normalized queries, one row of scores per query."""
+        if self.mode == "binary":
+            query_bits = np.packbits(queries > 0, axis=1)
+            distances = np.stack([_POPCOUNT[np.bitwise_xor(codes, bits)].sum(axis=1) for bits in query_bits])
+            return 1.0 - 2.0 * distances / self.dimension
+        return (queries @ codes.astype(np.float32).T) * scales
+
+    def search(self, query_vectors: np.ndarray, top_k: int, rescore_factor: Optional[int] = None,
+               allowed_keys: Optional[Iterable[str]] = None) -> List[List[Tuple[str, float]]]:
+        """
+        Find the closest rows to each query by scanning the codes.
+
+        Args:
+            query_vectors: Query embeddings, one row per query
+            top_k: Number of results wanted per query
+            rescore_factor: Candidates returned per wanted result (defaults to RESCORE_FACTORS[mode])
+            allowed_keys: Only return rows with these keys (e.g. chunks matching a metadata filter)
+
+        Returns:
+            One list per query of (key, approximate score) candidates, best first
+        """
+        queries = _normalize(np.atleast_2d(query_vectors))
+        factor = rescore_factor or RESCORE_FACTORS[self.mode]
+        with self._lock:
+            num_rows = len(self._keys)
+            if not self._rows or self._codes is None:
+                return [[] for _ in queries]
+            live = self._live
+            if allowed_keys is not None:
+                live = np.zeros(num_rows, dtype=bool)
+                live[[self._rows[key] for key in allowed_keys if key in self._rows]] = True
+            num_live = int(live.sum())
+            if not num_live:
+                return [[] for _ in queries]
+            num_candidates = min(num_live, top_k * factor)
+
+            all_scores = np.empty((len(queries), num_rows), dtype=np.float32)
+            for start in range(0, num_rows, SCAN_BLOCK_ROWS):
+                end = min(start + SCAN_BLOCK_ROWS, num_rows)
+                all_scores[:, start:end] = self._approximate_scores(
+                    queries, self._codes[start:end], self._scales[start:end]
+                )
+            all_scores[:, ~live] = -np.inf
+
+            results = []
+            for scores in all_scores:
+                candidates = np.argpartition(-scores, num_candidates - 1)[:num_candidates]
+                candidates = candidates[np.argsort(-scores[candidates])]
+                results.append([(self._keys[row], float(scores[row])) for row in candidates])
+            return results
+
+    def save(self, directory: str) -> None:
+        """
+        Persist the index to a directory.
+
+        Deleted rows are compacted away first. Each file is written to a
+        temporary name and renamed into place.
+
+        Args:
+            directory: Directory to write the index files to
+        """
+        with self._lock:
+            if len(self._keys) != len(self._rows):
+                self.compact()
+            os.makedirs(directory, exist_ok=True)
+
+            codes = self._codes if self._codes is not None else np.zeros((0, 0), dtype=np.int8)
+            for name, values in {"codes": codes, "scales": self._scales}.items():
+                path = os.path.join(directory, f"{name}.npy")
+                with open(path + ".tmp", "wb") as f:
+                    np.save(f, values)
+                os.replace(path + ".tmp", path)
+
+            meta = {"mode": self.mode, "dimension": self.dimension, "keys": self._keys}
+            meta_path = os.path.join(directory, META_FILENAME)
+            with open(meta_path + ".tmp", "w") as f:
+                json.dump(meta, f)
+            os.replace(meta_path + ".tmp", meta_path)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "QuantizedEmbeddingIndex":
+        """
+        Load an index saved with save().
+
+        Args:
+            directory: Directory containing the index files
+            mmap: Whether to memory-map the codes instead of reading them
+
+        Returns:
+            The loaded index
+        """
+        with open(os.path.join(directory, META_FILENAME)) as f:
+            meta = json.load(f)
+
+        index = cls(mode=meta["mode"], dimension=meta["dimension"])
+        index._keys = meta["keys"]
+        index._rows = {key: row for row, key in enumerate(index._keys)}
+        if index._keys:
+            index._codes = np.load(os.path.join(directory, "codes.npy"), mmap_mode="r" if mmap else None)
+        index._scales = np.load(os.path.join(directory, "scales.npy"))
+        index._live = np.ones(len(index._keys), dtype=bool)
+        return index
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        """
+        Check whether a saved index exists in a directory.
+
+        Args:
+            directory: Directory to check
+
+        Returns:
+            True if all index files are present
+        """
+        names = [META_FILENAME] + [f"{name}.npy" for name in ARRAY_FILENAMES]
+        return all(os.path.exists(os.path.join(directory, name)) for name in names)
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Get index statistics.
+
+        Returns:
+            Dictionary with the mode, row counts and code size versus float32
+        """
+        with self._lock:
+            code_bytes = (self._codes.nbytes if self._codes is not None else 0) + self._scales.nbytes
+            float_bytes = len(self._keys) * (self.dimension or 0) * 4
+            return {
+                "mode": self.mode,
+                "rows": len(self._rows),
+                "deleted": len(self._keys) - len(self._rows),
+                "dimension": self.dimension,
+                "code_bytes": int(code_bytes),
+                "float32_bytes": int(float_bytes),
+                "compression": float_bytes / code_bytes if code_bytes else 0.0,
+            }
+
+
+def rescore(query_vector: np.ndarray, candidates: Sequence[str], vectors: np.ndarray,
+            top_k: int) -> List[Tuple[str, float]]:
+    """
+    Re-score dense candidates with full-precision vectors.
+
+    Args:
+        query_vector: Query embedding
+        candidates: Candidate keys from QuantizedEmbeddingIndex.search
+        vectors: Full-precision embeddings of the candidates, in the same order
+        top_k: Number of results to keep
+
+    Returns:
+        The top_k (key, cosine similarity) pairs, best first
+    """
+    if not len(candidates):
+        return []
+    similarities = _normalize(vectors) @ _normalize(query_vector)
+    order = np.argsort(-similarities)[:top_k]
+    return [(candidates[i], float(similarities[i])) for i in order]
+
+
+def measure_recall(vectors: np.ndarray, queries: np.ndarray, top_k: int, mode: str,
+                   rescore_factor: Optional[int] = None,
+                   fetch_vectors: Optional[Callable[[List[str]], np.ndarray]] = None) -> float:
+    """
+    Measure recall@top_k of quantized search with re-scoring against exact float32 search.
+
+    Args:
+        vectors: Corpus embeddings
+        queries: Query embeddings
+        top_k: Number of results compared per query
+        mode: Quantization mode to evaluate
+        rescore_factor: Candidates re-scored per result (defaults to RESCORE_FACTORS[mode])
+        fetch_vectors: Returns full-precision vectors for candidate keys (defaults to the corpus rows)
+
+    Returns:
+        Fraction of the exact top_k results that the quantized search also returned
+    """
+    vectors = _normalize(vectors)
+    keys = [str(row) for row in range(len(vectors))]
+    fetch_vectors = fetch_vectors or (lambda candidate_keys: vectors[[int(key) for key in candidate_keys]])
+
+    exact = QuantizedEmbeddingIndex("float32")
+    exact.add_many(keys, vectors)
+    quantized = QuantizedEmbeddingIndex(mode)
+    quantized.add_many(keys, vectors)
+
+    found = 0
+    queries = _normalize(np.atleast_2d(queries))
+    for query, expected, candidates in zip(queries, exact.search(queries, top_k, rescore_factor=1),
+                                           quantized.search(queries, top_k, rescore_factor)):
+        candidate_keys = [key for key, _ in candidates]
+        results = rescore(query, candidate_keys, fetch_vectors(candidate_keys), top_k)
+        found += len({key for key, _ in expected} & {key for key, _ in results})
+    return found / (len(queries) * min(top_k, len(keys))) if len(queries) else 1.0
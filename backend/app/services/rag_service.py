@@ -11,19 +11,65 @@ This module provides functionality for:
 import logging
 import os
 import json
+from datetime import datetime
 from typing import List, Dict, Any, Optional
 
 from app.services.vector_store import get_vector_store
+from app.services.vector_store_common import document_id_for_path, PERSIST_DIRECTORY, CHUNK_OVERLAP
+from app.services.context_packer import PackedContext, pack_context, estimate_tokens
 from app.services.document_processor import get_document_processor
+from app.services.parse_cache import hash_file
 from app.services.llm_provider import LLMProvider
+from app.services.retrieval_executor import get_retrieval_executor
+from app.services.response_cache import get_response_cache
+from app.services.reranker import get_reranker, RERANK_CANDIDATES
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
 # Configuration
 DEFAULT_NUM_RESULTS = 5
-MAX_CONTEXT_LENGTH = 2000
+# Retrieved context is packed into a token budget of at most MAX_CONTEXT_TOKENS
+MAX_CONTEXT_TOKENS = int(os.environ.get("CHAKRA_RAG_MAX_CONTEXT_TOKENS", "1000"))
+MIN_CONTEXT_TOKENS = 256
+DEFAULT_CONTEXT_WINDOW = 4096
+RESPONSE_TOKEN_RESERVE = 800
+PROMPT_OVERHEAD_TOKENS = 100
 DEFAULT_SLA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "sla_examples")
+DEFAULT_MANIFEST_PATH = os.path.join(PERSIST_DIRECTORY, "indexed_documents.json")
+# Hybrid retrieval fuses dense and BM25 keyword rankings with reciprocal rank fusion
+HYBRID_SEARCH_ENABLED = os.environ.get("CHAKRA_HYBRID_SEARCH", "true").lower() == "true"
+HYBRID_DENSE_WEIGHT = float(os.environ.get("CHAKRA_HYBRID_DENSE_WEIGHT", "1.0"))
+HYBRID_KEYWORD_WEIGHT = float(os.environ.get("CHAKRA_HYBRID_KEYWORD_WEIGHT", "1.0"))
+HYBRID_CANDIDATE_FACTOR = 2  # Candidates fetched from each retriever per requested result
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict[str, Any]]], weights: List[float],
+                           top_k: int, k: int = RRF_K) -> List[Dict[str, Any]]:
+    """
+    Fuse ranked result lists with weighted reciprocal rank fusion.
+    
+    Each result contributes weight / (k + rank) for every list it appears in,
+    so chunks ranked well by several retrievers rise to the top regardless of
+    how the retrievers' raw scores are scaled.
+    
+    Args:
+        result_lists: Ranked result lists whose items carry an "id" (or are keyed by content)
+        weights: Weight of each result list
+        top_k: Number of fused results to return
+        k: Rank smoothing constant
+        
+    Returns:
+        Fused results, best first, with the fused score in "rrf_score"; "score"
+        keeps the retriever's own score from the first list the result appears in
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for results, weight in zip(result_lists, weights):
+        for rank, result in enumerate(results, start=1):
+            entry = fused.setdefault(result.get("id", result["content"]), {**result, "rrf_score": 0.0})
+            entry["rrf_score"] += weight / (k + rank)
+    return sorted(fused.values(), key=lambda result: result["rrf_score"], reverse=True)[:top_k]
 
 
 class RAGService:
@@ -48,6 +94,12 @@ class RAGService:
         self.llm_provider = llm_provider
         logger.debug(f"LLM provider initialized: {type(self.llm_provider).__name__}")
         
+        # Embedding and vector search block, so async callers run them here
+        self.retrieval_executor = get_retrieval_executor()
+        
+        # Optional cross-encoder second pass over over-fetched candidates
+        self.reranker = get_reranker()
+        
         # Check if we have documents in the vector store
         count = self.vector_store.get_document_count()
         logger.info(f"Vector store contains {count} documents")
@@ -55,50 +107,210 @@ class RAGService:
         if count == 0:
             logger.warning("Vector store is empty. Consider loading documents using initialize_knowledge_base().")
     
-    def initialize_knowledge_base(self, directory: str = DEFAULT_SLA_DIR) -> int:
+    def initialize_knowledge_base(self, directory: str = DEFAULT_SLA_DIR, incremental: bool = True) -> int:
         """
         Initialize the knowledge base with SLA documents.
         
         Args:
             directory: Directory containing SLA documents
+            incremental: Sync against the index manifest instead of re-ingesting every file
             
         Returns:
             Number of documents loaded
         """
+        if incremental:
+            summary = self.sync_knowledge_base(directory)
+            return summary["added"] + summary["updated"] + summary["unchanged"]
+        
         logger.info(f"Initializing knowledge base from {directory}")
         
-        # Load documents
-        documents = self.document_processor.load_directory(directory)
+        # Documents stream from the parser pool through chunking and embedding
+        # in bounded batches, so memory does not grow with the corpus
+        loaded = 0
+        
+        def iter_documents():
+            nonlocal loaded
+            paths = self.document_processor.list_files(directory) if os.path.exists(directory) else []
+            for path, doc, error in self.document_processor.iter_load_files(paths):
+                if doc is None:
+                    logger.error(f"Error loading {path}: {error}")
+                    continue
+                # Same document and chunk IDs as sync_knowledge_base, so a later sync does not duplicate them
+                yield doc["content"], {**doc["metadata"], "id": document_id_for_path(path)}
+                loaded += 1
         
-        if not documents:
+        self.vector_store.add_document_stream(iter_documents())
+        
+        if not loaded:
             logger.warning(f"No documents found in {directory}")
             return 0
+        
+        logger.info(f"Initialized knowledge base with {loaded} documents")
+        return loaded
+    
+    def sync_knowledge_base(self, directory: str = DEFAULT_SLA_DIR,
+                            manifest_path: str = DEFAULT_MANIFEST_PATH) -> Dict[str, int]:
+        """
+        Incrementally sync the knowledge base with the documents in a directory.
+        
+        Each indexed file is tracked in the manifest by mtime, size and content
+        hash. Unchanged files are skipped without being read, changed files only
+        upsert the chunks whose content changed, and chunks belonging to files
+        that were removed from the directory are deleted.
+        
+        Args:
+            directory: Directory containing SLA documents
+            manifest_path: Path of the JSON manifest of indexed files
+            
+        Returns:
+            Counts of added, updated, unchanged, removed and failed files
+        """
+        logger.info(f"Syncing knowledge base from {directory}")
+        
+        manifest = self._load_manifest(manifest_path)
+        tracked = manifest.setdefault("files", {})
+        if tracked and self.vector_store.get_document_count() == 0:
+            logger.warning("Vector store is empty but manifest is not, re-indexing all files")
+            tracked.clear()
+        directory = os.path.abspath(directory)
+        summary = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0, "failed": 0}
+        
+        # Nothing is tracked yet: drop chunks a full ingest wrote under positional
+        # IDs, which the content-derived IDs below would otherwise duplicate
+        migrated = 0 if tracked else self.vector_store.delete_legacy_chunks()
+        
+        current_paths = [os.path.abspath(p) for p in self.document_processor.list_files(directory)]
+        changed = {}
+        for path in current_paths:
+            entry = tracked.get(path)
+            stat = os.stat(path)
+            
+            # Cheap check first: identical mtime and size means the file is untouched
+            if entry and entry.get("mtime") == stat.st_mtime and entry.get("size") == stat.st_size:
+                summary["unchanged"] += 1
+                continue
+            
+            content_hash = self._hash_file(path)
+            if entry and entry.get("sha256") == content_hash:
+                entry.update({"mtime": stat.st_mtime, "size": stat.st_size})
+                summary["unchanged"] += 1
+                continue
+            changed[path] = (stat, content_hash)
+        
+        # Changed files are parsed in parallel and indexed as each one finishes
+        for path, doc, error in self.document_processor.iter_load_files(list(changed)):
+            if doc is None:
+                logger.error(f"Error syncing {path}: {error}")
+                summary["failed"] += 1
+                continue
             
-        # Extract content and metadata
-        contents = [doc["content"] for doc in documents]
-        metadatas = [doc["metadata"] for doc in documents]
+            entry = tracked.get(path)
+            stat, content_hash = changed[path]
+            try:
+                doc_id = entry["document_id"] if entry else document_id_for_path(path)
+                chunk_ids = self.vector_store.upsert_document(
+                    doc_id,
+                    doc["content"],
+                    doc["metadata"],
+                    existing_chunk_ids=entry.get("chunk_ids") if entry else None
+                )
+            except Exception as e:
+                logger.error(f"Error syncing {path}: {str(e)}")
+                summary["failed"] += 1
+                continue
+            
+            summary["updated" if entry else "added"] += 1
+            tracked[path] = self._manifest_entry(doc_id, stat, content_hash, chunk_ids, doc["metadata"])
+        
+        # Drop chunks of files that disappeared from this directory
+        current = set(current_paths)
+        for path in [p for p in tracked if os.path.dirname(p) == directory and p not in current]:
+            self.vector_store.delete_chunks(tracked[path].get("chunk_ids", []))
+            del tracked[path]
+            summary["removed"] += 1
         
-        # Add documents to the vector store
-        doc_dicts = [{"content": content} for content in contents]
-        self.vector_store.add_documents(doc_dicts, metadatas)
+        self._save_manifest(manifest_path, manifest)
         
-        logger.info(f"Initialized knowledge base with {len(documents)} documents")
-        return len(documents)
+        if summary["added"] or summary["updated"] or summary["removed"] or migrated:
+            self.vector_store.save_indexes()
+            self._invalidate_response_cache("knowledge base synced")
+        
+        logger.info(f"Knowledge base sync complete: {summary}")
+        return summary
+    
+    @staticmethod
+    def _invalidate_response_cache(reason: str) -> None:
+        """Drop cached answers that may have been grounded on outdated documents."""
+        response_cache = get_response_cache()
+        if response_cache is not None:
+            response_cache.invalidate(reason)
+    
+    @staticmethod
+    def _hash_file(path: str) -> str:
+        """Compute the SHA-256 digest of a file's contents."""
+        return hash_file(path)
+    
+    @staticmethod
+    def _load_manifest(manifest_path: str) -> Dict[str, Any]:
+        """Load the index manifest, returning an empty one if missing or invalid."""
+        if not os.path.exists(manifest_path):
+            return {}
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            return manifest if isinstance(manifest, dict) else {}
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable index manifest {manifest_path}: {str(e)}")
+            return {}
+    
+    @staticmethod
+    def _manifest_entry(doc_id: str, stat: os.stat_result, content_hash: str, chunk_ids: List[str],
+                        metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the manifest entry tracking an indexed file."""
+        return {
+            "document_id": doc_id,
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "sha256": content_hash,
+            "chunk_ids": chunk_ids,
+            "metadata": metadata
+        }
+    
+    @staticmethod
+    def _save_manifest(manifest_path: str, manifest: Dict[str, Any]) -> None:
+        """Update the manifest totals and atomically write it."""
+        tracked = manifest.get("files", {})
+        manifest["document_count"] = len(tracked)
+        manifest["chunk_count"] = sum(len(entry.get("chunk_ids", [])) for entry in tracked.values())
+        manifest["indexed_at"] = datetime.now().isoformat()
+        manifest["documents"] = [entry.get("metadata", {}) for entry in tracked.values()]
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        tmp_path = f"{manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, manifest_path)
     
     def get_relevant_context(self, query: str, top_k: int = DEFAULT_NUM_RESULTS, 
                             filter_criteria: Optional[Dict[str, Any]] = None, 
-                            include_sources: bool = False) -> Any:
+                            include_sources: bool = False,
+                            token_budget: Optional[int] = None) -> Any:
         """
         Get relevant context from the knowledge base for a query.
         
+        In hybrid mode, dense and BM25 keyword results are fused with
+        reciprocal rank fusion, so exact regulatory terms are found without
+        raising top_k. With reranking enabled, RERANK_CANDIDATES candidates
+        are retrieved and the cross-encoder keeps the best top_k.
+        
         Args:
             query: User query
             top_k: Number of results to retrieve
             filter_criteria: Optional metadata filter
             include_sources: Whether to include source information in the result
+            token_budget: Maximum tokens of packed context
             
         Returns:
-            Either a string of concatenated context or an object with context and sources
+            Either a string of packed context or a PackedContext with text, sources and dropped chunks
         """
         logger.info(f"Getting relevant context for query: '{query[:50]}...' (top_k={top_k})")
         if filter_criteria:
@@ -106,11 +318,161 @@ class RAGService:
         
         # Search the vector store
         logger.debug(f"Searching vector store with query: '{query[:50]}...'")
-        results = self.vector_store.search(query, top_k, filter_criteria)
+        fetch_k = self._fetch_count(top_k)
+        if HYBRID_SEARCH_ENABLED:
+            candidates = max(fetch_k, top_k * HYBRID_CANDIDATE_FACTOR)
+            results = reciprocal_rank_fusion(
+                [self.vector_store.search(query, candidates, filter_criteria),
+                 self.vector_store.keyword_search(query, candidates, filter_criteria)],
+                [HYBRID_DENSE_WEIGHT, HYBRID_KEYWORD_WEIGHT],
+                fetch_k
+            )
+        else:
+            results = self.vector_store.search(query, fetch_k, filter_criteria)
+        
+        if self.reranker:
+            results = self.reranker.rerank(query, results, top_k)
+        
+        return self._build_context(query, results, include_sources, token_budget)
+    
+    def _fetch_count(self, top_k: int) -> int:
+        """Return how many candidates to retrieve so the reranker has enough to choose from."""
+        return max(top_k, RERANK_CANDIDATES) if self.reranker else top_k
+    
+    def get_relevant_contexts(self, queries: List[str], top_k: int = DEFAULT_NUM_RESULTS,
+                              filter_criteria: Optional[Dict[str, Any]] = None,
+                              include_sources: bool = False,
+                              token_budget: Optional[int] = None) -> List[Any]:
+        """
+        Get relevant context from the knowledge base for several queries at once.
+        
+        Uses a single batched vector search (and keyword search, in hybrid mode)
+        instead of one search per query.
+        
+        Args:
+            queries: List of user queries
+            top_k: Number of results to retrieve per query
+            filter_criteria: Optional metadata filter applied to every query
+            include_sources: Whether to include source information in each result
+            token_budget: Maximum tokens of packed context per query
+            
+        Returns:
+            List with one context (string or PackedContext) per query
+        """
+        logger.info(f"Getting relevant context for {len(queries)} queries (top_k={top_k})")
+        if not queries:
+            return []
+        
+        fetch_k = self._fetch_count(top_k)
+        if HYBRID_SEARCH_ENABLED:
+            candidates = max(fetch_k, top_k * HYBRID_CANDIDATE_FACTOR)
+            dense_per_query = self.vector_store.search_many(queries, candidates, filter_criteria)
+            keyword_per_query = self.vector_store.keyword_search_many(queries, candidates, filter_criteria)
+            results_per_query = [
+                reciprocal_rank_fusion([dense, keyword], [HYBRID_DENSE_WEIGHT, HYBRID_KEYWORD_WEIGHT], fetch_k)
+                for dense, keyword in zip(dense_per_query, keyword_per_query)
+            ]
+        else:
+            results_per_query = self.vector_store.search_many(queries, fetch_k, filter_criteria)
+        
+        if self.reranker:
+            results_per_query = [
+                self.reranker.rerank(query, results, top_k)
+                for query, results in zip(queries, results_per_query)
+            ]
+        return [
+            self._build_context(query, results, include_sources, token_budget)
+            for query, results in zip(queries, results_per_query)
+        ]
+    
+    async def aget_relevant_context(self, query: str, top_k: int = DEFAULT_NUM_RESULTS,
+                                    filter_criteria: Optional[Dict[str, Any]] = None,
+                                    include_sources: bool = False,
+                                    token_budget: Optional[int] = None) -> Any:
+        """
+        Async version of get_relevant_context that keeps the event loop free.
+        
+        The blocking embedding and vector search run on the bounded retrieval
+        executor, so a slow retrieval does not stall unrelated requests.
         
+        Args:
+            query: User query
+            top_k: Number of results to retrieve
+            filter_criteria: Optional metadata filter
+            include_sources: Whether to include source information in the result
+            token_budget: Maximum tokens of packed context
+            
+        Returns:
+            Either a string of packed context or a PackedContext
+        """
+        return await self.retrieval_executor.run(
+            self.get_relevant_context, query, top_k, filter_criteria, include_sources, token_budget
+        )
+    
+    async def aget_relevant_contexts(self, queries: List[str], top_k: int = DEFAULT_NUM_RESULTS,
+                                     filter_criteria: Optional[Dict[str, Any]] = None,
+                                     include_sources: bool = False,
+                                     token_budget: Optional[int] = None) -> List[Any]:
+        """
+        Async version of get_relevant_contexts that keeps the event loop free.
+        
+        Args:
+            queries: List of user queries
+            top_k: Number of results to retrieve per query
+            filter_criteria: Optional metadata filter applied to every query
+            include_sources: Whether to include source information in each result
+            token_budget: Maximum tokens of packed context per query
+            
+        Returns:
+            List with one context per query
+        """
+        return await self.retrieval_executor.run(
+            self.get_relevant_contexts, queries, top_k, filter_criteria, include_sources, token_budget
+        )
+    
+    async def aembed_query(self, query: str) -> List[float]:
+        """
+        Embed a query with the knowledge base embedding model on the retrieval executor.
+        
+        Args:
+            query: Query text
+            
+        Returns:
+            Query embedding vector
+        """
+        embeddings = await self.retrieval_executor.run(self.vector_store._embed_queries, [query])
+        return embeddings[0]
+    
+    def get_retrieval_stats(self) -> Dict[str, Any]:
+        """
+        Get queue depth and wait time statistics for async retrievals.
+        
+        Returns:
+            Dictionary of retrieval executor statistics
+        """
+        return self.retrieval_executor.stats()
+    
+    def _build_context(self, query: str, results: List[Dict[str, Any]], include_sources: bool,
+                       token_budget: Optional[int] = None) -> Any:
+        """
+        Pack search results into a context string for the LLM.
+        
+        Whole chunks are packed in rank order into the token budget; chunks
+        that are duplicated, overlap-only or do not fit are dropped and
+        reported on the returned PackedContext rather than cut mid-sentence.
+        
+        Args:
+            query: User query the results were retrieved for
+            results: Search results from the vector store
+            include_sources: Whether to include source information in the result
+            token_budget: Maximum tokens of context (defaults to MAX_CONTEXT_TOKENS)
+            
+        Returns:
+            Either a string of packed context or a PackedContext with text, sources and dropped chunks
+        """
         if not results:
             logger.warning(f"No relevant context found for query: '{query[:50]}...'")
-            return "" if not include_sources else type('ContextWithSources', (), {'text': "", 'sources': []})()
+            return "" if not include_sources else PackedContext()
             
         logger.info(f"Found {len(results)} relevant document(s) for query")
         for i, result in enumerate(results):
@@ -119,43 +481,47 @@ class RAGService:
                 source = result["metadata"].get("source", "UNKNOWN")
             logger.debug(f"Result {i+1}: from '{source}' ({len(result['content'])} chars)")  
         
-        # Format the results into a context string
-        logger.debug("Formatting search results into context string")
-        context_parts = []
-        sources = results.copy()  # Store original results for source citation
-        
-        for i, result in enumerate(results):
-            # Format source information
-            source_info = "UNKNOWN SOURCE"
-            if "metadata" in result and result["metadata"]:
-                source = result["metadata"].get("source", "").split(os.path.sep)[-1]
-                source_info = source if source else "UNKNOWN SOURCE"
-                logger.debug(f"Result {i+1} metadata: {json.dumps(result['metadata'])}")
-            
-            # Format the context part
-            context_part = f"[Source {i+1}: {source_info}]\n{result['content']}\n"
-            context_parts.append(context_part)
-            logger.debug(f"Added context part from source '{source_info}' ({len(result['content'])} chars)")
-        
-        # Join all context parts
-        full_context = "\n".join(context_parts)
-        logger.info(f"Created context with {len(context_parts)} sources ({len(full_context)} total chars)")
-        
-        # Truncate if too long
-        if len(full_context) > MAX_CONTEXT_LENGTH:
-            logger.warning(f"Context too long ({len(full_context)} chars), truncating to {MAX_CONTEXT_LENGTH}")
-            full_context = full_context[:MAX_CONTEXT_LENGTH] + "..."
+        packed = pack_context(
+            results,
+            token_budget if token_budget is not None else MAX_CONTEXT_TOKENS,
+            CHUNK_OVERLAP,
+            self._count_tokens
+        )
+        logger.info(f"Created context with {len(packed.sources)} sources (~{packed.tokens} tokens)")
         
         # If include_sources is True, return an object with both text and sources
         if include_sources:
-            context_obj = type('ContextWithSources', (), {
-                'text': full_context,
-                'sources': sources
-            })()
-            return context_obj
+            return packed
         
         # Otherwise just return the text
-        return full_context
+        return packed.text
+    
+    def _count_tokens(self, text: str) -> int:
+        """Count tokens with the LLM provider's tokenizer when it has one."""
+        count_tokens = getattr(self.llm_provider, "count_tokens", None)
+        return count_tokens(text) if count_tokens else estimate_tokens(text)
+    
+    def context_token_budget(self, messages: List[Dict[str, str]],
+                             max_response_tokens: int = RESPONSE_TOKEN_RESERVE) -> int:
+        """
+        Work out how many tokens of retrieved context fit next to a conversation.
+        
+        The budget is what remains of the model's context window after the
+        conversation, the response and prompt formatting, capped at
+        MAX_CONTEXT_TOKENS so prompts stay short, and floored at
+        MIN_CONTEXT_TOKENS (older turns are pruned by the provider instead).
+        
+        Args:
+            messages: Conversation the context will be added to
+            max_response_tokens: Tokens reserved for the response
+            
+        Returns:
+            Token budget for retrieved context
+        """
+        context_window = getattr(self.llm_provider, "context_window", DEFAULT_CONTEXT_WINDOW)
+        conversation_tokens = sum(self._count_tokens(msg.get("content", "")) for msg in messages)
+        available = context_window - conversation_tokens - max_response_tokens - PROMPT_OVERHEAD_TOKENS
+        return max(MIN_CONTEXT_TOKENS, min(MAX_CONTEXT_TOKENS, available))
     
     async def generate_response_with_rag(self, messages: List[Dict[str, str]], query: str) -> str:
         """
@@ -173,12 +539,36 @@ class RAGService:
         
         # Get relevant context
         logger.info("Retrieving relevant context from knowledge base")
-        context = self.get_relevant_context(query)
+        context = await self.aget_relevant_context(query, token_budget=self.context_token_budget(messages))
         
         if not context:
             logger.warning("No context retrieved, falling back to standard generation")
             return await self.llm_provider.generate_response(messages)
         
+        augmented_messages = self.augment_messages(messages, context)
+        
+        # Generate response with the augmented messages
+        logger.info(f"Calling LLM provider with RAG-augmented messages ({len(augmented_messages)} messages)")
+        response = await self.llm_provider.generate_response(augmented_messages)
+        logger.info(f"Received RAG-enhanced response ({len(response)} chars)")
+        
+        return response
+    
+    def augment_messages(self, messages: List[Dict[str, str]], context: str) -> List[Dict[str, str]]:
+        """
+        Add retrieved context to the system message of a conversation.
+        
+        Args:
+            messages: List of message dictionaries
+            context: Retrieved context text
+            
+        Returns:
+            New list of messages with the context in the system message
+            (the original messages if there is no context)
+        """
+        if not context:
+            return messages
+        
         # Create augmented prompt
         logger.info(f"Retrieved context: {len(context)} chars, creating augmented prompt")
         system_message = next((m for m in messages if m["role"] == "system"), None)
@@ -209,20 +599,21 @@ class RAGService:
             augmented_messages = [augmented_system] + messages
             logger.debug(f"Added new system message with context ({len(augmented_system['content'])} chars)")
         
-        # Generate response with the augmented messages
-        logger.info(f"Calling LLM provider with RAG-augmented messages ({len(augmented_messages)} messages)")
-        response = await self.llm_provider.generate_response(augmented_messages)
-        logger.info(f"Received RAG-enhanced response ({len(response)} chars)")
-        
-        return response
+        return augmented_messages
     
-    def add_document_to_knowledge_base(self, content: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+    def add_document_to_knowledge_base(self, content: str, metadata: Optional[Dict[str, Any]] = None,
+                                       manifest_path: str = DEFAULT_MANIFEST_PATH) -> str:
         """
         Add a new document to the knowledge base.
         
+        The document is saved to the document directory, indexed under the
+        same document ID that sync_knowledge_base derives from its path, and
+        recorded in the manifest, so a later sync treats it as unchanged.
+        
         Args:
             content: Document content
             metadata: Optional metadata
+            manifest_path: Path of the JSON manifest of indexed files
             
         Returns:
             Document ID
@@ -234,16 +625,25 @@ class RAGService:
         logger.debug(f"Document metadata: {json.dumps(metadata)}")
         
         # Save the document
-        file_path = self.document_processor.save_document(content, metadata)
+        file_path = os.path.abspath(self.document_processor.save_document(content, metadata))
         logger.debug(f"Document saved to: {file_path}")
         
         # Add to vector store
-        doc_dict = {"content": content}
+        doc_id = document_id_for_path(file_path)
         logger.debug(f"Adding document to vector store")
-        doc_ids = self.vector_store.add_documents([doc_dict], [metadata])
+        chunk_ids = self.vector_store.upsert_document(doc_id, content, metadata)
+        self.vector_store.save_indexes()
         
-        logger.info(f"Successfully added document to knowledge base with ID: {doc_ids[0]}")
-        return doc_ids[0]
+        manifest = self._load_manifest(manifest_path)
+        manifest.setdefault("files", {})[file_path] = self._manifest_entry(
+            doc_id, os.stat(file_path), self._hash_file(file_path), chunk_ids, metadata
+        )
+        self._save_manifest(manifest_path, manifest)
+        
+        self._invalidate_response_cache("document added")
+        
+        logger.info(f"Successfully added document to knowledge base with ID: {doc_id}")
+        return doc_id
 
 # Singleton instance
 _rag_service = None
@@ -275,18 +675,15 @@ def get_healthcare_document_count() -> int:
         Count of healthcare documents (0 if none or if query fails)
     """
     try:
+        from .metadata_filters import HEALTHCARE_INDUSTRY_VALUES, metadata_filter
         from .vector_store import get_vector_store
         vector_store = get_vector_store()
         
-        # Use a simple search to find healthcare documents
-        healthcare_results = vector_store.search(
-            query="healthcare HIPAA patient data", 
-            top_k=20, 
-            filter_criteria={"metadata.industry": "healthcare"}
-        )
+        # Count documents whose chunks are tagged with a healthcare industry
+        count = vector_store.count_documents(metadata_filter({"industry": HEALTHCARE_INDUSTRY_VALUES}))
         
-        logger.info(f"Found {len(healthcare_results)} healthcare documents in knowledge base")
-        return len(healthcare_results)
+        logger.info(f"Found {count} healthcare documents in knowledge base")
+        return count
     except Exception as e:
         logger.error(f"Error checking healthcare documents: {e}")
         return 0
\ No newline at end of file
@@ -11,7 +11,7 @@ from app.services.prompts import get_template_recommendation_prompt
 from app.services.llm_provider import LLMProvider
 from app.core.config import LLM_PROVIDER
 from app.services.openai_provider import OpenAIProvider
-from app.services.ollama_provider import OllamaProvider
+from app.services.ollama_provider import get_ollama_provider
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -21,7 +21,7 @@ def get_llm_provider() -> LLMProvider:
     if LLM_PROVIDER.lower() == "openai":
         return OpenAIProvider()
     else:
-        return OllamaProvider()
+        return get_ollama_provider()
 
 async def get_template_recommendations(
     db: Session,
@@ -0,0 +1,240 @@
+"""
+Cross-Encoder Reranking for Retrieved Chunks
+
+This module provides functionality for:
+- Rescoring over-fetched retrieval candidates with a small local cross-encoder
+- Batched CPU inference with a hard per-request latency budget
+- Falling back to the retrieval order when the budget would be exceeded
+- Caching scores for repeated (query, chunk) pairs
+"""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from app.core.lazy_imports import lazy_module
+
+# Imported on first use; see app.core.lazy_imports
+sentence_transformers = lazy_module("sentence_transformers")
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Configuration constants
+RERANK_ENABLED = os.environ.get("CHAKRA_RERANK", "false").lower() == "true"
+RERANK_MODEL_NAME = os.environ.get("CHAKRA_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.environ.get("CHAKRA_RERANK_CANDIDATES", "50"))
+RERANK_BATCH_SIZE = int(os.environ.get("CHAKRA_RERANK_BATCH_SIZE", "16"))
+RERANK_LATENCY_BUDGET_MS = float(os.environ.get("CHAKRA_RERANK_BUDGET_MS", "200"))
+RERANK_SCORE_CACHE_SIZE = int(os.environ.get("CHAKRA_RERANK_CACHE_SIZE", "10000"))
+RERANK_MAX_LENGTH = 512
+
+
+class CrossEncoderReranker:
+    """
+    Reranks retrieval candidates with a cross-encoder under a latency budget.
+
+    Candidates are scored in batches. Before each batch, including the first,
+    the reranker checks whether the batch still fits the budget at the
+    per-pair speed last measured (at load time or by an earlier batch); if
+    not it gives up and returns the candidates in retrieval order. Scores of
+    completed batches are cached, so a retried query gets further. Until the
+    model is loaded (normally by the startup warm-up), requests keep the
+    retrieval order and the model loads on a background thread.
+    """
+
+    def __init__(self, model_name: str = RERANK_MODEL_NAME, batch_size: int = RERANK_BATCH_SIZE,
+                 latency_budget_ms: float = RERANK_LATENCY_BUDGET_MS, cache_size: int = RERANK_SCORE_CACHE_SIZE):
+        """
+        Initialize the reranker. The model is loaded on first use.
+
+        Args:
+            model_name: Name or local path of the cross-encoder model
+            batch_size: Number of (query, chunk) pairs scored per forward pass
+            latency_budget_ms: Default per-request scoring budget in milliseconds
+            cache_size: Maximum number of cached (query, chunk) scores
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.latency_budget_ms = latency_budget_ms
+        self.cache_size = cache_size
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._load_thread: Optional[threading.Thread] = None
+        # Seconds per (query, chunk) pair of the last scored batch, used to predict the next one
+        self._pair_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+        self._scores: "OrderedDict[bytes, float]" = OrderedDict()
+        self._stats = {
+            "requests": 0,
+            "reranked": 0,
+            "fallbacks": 0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "total_ms": 0.0,
+        }
+
+    def load(self) -> None:
+        """Load the cross-encoder model (CPU) if it is not loaded yet and measure its speed."""
+        if self._model is not None:
+            return
+        with self._model_lock:
+            if self._model is None:
+                start = time.perf_counter()
+                model = sentence_transformers.CrossEncoder(self.model_name, max_length=RERANK_MAX_LENGTH, device="cpu")
+                logger.info(f"Loaded reranker model {self.model_name} in {time.perf_counter() - start:.2f}s")
+                
+                # The first call initializes the runtime; time a second, full batch
+                pairs = [("warm up", "warm up")] * self.batch_size
+                model.predict(pairs[:1], show_progress_bar=False)
+                batch_start = time.perf_counter()
+                model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+                self._pair_seconds = (time.perf_counter() - batch_start) / len(pairs)
+                self._model = model
+    
+    def load_in_background(self) -> None:
+        """Start loading the model on a background thread unless it is loaded or already loading."""
+        with self._lock:
+            if self._model is not None or self._load_thread is not None:
+                return
+            self._load_thread = threading.Thread(target=self._background_load, name="reranker-load", daemon=True)
+            self._load_thread.start()
+    
+    def _background_load(self) -> None:
+        """Load the model, logging instead of raising so a later request can retry."""
+        try:
+            self.load()
+        except Exception as e:
+            logger.error(f"Error loading reranker model {self.model_name}: {e}")
+        finally:
+            with self._lock:
+                self._load_thread = None
+
+    @staticmethod
+    def _pair_key(query: str, result: Dict[str, Any]) -> bytes:
+        """Build the cache key of a (query, chunk) pair."""
+        chunk_key = result.get("id") or result["content"]
+        return hashlib.blake2b(f"{query}\0{chunk_key}".encode("utf-8"), digest_size=16).digest()
+
+    def rerank(self, query: str, results: List[Dict[str, Any]], top_n: int,
+               latency_budget_ms: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Rerank retrieval candidates and keep the best top_n.
+
+        Args:
+            query: User query
+            results: Candidates in retrieval order
+            top_n: Number of results to keep
+            latency_budget_ms: Scoring budget in milliseconds (defaults to the reranker's budget)
+
+        Returns:
+            The top_n candidates ordered by cross-encoder score, with "score" set
+            to that score and the original score kept as "retrieval_score"; or the
+            first top_n candidates in retrieval order if the budget ran out or
+            the model is not loaded yet
+        """
+        if len(results) <= 1:
+            return results[:top_n]
+
+        if self._model is None:
+            # Loading takes seconds, far beyond any request budget
+            self.load_in_background()
+            with self._lock:
+                self._stats["requests"] += 1
+                self._stats["fallbacks"] += 1
+            logger.info("Reranker model is still loading, keeping retrieval order")
+            return results[:top_n]
+
+        budget = (latency_budget_ms if latency_budget_ms is not None else self.latency_budget_ms) / 1000
+        start = time.perf_counter()
+
+        keys = [self._pair_key(query, result) for result in results]
+        scores: List[Optional[float]] = []
+        with self._lock:
+            for key in keys:
+                score = self._scores.get(key)
+                if score is not None:
+                    self._scores.move_to_end(key)
+                scores.append(score)
+        missing = [i for i, score in enumerate(scores) if score is None]
+        hits = len(results) - len(missing)
+
+        completed = True
+        for offset in range(0, len(missing), self.batch_size):
+            batch = missing[offset:offset + self.batch_size]
+            estimate = len(batch) * self._pair_seconds if self._pair_seconds is not None else 0.0
+            if time.perf_counter() - start + estimate > budget:
+                completed = False
+                break
+            batch_start = time.perf_counter()
+            batch_scores = self._model.predict(
+                [(query, results[i]["content"]) for i in batch], batch_size=self.batch_size,
+                show_progress_bar=False
+            )
+            self._pair_seconds = (time.perf_counter() - batch_start) / len(batch)
+            with self._lock:
+                for i, score in zip(batch, batch_scores):
+                    scores[i] = float(score)
+                    self._scores[keys[i]] = float(score)
+                while len(self._scores) > self.cache_size:
+                    self._scores.popitem(last=False)
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["cache_hits"] += hits
+            self._stats["cache_misses"] += len(missing)
+            self._stats["total_ms"] += elapsed_ms
+            self._stats["reranked" if completed else "fallbacks"] += 1
+
+        if not completed:
+            logger.warning(f"Rerank budget of {budget * 1000:.0f}ms exceeded after {elapsed_ms:.0f}ms, "
+                           f"keeping retrieval order")
+            return results[:top_n]
+
+        reranked = [
+            {**result, "retrieval_score": result.get("score"), "score": score}
+            for result, score in zip(results, scores)
+        ]
+        reranked.sort(key=lambda result: result["score"], reverse=True)
+        logger.debug(f"Reranked {len(results)} candidates in {elapsed_ms:.0f}ms ({hits} cached)")
+        return reranked[:top_n]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get reranker statistics.
+
+        Returns:
+            Dictionary with request, fallback and cache counters and the average latency
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cached_scores"] = len(self._scores)
+        lookups = stats["cache_hits"] + stats["cache_misses"]
+        stats["cache_hit_rate"] = stats["cache_hits"] / lookups if lookups else 0.0
+        stats["avg_ms"] = stats.pop("total_ms") / stats["requests"] if stats["requests"] else 0.0
+        stats["model"] = self.model_name
+        stats["latency_budget_ms"] = self.latency_budget_ms
+        return stats
+
+
+_reranker = None
+
+
+def get_reranker() -> Optional[CrossEncoderReranker]:
+    """
+    Get the shared reranker singleton.
+
+    Returns:
+        CrossEncoderReranker instance, or None if reranking is disabled
+    """
+    global _reranker
+    if not RERANK_ENABLED:
+        return None
+    if _reranker is None:
+        _reranker = CrossEncoderReranker()
+    return _reranker
@@ -0,0 +1,277 @@
+"""
+Semantic Response Cache for Consultation Answers
+
+This module provides functionality for:
+- Caching generated answers keyed on the normalized prompt, template stage,
+  retrieved chunk IDs and model name
+- Falling back to an embedding-similarity lookup when there is no exact match
+- Expiring entries after a TTL and evicting the least recently used entries
+- Invalidating everything when the knowledge base changes
+- Reporting hit-rate metrics so cache effectiveness can be monitored
+"""
+
+import os
+import re
+import copy
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Configuration constants
+RESPONSE_CACHE_ENABLED = os.environ.get("CHAKRA_RESPONSE_CACHE", "true").lower() == "true"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("CHAKRA_RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+RESPONSE_CACHE_TTL = float(os.environ.get("CHAKRA_RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_SIMILARITY = float(os.environ.get("CHAKRA_RESPONSE_CACHE_SIMILARITY", "0.95"))
+
+
+class ResponseCache:
+    """
+    An in-memory LRU cache of generated responses with a semantic fallback.
+
+    Entries are grouped by scope (model, template stage, retrieved chunks and
+    system prompts). An exact lookup matches the normalized prompt within a
+    scope; a semantic lookup compares the prompt embedding against the other
+    entries of the same scope, so a rephrased question only reuses an answer
+    that was generated from the same retrieved context.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl_seconds: float = RESPONSE_CACHE_TTL,
+                 similarity_threshold: float = RESPONSE_CACHE_SIMILARITY):
+        """
+        Initialize the response cache.
+
+        Args:
+            max_entries: Maximum number of cached responses before LRU eviction
+            ttl_seconds: Seconds after which a cached response expires
+            similarity_threshold: Minimum cosine similarity for a semantic hit
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._scopes: Dict[str, set] = {}
+        self._stats = {
+            "exact_hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+        logger.info(f"Initialized response cache (max {max_entries} entries, TTL {ttl_seconds}s, "
+                    f"similarity threshold {similarity_threshold})")
+
+    @staticmethod
+    def normalize_prompt(prompt: str) -> str:
+        """
+        Normalize a prompt so trivially different phrasings share a key.
+
+        Args:
+            prompt: Raw user prompt
+
+        Returns:
+            Lower-cased prompt with collapsed whitespace and no trailing punctuation
+        """
+        normalized = re.sub(r"\s+", " ", prompt.lower()).strip()
+        return normalized.rstrip("?!. ")
+
+    @staticmethod
+    def make_scope(model_name: str, template_stage: Optional[str] = None,
+                   chunk_ids: Sequence[str] = (), system_prompts: Sequence[str] = (),
+                   history: Sequence[Dict[str, Any]] = ()) -> str:
+        """
+        Build the scope key that a cached response is only valid within.
+
+        Args:
+            model_name: Name of the model that generated the response
+            template_stage: Template and stage identifier, if any
+            chunk_ids: IDs of the knowledge base chunks the response was grounded on
+            system_prompts: System prompts sent with the request
+            history: Conversation messages before the prompt, so a follow-up
+                such as "continue" only reuses answers given after the same turns
+
+        Returns:
+            Hex digest identifying the scope
+        """
+        digest = hashlib.sha256()
+        turns = [f"{msg.get('role', '')}:{msg.get('content', '')}" for msg in history]
+        for part in [model_name, template_stage or ""] + sorted(chunk_ids) + list(system_prompts):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        # Separate the conversation from the parts above so they cannot run together
+        digest.update(b"\1")
+        for part in turns:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    @staticmethod
+    def _make_key(prompt: str, scope: str) -> str:
+        """Build the exact-match key for a normalized prompt within a scope."""
+        return hashlib.sha256(f"{scope}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, prompt: str, scope: str, embedding: Optional[Sequence[float]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response.
+
+        Args:
+            prompt: User prompt
+            scope: Scope key from make_scope
+            embedding: Optional prompt embedding enabling the similarity fallback
+
+        Returns:
+            A copy of the cached response, or None on a miss
+        """
+        normalized = self.normalize_prompt(prompt)
+        key = self._make_key(normalized, scope)
+
+        with self._lock:
+            entry = self._live_entry_locked(key)
+            if entry is not None:
+                self._stats["exact_hits"] += 1
+                return copy.deepcopy(entry["response"])
+
+            if embedding is not None:
+                match = self._most_similar_locked(scope, self._unit(embedding))
+                if match is not None:
+                    self._stats["semantic_hits"] += 1
+                    logger.info(f"Semantic response cache hit for prompt: '{normalized[:50]}'")
+                    return copy.deepcopy(match["response"])
+
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, prompt: str, scope: str, response: Dict[str, Any],
+            embedding: Optional[Sequence[float]] = None) -> None:
+        """
+        Store a response and evict old entries if needed.
+
+        Args:
+            prompt: User prompt
+            scope: Scope key from make_scope
+            response: Response to cache
+            embedding: Optional prompt embedding used for similarity lookups
+        """
+        normalized = self.normalize_prompt(prompt)
+        key = self._make_key(normalized, scope)
+        entry = {
+            "scope": scope,
+            "response": copy.deepcopy(response),
+            "embedding": self._unit(embedding) if embedding is not None else None,
+            "created_at": time.time(),
+        }
+
+        with self._lock:
+            self._remove_locked(key)
+            self._entries[key] = entry
+            self._scopes.setdefault(scope, set()).add(key)
+            self._stats["writes"] += 1
+            while len(self._entries) > self.max_entries:
+                oldest_key = next(iter(self._entries))
+                self._remove_locked(oldest_key)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, reason: str = "") -> None:
+        """
+        Drop every cached response, e.g. because the knowledge base changed.
+
+        Args:
+            reason: Reason logged with the invalidation
+        """
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+            self._scopes.clear()
+            self._stats["invalidations"] += 1
+        logger.info(f"Invalidated response cache ({dropped} entries){': ' + reason if reason else ''}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with hit/miss counters, hit rates and the entry count
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+
+        hits = stats["exact_hits"] + stats["semantic_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        stats["semantic_hit_rate"] = stats["semantic_hits"] / lookups if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        return stats
+
+    def _live_entry_locked(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return an unexpired entry and mark it as recently used."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry["created_at"] > self.ttl_seconds:
+            self._remove_locked(key)
+            self._stats["expirations"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _most_similar_locked(self, scope: str, embedding: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Return the most similar live entry of a scope above the similarity threshold."""
+        candidates = [key for key in self._scopes.get(scope, ())
+                      if self._entries[key]["embedding"] is not None]
+        candidates = [key for key in candidates if self._live_entry_locked(key) is not None]
+        if not candidates:
+            return None
+
+        matrix = np.stack([self._entries[key]["embedding"] for key in candidates])
+        similarities = matrix @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        return self._entries[candidates[best]]
+
+    def _remove_locked(self, key: str) -> None:
+        """Remove an entry and its scope membership."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._scopes.get(entry["scope"])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._scopes[entry["scope"]]
+
+    @staticmethod
+    def _unit(embedding: Sequence[float]) -> np.ndarray:
+        """Convert an embedding to a unit-length float32 vector."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+_response_cache = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Get the shared response cache singleton.
+
+    Returns:
+        ResponseCache instance, or None if response caching is disabled
+    """
+    global _response_cache
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
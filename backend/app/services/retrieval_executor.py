@@ -0,0 +1,155 @@
+"""
+Bounded Executor for Blocking Retrieval Work
+
+This module provides functionality for:
+- Running blocking embedding and vector search calls off the event loop
+- Bounding the number of worker threads and queued retrievals
+- Reporting queue depth and wait time so retrieval backlogs are visible
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Configuration constants
+RETRIEVAL_MAX_WORKERS = int(os.environ.get("CHAKRA_RETRIEVAL_WORKERS", "2"))
+RETRIEVAL_MAX_QUEUE = int(os.environ.get("CHAKRA_RETRIEVAL_MAX_QUEUE", "64"))
+
+
+class BoundedExecutor:
+    """
+    A thread pool with a bounded backlog and wait-time accounting.
+
+    Callers await run(); at most max_workers calls execute at once and at most
+    max_queue calls are admitted in total. Further callers wait asynchronously
+    for admission, so the event loop itself is never blocked.
+    """
+
+    def __init__(self, max_workers: int = RETRIEVAL_MAX_WORKERS, max_queue: int = RETRIEVAL_MAX_QUEUE,
+                 name: str = "retrieval"):
+        """
+        Initialize the executor.
+
+        Args:
+            max_workers: Number of worker threads
+            max_queue: Maximum number of admitted (queued or running) calls
+            name: Name used for worker threads and log messages
+        """
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max(max_queue, max_workers)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._admission: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_run = 0.0
+        logger.info(f"Initialized {name} executor with {max_workers} workers (max queue {self.max_queue})")
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run a blocking callable on the executor and await its result.
+
+        Args:
+            func: Blocking callable to run
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            The callable's return value
+        """
+        if self._admission is None:
+            self._admission = asyncio.Semaphore(self.max_queue)
+
+        submitted = time.perf_counter()
+        # Whichever of the worker or a cancelled caller claims the call first
+        # takes it off the queue, so cancellations never leak queue depth
+        state = {"claimed": False}
+        with self._lock:
+            self._queued += 1
+
+        def timed_call():
+            started = time.perf_counter()
+            with self._lock:
+                if not state["claimed"]:
+                    state["claimed"] = True
+                    self._queued -= 1
+                self._running += 1
+                wait = started - submitted
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._total_run += time.perf_counter() - started
+
+        try:
+            async with self._admission:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(self._pool, timed_call)
+        except BaseException:
+            with self._lock:
+                self._failed += 1
+                if not state["claimed"]:
+                    state["claimed"] = True
+                    self._queued -= 1
+            raise
+
+        with self._lock:
+            self._completed += 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get executor statistics.
+
+        Returns:
+            Dictionary with queue depth, running count and wait times in milliseconds
+        """
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "avg_wait_ms": (self._total_wait / finished * 1000) if finished else 0.0,
+                "max_wait_ms": self._max_wait * 1000,
+                "avg_run_ms": (self._total_run / finished * 1000) if finished else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        """Shut down the worker threads."""
+        self._pool.shutdown(wait=False)
+
+
+_retrieval_executor = None
+
+
+def get_retrieval_executor() -> BoundedExecutor:
+    """
+    Get the shared retrieval executor singleton.
+
+    Returns:
+        BoundedExecutor instance
+    """
+    global _retrieval_executor
+    if _retrieval_executor is None:
+        _retrieval_executor = BoundedExecutor()
+    return _retrieval_executor
@@ -18,7 +18,7 @@ from app.models.database_templates import (
 from app.services.llm_provider import LLMProvider
 from app.core.config import LLM_PROVIDER
 from app.services.openai_provider import OpenAIProvider
-from app.services.ollama_provider import OllamaProvider
+from app.services.ollama_provider import get_ollama_provider
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -28,7 +28,7 @@ def get_llm_provider() -> LLMProvider:
     if LLM_PROVIDER.lower() == "openai":
         return OpenAIProvider()
     else:
-        return OllamaProvider()
+        return get_ollama_provider()
 
 def analyze_conversation_structure(messages: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
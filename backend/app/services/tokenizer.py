@@ -0,0 +1,229 @@
+"""
+Model-Specific Token Counting
+
+This module provides functionality for:
+- Loading per-model tokenizer vocabularies from local files
+- Falling back to a character-based estimate when no vocabulary is available
+- Caching token counts per message hash so repeated context management is cheap
+- Counting tokens per message, including chat formatting overhead
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Configuration constants
+TOKENIZER_DIRECTORY = os.environ.get(
+    "CHAKRA_TOKENIZER_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "tokenizers")
+)
+TOKEN_COUNT_CACHE_SIZE = int(os.environ.get("CHAKRA_TOKEN_COUNT_CACHE_SIZE", "4096"))
+# Role markers and separators added around each message by the prompt format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class EstimateTokenizer:
+    """Approximate tokenizer used when no vocabulary is available (~4 characters per token)."""
+
+    name = "estimate"
+
+    def count(self, text: str) -> int:
+        """Estimate the token count of text."""
+        return len(text) // 4 if text else 0
+
+
+class VocabularyTokenizer:
+    """Tokenizer backed by a Hugging Face tokenizer.json vocabulary file."""
+
+    def __init__(self, path: str):
+        """
+        Load a tokenizer vocabulary.
+
+        Args:
+            path: Path to a tokenizer.json file
+
+        Raises:
+            ImportError: If the tokenizers package is not installed
+        """
+        from tokenizers import Tokenizer
+
+        self.name = path
+        self._tokenizer = Tokenizer.from_file(path)
+
+    def count(self, text: str) -> int:
+        """Count the tokens of text without special tokens."""
+        if not text:
+            return 0
+        return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+def _vocabulary_candidates(model_name: str) -> List[str]:
+    """
+    List the vocabulary files that may hold a model's tokenizer.
+
+    "mistral:7b-instruct" is looked up as data/tokenizers/mistral-7b-instruct
+    first and then as data/tokenizers/mistral, either as a directory containing
+    tokenizer.json or as a <name>.json file.
+    """
+    base_name = model_name.split("/")[-1]
+    names = [base_name.replace(":", "-"), base_name.split(":")[0]]
+    candidates = []
+    for name in dict.fromkeys(names):
+        candidates.append(os.path.join(TOKENIZER_DIRECTORY, name, "tokenizer.json"))
+        candidates.append(os.path.join(TOKENIZER_DIRECTORY, f"{name}.json"))
+    return candidates
+
+
+def load_tokenizer(model_name: str) -> Any:
+    """
+    Load the tokenizer for a model from the local vocabulary directory.
+
+    Args:
+        model_name: Model name, optionally with an Ollama tag (e.g. "mistral:latest")
+
+    Returns:
+        A tokenizer with a count(text) method; the estimate tokenizer if no
+        vocabulary file is found or it cannot be loaded
+    """
+    for path in _vocabulary_candidates(model_name or ""):
+        if not os.path.exists(path):
+            continue
+        try:
+            tokenizer = VocabularyTokenizer(path)
+            logger.info(f"Loaded tokenizer for model '{model_name}' from {path}")
+            return tokenizer
+        except ImportError:
+            logger.warning("tokenizers package not installed, falling back to estimated token counts")
+            break
+        except Exception as e:
+            logger.error(f"Error loading tokenizer from {path}: {e}")
+
+    logger.warning(f"No tokenizer vocabulary found for model '{model_name}' in {TOKENIZER_DIRECTORY}, "
+                   f"using estimated token counts")
+    return EstimateTokenizer()
+
+
+class TokenCounter:
+    """
+    Counts tokens with a model's tokenizer and caches counts per text hash.
+
+    Context management recounts the same conversation on every turn, so
+    counts are kept in an LRU cache keyed by a hash of the text.
+    """
+
+    def __init__(self, tokenizer: Any, cache_size: int = TOKEN_COUNT_CACHE_SIZE):
+        """
+        Initialize the token counter.
+
+        Args:
+            tokenizer: Tokenizer with a count(text) method
+            cache_size: Maximum number of cached counts
+        """
+        self.tokenizer = tokenizer
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[bytes, int]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def count(self, text: str) -> int:
+        """
+        Count the tokens of text.
+
+        Args:
+            text: Text to count
+
+        Returns:
+            Token count
+        """
+        if not text:
+            return 0
+        key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self._hits += 1
+                return cached
+            self._misses += 1
+
+        tokens = self.tokenizer.count(text)
+
+        with self._lock:
+            self._cache[key] = tokens
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return tokens
+
+    def count_message(self, message: Dict[str, Any]) -> int:
+        """
+        Count the tokens a message occupies in the prompt.
+
+        Args:
+            message: Message dictionary with 'role' and 'content' keys
+
+        Returns:
+            Token count of the content plus per-message formatting overhead
+        """
+        return self.count(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
+
+    def count_messages(self, messages: List[Dict[str, Any]]) -> List[int]:
+        """
+        Count the tokens of each message.
+
+        Args:
+            messages: List of message dictionaries
+
+        Returns:
+            Token count per message, in order
+        """
+        return [self.count_message(message) for message in messages]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get token counter statistics.
+
+        Returns:
+            Dictionary with the tokenizer name, cache size and hit rate
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "tokenizer": self.tokenizer.name,
+                "cached_counts": len(self._cache),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
+
+
+_token_counters: Dict[str, TokenCounter] = {}
+_token_counters_lock = threading.Lock()
+
+
+def get_token_counter(model_name: Optional[str]) -> TokenCounter:
+    """
+    Get the shared token counter for a model.
+
+    Args:
+        model_name: Model name, optionally with a tag
+
+    Returns:
+        TokenCounter instance for the model
+    """
+    key = model_name or ""
+    counter = _token_counters.get(key)
+    if counter is None:
+        with _token_counters_lock:
+            counter = _token_counters.get(key)
+            if counter is None:
+                counter = TokenCounter(load_tokenizer(key))
+                _token_counters[key] = counter
+    return counter
@@ -8,28 +8,49 @@ This module provides functionality for:
 """
 
 import os
+import time
 import logging
 import tempfile
-from typing import List, Dict, Any, Optional
-import chromadb
-from chromadb.config import Settings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from sentence_transformers import SentenceTransformer
+import threading
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
+import numpy as np
+
+from app.core.lazy_imports import lazy_module
+from app.services.vector_store_common import (
+    EMBEDDING_MODEL_NAME, PERSIST_DIRECTORY, CHUNK_OVERLAP, INGEST_BATCH_SIZE, LEGACY_CHUNK_ID,
+    document_id_for_path, content_chunk_ids
+)
+from app.services.embedding_cache import (
+    EmbeddingCache, QueryEmbeddingCache, CACHE_ENABLED, DEFAULT_CACHE_FILENAME, QUERY_EMBEDDING_CACHE_SIZE
+)
+from app.services.embedding_batcher import EmbeddingBatcher, EMBED_MICRO_BATCHING
+from app.services.bm25_index import BM25Index, META_FILENAME as KEYWORD_INDEX_META_FILENAME
+from app.services.quantized_index import QuantizedEmbeddingIndex, EMBEDDING_QUANTIZATION
+from app.services.chunker import StructuredChunker, CHUNK_TOKENS
+from app.services.tokenizer import get_token_counter
+from app.services.metadata_filters import flatten_metadata
+
+# Imported on first use; see app.core.lazy_imports
+chromadb = lazy_module("chromadb")
+chromadb_config = lazy_module("chromadb.config")
+sentence_transformers = lazy_module("sentence_transformers")
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
 # Configuration constants
 COLLECTION_NAME = "sla_knowledge_base"
-# Use a smaller and more memory-efficient model when running in lightweight mode
-DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
-LIGHTWEIGHT_EMBEDDING_MODEL = "paraphrase-MiniLM-L3-v2"  # Smaller, faster model
-# Check for lightweight mode flag
-LIGHTWEIGHT_MODE = os.environ.get("CHAKRA_LIGHTWEIGHT_MODE", "false").lower() == "true"
-EMBEDDING_MODEL_NAME = LIGHTWEIGHT_EMBEDDING_MODEL if LIGHTWEIGHT_MODE else DEFAULT_EMBEDDING_MODEL
-PERSIST_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "vector_db")
-CHUNK_SIZE = 500 if LIGHTWEIGHT_MODE else 1000  # Smaller chunks in lightweight mode
-CHUNK_OVERLAP = 100 if LIGHTWEIGHT_MODE else 200
+KEYWORD_INDEX_DIRECTORY = os.path.join(PERSIST_DIRECTORY, "bm25_index")
+DENSE_INDEX_DIRECTORY = os.path.join(PERSIST_DIRECTORY, "quantized_index")
+# Keyword hits fetched per requested result when a metadata filter may discard some
+KEYWORD_FILTER_OVERFETCH = 4
+# Chunks read from the collection per request when an index is rebuilt from stored data
+INDEX_REBUILD_PAGE_SIZE = int(os.environ.get("CHAKRA_INDEX_REBUILD_PAGE_SIZE", "1000"))
+# Seconds between checks for keyword index changes persisted by other workers
+KEYWORD_INDEX_REFRESH_INTERVAL = float(os.environ.get("CHAKRA_KEYWORD_INDEX_REFRESH_INTERVAL", "30"))
+# Unix socket of a shared vector store server (app.services.vector_store_server);
+# when set, workers use the server instead of loading the model and database themselves
+VECTOR_STORE_SOCKET = os.environ.get("CHAKRA_VECTOR_STORE_SOCKET", "")
 
 class VectorStore:
     """
@@ -58,14 +79,29 @@ class VectorStore:
         # Create ChromaDB client
         self.client = chromadb.PersistentClient(
             path=PERSIST_DIRECTORY,
-            settings=Settings(
+            settings=chromadb_config.Settings(
                 allow_reset=True,
                 anonymized_telemetry=False
             )
         )
         
         # Initialize the embedding model
-        self.embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+        self.embedding_model = sentence_transformers.SentenceTransformer(EMBEDDING_MODEL_NAME)
+        
+        # Concurrent small embedding requests (e.g. chat queries) share model batches
+        self.embedding_batcher = None
+        if EMBED_MICRO_BATCHING:
+            self.embedding_batcher = EmbeddingBatcher(self.embedding_model.encode)
+        
+        # Persistent embedding cache so unchanged chunks are never re-encoded
+        self.embedding_cache = None
+        if CACHE_ENABLED:
+            self.embedding_cache = EmbeddingCache(os.path.join(PERSIST_DIRECTORY, DEFAULT_CACHE_FILENAME))
+        
+        # In-memory LRU so repeated queries skip the model entirely
+        self.query_embedding_cache = None
+        if QUERY_EMBEDDING_CACHE_SIZE > 0:
+            self.query_embedding_cache = QueryEmbeddingCache(QUERY_EMBEDDING_CACHE_SIZE)
         
         # Get or create the collection
         try:
@@ -78,12 +114,21 @@ class VectorStore:
             )
             logger.info(f"Created new collection: {COLLECTION_NAME}")
         
-        # Create text splitter for document chunking
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=CHUNK_SIZE,
-            chunk_overlap=CHUNK_OVERLAP,
-            separators=["\n\n", "\n", ". ", " ", ""]
-        )
+        # BM25 keyword index over the same chunks, loaded on first use
+        self._keyword_index = None
+        self._keyword_index_dirty = False
+        self._keyword_index_version = None
+        # Staleness checks are rate-limited; a stale index is reloaded on a background thread
+        self._keyword_index_checked_at = time.monotonic()
+        self._keyword_index_lock = threading.Lock()
+        self._keyword_refresh_thread = None
+        
+        # Quantized dense index serving vector search when quantization is enabled
+        self._dense_index = None
+        self._dense_index_dirty = False
+        
+        # Section-aware chunker sized in tokens of the embedding model
+        self.chunker = StructuredChunker(CHUNK_TOKENS, get_token_counter(EMBEDDING_MODEL_NAME).count)
         
         self._initialized = True
         
@@ -91,6 +136,9 @@ class VectorStore:
         """
         Generate embeddings for a list of texts.
         
+        Texts already present in the embedding cache are served from disk;
+        only new or changed texts are passed to the embedding model.
+        
         Args:
             texts: List of text strings to embed
             
@@ -99,14 +147,40 @@ class VectorStore:
         """
         logger.debug(f"Generating embeddings for {len(texts)} texts")
         
+        if self.embedding_cache is None:
+            return self._encode(texts)
+        
+        embeddings = self.embedding_cache.get_many(EMBEDDING_MODEL_NAME, texts)
+        
+        # Encode each distinct missing text once
+        missing_texts = list(dict.fromkeys(text for text, emb in zip(texts, embeddings) if emb is None))
+        if missing_texts:
+            logger.debug(f"Embedding cache miss for {len(missing_texts)}/{len(texts)} texts")
+            new_embeddings = self._encode(missing_texts)
+            self.embedding_cache.put_many(EMBEDDING_MODEL_NAME, missing_texts, new_embeddings)
+            
+            encoded = dict(zip(missing_texts, new_embeddings))
+            embeddings = [emb if emb is not None else encoded[text] for text, emb in zip(texts, embeddings)]
+        
+        return embeddings
+    
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        """
+        Run the embedding model over a list of texts.
+        
+        Args:
+            texts: List of text strings to embed
+            
+        Returns:
+            List of embedding vectors
+        """
         # Process texts in smaller batches to reduce memory pressure
         max_batch_size = 8
         embeddings_list = []
         
         # If we have a small number of texts, process them directly
         if len(texts) <= max_batch_size:
-            embeddings = self.embedding_model.encode(texts)
-            return embeddings.tolist()
+            return self._encode_small(texts)
         
         # Otherwise, process in smaller batches
         for i in range(0, len(texts), max_batch_size):
@@ -114,7 +188,7 @@ class VectorStore:
             logger.debug(f"Processing batch {i//max_batch_size + 1}/{(len(texts) + max_batch_size - 1)//max_batch_size}")
             
             batch_embeddings = self.embedding_model.encode(batch)
-            embeddings_list.extend(batch_embeddings.tolist())
+            embeddings_list.extend(np.asarray(batch_embeddings, dtype=np.float32).tolist())
             
             # Force garbage collection after each batch to free memory
             import gc
@@ -140,43 +214,408 @@ class VectorStore:
         if metadata is None:
             metadata = [{} for _ in documents]
             
-        # Extract content from documents
-        texts = [doc.get("content", "") for doc in documents]
-        
-        # Split documents into chunks
-        chunks = []
-        chunk_metadatas = []
         doc_ids = []
         
-        for i, (text, meta) in enumerate(zip(texts, metadata)):
-            doc_chunks = self.text_splitter.split_text(text)
+        def iter_documents():
+            for i, (doc, meta) in enumerate(zip(documents, metadata)):
+                doc_id = meta.get("id", f"doc_{i}")
+                doc_ids.append(doc_id)
+                yield doc.get("content", ""), {**meta, "id": doc_id}
+        
+        self.add_document_stream(iter_documents())
+        return doc_ids
+    
+    def iter_chunks(self, documents: Iterable[Tuple[str, Dict[str, Any]]]) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """
+        Lazily split documents into chunks.
+        
+        Only one document's chunks are held at a time.
+        
+        Args:
+            documents: Iterable of (content, metadata) pairs; metadata "id" is the document ID
             
-            # Create metadata for each chunk that links back to the source document
+        Yields:
+            (chunk ID, chunk text, chunk metadata) tuples
+        """
+        for i, (content, meta) in enumerate(documents):
             doc_id = meta.get("id", f"doc_{i}")
-            chunk_meta = [
-                {
+            document_chunks = self.chunker.chunk(content)
+            for chunk_id, chunk in zip(content_chunk_ids(doc_id, document_chunks), document_chunks):
+                yield chunk_id, chunk["text"], {
                     **meta,
-                    "chunk_id": f"{doc_id}_chunk_{j}",
-                    "document_id": doc_id
+                    "chunk_id": chunk_id,
+                    "document_id": doc_id,
+                    "section_path": chunk["section_path"]
                 }
-                for j in range(len(doc_chunks))
-            ]
+    
+    def add_document_stream(self, documents: Iterable[Tuple[str, Dict[str, Any]]],
+                            batch_size: int = INGEST_BATCH_SIZE) -> int:
+        """
+        Chunk, embed and store a stream of documents in bounded batches.
+        
+        Args:
+            documents: Iterable (typically a generator) of (content, metadata) pairs
+            batch_size: Number of chunks embedded and written per batch
             
-            chunks.extend(doc_chunks)
-            chunk_metadatas.extend(chunk_meta)
-            doc_ids.append(doc_id)
+        Returns:
+            Number of chunks stored
+        """
+        return self.add_chunk_stream(self.iter_chunks(documents), batch_size)
+    
+    def add_chunk_stream(self, chunks: Iterable[Tuple[str, str, Dict[str, Any]]],
+                         batch_size: int = INGEST_BATCH_SIZE) -> int:
+        """
+        Embed and upsert a stream of chunks one batch at a time.
+        
+        At most batch_size chunks and their embeddings are held in memory, so
+        ingestion memory stays constant however large the corpus is. The keyword
+        and dense indexes are updated per batch and saved once at the end.
+        Chunk metadata is flattened (see metadata_filters.flatten_metadata), so
+        every ingest path stores the schema that metadata filters match.
+        
+        Args:
+            chunks: Iterable of (chunk ID, chunk text, chunk metadata) tuples
+            batch_size: Number of chunks embedded and written per batch
             
-        # Add chunks to the collection
-        ids = [meta["chunk_id"] for meta in chunk_metadatas]
+        Returns:
+            Number of chunks stored
+        """
+        # Load the indexes before writing so they are not rebuilt from the new state
+        self._load_indexes()
+        stored = 0
+        batch: List[Tuple[str, str, Dict[str, Any]]] = []
         
-        logger.info(f"Adding {len(chunks)} chunks to vector store")
-        self.collection.add(
-            documents=chunks,
-            metadatas=chunk_metadatas,
-            ids=ids
-        )
+        def flush():
+            ids = [chunk_id for chunk_id, _, _ in batch]
+            texts = [text for _, text, _ in batch]
+            embeddings = self._get_embeddings(texts)
+            self.collection.upsert(
+                documents=texts,
+                embeddings=embeddings,
+                metadatas=[flatten_metadata(meta) for _, _, meta in batch],
+                ids=ids
+            )
+            self._index_keywords(ids, texts)
+            self._index_vectors(ids, embeddings)
         
-        return doc_ids
+        try:
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) >= batch_size:
+                    flush()
+                    stored += len(batch)
+                    batch = []
+                    logger.info(f"Stored {stored} chunks")
+            if batch:
+                flush()
+                stored += len(batch)
+        finally:
+            self.save_indexes()
+        
+        logger.info(f"Added {stored} chunks to vector store")
+        return stored
+    
+    def upsert_document(self, doc_id: str, content: str, metadata: Optional[Dict[str, Any]] = None,
+                        existing_chunk_ids: Optional[List[str]] = None) -> List[str]:
+        """
+        Idempotently index a single document under a stable document ID.
+        
+        Chunk IDs are derived from the chunk content, so re-indexing an
+        unchanged document is a no-op and an edited document only writes the
+        chunks that actually changed. Chunks listed in existing_chunk_ids that
+        are no longer produced are deleted.
+        
+        Args:
+            doc_id: Stable identifier of the source document
+            content: Document content
+            metadata: Optional metadata for the document; list values are flattened before storing
+            existing_chunk_ids: Chunk IDs previously indexed for this document
+            
+        Returns:
+            List of chunk IDs now indexed for the document
+        """
+        metadata = flatten_metadata(metadata or {})
+        existing = set(existing_chunk_ids or [])
+        self._load_indexes()
+        
+        document_chunks = self.chunker.chunk(content)
+        chunks = [chunk["text"] for chunk in document_chunks]
+        ids = content_chunk_ids(doc_id, document_chunks)
+        
+        stale_ids = [chunk_id for chunk_id in existing if chunk_id not in set(ids)]
+        if stale_ids:
+            logger.info(f"Deleting {len(stale_ids)} stale chunks of {doc_id}")
+            self.collection.delete(ids=stale_ids)
+            self._unindex_keywords(stale_ids)
+            self._unindex_vectors(stale_ids)
+        
+        new_positions = [j for j, chunk_id in enumerate(ids) if chunk_id not in existing]
+        if new_positions:
+            new_chunks = [chunks[j] for j in new_positions]
+            new_ids = [ids[j] for j in new_positions]
+            logger.info(f"Upserting {len(new_chunks)} changed chunks of {doc_id}")
+            new_embeddings = self._get_embeddings(new_chunks)
+            self.collection.upsert(
+                documents=new_chunks,
+                embeddings=new_embeddings,
+                metadatas=[
+                    {
+                        **metadata,
+                        "chunk_id": ids[j],
+                        "document_id": doc_id,
+                        "section_path": document_chunks[j]["section_path"]
+                    }
+                    for j in new_positions
+                ],
+                ids=new_ids
+            )
+            self._index_keywords(new_ids, new_chunks)
+            self._index_vectors(new_ids, new_embeddings)
+        
+        return ids
+    
+    def delete_chunks(self, chunk_ids: List[str]) -> None:
+        """
+        Delete chunks from the collection by ID.
+        
+        Args:
+            chunk_ids: IDs of the chunks to delete
+        """
+        if not chunk_ids:
+            return
+        logger.info(f"Deleting {len(chunk_ids)} chunks from vector store")
+        self._load_indexes()
+        self.collection.delete(ids=chunk_ids)
+        self._unindex_keywords(chunk_ids)
+        self._unindex_vectors(chunk_ids)
+    
+    def delete_legacy_chunks(self, page_size: int = INDEX_REBUILD_PAGE_SIZE) -> int:
+        """
+        Delete chunks stored under positional IDs (see LEGACY_CHUNK_ID).
+        
+        Such chunks were written by full ingests before chunk IDs were derived
+        from content; re-indexing their files would otherwise duplicate them.
+        
+        Args:
+            page_size: Number of chunk IDs read from the collection per request
+            
+        Returns:
+            Number of chunks deleted
+        """
+        legacy_ids = []
+        offset = 0
+        while True:
+            page = self.collection.get(include=[], limit=page_size, offset=offset)["ids"]
+            legacy_ids.extend(chunk_id for chunk_id in page if LEGACY_CHUNK_ID.match(chunk_id))
+            if len(page) < page_size:
+                break
+            offset += page_size
+        
+        for start in range(0, len(legacy_ids), page_size):
+            self.delete_chunks(legacy_ids[start:start + page_size])
+        if legacy_ids:
+            logger.info(f"Deleted {len(legacy_ids)} chunks with positional IDs")
+        return len(legacy_ids)
+    
+    @staticmethod
+    def _saved_keyword_index_version() -> Optional[int]:
+        """Return the modification time of the persisted keyword index, or None if there is none."""
+        try:
+            return os.stat(os.path.join(KEYWORD_INDEX_DIRECTORY, KEYWORD_INDEX_META_FILENAME)).st_mtime_ns
+        except OSError:
+            return None
+    
+    def _iter_collection_pages(self, include: List[str]) -> Iterator[Dict[str, Any]]:
+        """Read the whole collection INDEX_REBUILD_PAGE_SIZE chunks at a time."""
+        offset = 0
+        while True:
+            page = self.collection.get(include=include, limit=INDEX_REBUILD_PAGE_SIZE, offset=offset)
+            yield page
+            if len(page["ids"]) < INDEX_REBUILD_PAGE_SIZE:
+                break
+            offset += INDEX_REBUILD_PAGE_SIZE
+    
+    def _load_keyword_index(self) -> Tuple[BM25Index, Optional[int]]:
+        """
+        Load the persisted keyword index, or rebuild and persist it if it does not match the collection.
+        
+        Returns:
+            The index and the version of the persisted index it corresponds to
+        """
+        if BM25Index.exists(KEYWORD_INDEX_DIRECTORY):
+            version = self._saved_keyword_index_version()
+            index = BM25Index.load(KEYWORD_INDEX_DIRECTORY)
+            num_chunks = 0
+            matches = True
+            for page in self._iter_collection_pages([]):
+                num_chunks += len(page["ids"])
+                matches = matches and all(chunk_id in index for chunk_id in page["ids"])
+            if matches and num_chunks == len(index):
+                return index, version
+            logger.warning("Keyword index does not match the collection, rebuilding")
+        
+        # Rebuild one page at a time so the texts of the whole corpus are never held at once
+        index = BM25Index()
+        for page in self._iter_collection_pages(["documents"]):
+            index.add_many(list(zip(page["ids"], page["documents"])))
+        index.save(KEYWORD_INDEX_DIRECTORY)
+        logger.info(f"Built keyword index over {len(index)} chunks")
+        return index, self._saved_keyword_index_version()
+    
+    def _get_keyword_index(self) -> BM25Index:
+        """
+        Get the BM25 keyword index, loading or rebuilding it on first use.
+        
+        The persisted index is only trusted if it covers exactly the chunks
+        in the collection; otherwise (e.g. after a bulk load that bypassed
+        this class) it is rebuilt from the stored chunk texts.
+        
+        Returns:
+            BM25Index over all chunks in the collection
+        """
+        if self._keyword_index is None:
+            self._keyword_index, self._keyword_index_version = self._load_keyword_index()
+            self._keyword_index_dirty = False
+            self._keyword_index_checked_at = time.monotonic()
+        return self._keyword_index
+    
+    def _get_current_keyword_index(self) -> BM25Index:
+        """
+        Get the keyword index for a search, refreshing it if the collection changed.
+        
+        Other API workers ingest into the same collection and persist their
+        own copy of the index. At most every KEYWORD_INDEX_REFRESH_INTERVAL
+        seconds, a loaded index without unsaved changes is checked against
+        the persisted index version and the collection size; if it is stale,
+        it is reloaded on a background thread and searches keep using the
+        current index until the reload finishes.
+        
+        Returns:
+            BM25Index over all chunks in the collection
+        """
+        index = self._get_keyword_index()
+        now = time.monotonic()
+        if self._keyword_index_dirty or now - self._keyword_index_checked_at < KEYWORD_INDEX_REFRESH_INTERVAL:
+            return index
+        
+        with self._keyword_index_lock:
+            if self._keyword_refresh_thread is not None or now - self._keyword_index_checked_at < KEYWORD_INDEX_REFRESH_INTERVAL:
+                return index
+            self._keyword_index_checked_at = now
+            if (self._saved_keyword_index_version() == self._keyword_index_version
+                    and len(index) == self.collection.count()):
+                return index
+            logger.info("Collection changed since the keyword index was loaded, reloading in the background")
+            self._keyword_refresh_thread = threading.Thread(
+                target=self._refresh_keyword_index, args=(index, self._keyword_index_version),
+                name="keyword-index-refresh", daemon=True
+            )
+            self._keyword_refresh_thread.start()
+        return index
+    
+    def _refresh_keyword_index(self, stale: BM25Index, stale_version: Optional[int]) -> None:
+        """Reload the keyword index and swap it in, unless this worker changed or saved it meanwhile."""
+        try:
+            index, version = self._load_keyword_index()
+            with self._keyword_index_lock:
+                if (self._keyword_index is stale and self._keyword_index_version == stale_version
+                        and not self._keyword_index_dirty):
+                    self._keyword_index = index
+                    self._keyword_index_version = version
+        except Exception as e:
+            logger.error(f"Error reloading keyword index: {e}")
+        finally:
+            self._keyword_refresh_thread = None
+    
+    def _index_keywords(self, chunk_ids: List[str], chunks: List[str]) -> None:
+        """Add chunks to the keyword index; call save_keyword_index to persist."""
+        # Marked dirty first so a background refresh does not swap the index out from under the change
+        with self._keyword_index_lock:
+            index = self._get_keyword_index()
+            self._keyword_index_dirty = True
+        index.add_many(list(zip(chunk_ids, chunks)))
+    
+    def _unindex_keywords(self, chunk_ids: List[str]) -> None:
+        """Remove chunks from the keyword index; call save_keyword_index to persist."""
+        with self._keyword_index_lock:
+            index = self._get_keyword_index()
+            self._keyword_index_dirty = True
+        for chunk_id in chunk_ids:
+            index.delete(chunk_id)
+    
+    def save_keyword_index(self) -> None:
+        """Persist the keyword index if it changed since it was last saved."""
+        if self._keyword_index is not None and self._keyword_index_dirty:
+            self._keyword_index.save(KEYWORD_INDEX_DIRECTORY)
+            self._keyword_index_dirty = False
+            self._keyword_index_version = self._saved_keyword_index_version()
+    
+    def _load_indexes(self) -> None:
+        """Load the keyword index and, when quantization is enabled, the dense index."""
+        self._get_keyword_index()
+        if EMBEDDING_QUANTIZATION != "none":
+            self._get_dense_index()
+    
+    def _get_dense_index(self) -> QuantizedEmbeddingIndex:
+        """
+        Get the quantized dense index, loading or rebuilding it on first use.
+        
+        Like the keyword index, the persisted index is only trusted if it uses
+        the configured quantization and covers exactly the chunks in the
+        collection; otherwise it is rebuilt from the stored embeddings.
+        
+        Returns:
+            QuantizedEmbeddingIndex over all chunks in the collection
+        """
+        if self._dense_index is not None:
+            return self._dense_index
+        
+        chunk_ids = self.collection.get(include=[])["ids"]
+        if QuantizedEmbeddingIndex.exists(DENSE_INDEX_DIRECTORY):
+            index = QuantizedEmbeddingIndex.load(DENSE_INDEX_DIRECTORY)
+            if (index.mode == EMBEDDING_QUANTIZATION and len(index) == len(chunk_ids)
+                    and all(chunk_id in index for chunk_id in chunk_ids)):
+                self._dense_index = index
+                return index
+            logger.warning("Quantized dense index does not match the collection, rebuilding")
+        
+        # Rebuild one page at a time so the float32 embeddings of the whole corpus are never held at once
+        index = QuantizedEmbeddingIndex(EMBEDDING_QUANTIZATION)
+        for page in self._iter_collection_pages(["embeddings"]):
+            if page["ids"]:
+                index.add_many(page["ids"], np.asarray(page["embeddings"], dtype=np.float32))
+        self._dense_index = index
+        self._dense_index_dirty = True
+        self.save_dense_index()
+        logger.info(f"Built {EMBEDDING_QUANTIZATION} dense index over {len(index)} chunks")
+        return index
+    
+    def _index_vectors(self, chunk_ids: List[str], embeddings: List[List[float]]) -> None:
+        """Add chunk embeddings to the quantized dense index, if enabled; call save_dense_index to persist."""
+        if EMBEDDING_QUANTIZATION == "none":
+            return
+        self._get_dense_index().add_many(chunk_ids, np.asarray(embeddings, dtype=np.float32))
+        self._dense_index_dirty = True
+    
+    def _unindex_vectors(self, chunk_ids: List[str]) -> None:
+        """Remove chunks from the quantized dense index, if enabled; call save_dense_index to persist."""
+        if EMBEDDING_QUANTIZATION == "none":
+            return
+        index = self._get_dense_index()
+        for chunk_id in chunk_ids:
+            index.delete(chunk_id)
+        self._dense_index_dirty = True
+    
+    def save_dense_index(self) -> None:
+        """Persist the quantized dense index if it changed since it was last saved."""
+        if self._dense_index is not None and self._dense_index_dirty:
+            self._dense_index.save(DENSE_INDEX_DIRECTORY)
+            self._dense_index_dirty = False
+    
+    def save_indexes(self) -> None:
+        """Persist the keyword and quantized dense indexes if they changed."""
+        self.save_keyword_index()
+        self.save_dense_index()
         
     def search(self, query: str, top_k: int = 5, filter_criteria: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
@@ -191,35 +630,227 @@ class VectorStore:
             List of document dictionaries with content and metadata
         """
         logger.info(f"Searching for: {query}")
+        return self.search_many([query], top_k, filter_criteria)[0]
+    
+    def search_many(self, queries: List[str], top_k: int = 5,
+                    filter_criteria: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Search for documents similar to each of several queries at once.
+        
+        All queries are embedded in a single batch and sent to the collection
+        in one vectorized query, instead of one model pass and one round trip
+        per query.
         
-        # Query the collection
+        Args:
+            queries: List of search query strings
+            top_k: Number of results to return per query
+            filter_criteria: Optional metadata filter applied to every query
+            
+        Returns:
+            List of result lists, one per query, in the same order as queries
+        """
+        if not queries:
+            return []
+        
+        logger.info(f"Searching for {len(queries)} queries (top_k={top_k})")
+        query_embeddings = self._embed_queries(queries)
+        
+        if EMBEDDING_QUANTIZATION != "none":
+            return self._quantized_search_many(query_embeddings, top_k, filter_criteria)
+        
+        # Query the collection with all query embeddings at once
         results = self.collection.query(
-            query_texts=[query],
+            query_embeddings=query_embeddings,
             n_results=top_k,
             where=filter_criteria
         )
         
-        # Format the results
+        # Format the results for each query
         formatted_results = []
         
-        if results and 'documents' in results and len(results['documents']) > 0:
-            for i, (doc, metadata, distance) in enumerate(zip(
-                results['documents'][0], 
-                results['metadatas'][0],
-                results['distances'][0]
-            )):
-                formatted_results.append({
-                    "content": doc,
-                    "metadata": metadata,
-                    "score": 1.0 - distance  # Convert distance to similarity score
-                })
+        for q in range(len(queries)):
+            query_results = []
+            if results and 'documents' in results and len(results['documents']) > q:
+                for chunk_id, doc, metadata, distance in zip(
+                    results['ids'][q],
+                    results['documents'][q], 
+                    results['metadatas'][q],
+                    results['distances'][q]
+                ):
+                    query_results.append({
+                        "id": chunk_id,
+                        "content": doc,
+                        "metadata": metadata,
+                        "score": 1.0 - distance  # Convert distance to similarity score
+                    })
+            formatted_results.append(query_results)
                 
         return formatted_results
     
+    def _quantized_search_many(self, query_embeddings: List[List[float]], top_k: int,
+                               filter_criteria: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Search the quantized dense index and re-score candidates at full precision.
+        
+        A metadata filter is resolved to the matching chunk IDs first and only
+        those rows are scanned, so a selective filter still yields top_k
+        results. The candidates of all queries are then resolved in a single
+        collection lookup that returns their float32 embeddings for re-scoring.
+        
+        Args:
+            query_embeddings: Query embedding vectors
+            top_k: Number of results to return per query
+            filter_criteria: Optional metadata filter applied to every query
+            
+        Returns:
+            List of result lists, one per query, scored like search() on the collection
+        """
+        index = self._get_dense_index()
+        allowed_ids = None
+        if filter_criteria:
+            allowed_ids = self.collection.get(where=filter_criteria, include=[])["ids"]
+            if not allowed_ids:
+                return [[] for _ in query_embeddings]
+        query_vectors = np.asarray(query_embeddings, dtype=np.float32)
+        candidates_per_query = index.search(query_vectors, top_k, allowed_keys=allowed_ids)
+        
+        candidate_ids = list(dict.fromkeys(chunk_id for hits in candidates_per_query for chunk_id, _ in hits))
+        if not candidate_ids:
+            return [[] for _ in query_embeddings]
+        stored = self.collection.get(ids=candidate_ids, include=["documents", "metadatas", "embeddings"])
+        chunks = {
+            chunk_id: (doc, metadata, np.asarray(embedding, dtype=np.float32))
+            for chunk_id, doc, metadata, embedding in zip(
+                stored["ids"], stored["documents"], stored["metadatas"], stored["embeddings"]
+            )
+        }
+        
+        formatted_results = []
+        for query_vector, hits in zip(query_vectors, candidates_per_query):
+            ids = [chunk_id for chunk_id, _ in hits if chunk_id in chunks]
+            if not ids:
+                formatted_results.append([])
+                continue
+            vectors = np.stack([chunks[chunk_id][2] for chunk_id in ids])
+            # Re-score at full precision on the collection's scale: 1 - squared L2 distance
+            scores = 1.0 - np.sum((vectors - query_vector) ** 2, axis=1)
+            formatted_results.append([
+                {"id": ids[i], "content": chunks[ids[i]][0], "metadata": chunks[ids[i]][1], "score": float(scores[i])}
+                for i in np.argsort(-scores)[:top_k]
+            ])
+        return formatted_results
+    
+    def keyword_search(self, query: str, top_k: int = 5,
+                       filter_criteria: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Search for chunks matching the query terms with BM25.
+        
+        Args:
+            query: Search query string
+            top_k: Number of results to return
+            filter_criteria: Optional metadata filter for search
+            
+        Returns:
+            List of document dictionaries with id, content, metadata and BM25 score
+        """
+        return self.keyword_search_many([query], top_k, filter_criteria)[0]
+    
+    def keyword_search_many(self, queries: List[str], top_k: int = 5,
+                            filter_criteria: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Search for chunks matching each of several queries with BM25.
+        
+        Hits of all queries are resolved in a single collection lookup, which
+        also applies the metadata filter.
+        
+        Args:
+            queries: List of search query strings
+            top_k: Number of results to return per query
+            filter_criteria: Optional metadata filter applied to every query
+            
+        Returns:
+            List of result lists, one per query, in the same order as queries
+        """
+        if not queries:
+            return []
+        
+        index = self._get_current_keyword_index()
+        fetch_k = top_k * KEYWORD_FILTER_OVERFETCH if filter_criteria else top_k
+        hits_per_query = [index.search(query, top_k=fetch_k) for query in queries]
+        
+        hit_ids = list(dict.fromkeys(chunk_id for hits in hits_per_query for chunk_id, _ in hits))
+        if not hit_ids:
+            return [[] for _ in queries]
+        stored = self.collection.get(ids=hit_ids, where=filter_criteria, include=["documents", "metadatas"])
+        chunks = {
+            chunk_id: (doc, metadata)
+            for chunk_id, doc, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])
+        }
+        
+        formatted_results = []
+        for hits in hits_per_query:
+            query_results = [
+                {"id": chunk_id, "content": chunks[chunk_id][0], "metadata": chunks[chunk_id][1], "score": score}
+                for chunk_id, score in hits if chunk_id in chunks
+            ]
+            formatted_results.append(query_results[:top_k])
+        return formatted_results
+    
+    def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """
+        Embed search queries in a single model forward pass.
+        
+        Queries bypass the persistent embedding cache, which is reserved for
+        document chunks; recently embedded queries are served from the
+        in-memory query embedding cache instead.
+        
+        Args:
+            queries: List of query strings
+            
+        Returns:
+            List of query embedding vectors
+        """
+        if self.query_embedding_cache is None:
+            return self._encode_small(queries)
+        
+        embeddings = self.query_embedding_cache.get_many(queries)
+        
+        # Encode each distinct missing query once
+        missing_queries = list(dict.fromkeys(query for query, emb in zip(queries, embeddings) if emb is None))
+        if missing_queries:
+            new_embeddings = self._encode_small(missing_queries)
+            self.query_embedding_cache.put_many(missing_queries, new_embeddings)
+            
+            encoded = dict(zip(missing_queries, new_embeddings))
+            embeddings = [emb if emb is not None else encoded[query] for query, emb in zip(queries, embeddings)]
+        
+        return embeddings
+    
+    def _encode_small(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a few texts, sharing a model batch with concurrent requests when micro-batching is on.
+        
+        Args:
+            texts: List of text strings to embed
+            
+        Returns:
+            List of embedding vectors
+        """
+        if self.embedding_batcher is not None:
+            return self.embedding_batcher.encode(texts)
+        embeddings = self.embedding_model.encode(texts)
+        return np.asarray(embeddings, dtype=np.float32).tolist()
+    
     def clear(self) -> None:
         """Clear all documents from the collection."""
         logger.warning("Clearing all documents from the vector store")
         self.collection.delete(delete_all=True)
+        self._keyword_index = BM25Index()
+        self._keyword_index_dirty = True
+        if EMBEDDING_QUANTIZATION != "none":
+            self._dense_index = QuantizedEmbeddingIndex(EMBEDDING_QUANTIZATION)
+            self._dense_index_dirty = True
+        self.save_indexes()
         
     def get_document_count(self) -> int:
         """
@@ -229,12 +860,80 @@ class VectorStore:
             Number of documents
         """
         return self.collection.count()
+    
+    def count_documents(self, filter_criteria: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Count the distinct source documents with chunks matching a metadata filter.
+        
+        Args:
+            filter_criteria: Optional metadata filter, e.g. from metadata_filters.metadata_filter
+            
+        Returns:
+            Number of distinct document IDs among the matching chunks
+        """
+        stored = self.collection.get(where=filter_criteria, include=["metadatas"])
+        return len({
+            metadata.get("document_id", chunk_id)
+            for chunk_id, metadata in zip(stored["ids"], stored["metadatas"] or [])
+            if metadata is not None
+        })
+    
+    def get_index_stats(self) -> Dict[str, Any]:
+        """
+        Get size statistics for the keyword index and, when quantization is enabled, the dense index.
+        
+        Returns:
+            Dictionary with "keyword" and "dense" statistics ("dense" is empty without quantization)
+        """
+        return {
+            "keyword": self._get_keyword_index().stats(),
+            "dense": self._get_dense_index().stats() if EMBEDDING_QUANTIZATION != "none" else {},
+        }
+    
+    def get_embedding_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get hit/miss statistics for the persistent embedding cache.
+        
+        Returns:
+            Dictionary of cache statistics (empty if the cache is disabled)
+        """
+        if self.embedding_cache is None:
+            return {}
+        return self.embedding_cache.stats()
+    
+    def get_query_embedding_cache_stats(self) -> Dict[str, Any]:
+        """
+        Get hit/miss statistics for the in-memory query embedding cache.
+        
+        Returns:
+            Dictionary of cache statistics (empty if the cache is disabled)
+        """
+        if self.query_embedding_cache is None:
+            return {}
+        return self.query_embedding_cache.stats()
+    
+    def get_embedding_batcher_stats(self) -> Dict[str, Any]:
+        """
+        Get batch size and wait statistics for micro-batched embedding requests.
+        
+        Returns:
+            Dictionary of batching statistics (empty if micro-batching is disabled)
+        """
+        if self.embedding_batcher is None:
+            return {}
+        return self.embedding_batcher.stats()
         
 def get_vector_store() -> VectorStore:
     """
     Get the vector store singleton instance.
     
+    If CHAKRA_VECTOR_STORE_SOCKET is set, this is a client of the shared
+    vector store server, which offers the same methods.
+    
     Returns:
-        VectorStore instance
+        VectorStore (or RemoteVectorStore) instance
     """
+    if VECTOR_STORE_SOCKET:
+        from app.services.vector_store_client import get_remote_vector_store
+        return get_remote_vector_store(VECTOR_STORE_SOCKET)
     return VectorStore()
\ No newline at end of file
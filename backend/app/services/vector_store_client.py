@@ -0,0 +1,313 @@
+"""
+Client for the Shared Vector Store Server
+
+This module provides functionality for:
+- Encoding vector store requests and responses as length-prefixed JSON messages
+- Forwarding vector store calls from API workers to the vector store server over a Unix socket
+- Sending streamed ingestion input to the server in bounded batches
+- Reusing one connection per thread and reconnecting after the server restarts
+"""
+
+import os
+import json
+import socket
+import struct
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.chunker import StructuredChunker, CHUNK_TOKENS
+from app.services.tokenizer import get_token_counter
+from app.services.vector_store_common import EMBEDDING_MODEL_NAME, INGEST_BATCH_SIZE
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Configuration constants
+# Seconds to wait for a response; ingestion batches embed up to INGEST_BATCH_SIZE chunks
+VECTOR_STORE_TIMEOUT = float(os.environ.get("CHAKRA_VECTOR_STORE_TIMEOUT", "120"))
+# Messages are prefixed with their length as a 4-byte big-endian unsigned integer
+MESSAGE_HEADER = struct.Struct(">I")
+MAX_MESSAGE_BYTES = 256 * 1024 * 1024
+
+
+def _to_json(value: Any) -> Any:
+    """Convert numpy values in results (e.g. float32 scores) to JSON types."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_message(message: Dict[str, Any]) -> bytes:
+    """
+    Encode a request or response for the socket.
+
+    Args:
+        message: JSON-serializable dictionary (numpy values are converted)
+
+    Returns:
+        Length header followed by the UTF-8 JSON payload
+    """
+    payload = json.dumps(message, default=_to_json).encode("utf-8")
+    return MESSAGE_HEADER.pack(len(payload)) + payload
+
+
+def decode_length(header: bytes) -> int:
+    """
+    Decode a message length header.
+
+    Raises:
+        ValueError: If the announced message is larger than MAX_MESSAGE_BYTES
+    """
+    (length,) = MESSAGE_HEADER.unpack(header)
+    if length > MAX_MESSAGE_BYTES:
+        raise ValueError(f"Message of {length} bytes exceeds the {MAX_MESSAGE_BYTES} byte limit")
+    return length
+
+
+class RemoteVectorStore:
+    """
+    A vector store whose model, collection and indexes live in the vector store server.
+
+    Mirrors the VectorStore methods used by the API, so services use it
+    unchanged through get_vector_store(). Chunking happens on the server for
+    document calls and locally only where callers chunk themselves.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = VECTOR_STORE_TIMEOUT):
+        """
+        Initialize the client. Connections are opened on first use, per thread.
+
+        Args:
+            socket_path: Path of the vector store server's Unix socket
+            timeout: Seconds to wait for each response
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        # Same chunking as the server, for callers that chunk before add_chunk_stream
+        self.chunker = StructuredChunker(CHUNK_TOKENS, get_token_counter(EMBEDDING_MODEL_NAME).count)
+
+    def _connection(self) -> socket.socket:
+        """Get this thread's connection, opening it if needed."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            conn.settimeout(self.timeout)
+            try:
+                conn.connect(self.socket_path)
+            except OSError:
+                conn.close()
+                raise
+            self._local.conn = conn
+        return conn
+
+    def _disconnect(self) -> None:
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @staticmethod
+    def _recv_exactly(conn: socket.socket, size: int) -> bytes:
+        """Read exactly size bytes from the connection."""
+        data = bytearray()
+        while len(data) < size:
+            block = conn.recv(min(size - len(data), 1024 * 1024))
+            if not block:
+                raise ConnectionError("Vector store server closed the connection")
+            data.extend(block)
+        return bytes(data)
+
+    def _request(self, method: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one request on this thread's connection and read the response."""
+        conn = self._connection()
+        try:
+            conn.sendall(encode_message({"method": method, "args": list(args), "kwargs": kwargs}))
+            length = decode_length(self._recv_exactly(conn, MESSAGE_HEADER.size))
+            return json.loads(self._recv_exactly(conn, length))
+        except BaseException:
+            # The stream may hold a partial message; never reuse it
+            self._disconnect()
+            raise
+
+    def _call(self, method: str, *args, **kwargs) -> Any:
+        """
+        Call a vector store method on the server.
+
+        A call that fails because the connection was lost (e.g. the server
+        restarted) is retried once on a new connection; every write the server
+        accepts is an upsert or delete, so a retry cannot duplicate data.
+
+        Raises:
+            ConnectionError: If the server cannot be reached
+            RuntimeError: If the method raised on the server
+        """
+        try:
+            response = self._request(method, args, kwargs)
+        except (ConnectionError, FileNotFoundError):
+            logger.warning(f"Lost connection to vector store server at {self.socket_path}, reconnecting")
+            response = self._request(method, args, kwargs)
+
+        if "error" in response:
+            raise RuntimeError(f"Vector store server failed in {method}: {response['error']}")
+        return response["result"]
+
+    def add_documents(self, documents: List[Dict[str, Any]], metadata: Optional[List[Dict[str, Any]]] = None) -> List[str]:
+        """Add documents to the vector store; see VectorStore.add_documents."""
+        return self._call("add_documents", documents, metadata)
+
+    def add_document_stream(self, documents: Iterable[Tuple[str, Dict[str, Any]]],
+                            batch_size: int = INGEST_BATCH_SIZE) -> int:
+        """
+        Chunk, embed and store a stream of documents; see VectorStore.add_document_stream.
+
+        Documents are sent batch_size at a time, so the stream is never held
+        in memory as a whole.
+        """
+        stored = 0
+        batch: List[Tuple[str, Dict[str, Any]]] = []
+        for document in documents:
+            batch.append(document)
+            if len(batch) >= batch_size:
+                stored += self._call("add_document_stream", batch, batch_size)
+                batch = []
+        if batch:
+            stored += self._call("add_document_stream", batch, batch_size)
+        return stored
+
+    def add_chunk_stream(self, chunks: Iterable[Tuple[str, str, Dict[str, Any]]],
+                         batch_size: int = INGEST_BATCH_SIZE) -> int:
+        """Embed and store a stream of chunks one batch per request; see VectorStore.add_chunk_stream."""
+        stored = 0
+        batch: List[Tuple[str, str, Dict[str, Any]]] = []
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                stored += self._call("add_chunk_stream", batch, batch_size)
+                batch = []
+        if batch:
+            stored += self._call("add_chunk_stream", batch, batch_size)
+        return stored
+
+    def upsert_document(self, doc_id: str, content: str, metadata: Optional[Dict[str, Any]] = None,
+                        existing_chunk_ids: Optional[List[str]] = None) -> List[str]:
+        """Idempotently index a single document; see VectorStore.upsert_document."""
+        return self._call("upsert_document", doc_id, content, metadata, existing_chunk_ids)
+
+    def delete_chunks(self, chunk_ids: List[str]) -> None:
+        """Delete chunks from the collection and indexes; see VectorStore.delete_chunks."""
+        self._call("delete_chunks", chunk_ids)
+
+    def delete_legacy_chunks(self) -> int:
+        """Delete chunks stored under positional IDs; see VectorStore.delete_legacy_chunks."""
+        return self._call("delete_legacy_chunks")
+
+    def save_indexes(self) -> None:
+        """Persist the server's keyword and dense indexes."""
+        self._call("save_indexes")
+
+    def _load_indexes(self) -> None:
+        """Make the server load its keyword and dense indexes."""
+        self._call("_load_indexes")
+
+    def search(self, query: str, top_k: int = 5, filter_criteria: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Search for documents similar to the query; see VectorStore.search."""
+        return self._call("search", query, top_k, filter_criteria)
+
+    def search_many(self, queries: List[str], top_k: int = 5,
+                    filter_criteria: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """Search for several queries in one request; see VectorStore.search_many."""
+        if not queries:
+            return []
+        return self._call("search_many", queries, top_k, filter_criteria)
+
+    def keyword_search(self, query: str, top_k: int = 5,
+                       filter_criteria: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Search the keyword index; see VectorStore.keyword_search."""
+        return self._call("keyword_search", query, top_k, filter_criteria)
+
+    def keyword_search_many(self, queries: List[str], top_k: int = 5,
+                            filter_criteria: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """Search the keyword index for several queries in one request; see VectorStore.keyword_search_many."""
+        if not queries:
+            return []
+        return self._call("keyword_search_many", queries, top_k, filter_criteria)
+
+    def _get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Embed document texts through the server's embedding cache."""
+        return self._call("_get_embeddings", texts)
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts with the server's model, bypassing the embedding cache."""
+        return self._call("_encode", texts)
+
+    def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed search queries with the server's model."""
+        return self._call("_embed_queries", queries)
+
+    def clear(self) -> None:
+        """Clear all documents from the collection."""
+        self._call("clear")
+
+    def get_document_count(self) -> int:
+        """Get the number of chunks in the collection."""
+        return self._call("get_document_count")
+
+    def count_documents(self, filter_criteria: Optional[Dict[str, Any]] = None) -> int:
+        """Count the distinct documents matching a metadata filter; see VectorStore.count_documents."""
+        return self._call("count_documents", filter_criteria)
+
+    def get_index_stats(self) -> Dict[str, Any]:
+        """Get the server's keyword and dense index statistics; see VectorStore.get_index_stats."""
+        return self._call("get_index_stats")
+
+    def get_embedding_cache_stats(self) -> Dict[str, Any]:
+        """Get the server's embedding cache statistics."""
+        return self._call("get_embedding_cache_stats")
+
+    def get_query_embedding_cache_stats(self) -> Dict[str, Any]:
+        """Get the server's query embedding cache statistics."""
+        return self._call("get_query_embedding_cache_stats")
+
+    def get_embedding_batcher_stats(self) -> Dict[str, Any]:
+        """Get the server's embedding micro-batching statistics."""
+        return self._call("get_embedding_batcher_stats")
+
+    def server_stats(self) -> Dict[str, Any]:
+        """
+        Get vector store server statistics.
+
+        Returns:
+            Dictionary with request counters and read/write executor statistics
+        """
+        return self._call("server_stats")
+
+
+_remote_vector_store = None
+_remote_vector_store_pid = None
+
+
+def get_remote_vector_store(socket_path: str) -> RemoteVectorStore:
+    """
+    Get the client of the vector store server for the current process.
+
+    Connections inherited from a forked parent are never reused.
+
+    Args:
+        socket_path: Path of the vector store server's Unix socket
+
+    Returns:
+        RemoteVectorStore instance
+    """
+    global _remote_vector_store, _remote_vector_store_pid
+    if (_remote_vector_store is None or _remote_vector_store_pid != os.getpid()
+            or _remote_vector_store.socket_path != socket_path):
+        _remote_vector_store = RemoteVectorStore(socket_path)
+        _remote_vector_store_pid = os.getpid()
+    return _remote_vector_store
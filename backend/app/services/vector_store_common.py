@@ -0,0 +1,69 @@
+"""
+Shared Vector Store Settings and Chunk IDs
+
+This module provides functionality for:
+- Vector store settings shared by the store, its client and the RAG service
+- Stable document IDs derived from source file paths
+- Content-derived chunk IDs, so every ingest path writes the same IDs
+
+It has no heavy dependencies and is imported by modules that only need
+these settings, so they keep working where app.services.vector_store is
+replaced by a simplified implementation (see docker/backend).
+"""
+
+import os
+import re
+import hashlib
+from typing import List, Dict, Any
+
+# Use a smaller and more memory-efficient model when running in lightweight mode
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+LIGHTWEIGHT_EMBEDDING_MODEL = "paraphrase-MiniLM-L3-v2"  # Smaller, faster model
+# Check for lightweight mode flag
+LIGHTWEIGHT_MODE = os.environ.get("CHAKRA_LIGHTWEIGHT_MODE", "false").lower() == "true"
+EMBEDDING_MODEL_NAME = LIGHTWEIGHT_EMBEDDING_MODEL if LIGHTWEIGHT_MODE else DEFAULT_EMBEDDING_MODEL
+PERSIST_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "vector_db")
+# Upper bound on text shared by neighbouring chunks (chunks indexed before
+# structure-aware chunking overlapped by this many characters)
+CHUNK_OVERLAP = 100 if LIGHTWEIGHT_MODE else 200
+# Chunks embedded and written per batch during ingestion; bounds ingestion memory
+INGEST_BATCH_SIZE = int(os.environ.get("CHAKRA_INGEST_BATCH_SIZE", "64"))
+# Positional chunk IDs ("doc_3_chunk_7", "doc3_chunk7") written before chunk IDs were content-derived
+LEGACY_CHUNK_ID = re.compile(r"^doc_?\d+_chunk_?\d+$")
+
+
+def document_id_for_path(path: str) -> str:
+    """
+    Get the stable document ID of a source file.
+    
+    Args:
+        path: Path of the source file
+        
+    Returns:
+        Document ID derived from the absolute path
+    """
+    return "doc_" + hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+
+
+def content_chunk_ids(doc_id: str, document_chunks: List[Dict[str, Any]]) -> List[str]:
+    """
+    Derive chunk IDs from chunk content, so re-indexing the same text yields the same IDs.
+    
+    Args:
+        doc_id: Stable identifier of the source document
+        document_chunks: Chunks from StructuredChunker.chunk, in document order
+        
+    Returns:
+        One chunk ID per chunk
+    """
+    ids = []
+    seen = {}
+    for chunk in document_chunks:
+        # The section path is part of the identity so a moved chunk gets fresh metadata
+        key = f"{chunk['section_path']}\0{chunk['text']}"
+        chunk_hash = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+        # Disambiguate identical chunks repeated within the same document
+        occurrence = seen.get(chunk_hash, 0)
+        seen[chunk_hash] = occurrence + 1
+        ids.append(f"{doc_id}_{chunk_hash}" + (f"_{occurrence}" if occurrence else ""))
+    return ids
@@ -0,0 +1,198 @@
+"""
+Shared Vector Store Server
+
+This module provides functionality for:
+- Owning the embedding model, Chroma client and search indexes once per host
+- Serving embedding, search and indexing requests from API workers over a Unix socket
+- Running reads concurrently and writes one at a time, so one process writes the database
+- Reporting request counters and executor statistics
+
+Run it before starting multiple API workers and point the workers at it:
+
+    python -m app.services.vector_store_server --socket /tmp/chakra-vector-store.sock
+    CHAKRA_VECTOR_STORE_SOCKET=/tmp/chakra-vector-store.sock uvicorn app.main:app --workers 4
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import logging
+import argparse
+from typing import Any, Dict
+
+from app.services.retrieval_executor import BoundedExecutor
+from app.services.vector_store import VectorStore
+from app.services.vector_store_client import MESSAGE_HEADER, encode_message, decode_length
+from app.services.warmup import WARMUP_QUERY
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Configuration constants
+DEFAULT_SOCKET_PATH = os.environ.get("CHAKRA_VECTOR_STORE_SOCKET") or "/tmp/chakra-vector-store.sock"
+SERVER_READ_WORKERS = int(os.environ.get("CHAKRA_VECTOR_STORE_READ_WORKERS", "4"))
+SERVER_MAX_QUEUE = int(os.environ.get("CHAKRA_VECTOR_STORE_MAX_QUEUE", "256"))
+
+# Methods callable over the socket; writes run on a single thread
+READ_METHODS = frozenset({
+    "search", "search_many", "keyword_search", "keyword_search_many",
+    "_get_embeddings", "_encode", "_embed_queries", "_load_indexes",
+    "get_document_count", "count_documents", "get_index_stats", "get_embedding_cache_stats",
+    "get_query_embedding_cache_stats", "get_embedding_batcher_stats",
+})
+WRITE_METHODS = frozenset({
+    "add_documents", "add_document_stream", "add_chunk_stream",
+    "upsert_document", "delete_chunks", "delete_legacy_chunks", "save_indexes", "clear",
+})
+
+
+class VectorStoreServer:
+    """
+    Serves one VectorStore to many API worker processes.
+
+    Each connection sends requests one at a time and gets a response to each;
+    workers hold one connection per thread, so requests from different workers
+    and threads are processed concurrently. Reads share a thread pool and writes
+    are serialized on a single thread.
+    """
+
+    def __init__(self, store: Any, socket_path: str = DEFAULT_SOCKET_PATH,
+                 read_workers: int = SERVER_READ_WORKERS, max_queue: int = SERVER_MAX_QUEUE):
+        """
+        Initialize the server.
+
+        Args:
+            store: VectorStore that requests are dispatched to
+            socket_path: Path of the Unix socket to listen on
+            read_workers: Number of threads running read requests
+            max_queue: Maximum number of admitted read requests
+        """
+        self.store = store
+        self.socket_path = socket_path
+        self.readers = BoundedExecutor(max_workers=read_workers, max_queue=max_queue, name="vector-store-read")
+        self.writer = BoundedExecutor(max_workers=1, max_queue=max_queue, name="vector-store-write")
+        self._server = None
+        self._stats = {"connections": 0, "requests": 0, "errors": 0}
+
+    async def _dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one request and build its response."""
+        method = request.get("method")
+        if method == "server_stats":
+            return {"result": self.stats()}
+        if method in READ_METHODS:
+            executor = self.readers
+        elif method in WRITE_METHODS:
+            executor = self.writer
+        else:
+            return {"error": f"Unknown method: {method}"}
+
+        try:
+            result = await executor.run(getattr(self.store, method), *request.get("args", []),
+                                        **request.get("kwargs", {}))
+            return {"result": result}
+        except Exception as e:
+            logger.error(f"Vector store request {method} failed: {str(e)}")
+            self._stats["errors"] += 1
+            return {"error": f"{type(e).__name__}: {str(e)}"}
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answer requests on one connection until the client disconnects."""
+        self._stats["connections"] += 1
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(MESSAGE_HEADER.size)
+                except asyncio.IncompleteReadError:
+                    break
+                payload = await reader.readexactly(decode_length(header))
+                self._stats["requests"] += 1
+                try:
+                    request = json.loads(payload)
+                except ValueError as e:
+                    request = None
+                    response = {"error": f"Malformed request: {str(e)}"}
+                if isinstance(request, dict):
+                    response = await self._dispatch(request)
+                elif request is not None:
+                    response = {"error": "Malformed request: expected a JSON object"}
+                writer.write(encode_message(response))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+            logger.warning(f"Dropped vector store client connection: {str(e)}")
+        finally:
+            writer.close()
+
+    async def start(self) -> None:
+        """Listen on the Unix socket, replacing a stale socket file."""
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        os.makedirs(os.path.dirname(self.socket_path) or ".", exist_ok=True)
+        self._server = await asyncio.start_unix_server(self._handle_connection, path=self.socket_path)
+        # Only processes of the same user may connect
+        os.chmod(self.socket_path, 0o600)
+        logger.info(f"Vector store server listening on {self.socket_path}")
+
+    async def close(self) -> None:
+        """Stop listening, remove the socket file and shut down the executors."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.readers.shutdown()
+        self.writer.shutdown()
+        self.store.save_indexes()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get server statistics.
+
+        Returns:
+            Dictionary with connection/request/error counters and executor statistics
+        """
+        return {
+            **self._stats,
+            "socket": self.socket_path,
+            "readers": self.readers.stats(),
+            "writer": self.writer.stats(),
+        }
+
+
+async def serve(socket_path: str) -> None:
+    """Load the vector store, warm it up and serve until SIGINT or SIGTERM."""
+    start = time.perf_counter()
+    store = VectorStore()
+    store._load_indexes()
+    store._encode([WARMUP_QUERY])
+    logger.info(f"Vector store loaded in {time.perf_counter() - start:.2f}s "
+                f"({store.get_document_count()} chunks)")
+
+    server = VectorStoreServer(store, socket_path)
+    await server.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    await stop.wait()
+
+    logger.info("Shutting down vector store server")
+    await server.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Serve the Chakra vector store to API workers over a Unix socket")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Path of the Unix socket to listen on")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    asyncio.run(serve(args.socket))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
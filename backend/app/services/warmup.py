@@ -0,0 +1,156 @@
+"""
+Startup Warm-up and Cold-Start Timings
+
+This module provides functionality for:
+- Loading the embedding model, vector store, search indexes and reranker before traffic arrives
+- Running one embedding so the first query does not pay for model initialization
+- Timing each warm-up component, and each lazily imported library, for startup reporting
+- Reporting whether the worker is ready to serve
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.lazy_imports import import_timings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Configuration constants
+# "blocking": startup waits for warm-up; "background": serve at once, warm up
+# concurrently (/ready reports progress); "off": load everything on first use
+WARMUP_MODE = os.environ.get("CHAKRA_WARMUP", "blocking").lower()
+WARMUP_QUERY = "service level agreement uptime and response time"
+
+
+def _warm_vector_store() -> None:
+    """Open the vector database and load the embedding model (or reach the vector store server)."""
+    from app.services.vector_store import get_vector_store
+    get_vector_store().get_document_count()
+
+
+def _warm_embedding_model() -> None:
+    """Run one embedding, bypassing the embedding cache, so inference is initialized."""
+    from app.services.vector_store import get_vector_store
+    get_vector_store()._encode([WARMUP_QUERY])
+
+
+def _warm_search_indexes() -> None:
+    """Load (or rebuild) the keyword and quantized dense indexes."""
+    from app.services.vector_store import get_vector_store
+    get_vector_store()._load_indexes()
+
+
+def _warm_reranker() -> Optional[str]:
+    """Load the cross-encoder model, if reranking is enabled."""
+    from app.services.reranker import get_reranker
+    reranker = get_reranker()
+    if reranker is None:
+        return "disabled"
+    reranker.load()
+    return None
+
+
+WARMUP_COMPONENTS: List[Tuple[str, Callable[[], Optional[str]]]] = [
+    ("vector_store", _warm_vector_store),
+    ("embedding_model", _warm_embedding_model),
+    ("search_indexes", _warm_search_indexes),
+    ("reranker", _warm_reranker),
+]
+
+
+class StartupReport:
+    """
+    Records the progress and timings of the worker's warm-up.
+
+    A component that fails is reported with its error and warm-up moves on;
+    the component is then loaded on first use as it would be without warm-up.
+    """
+
+    def __init__(self, mode: str = WARMUP_MODE):
+        """
+        Initialize the report.
+
+        Args:
+            mode: Warm-up mode ("blocking", "background" or "off")
+        """
+        self.mode = mode
+        self.status = "off" if mode == "off" else "pending"
+        self.app_import_seconds: Optional[float] = None
+        self.total_seconds: Optional[float] = None
+        self.components: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        """Whether the worker can serve without further cold-start delays."""
+        return self.status in ("ready", "degraded", "off")
+
+    def warm_up(self, components: List[Tuple[str, Callable[[], Optional[str]]]] = WARMUP_COMPONENTS) -> None:
+        """
+        Run each warm-up component in order and time it.
+
+        Args:
+            components: (name, function) pairs; a function may return a reason
+                for skipping (e.g. "disabled") instead of None
+        """
+        with self._lock:
+            self.status = "warming"
+        start = time.perf_counter()
+        failed = False
+        for name, warm in components:
+            component_start = time.perf_counter()
+            try:
+                skipped = warm()
+                result = {"status": "skipped", "reason": skipped} if skipped else {"status": "ok"}
+            except Exception as e:
+                logger.error(f"Warm-up of {name} failed: {str(e)}")
+                result = {"status": "error", "error": str(e)}
+                failed = True
+            result["seconds"] = round(time.perf_counter() - component_start, 3)
+            with self._lock:
+                self.components[name] = result
+            logger.info(f"Warm-up of {name}: {result['status']} in {result['seconds']:.2f}s")
+
+        with self._lock:
+            self.total_seconds = round(time.perf_counter() - start, 3)
+            self.status = "degraded" if failed else "ready"
+        logger.info(f"Warm-up finished ({self.status}) in {self.total_seconds:.2f}s")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get the report.
+
+        Returns:
+            Dictionary with the warm-up mode and status, the app import time,
+            per-component timings and the import time of each lazily imported library
+        """
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "status": self.status,
+                "ready": self.ready,
+                "app_import_seconds": self.app_import_seconds,
+                "warmup_seconds": self.total_seconds,
+                "components": {name: dict(result) for name, result in self.components.items()},
+                "imports": {name: round(seconds, 3) for name, seconds in import_timings().items()},
+            }
+
+
+_startup_report = None
+
+
+def get_startup_report() -> StartupReport:
+    """
+    Get the startup report of this worker.
+
+    Returns:
+        StartupReport instance
+    """
+    global _startup_report
+    if _startup_report is None:
+        _startup_report = StartupReport()
+    return _startup_report
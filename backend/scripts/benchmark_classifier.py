@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Healthcare Document Classifier
+
+This script:
+1. Loads the sample SLA documents (and a large document built from them)
+2. Classifies each with the single-pass term matcher and with the previous
+   one-regex-per-term implementation
+3. Checks that both produce identical classifications
+4. Reports the timings and the speedup
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from typing import Any, Callable, Dict, List, Tuple
+
+# Add backend directory to path
+script_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.append(backend_dir)
+
+from app.services.healthcare_classifier import (
+    HealthcareDocumentClassifier, HEALTHCARE_TERMS, COMPLIANCE_FRAMEWORKS,
+    CLINICAL_SPECIALTIES, HIGH_SENSITIVITY_PATTERNS
+)
+
+SAMPLE_DIRECTORIES = [
+    os.path.join(backend_dir, "data", "sla_examples"),
+    os.path.join(backend_dir, "app", "data", "sla_examples"),
+    os.path.join(backend_dir, "..", "examples"),
+]
+
+
+class RegexPerTermClassifier(HealthcareDocumentClassifier):
+    """The previous implementation: one full regex pass over the text per term"""
+
+    @staticmethod
+    def _scan(content):
+        # No shared pass; each detector below rescans the text
+        return None
+
+    def _calculate_healthcare_score(self, content, matches=None):
+        normalized_content = content.lower()
+        word_count = len(re.findall(r'\w+', normalized_content))
+        if word_count == 0:
+            return 0.0, {}
+        category_scores = {}
+        total_matches = 0
+        for category, terms in HEALTHCARE_TERMS.items():
+            category_count = 0
+            for term in terms:
+                category_count += len(re.findall(r'\b' + re.escape(term.lower()) + r'\b', normalized_content))
+            category_scores[category] = category_count / word_count
+            total_matches += category_count
+        return min(1.0, total_matches / (word_count * 0.05)), category_scores
+
+    def _detect_compliance_frameworks(self, content, matches=None):
+        frameworks = []
+        normalized_content = content.lower()
+        for framework, indicators in COMPLIANCE_FRAMEWORKS.items():
+            for indicator in indicators:
+                if re.search(r'\b' + re.escape(indicator.lower()) + r'\b', normalized_content):
+                    frameworks.append(framework)
+                    break
+        return frameworks
+
+    def _detect_clinical_specialties(self, content, matches=None):
+        return [
+            specialty for specialty in CLINICAL_SPECIALTIES
+            if re.search(r'\b' + re.escape(specialty) + r'\b', content, re.IGNORECASE)
+        ]
+
+    def _determine_data_sensitivity(self, content, compliance_frameworks, matches=None):
+        for pattern in HIGH_SENSITIVITY_PATTERNS:
+            if re.search(r'\b' + pattern, content, re.IGNORECASE):
+                return "High"
+        if "HIPAA" in compliance_frameworks or "42 CFR Part 2" in compliance_frameworks:
+            return "High"
+        return "Medium"
+
+
+def load_samples(scale: int) -> List[Tuple[str, str]]:
+    """Load the sample documents plus one large document made of all of them"""
+    samples = []
+    for directory in SAMPLE_DIRECTORIES:
+        if not os.path.isdir(directory):
+            continue
+        for filename in sorted(os.listdir(directory)):
+            path = os.path.join(directory, filename)
+            if filename.endswith(".md"):
+                with open(path, "r", encoding="utf-8") as f:
+                    samples.append((filename, f.read()))
+            elif filename.endswith(".json"):
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                except (OSError, json.JSONDecodeError):
+                    continue
+                if isinstance(data, dict) and isinstance(data.get("content"), str):
+                    samples.append((filename, data["content"]))
+
+    if samples:
+        large = "\n\n".join(content for _, content in samples)
+        samples.append((f"all_samples_x{scale}", "\n\n".join([large] * scale)))
+    return samples
+
+
+def time_classifier(classify: Callable[[str, str], Dict[str, Any]], samples: List[Tuple[str, str]],
+                    repeat: int) -> Tuple[List[float], List[Dict[str, Any]]]:
+    """Return the best time over repeat runs and the classification of each sample"""
+    timings = []
+    results = []
+    for filename, content in samples:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = classify(content, filename)
+            best = min(best, time.perf_counter() - start)
+        timings.append(best)
+        results.append(result)
+    return timings, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the healthcare document classifier")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per document (best is reported)")
+    parser.add_argument("--scale", type=int, default=20, help="Copies of all samples in the large document")
+    args = parser.parse_args()
+
+    samples = load_samples(args.scale)
+    if not samples:
+        print("No sample documents found")
+        return 1
+
+    baseline_times, baseline_results = time_classifier(RegexPerTermClassifier().classify_document, samples, args.repeat)
+    matcher_times, matcher_results = time_classifier(HealthcareDocumentClassifier().classify_document, samples, args.repeat)
+
+    print(f"{'document':<45} {'KB':>8} {'per-term ms':>12} {'single-pass ms':>15} {'speedup':>8}")
+    mismatches = 0
+    for (filename, content), old, new, old_result, new_result in zip(
+            samples, baseline_times, matcher_times, baseline_results, matcher_results):
+        flag = "" if old_result == new_result else "  MISMATCH"
+        mismatches += bool(flag)
+        print(f"{filename[:45]:<45} {len(content) / 1024:>8.1f} {old * 1000:>12.2f} {new * 1000:>15.2f} "
+              f"{old / new:>7.1f}x{flag}")
+
+    print(f"\nTotal: {sum(baseline_times) * 1000:.1f} ms -> {sum(matcher_times) * 1000:.1f} ms "
+          f"({sum(baseline_times) / sum(matcher_times):.1f}x faster)")
+    print("Classifications identical" if not mismatches else f"{mismatches} classifications differ")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,12 +16,15 @@ import sys
 import logging
 import json
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 
 # Add the parent directory to the path so we can import our app modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from app.services.vector_store import get_vector_store
+from app.services.vector_store_common import content_chunk_ids, document_id_for_path, INGEST_BATCH_SIZE
+from app.services.parse_cache import hash_file
+from app.services.chunker import StructuredChunker, CHUNK_TOKENS
 from app.services.llm_provider import LLMProvider
 from app.services.openai_provider import OpenAIProvider
 from app.services.ollama_provider import OllamaProvider
@@ -29,20 +32,13 @@ from app.core.config import LLM_PROVIDER, OLLAMA_API_URL, OLLAMA_MODEL
 
 # Constants
 COLLECTION_NAME = "sla_knowledge_base"
-CHUNK_SIZE = 500
-CHUNK_OVERLAP = 50
-MAX_DOCS_TO_PROCESS = 100
-BATCH_SIZE = 3  # Process documents in smaller batches to reduce memory usage
-
-# Memory management constants
-MEMORY_CHECK_INTERVAL = 2  # Check memory more frequently
-MAX_MEMORY_PERCENT = 75  # Lower threshold to prevent OOM errors
+# Chunks embedded and written per batch; documents stream through the pipeline,
+# so this bounds ingestion memory regardless of how many documents there are
+BATCH_SIZE = INGEST_BATCH_SIZE
 
 # Lightweight mode settings (overridden when lightweight=True)
-LIGHTWEIGHT_BATCH_SIZE = 2
-LIGHTWEIGHT_MAX_DOCS = 50
-LIGHTWEIGHT_CHUNK_SIZE = 300
-LIGHTWEIGHT_MEMORY_PERCENT = 60
+LIGHTWEIGHT_BATCH_SIZE = 16
+LIGHTWEIGHT_CHUNK_TOKENS = 96
 
 # Set up logging
 logging.basicConfig(
@@ -65,95 +61,81 @@ def get_llm_provider() -> LLMProvider:
         from app.core.config import OPENAI_API_KEY
         return OpenAIProvider(api_key=OPENAI_API_KEY)
 
-def load_sla_examples(directory_path: str) -> List[Dict[str, Any]]:
-    """Load SLA examples from the given directory."""
-    documents = []
-    
-    try:
-        if not os.path.exists(directory_path):
-            logger.error(f"Directory not found: {directory_path}")
-            return documents
-        
-        # Get all JSON files in the directory
-        json_files = [f for f in os.listdir(directory_path) 
-                    if f.endswith('.json') and os.path.isfile(os.path.join(directory_path, f))]
-        
-        logger.info(f"Found {len(json_files)} JSON files in {directory_path}")
-        
-        # Process each file
-        for filename in json_files:
-            file_path = os.path.join(directory_path, filename)
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    
-                    # Check if it has the expected format
-                    if 'content' in data and 'metadata' in data:
-                        # Add source information to metadata
-                        data['metadata']['source'] = filename
-                        documents.append(data)
-                        logger.info(f"Loaded document: {filename}")
-                    else:
-                        logger.warning(f"Skipping file with invalid format: {filename}")
-            
-            except Exception as e:
-                logger.error(f"Error loading {filename}: {str(e)}")
-    
-    except Exception as e:
-        logger.error(f"Error loading documents: {str(e)}")
+def list_sla_files(directory_path: str) -> List[str]:
+    """List the JSON files in the given directory."""
+    if not os.path.exists(directory_path):
+        logger.error(f"Directory not found: {directory_path}")
+        return []
     
-    return documents
+    json_files = [f for f in sorted(os.listdir(directory_path))
+                  if f.endswith('.json') and os.path.isfile(os.path.join(directory_path, f))]
+    logger.info(f"Found {len(json_files)} JSON files in {directory_path}")
+    return json_files
 
-def create_text_chunks(text: str, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> List[str]:
-    """Split text into chunks for better processing."""
-    if not text:
-        return []
+def load_sla_examples(directory_path: str) -> Iterator[Dict[str, Any]]:
+    """Lazily load SLA examples from the given directory, one document at a time."""
+    for filename in list_sla_files(directory_path):
+        file_path = os.path.join(directory_path, filename)
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading {filename}: {str(e)}")
+            continue
         
-    chunks = []
-    current_pos = 0
-    text_length = len(text)
+        # Check if it has the expected format
+        if 'content' in data and 'metadata' in data:
+            # Add source information to metadata
+            data['metadata']['source'] = filename
+            data['path'] = os.path.abspath(file_path)
+            logger.info(f"Loaded document: {filename}")
+            yield data
+        else:
+            logger.warning(f"Skipping file with invalid format: {filename}")
+
+def iter_document_chunks(documents: Iterable[Dict[str, Any]], chunker: StructuredChunker,
+                         indexed: List[Dict[str, Any]]) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    """
+    Lazily split a stream of documents into chunks for the vector store.
     
-    while current_pos < text_length:
-        # Get chunk with specified size
-        chunk_end = min(current_pos + chunk_size, text_length)
-        
-        # If not at the end and not at a line break, find the last line break
-        if chunk_end < text_length and text[chunk_end] not in ['\n', '.', '!', '?']:
-            # Try to end at a natural break
-            last_break = max(
-                text.rfind('\n', current_pos, chunk_end),
-                text.rfind('. ', current_pos, chunk_end),
-                text.rfind('! ', current_pos, chunk_end),
-                text.rfind('? ', current_pos, chunk_end)
-            )
-            
-            if last_break > current_pos:
-                chunk_end = last_break + 1
+    Args:
+        documents: Iterable of documents with 'content' and 'metadata'
+        chunker: Section-aware chunker
+        indexed: List that receives each document's metadata, path, document ID
+            and chunk IDs as it is chunked
         
-        # Get the chunk text
-        chunk_text = text[current_pos:chunk_end].strip()
+    Yields:
+        (chunk ID, chunk text, chunk metadata) tuples
+    """
+    for doc_idx, doc in enumerate(documents):
+        content = doc.get('content', '')
+        metadata = doc.get('metadata', {})
+        logger.info(f"Processing document {doc_idx+1}: {metadata.get('title', 'Untitled')}")
         
-        if chunk_text:
-            chunks.append(chunk_text)
+        # Same ID scheme as RAGService.sync_knowledge_base, so a later sync does not duplicate chunks
+        doc_id = document_id_for_path(doc['path'])
+        chunks = chunker.chunk(content)
+        chunk_ids = content_chunk_ids(doc_id, chunks)
+        indexed.append({"metadata": metadata, "path": doc['path'], "document_id": doc_id, "chunk_ids": chunk_ids})
         
-        # Move position with overlap
-        current_pos = chunk_end - chunk_overlap
-    
-    return chunks
+        for i, (chunk_id, chunk) in enumerate(zip(chunk_ids, chunks)):
+            chunk_metadata = metadata.copy()
+            chunk_metadata['chunk_id'] = chunk_id
+            chunk_metadata['document_id'] = doc_id
+            chunk_metadata['chunk_index'] = i
+            chunk_metadata['total_chunks'] = len(chunks)
+            chunk_metadata['section_path'] = chunk['section_path']
+            yield chunk_id, chunk['text'], chunk_metadata
 
-def get_memory_usage():
-    """Get the current memory usage percentage."""
+def get_peak_memory_mb() -> Optional[float]:
+    """Get the peak resident memory of this process in MB, if the platform reports it."""
     try:
-        import psutil
-        process = psutil.Process(os.getpid())
-        memory_percent = process.memory_percent()
-        return memory_percent
+        import resource
     except ImportError:
-        logger.warning("psutil not installed, cannot monitor memory usage")
-        return 0.0
-    except Exception as e:
-        logger.warning(f"Error checking memory usage: {e}")
-        return 0.0
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
 
 def initialize_rag_system(lightweight=False):
     """
@@ -168,150 +150,106 @@ def initialize_rag_system(lightweight=False):
     app_dir = Path(__file__).resolve().parent.parent
     app_data_dir = app_dir / "app" / "data" / "sla_examples"
     backup_data_dir = app_dir / "data" / "sla_examples"
+    examples_dir = Path(__file__).resolve().parent.parent.parent / "examples"
     
-    # First check the app data directory
-    logger.info(f"Checking for documents in {app_data_dir}")
-    documents = load_sla_examples(str(app_data_dir))
-    
-    # If no documents found, check the backup directory
-    if not documents:
-        logger.info(f"No documents found, checking backup directory {backup_data_dir}")
-        documents = load_sla_examples(str(backup_data_dir))
+    # Use the first directory that has documents: app data, then backup, then examples
+    source_dir = None
+    for directory in (app_data_dir, backup_data_dir, examples_dir):
+        logger.info(f"Checking for documents in {directory}")
+        if list_sla_files(str(directory)):
+            source_dir = directory
+            break
     
-    # If still no documents, check examples directory
-    if not documents:
-        examples_dir = Path(__file__).resolve().parent.parent.parent / "examples"
-        logger.info(f"No documents found, checking examples directory {examples_dir}")
-        documents = load_sla_examples(str(examples_dir))
-    
-    if not documents:
+    if source_dir is None:
         logger.error("No SLA documents found to process")
         return False
     
-    logger.info(f"Processing {len(documents)} documents")
-    
     # Get vector store
     vector_store = get_vector_store()
     
-    # The vector_store already handles collection creation
-    logger.info("Using vector store's built-in collection management")
-    collection = vector_store.collection
-    
     # Configure based on lightweight mode
     if lightweight:
         logger.info("Using lightweight settings for memory-constrained environments")
-        actual_max_docs = LIGHTWEIGHT_MAX_DOCS
         actual_batch_size = LIGHTWEIGHT_BATCH_SIZE
-        actual_memory_percent = LIGHTWEIGHT_MEMORY_PERCENT
-        actual_chunk_size = LIGHTWEIGHT_CHUNK_SIZE
-        
-        # Clear Python's memory cache for additional safety
-        import gc
-        gc.collect()
+        actual_chunk_tokens = LIGHTWEIGHT_CHUNK_TOKENS
     else:
-        actual_max_docs = MAX_DOCS_TO_PROCESS
         actual_batch_size = BATCH_SIZE
-        actual_memory_percent = MAX_MEMORY_PERCENT
-        actual_chunk_size = CHUNK_SIZE
-    
-    # Process documents in batches
-    documents_to_process = documents[:actual_max_docs]
-    total_docs = len(documents_to_process)
-    total_batches = (total_docs + actual_batch_size - 1) // actual_batch_size
+        actual_chunk_tokens = CHUNK_TOKENS
     
-    logger.info(f"Processing {total_docs} documents in {total_batches} batches")
+    # Documents are read, chunked, embedded and written one batch of chunks at a
+    # time, so memory stays flat however many documents there are
+    logger.info(f"Streaming documents from {source_dir} in batches of {actual_batch_size} chunks")
+    # Chunks written under positional IDs by earlier versions of this script would be duplicated
+    vector_store.delete_legacy_chunks()
+    indexed: List[Dict[str, Any]] = []
+    chunker = StructuredChunker(actual_chunk_tokens, vector_store.chunker.count_tokens)
+    chunks = iter_document_chunks(load_sla_examples(str(source_dir)), chunker, indexed)
+    chunk_count = vector_store.add_chunk_stream(chunks, batch_size=actual_batch_size)
     
-    batch_num = 0
-    for batch_start in range(0, total_docs, actual_batch_size):
-        batch_num += 1
-        batch_end = min(batch_start + actual_batch_size, total_docs)
-        batch = documents_to_process[batch_start:batch_end]
-        
-        logger.info(f"Processing batch {batch_num}/{total_batches} (docs {batch_start+1}-{batch_end})")
-        
-        # If in lightweight mode, pause between batches to let system recover
-        if lightweight and batch_num > 1:
-            import time
-            logger.info("Pausing to let system memory recover...")
-            time.sleep(2)  # 2-second pause
-        
-        # Process each document in the batch
-        for batch_idx, doc in enumerate(batch):
-            doc_idx = batch_start + batch_idx
-            content = doc.get('content', '')
-            metadata = doc.get('metadata', {})
-            
-            # Check memory usage periodically
-            if doc_idx % MEMORY_CHECK_INTERVAL == 0:
-                mem_usage = get_memory_usage()
-                logger.info(f"Memory usage: {mem_usage:.1f}%")
-                
-                if mem_usage > actual_memory_percent:
-                    logger.warning(f"Memory usage too high ({mem_usage:.1f}%), stopping processing")
-                    break
-            
-            logger.info(f"Processing document {doc_idx+1}/{total_docs}: {metadata.get('title', 'Untitled')}")
-            
-            # Create chunks from document using the appropriate chunk size
-            chunks = create_text_chunks(content, chunk_size=actual_chunk_size)
-            
-            # Force memory cleanup after chunking
-            if lightweight:
-                gc.collect()
-            
-            # Add chunks in mini-batches to reduce memory pressure
-            chunk_docs = []
-            chunk_metadatas = []
-            chunk_ids = []
-            
-            for i, chunk in enumerate(chunks):
-                chunk_metadata = metadata.copy()
-                chunk_metadata['chunk_id'] = f"{doc_idx}-{i}"
-                chunk_metadata['chunk_index'] = i
-                chunk_metadata['total_chunks'] = len(chunks)
-                
-                chunk_docs.append(chunk)
-                chunk_metadatas.append(chunk_metadata)
-                chunk_ids.append(f"doc{doc_idx}_chunk{i}")
-                
-                # Add in mini-batches of 10 chunks
-                if len(chunk_docs) >= 10 or i == len(chunks) - 1:
-                    try:
-                        # Add to collection
-                        collection.add(
-                            documents=chunk_docs,
-                            metadatas=chunk_metadatas,
-                            ids=chunk_ids
-                        )
-                        
-                        # Clear lists after adding
-                        chunk_docs = []
-                        chunk_metadatas = []
-                        chunk_ids = []
-                        
-                        # Force garbage collection to free memory
-                        if lightweight:
-                            gc.collect()
-                    except Exception as e:
-                        logger.error(f"Error adding chunks: {str(e)}")
-                        # Continue with next mini-batch
+    if not indexed:
+        logger.error("No SLA documents found to process")
+        return False
     
     # Add information about indexed documents to the vector store directory
     index_info = {
-        "document_count": len(documents),
-        "chunk_count": sum(len(create_text_chunks(doc.get('content', ''))) for doc in documents),
+        "document_count": len(indexed),
+        "chunk_count": chunk_count,
         "indexed_at": str(Path.ctime(Path.cwd())),
-        "documents": [doc.get('metadata', {}) for doc in documents]
+        "documents": [doc["metadata"] for doc in indexed]
     }
     
     # Save index info to file
     vector_db_dir = app_dir / "data" / "vector_db"
     os.makedirs(vector_db_dir, exist_ok=True)
     
-    with open(vector_db_dir / "indexed_documents.json", 'w') as f:
+    # Preserve per-file sync state written by RAGService.sync_knowledge_base
+    manifest_path = vector_db_dir / "indexed_documents.json"
+    files = {}
+    if manifest_path.exists():
+        try:
+            with open(manifest_path, 'r') as f:
+                files = json.load(f).get("files", {})
+        except (OSError, json.JSONDecodeError):
+            pass
+    
+    # Track the files indexed here so a later sync skips them instead of re-adding them
+    for doc in indexed:
+        previous = set(files.get(doc["path"], {}).get("chunk_ids", []))
+        vector_store.delete_chunks(sorted(previous - set(doc["chunk_ids"])))
+        stat = os.stat(doc["path"])
+        files[doc["path"]] = {
+            "document_id": doc["document_id"],
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "sha256": hash_file(doc["path"]),
+            "chunk_ids": doc["chunk_ids"],
+            "metadata": doc["metadata"]
+        }
+    index_info["files"] = files
+    
+    with open(manifest_path, 'w') as f:
         json.dump(index_info, f, indent=2)
     
-    logger.info(f"Successfully initialized RAG system with {len(documents)} documents")
+    # The keyword and dense indexes were updated batch by batch during ingestion
+    index_stats = vector_store.get_index_stats()
+    keyword_stats = index_stats["keyword"]
+    logger.info(f"Keyword index: {keyword_stats['documents']} chunks, {keyword_stats['terms']} terms")
+    
+    dense_stats = index_stats["dense"]
+    if dense_stats:
+        logger.info(f"Dense index: {dense_stats['rows']} chunks as {dense_stats['mode']} "
+                    f"({dense_stats['compression']:.1f}x smaller than float32)")
+    
+    cache_stats = vector_store.get_embedding_cache_stats()
+    if cache_stats:
+        logger.info(f"Embedding cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                    f"({cache_stats['hit_rate']:.0%} hit rate)")
+    
+    peak_memory = get_peak_memory_mb()
+    if peak_memory is not None:
+        logger.info(f"Peak memory: {peak_memory:.0f} MB")
+    
+    logger.info(f"Successfully initialized RAG system with {len(indexed)} documents ({chunk_count} chunks)")
     return True
 
 def main():
@@ -326,18 +264,16 @@ def main():
     # If minimal mode is requested, override lightweight
     if args.minimal:
         args.lightweight = True
-        global LIGHTWEIGHT_BATCH_SIZE, LIGHTWEIGHT_MAX_DOCS, LIGHTWEIGHT_CHUNK_SIZE, LIGHTWEIGHT_MEMORY_PERCENT
-        LIGHTWEIGHT_BATCH_SIZE = 1
-        LIGHTWEIGHT_MAX_DOCS = 20
-        LIGHTWEIGHT_CHUNK_SIZE = 200
-        LIGHTWEIGHT_MEMORY_PERCENT = 50
+        global LIGHTWEIGHT_BATCH_SIZE, LIGHTWEIGHT_CHUNK_TOKENS
+        LIGHTWEIGHT_BATCH_SIZE = 4
+        LIGHTWEIGHT_CHUNK_TOKENS = 64
     
     print("=" * 80)
     print("RAG System Initialization (Optimized Version)")
     print("=" * 80)
     
     if args.minimal:
-        print("Using MINIMAL mode - lowest memory usage, reduced document set")
+        print("Using MINIMAL mode - lowest memory usage, smallest batches")
     elif args.lightweight:
         print("Using LIGHTWEIGHT mode - reduced memory usage")
     
@@ -349,14 +285,6 @@ def main():
     except:
         print("Unable to retrieve system memory information")
     
-    # Try to install psutil if missing
-    try:
-        import psutil
-    except ImportError:
-        print("Installing psutil for memory monitoring...")
-        import subprocess
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "psutil"])
-    
     success = initialize_rag_system(lightweight=args.lightweight)
     
     if success:
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+"""
+Unit tests for the Ollama provider
+"""
+
+import sys
+import os
+import asyncio
+import unittest
+import logging
+
+import httpx
+
+# Add the parent directory to the path so we can import our app modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Disable INFO logging for cleaner test output
+logging.basicConfig(level=logging.WARNING)
+
+class TestOllamaProvider(unittest.TestCase):
+    """Test cases for the OllamaProvider HTTP client handling."""
+    
+    def _provider_with_transport(self, handler):
+        """Create a provider whose pooled client is served by a mock transport."""
+        from app.services.ollama_provider import OllamaProvider
+        
+        provider = OllamaProvider()
+        provider._client = httpx.AsyncClient(base_url=provider.api_url, transport=httpx.MockTransport(handler))
+        return provider
+    
+    def test_health_check_is_cached(self):
+        """Test that repeated generations reuse one health check."""
+        calls = []
+        
+        def handler(request):
+            calls.append(request.url.path)
+            if request.url.path == "/api/tags":
+                return httpx.Response(200, json={"models": [{"name": "mistral:latest"}]})
+            return httpx.Response(200, json={"response": "ok"})
+        
+        provider = self._provider_with_transport(handler)
+        messages = [{"role": "user", "content": "Hello"}]
+        
+        async def scenario():
+            first = await provider.generate_response(messages)
+            second = await provider.generate_response(messages)
+            await provider.aclose()
+            return first, second
+        
+        self.assertEqual(asyncio.run(scenario()), ("ok", "ok"))
+        self.assertEqual(calls.count("/api/tags"), 1)
+        self.assertEqual(calls.count("/api/generate"), 2)
+    
+    def test_fallback_does_not_switch_the_shared_model(self):
+        """Test that a fallback passes its model per request instead of switching the shared provider."""
+        import json
+        requested = []
+        
+        def handler(request):
+            if request.url.path == "/api/tags":
+                return httpx.Response(200, json={"models": [{"name": "mistral:latest"}]})
+            # Concurrent requests read provider.model while the fallback is in flight
+            requested.append((json.loads(request.content)["model"], provider.model))
+            return httpx.Response(200, json={"response": "ok"})
+        
+        provider = self._provider_with_transport(handler)
+        provider.model = "mistral"
+        
+        async def scenario():
+            result = await provider.fallback_to_smaller_model([{"role": "user", "content": "Hello"}])
+            await provider.aclose()
+            return result
+        
+        result = asyncio.run(scenario())
+        
+        self.assertTrue(result.startswith("[Response generated using fallback model mistral:7b]"))
+        self.assertEqual(requested, [("mistral:7b", "mistral")])
+    
+    def test_manage_context_keeps_latest_message(self):
+        """Test that pruning an oversized conversation never drops the current turn."""
+        from app.services.ollama_provider import OllamaProvider
+        
+        provider = OllamaProvider()
+        messages = [
+            {"role": "system", "content": "s" * 400},
+            {"role": "user", "content": "first question"},
+            {"role": "assistant", "content": "a" * 400},
+            {"role": "user", "content": "latest question " + "q" * 300},
+        ]
+        
+        pruned = asyncio.run(provider.manage_context(messages, max_tokens=200))
+        
+        self.assertEqual([m["role"] for m in pruned], ["system", "user", "user"])
+        self.assertEqual(pruned[1]["content"], "first question")
+        self.assertTrue(pruned[-1]["content"].startswith("latest question"))
+    
+    def test_token_counts_are_cached_per_text(self):
+        """Test that token counts come from the model tokenizer and are cached by hash."""
+        from unittest import mock
+        from app.services.tokenizer import TokenCounter, MESSAGE_OVERHEAD_TOKENS, load_tokenizer
+        
+        tokenizer = mock.MagicMock()
+        tokenizer.count.side_effect = lambda text: len(text.split())
+        counter = TokenCounter(tokenizer, cache_size=2)
+        messages = [{"role": "user", "content": "one two three"}, {"role": "assistant", "content": "four"}]
+        
+        self.assertEqual(counter.count_messages(messages), [3 + MESSAGE_OVERHEAD_TOKENS, 1 + MESSAGE_OVERHEAD_TOKENS])
+        self.assertEqual(counter.count_messages(messages), [3 + MESSAGE_OVERHEAD_TOKENS, 1 + MESSAGE_OVERHEAD_TOKENS])
+        self.assertEqual(tokenizer.count.call_count, 2)
+        self.assertEqual(counter.stats()["hits"], 2)
+        
+        # Models without a local vocabulary fall back to the estimate
+        self.assertEqual(load_tokenizer("no-such-model:latest").name, "estimate")
+    
+    def test_transient_errors_are_retried(self):
+        """Test that a dropped connection is retried with backoff."""
+        from app.services import ollama_provider
+        
+        attempts = []
+        
+        def handler(request):
+            attempts.append(request.url.path)
+            if len(attempts) == 1:
+                raise httpx.ConnectError("connection refused", request=request)
+            return httpx.Response(200, json={"response": "recovered"})
+        
+        provider = self._provider_with_transport(handler)
+        original_backoff = ollama_provider.OLLAMA_RETRY_BACKOFF
+        ollama_provider.OLLAMA_RETRY_BACKOFF = 0
+        self.addCleanup(setattr, ollama_provider, "OLLAMA_RETRY_BACKOFF", original_backoff)
+        
+        async def scenario():
+            response = await provider._post_with_retry("/api/generate", {"prompt": "Hello"})
+            await provider.aclose()
+            return response
+        
+        response = asyncio.run(scenario())
+        self.assertEqual(response.json()["response"], "recovered")
+        self.assertEqual(len(attempts), 2)
+
+    def test_closing_stream_stops_without_extra_text(self):
+        """Test that closing a stream early emits nothing after the last token."""
+        import json
+        
+        lines = [json.dumps({"response": token, "done": False}) for token in ["Hel", "lo", " there"]]
+        
+        def handler(request):
+            return httpx.Response(200, content="\n".join(lines).encode())
+        
+        provider = self._provider_with_transport(handler)
+        messages = [{"role": "user", "content": "Hello"}]
+        
+        async def scenario():
+            received = []
+            stream = provider.stream_response(messages)
+            async for token in stream:
+                received.append(token)
+                if len(received) == 2:
+                    break
+            await stream.aclose()
+            await provider.aclose()
+            return received
+        
+        self.assertEqual(asyncio.run(scenario()), ["Hel", "lo"])
+
+if __name__ == "__main__":
+    unittest.main()
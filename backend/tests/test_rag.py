@@ -5,6 +5,9 @@ Unit tests for the RAG implementation
 
 import sys
 import os
+import json
+import shutil
+import tempfile
 import unittest
 from unittest import mock
 import logging
@@ -29,7 +32,7 @@ class TestVectorStore(unittest.TestCase):
         # Check they're the same instance
         self.assertIs(store1, store2)
 
-    @mock.patch('app.services.vector_store.SentenceTransformer')
+    @mock.patch("sentence_transformers.SentenceTransformer")
     def test_add_and_search_documents(self, mock_transformer):
         """Test adding documents and searching them."""
         # Mock the embedding model to avoid loading actual model
@@ -50,6 +53,17 @@ class TestVectorStore(unittest.TestCase):
         mock_collection = mock.MagicMock()
         store.collection = mock_collection
         
+        # Keep mocked embeddings out of the real on-disk embedding cache
+        from app.services.embedding_cache import EmbeddingCache
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        store.embedding_cache = EmbeddingCache(os.path.join(cache_dir, "cache.sqlite3"))
+        self.addCleanup(store.embedding_cache.close)
+        keyword_patch = mock.patch('app.services.vector_store.KEYWORD_INDEX_DIRECTORY', os.path.join(cache_dir, "bm25"))
+        keyword_patch.start()
+        self.addCleanup(keyword_patch.stop)
+        mock_collection.get.return_value = {"ids": [], "documents": []}
+        
         # Test adding documents
         documents = [
             {"content": "This is a test document about cloud databases."}
@@ -61,10 +75,11 @@ class TestVectorStore(unittest.TestCase):
         store.add_documents(documents, metadata)
         
         # Verify document was processed and added
-        mock_collection.add.assert_called_once()
+        mock_collection.upsert.assert_called_once()
         
         # Mock search results
         mock_collection.query.return_value = {
+            "ids": [["doc_0_chunk_0"]],
             "documents": [["This is a test document about cloud databases."]],
             "metadatas": [[{"source": "test", "industry": "it", "chunk_id": "doc_0_chunk_0"}]],
             "distances": [[0.2]]
@@ -83,9 +98,899 @@ class TestVectorStore(unittest.TestCase):
         self.assertIn("score", results[0])
         self.assertEqual(results[0]["content"], "This is a test document about cloud databases.")
 
+    @mock.patch("sentence_transformers.SentenceTransformer")
+    def test_repeated_queries_skip_the_model(self, mock_transformer):
+        """Test that query embeddings are served from the in-memory query cache."""
+        from app.services.vector_store import VectorStore
+        VectorStore._instance = None
+        mock_model = mock_transformer.return_value
+        mock_model.encode.side_effect = lambda texts: [[float(len(text)), 1.0] for text in texts]
+        store = VectorStore()
+        store.embedding_batcher = None
+        
+        first = store._embed_queries(["uptime", "hipaa"])
+        second = store._embed_queries(["hipaa", "uptime", "hipaa"])
+        
+        self.assertEqual(second, [first[1], first[0], first[1]])
+        self.assertEqual(mock_model.encode.call_count, 1)
+        stats = store.get_query_embedding_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (3, 2, 2))
+
+    @mock.patch("sentence_transformers.SentenceTransformer")
+    def test_document_stream_is_ingested_in_bounded_batches(self, mock_transformer):
+        """Test that streamed documents are embedded and written one bounded batch at a time."""
+        from app.services.vector_store import VectorStore
+        VectorStore._instance = None
+        store = VectorStore()
+        store.collection = mock.MagicMock()
+        store.collection.count.return_value = 0
+        store._get_embeddings = lambda texts: [[0.1, 0.2]] * len(texts)
+        store.chunker = mock.MagicMock()
+        store.chunker.chunk.side_effect = lambda text: [
+            {"text": part, "section_path": "1. Scope"} for part in text.split("|")
+        ]
+        index_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, index_dir, ignore_errors=True)
+        for name in ("KEYWORD_INDEX_DIRECTORY", "DENSE_INDEX_DIRECTORY"):
+            patcher = mock.patch(f'app.services.vector_store.{name}', os.path.join(index_dir, name))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        
+        pulled = []
+        batches_at_pull = []
+        
+        def documents():
+            for i in range(10):
+                batches_at_pull.append(store.collection.upsert.call_count)
+                pulled.append(i)
+                yield "a|b|c", {"id": f"doc_{i}"}
+        
+        stored = store.add_document_stream(documents(), batch_size=4)
+        
+        self.assertEqual(stored, 30)
+        sizes = [len(call.kwargs["ids"]) for call in store.collection.upsert.call_args_list]
+        self.assertEqual(sizes, [4] * 7 + [2])
+        # Documents are pulled lazily as batches are written, not all up front
+        self.assertEqual(batches_at_pull[-1], 6)
+        # Chunk IDs are content-derived, as for upsert_document
+        first_ids = store.collection.upsert.call_args_list[0].kwargs["ids"][:3]
+        self.assertEqual(len(set(first_ids)), 3)
+        self.assertTrue(all(chunk_id.startswith("doc_0_") and "_chunk_" not in chunk_id for chunk_id in first_ids))
+
+    @mock.patch("sentence_transformers.SentenceTransformer")
+    def test_list_metadata_is_flattened_for_filters(self, mock_transformer):
+        """Test that documents with list metadata are stored with the flag keys filters match."""
+        from app.services.metadata_filters import metadata_filter
+        from app.services.vector_store import VectorStore
+        VectorStore._instance = None
+        store = VectorStore()
+        store.collection = mock.MagicMock()
+        store._get_embeddings = lambda texts: [[1.0, 0.0] for _ in texts]
+        for name in ("_load_indexes", "_index_keywords", "_index_vectors", "save_indexes"):
+            setattr(store, name, mock.MagicMock())
+        
+        store.add_documents(
+            [{"content": "# Access\nPHI access is logged and reviewed monthly."}],
+            [{"id": "doc_hipaa", "industry": "healthcare", "compliance_frameworks": ["HIPAA", "SOC2"]}]
+        )
+        stored = store.collection.upsert.call_args.kwargs["metadatas"]
+        
+        where = metadata_filter({"compliance_framework": "HIPAA", "industry": "healthcare"})
+        self.assertTrue(stored)
+        for metadata in stored:
+            self.assertTrue(all(isinstance(value, (str, int, float, bool)) for value in metadata.values()))
+            self.assertEqual(metadata["compliance_frameworks"], "HIPAA, SOC2")
+            # Every condition of the filter matches the stored chunk
+            for condition in where["$and"]:
+                (key, clause), = condition.items()
+                self.assertEqual(metadata.get(key), clause["$eq"])
+
+    @mock.patch("sentence_transformers.SentenceTransformer")
+    def test_legacy_positional_chunks_are_deleted(self, mock_transformer):
+        """Test that chunks with positional IDs are found page by page and deleted."""
+        from app.services.vector_store import VectorStore
+        VectorStore._instance = None
+        store = VectorStore()
+        ids = ["doc_0_chunk_0", "doc3_chunk1", "doc_0123456789abcdef_0123456789abcdef", "upload_1a2b"]
+        store.collection = mock.MagicMock()
+        store.collection.get.side_effect = lambda include, limit, offset: {"ids": ids[offset:offset + limit]}
+        store.delete_chunks = mock.MagicMock()
+        
+        self.assertEqual(store.delete_legacy_chunks(page_size=2), 2)
+        store.delete_chunks.assert_called_once_with(["doc_0_chunk_0", "doc3_chunk1"])
+
+    @mock.patch("sentence_transformers.SentenceTransformer")
+    def test_dense_index_is_rebuilt_page_by_page(self, mock_transformer):
+        """Test that the quantized index is rebuilt from bounded pages of stored embeddings."""
+        from app.services.vector_store import VectorStore
+        VectorStore._instance = None
+        store = VectorStore()
+        ids = [f"chunk_{i}" for i in range(5)]
+        store.collection = mock.MagicMock()
+
+        def get(include, limit=None, offset=0):
+            if limit is None:
+                return {"ids": ids}
+            self.assertLessEqual(limit, 2)
+            return {"ids": ids[offset:offset + limit], "embeddings": [[float(i), 1.0] for i in range(offset, min(offset + limit, 5))]}
+
+        store.collection.get.side_effect = get
+        index_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, index_dir, ignore_errors=True)
+        for name, value in (("DENSE_INDEX_DIRECTORY", index_dir), ("INDEX_REBUILD_PAGE_SIZE", 2),
+                            ("EMBEDDING_QUANTIZATION", "int8")):
+            patcher = mock.patch(f'app.services.vector_store.{name}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        index = store._get_dense_index()
+
+        self.assertEqual(len(index), 5)
+        self.assertTrue(all(chunk_id in index for chunk_id in ids))
+
+
+    @mock.patch("sentence_transformers.SentenceTransformer")
+    def test_keyword_index_reloads_after_another_worker_ingests(self, mock_transformer):
+        """Test that a stale keyword index is reloaded in the background, at most once per interval."""
+        from app.services.bm25_index import BM25Index
+        from app.services.vector_store import VectorStore
+        VectorStore._instance = None
+        store = VectorStore()
+        chunks = {"chunk_a": "Backups run nightly."}
+        store.collection = mock.MagicMock()
+        store.collection.count.side_effect = lambda: len(chunks)
+
+        def get(ids=None, where=None, include=(), limit=None, offset=0):
+            selected = [chunk_id for chunk_id in chunks if ids is None or chunk_id in ids]
+            if ids is None:
+                # Full reads of the collection are paged
+                self.assertEqual(limit, 1)
+                selected = selected[offset:offset + limit]
+            return {"ids": selected, "documents": [chunks[i] for i in selected], "metadatas": [{} for _ in selected]}
+
+        store.collection.get.side_effect = get
+        index_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, index_dir, ignore_errors=True)
+        for name, value in (("KEYWORD_INDEX_DIRECTORY", index_dir), ("INDEX_REBUILD_PAGE_SIZE", 1),
+                            ("KEYWORD_INDEX_REFRESH_INTERVAL", 60)):
+            patcher = mock.patch(f'app.services.vector_store.{name}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        store._keyword_index = None
+
+        self.assertEqual([r["id"] for r in store.keyword_search("backups")], ["chunk_a"])
+
+        # Another worker ingests a chunk and persists its own copy of the index
+        chunks["chunk_b"] = "Encryption keys rotate yearly."
+        other = BM25Index()
+        other.add_many(list(chunks.items()))
+        other.save(index_dir)
+
+        # Within the refresh interval the loaded index is used without checking the collection
+        self.assertEqual(store.keyword_search("encryption keys"), [])
+        store.collection.count.assert_not_called()
+
+        # Once the interval has passed the stale index is reloaded off the request path
+        store._keyword_index_checked_at -= 60
+        self.assertEqual(store.keyword_search("encryption keys"), [])
+        refresh = store._keyword_refresh_thread
+        if refresh is not None:
+            refresh.join(timeout=5)
+        self.assertEqual([r["id"] for r in store.keyword_search("encryption keys")], ["chunk_b"])
+
+    @mock.patch("sentence_transformers.SentenceTransformer")
+    def test_quantized_search_filters_before_selecting_candidates(self, mock_transformer):
+        """Test that a selective filter still fills top_k and scores match the collection query."""
+        import numpy as np
+        from app.services.quantized_index import QuantizedEmbeddingIndex
+        from app.services.vector_store import VectorStore
+        VectorStore._instance = None
+        store = VectorStore()
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(50, 8)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        ids = [f"chunk_{i}" for i in range(50)]
+        # Only the chunks least similar to the query match the filter
+        query = vectors[0]
+        matching = [ids[i] for i in np.argsort(vectors @ query)[:3]]
+        
+        store.collection = mock.MagicMock()
+        
+        def get(ids=None, where=None, include=()):
+            selected = matching if where else ids
+            rows = [int(chunk_id.split("_")[1]) for chunk_id in selected]
+            return {"ids": selected, "documents": [f"text {i}" for i in rows],
+                    "metadatas": [{} for _ in rows], "embeddings": [vectors[i].tolist() for i in rows]}
+        
+        store.collection.get.side_effect = get
+        index = QuantizedEmbeddingIndex("int8")
+        index.add_many(ids, vectors)
+        store._get_dense_index = lambda: index
+        
+        results = store._quantized_search_many([query.tolist()], 3, {"industry": {"$eq": "healthcare"}})[0]
+        
+        self.assertEqual(sorted(r["id"] for r in results), sorted(matching))
+        for result in results:
+            row = int(result["id"].split("_")[1])
+            self.assertAlmostEqual(result["score"], 1.0 - float(np.sum((query - vectors[row]) ** 2)), places=5)
+
+class TestStructuredChunker(unittest.TestCase):
+    """Test cases for the section-aware chunker."""
+    
+    def test_chunks_follow_sections_and_keep_tables_whole(self):
+        """Test section paths, token limits and that tables are never split."""
+        from app.services.chunker import StructuredChunker
+        
+        table = "\n".join(["| Tier | Uptime | Credit |"] + [f"| Tier {i} | 99.{i}% | {i}0% |" for i in range(20)])
+        document = (
+            "# Hospital EHR SLA\n\n"
+            "## 4. Availability\n\n"
+            "The EHR platform shall be available 99.95% of each calendar month.\n\n"
+            "### 4.2 Maintenance\n\n"
+            + "Maintenance is announced seven days ahead. " * 30 + "\n\n"
+            + table + "\n\n"
+            "5. Support\n"
+            "- **Response Time**: 15 minutes\n"
+            "- **Resolution Time**: 4 hours\n"
+        )
+        chunks = StructuredChunker(max_tokens=64).chunk(document)
+        
+        self.assertEqual(chunks[0]["section_path"], "Hospital EHR SLA > 4. Availability")
+        self.assertTrue(chunks[0]["text"].startswith("# Hospital EHR SLA\n\n## 4. Availability"))
+        maintenance = [c for c in chunks if c["section_path"].endswith("4.2 Maintenance")]
+        self.assertGreater(len(maintenance), 2)
+        for chunk in maintenance:
+            if table not in chunk["text"]:
+                self.assertLessEqual(chunk["tokens"], 64)
+                self.assertTrue(chunk["text"].rstrip().endswith("."))
+        # The table exceeds the limit but stays in one chunk
+        self.assertEqual(sum(table in c["text"] for c in chunks), 1)
+        self.assertEqual(chunks[-1]["section_path"], "5. Support")
+        self.assertIn("- **Resolution Time**: 4 hours", chunks[-1]["text"])
+
+    def test_numbered_lists_are_not_headings(self):
+        """Test that a numbered severity list stays one list block in its section."""
+        from app.services.chunker import StructuredChunker, parse_blocks
+
+        severity_list = (
+            "1. Critical outage of the EHR\n"
+            "2. Major degradation of clinical workflows\n"
+            "3. Minor issue"
+        )
+        document = (
+            "3. Incident Severity\n\n"
+            + severity_list + "\n\n"
+            "24 hours a day support by phone is included.\n"
+        )
+        blocks = parse_blocks(document)
+
+        self.assertEqual([b["kind"] for b in blocks], ["heading", "list", "text"])
+        self.assertEqual({tuple(b["section_path"]) for b in blocks}, {("3. Incident Severity",)})
+        chunks = StructuredChunker(max_tokens=16).chunk(document)
+        self.assertEqual(sum(severity_list in c["text"] for c in chunks), 1)
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    """Test cases for the persistent EmbeddingCache."""
+    
+    def setUp(self):
+        from app.services.embedding_cache import EmbeddingCache
+        
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.cache_dir, "cache.sqlite3")
+        self.cache = EmbeddingCache(self.cache_path)
+        
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+    
+    def test_round_trip_and_counters(self):
+        """Test that stored vectors are returned and hits/misses are counted."""
+        self.cache.put_many("model-a", ["alpha"], [[0.5, -1.0, 2.0]])
+        
+        results = self.cache.get_many("model-a", ["alpha", "beta"])
+        
+        self.assertEqual(results[0], [0.5, -1.0, 2.0])
+        self.assertIsNone(results[1])
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["entries"], 1)
+    
+    def test_keys_include_model_name(self):
+        """Test that the same text under a different model is a miss."""
+        self.cache.put_many("model-a", ["alpha"], [[1.0, 2.0]])
+        
+        self.assertEqual(self.cache.get_many("model-b", ["alpha"]), [None])
+    
+    def test_shared_across_connections(self):
+        """Test that a second cache instance on the same file sees stored vectors."""
+        from app.services.embedding_cache import EmbeddingCache
+        
+        self.cache.put_many("model-a", ["alpha"], [[1.0, 2.0]])
+        other = EmbeddingCache(self.cache_path)
+        self.addCleanup(other.close)
+        
+        self.assertEqual(other.get_many("model-a", ["alpha"]), [[1.0, 2.0]])
+    
+    def test_lru_eviction_by_size(self):
+        """Test that the least recently used vectors are evicted past the size cap."""
+        # Each 4-dim float32 vector takes 16 bytes; allow two of them
+        self.cache.max_bytes = 32
+        self.cache.put_many("m", ["one", "two"], [[1.0] * 4, [2.0] * 4])
+        self.cache.get_many("m", ["one"])  # "one" is now more recent than "two"
+        self.cache.put_many("m", ["three"], [[3.0] * 4])
+        
+        self.assertIsNone(self.cache.get_many("m", ["two"])[0])
+        self.assertIsNotNone(self.cache.get_many("m", ["one"])[0])
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_running_total_counts_replaced_vectors_once(self):
+        """Test that rewriting a cached vector does not inflate the size used for eviction."""
+        self.cache.max_bytes = 32
+        self.cache.put_many("m", ["one", "two"], [[1.0] * 4, [2.0] * 4])
+
+        with mock.patch.object(self.cache, "_sum_bytes_locked") as scan:
+            self.cache.put_many("m", ["one", "one"], [[1.5] * 4, [1.5] * 4])
+
+        scan.assert_not_called()
+        self.assertEqual(self.cache._total_bytes, 32)
+        self.assertEqual(self.cache.stats()["evictions"], 0)
+
+    def test_query_cache_evicts_least_recently_used(self):
+        """Test that the in-memory query cache keeps the most recently used queries."""
+        from app.services.embedding_cache import QueryEmbeddingCache
+        
+        query_cache = QueryEmbeddingCache(max_entries=2)
+        query_cache.put_many(["a", "b"], [[1.0], [2.0]])
+        query_cache.get_many(["a"])
+        query_cache.put_many(["c"], [[3.0]])
+        
+        self.assertEqual(query_cache.get_many(["a", "b", "c"]), [[1.0], None, [3.0]])
+        self.assertEqual(query_cache.stats()["evictions"], 1)
+
+class TestVectorStoreServer(unittest.TestCase):
+    """Test cases for the shared vector store server and its client."""
+
+    def setUp(self):
+        import asyncio
+        import threading
+        from app.services.vector_store_server import VectorStoreServer
+
+        self.socket_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.socket_dir, "vs.sock")
+        self.store = mock.MagicMock()
+        self.server = VectorStoreServer(self.store, self.socket_path, read_workers=2)
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(self.server.start(), self.loop).result(5)
+
+    def tearDown(self):
+        import asyncio
+        asyncio.run_coroutine_threadsafe(self.server.close(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        shutil.rmtree(self.socket_dir, ignore_errors=True)
+
+    def test_client_forwards_calls_to_server(self):
+        """Test that reads, batched writes and errors round-trip over the socket."""
+        import numpy as np
+        from app.services.vector_store_client import RemoteVectorStore
+
+        self.store.search_many.return_value = [[{"id": "c1", "content": "uptime", "metadata": {}, "score": np.float32(0.5)}]]
+        self.store.add_chunk_stream.side_effect = lambda chunks, batch_size: len(chunks)
+        self.store.delete_chunks.side_effect = KeyError("c9")
+        client = RemoteVectorStore(self.socket_path)
+
+        results = client.search_many(["uptime"], top_k=3)
+        stored = client.add_chunk_stream(((f"c{i}", "text", {}) for i in range(5)), batch_size=2)
+        with self.assertRaises(RuntimeError):
+            client.delete_chunks(["c9"])
+
+        self.assertEqual(results, [[{"id": "c1", "content": "uptime", "metadata": {}, "score": 0.5}]])
+        self.store.search_many.assert_called_once_with(["uptime"], 3, None)
+        self.assertEqual(stored, 5)
+        self.assertEqual(self.store.add_chunk_stream.call_count, 3)
+        stats = client.server_stats()
+        self.assertEqual(stats["errors"], 1)
+        self.assertEqual(stats["writer"]["max_workers"], 1)
+
+    def test_client_and_server_expose_the_same_methods(self):
+        """Test that every method the server serves exists on the store and the client."""
+        from app.services.vector_store import VectorStore
+        from app.services.vector_store_client import RemoteVectorStore
+        from app.services.vector_store_server import READ_METHODS, WRITE_METHODS
+
+        for method in READ_METHODS | WRITE_METHODS:
+            self.assertTrue(hasattr(VectorStore, method), method)
+            self.assertTrue(hasattr(RemoteVectorStore, method), method)
+
+        self.store.get_index_stats.return_value = {"keyword": {"documents": 3, "terms": 7}, "dense": {}}
+        client = RemoteVectorStore(self.socket_path)
+        self.assertEqual(client.get_index_stats()["keyword"]["documents"], 3)
+
+class TestRetrievalExecutor(unittest.TestCase):
+    """Test cases for the BoundedExecutor used for async retrieval."""
+    
+    def test_blocking_work_does_not_stall_event_loop(self):
+        """Test that blocking calls run off the loop and are accounted for."""
+        import asyncio
+        import time
+        from app.services.retrieval_executor import BoundedExecutor
+        
+        executor = BoundedExecutor(max_workers=1, max_queue=4, name="test")
+        self.addCleanup(executor.shutdown)
+        
+        async def scenario():
+            retrievals = [asyncio.ensure_future(executor.run(time.sleep, 0.05)) for _ in range(4)]
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            loop_delay = time.perf_counter() - started
+            await asyncio.gather(*retrievals)
+            return loop_delay
+        
+        loop_delay = asyncio.run(scenario())
+        
+        self.assertLess(loop_delay, 0.05)
+        stats = executor.stats()
+        self.assertEqual(stats["completed"], 4)
+        self.assertEqual(stats["queue_depth"], 0)
+        self.assertGreater(stats["max_wait_ms"], 0)
+
+class TestEmbeddingBatcher(unittest.TestCase):
+    """Test cases for micro-batching of concurrent embedding requests."""
+
+    def test_concurrent_requests_share_batches(self):
+        """Test that concurrent requests are encoded together and get their own vectors back."""
+        from concurrent.futures import ThreadPoolExecutor
+        from app.services.embedding_batcher import EmbeddingBatcher
+
+        batch_sizes = []
+        def encode(texts):
+            batch_sizes.append(len(texts))
+            return [[float(len(text))] for text in texts]
+
+        batcher = EmbeddingBatcher(encode, max_batch_size=8, max_wait_ms=50)
+        queries = ["a" * n for n in range(1, 9)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda query: batcher.encode([query]), queries))
+
+        self.assertEqual(results, [[[float(n)]] for n in range(1, 9)])
+        self.assertLess(len(batch_sizes), 8)
+        self.assertEqual(sum(batch_sizes), 8)
+        stats = batcher.stats()
+        self.assertEqual((stats["requests"], stats["texts"]), (8, 8))
+        self.assertEqual(batcher.encode(["x"] * 8), [[1.0]] * 8)
+        self.assertEqual(batcher.stats()["direct"], 1)
+
+    def test_errors_reach_every_caller(self):
+        """Test that a failed batch raises in the waiting caller."""
+        from app.services.embedding_batcher import EmbeddingBatcher
+
+        def encode(texts):
+            raise RuntimeError("model unavailable")
+
+        batcher = EmbeddingBatcher(encode, max_batch_size=8, max_wait_ms=1)
+        with self.assertRaises(RuntimeError):
+            batcher.encode(["query"])
+
+class TestIngestQueue(unittest.TestCase):
+    """Test cases for the background ingestion job queue."""
+    
+    def test_jobs_run_in_background_and_report_status(self):
+        """Test that submit returns a pending job that later reports its outcome."""
+        import asyncio
+        import time
+        from app.services.ingest_queue import IngestQueue
+        
+        queue = IngestQueue(workers=1, max_pending=4)
+        
+        def classify(seconds):
+            time.sleep(seconds)
+            return {"slept": seconds}
+        
+        def fail():
+            raise ValueError("unreadable upload")
+        
+        async def scenario():
+            ok = await queue.submit(classify, 0.05, document_id="doc-1")
+            bad = await queue.submit(fail, document_id="doc-2")
+            submitted = (ok["status"], bad["status"])
+            while queue.get(bad["id"])["status"] not in ("processed", "error"):
+                await asyncio.sleep(0.01)
+            await queue.close()
+            return submitted, queue.get(ok["id"]), queue.get(bad["id"])
+        
+        submitted, ok, bad = asyncio.run(scenario())
+        
+        self.assertEqual(submitted, ("pending", "pending"))
+        self.assertEqual((ok["status"], ok["result"], ok["document_id"]), ("processed", {"slept": 0.05}, "doc-1"))
+        self.assertEqual((bad["status"], bad["error"]), ("error", "unreadable upload"))
+        self.assertEqual(queue.stats()["processed"], 1)
+        self.assertEqual(queue.stats()["failed"], 1)
+
+class TestDocumentRegistry(unittest.TestCase):
+    """Test cases for the document registry and its vector search filters."""
+
+    def setUp(self):
+        """Set up a registry on a temporary SQLite database."""
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.services.document_registry import DocumentRegistry
+
+        self.temp_dir = tempfile.mkdtemp()
+        engine = create_engine(f"sqlite:///{os.path.join(self.temp_dir, 'registry.db')}")
+        self.registry = DocumentRegistry(sessionmaker(bind=engine))
+
+        self.registry.add({"id": "ehr", "filename": "ehr.pdf", "title": "ehr", "file_size": 10,
+                           "industry": "Hospital", "compliance_frameworks": ["HIPAA", "HITECH"]})
+        self.registry.add({"id": "portal", "filename": "portal.pdf", "title": "portal", "file_size": 20,
+                           "industry": "Hospital", "compliance_frameworks": ["GDPR for Health"]})
+        self.registry.update("portal", {"compliance_frameworks": ["HIPAA"], "data_sensitivity": "High"})
+
+    def tearDown(self):
+        """Clean up after tests."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_filters_combine_scalar_and_multi_valued_fields(self):
+        """Test that registry filters match columns and multi-valued fields together."""
+        def ids(filters):
+            return sorted(doc["id"] for doc in self.registry.list_documents(filters))
+
+        self.assertEqual(ids({"industry": "Hospital", "compliance_framework": "HIPAA"}), ["ehr", "portal"])
+        self.assertEqual(ids({"compliance_framework": "GDPR for Health"}), [])
+        self.assertEqual(ids({"compliance_framework": "HIPAA", "data_sensitivity": "High"}), ["portal"])
+        self.assertEqual(self.registry.get("portal")["compliance_frameworks"], ["HIPAA"])
+
+        self.assertEqual(self.registry.delete("ehr")["filename"], "ehr.pdf")
+        self.assertEqual(ids({"compliance_framework": "HITECH"}), [])
+        with self.assertRaises(ValueError):
+            self.registry.list_documents({"owner": "someone"})
+
+    def test_same_filters_push_down_to_vector_search(self):
+        """Test that the filter spec becomes a where clause over flattened chunk metadata."""
+        from app.services.metadata_filters import flatten_metadata, metadata_filter
+
+        metadata = flatten_metadata({"industry": "Hospital", "compliance_frameworks": ["HIPAA", "HITECH"],
+                                     "clinical_specialties": [], "data_sensitivity": None})
+        self.assertEqual(metadata, {"industry": "Hospital", "compliance_frameworks": "HIPAA, HITECH",
+                                    "compliance_framework:HIPAA": True, "compliance_framework:HITECH": True})
+        self.assertEqual(metadata_filter({"industry": ["Hospital", "healthcare"], "compliance_framework": "HIPAA",
+                                          "service_type": None}),
+                         {"$and": [{"industry": {"$in": ["Hospital", "healthcare"]}},
+                                   {"compliance_framework:HIPAA": {"$eq": True}}]})
+        self.assertIsNone(metadata_filter({"industry": None}))
+
+    def test_deleted_upload_is_not_indexed(self):
+        """Test that an upload deleted while its job waits or runs leaves no chunks behind."""
+        from app.api.endpoints import documents
+        
+        upload_path = os.path.join(self.temp_dir, "ehr.txt")
+        with open(upload_path, "w") as f:
+            f.write("EHR hosting with 99.9% uptime")
+        mock_store = mock.MagicMock()
+        mock_store.upsert_document.return_value = ["ehr_c0"]
+        with mock.patch.object(documents, "get_document_registry", return_value=self.registry), \
+                mock.patch("app.services.vector_store.get_vector_store", return_value=mock_store), \
+                mock.patch.object(documents, "read_document_text", return_value="EHR hosting with 99.9% uptime"):
+            # Deleted during indexing: the chunks written meanwhile are removed again
+            mock_store.upsert_document.side_effect = lambda *args, **kwargs: self.registry.delete("ehr") and ["ehr_c0"]
+            result = documents.process_upload(self.registry.get("ehr"), upload_path, {})
+            self.assertTrue(result["deleted"])
+            mock_store.delete_chunks.assert_called_once_with(["ehr_c0"])
+            
+            # Deleted before the job ran: nothing is indexed
+            mock_store.reset_mock()
+            result = documents.process_upload({"id": "ehr", "filename": "ehr.txt", "title": "ehr"}, upload_path, {})
+            self.assertTrue(result["deleted"])
+            mock_store.upsert_document.assert_not_called()
+
+class TestStartupWarmup(unittest.TestCase):
+    """Test cases for lazy imports and the startup warm-up report."""
+
+    def test_lazy_module_imports_on_first_use(self):
+        """Test that a lazy module is imported and timed only when first used."""
+        from app.core.lazy_imports import lazy_module, import_timings
+
+        sys.modules.pop("colorsys", None)
+        colorsys = lazy_module("colorsys")
+        self.assertNotIn("colorsys", sys.modules)
+        self.assertFalse(colorsys.loaded)
+
+        self.assertEqual(colorsys.rgb_to_hsv(1.0, 0.0, 0.0), (0.0, 1.0, 1.0))
+        self.assertTrue(colorsys.loaded)
+        self.assertIn("colorsys", import_timings())
+
+    def test_warm_up_times_each_component(self):
+        """Test that warm-up records each component and keeps going after a failure."""
+        from app.services.warmup import StartupReport
+
+        def fail():
+            raise RuntimeError("model not found")
+
+        report = StartupReport(mode="blocking")
+        self.assertFalse(report.ready)
+
+        report.warm_up([("vector_store", lambda: None), ("embedding_model", fail),
+                        ("reranker", lambda: "disabled")])
+        startup = report.to_dict()
+
+        self.assertTrue(startup["ready"])
+        self.assertEqual(startup["status"], "degraded")
+        self.assertEqual(startup["components"]["vector_store"]["status"], "ok")
+        self.assertEqual(startup["components"]["embedding_model"]["error"], "model not found")
+        self.assertEqual(startup["components"]["reranker"]["reason"], "disabled")
+        self.assertGreaterEqual(startup["warmup_seconds"], 0)
+
+class TestResponseCache(unittest.TestCase):
+    """Test cases for the semantic ResponseCache."""
+    
+    def setUp(self):
+        from app.services.response_cache import ResponseCache
+        
+        self.cache = ResponseCache(max_entries=2, ttl_seconds=60, similarity_threshold=0.9)
+        self.scope = ResponseCache.make_scope("mistral", "t1:s1", ["doc_a_1", "doc_b_2"], ["system"])
+    
+    def test_exact_hit_after_normalization(self):
+        """Test that case, whitespace and trailing punctuation do not matter."""
+        self.cache.put("What uptime for EHR hosting?", self.scope, {"text": "99.9%", "sources": []})
+        
+        self.assertEqual(self.cache.get("what  uptime for ehr hosting", self.scope)["text"], "99.9%")
+        self.assertEqual(self.cache.stats()["exact_hits"], 1)
+    
+    def test_semantic_hit_is_scoped(self):
+        """Test that similar prompts only hit within the same scope."""
+        from app.services.response_cache import ResponseCache
+        
+        self.cache.put("uptime for EHR hosting", self.scope, {"text": "99.9%", "sources": []}, [1.0, 0.0])
+        other_scope = ResponseCache.make_scope("mistral", "t1:s1", ["doc_c_3"], ["system"])
+        
+        self.assertEqual(self.cache.get("EHR hosting availability", self.scope, [0.99, 0.05])["text"], "99.9%")
+        self.assertIsNone(self.cache.get("EHR hosting availability", other_scope, [0.99, 0.05]))
+        self.assertIsNone(self.cache.get("penalty clauses", self.scope, [0.0, 1.0]))
+        stats = self.cache.stats()
+        self.assertEqual(stats["semantic_hits"], 1)
+        self.assertEqual(stats["misses"], 2)
+    
+    def test_follow_ups_are_scoped_to_the_conversation(self):
+        """Test that the same follow-up in sessions with different history does not share an entry."""
+        from app.services.response_cache import ResponseCache
+        
+        def scope(history):
+            return ResponseCache.make_scope("mistral", "t1:s1", ["doc_a_1"], ["system"], history)
+        
+        ehr_session = scope([{"role": "user", "content": "Uptime for EHR hosting?"},
+                             {"role": "assistant", "content": "99.9%"}])
+        portal_session = scope([{"role": "user", "content": "Uptime for the patient portal?"},
+                                {"role": "assistant", "content": "99.5%"}])
+        self.cache.put("continue", ehr_session, {"text": "EHR penalties"}, [1.0, 0.0])
+        
+        self.assertIsNone(self.cache.get("continue", portal_session, [1.0, 0.0]))
+        self.assertEqual(self.cache.get("continue", ehr_session)["text"], "EHR penalties")
+    
+    def test_ttl_lru_and_invalidation(self):
+        """Test expiry, size-bounded eviction and invalidation."""
+        self.cache.put("one", self.scope, {"text": "1"})
+        self.cache.put("two", self.scope, {"text": "2"})
+        self.cache.get("one", self.scope)  # "one" is now more recent than "two"
+        self.cache.put("three", self.scope, {"text": "3"})
+        self.assertIsNone(self.cache.get("two", self.scope))
+        
+        self.cache.ttl_seconds = -1
+        self.assertIsNone(self.cache.get("one", self.scope))
+        self.cache.ttl_seconds = 60
+        
+        self.cache.invalidate("test")
+        self.assertIsNone(self.cache.get("three", self.scope))
+        stats = self.cache.stats()
+        self.assertEqual((stats["evictions"], stats["expirations"], stats["entries"]), (1, 1, 0))
+
+class TestCrossEncoderReranker(unittest.TestCase):
+    """Test cases for the cross-encoder reranking stage."""
+    
+    def setUp(self):
+        """Set up a reranker with a fake cross-encoder scoring by keyword presence."""
+        from app.services.reranker import CrossEncoderReranker
+        
+        self.reranker = CrossEncoderReranker(batch_size=2, latency_budget_ms=1000)
+        self.reranker._model = mock.MagicMock()
+        self.reranker._model.predict.side_effect = lambda pairs, **kwargs: [
+            float("encrypt" in chunk) for _, chunk in pairs
+        ]
+        self.results = [
+            {"id": "a", "content": "uptime target", "score": 0.9},
+            {"id": "b", "content": "backups nightly", "score": 0.8},
+            {"id": "c", "content": "encrypt PHI at rest", "score": 0.7},
+        ]
+    
+    def test_rerank_reorders_and_caches_scores(self):
+        """Test that candidates are reordered by cross-encoder score and scores are cached."""
+        reranked = self.reranker.rerank("encryption", self.results, top_n=2)
+        self.assertEqual([r["id"] for r in reranked], ["c", "a"])
+        self.assertEqual(reranked[0]["retrieval_score"], 0.7)
+        self.assertEqual(self.reranker._model.predict.call_count, 2)
+        
+        self.reranker.rerank("encryption", self.results, top_n=2)
+        self.assertEqual(self.reranker._model.predict.call_count, 2)
+        self.assertEqual(self.reranker.stats()["cache_hits"], 3)
+    
+    def test_budget_exceeded_keeps_retrieval_order(self):
+        """Test that running out of latency budget falls back to the retrieval order."""
+        reranked = self.reranker.rerank("encryption", self.results, top_n=2, latency_budget_ms=0)
+        self.assertEqual([r["id"] for r in reranked], ["a", "b"])
+        self.assertEqual(self.reranker.stats()["fallbacks"], 1)
+    
+    def test_first_batch_is_estimated_from_measured_speed(self):
+        """Test that the first batch is skipped when the measured per-pair time exceeds the budget."""
+        self.reranker._pair_seconds = 1.0
+        reranked = self.reranker.rerank("encryption", self.results, top_n=2, latency_budget_ms=500)
+        self.assertEqual([r["id"] for r in reranked], ["a", "b"])
+        self.reranker._model.predict.assert_not_called()
+    
+    def test_unloaded_model_loads_in_background(self):
+        """Test that a request never waits for the model load and keeps the retrieval order."""
+        from app.services.reranker import CrossEncoderReranker
+        
+        reranker = CrossEncoderReranker(batch_size=2, latency_budget_ms=1000)
+        with mock.patch.object(reranker, "load_in_background") as load_in_background:
+            reranked = reranker.rerank("encryption", self.results, top_n=2)
+        
+        self.assertEqual([r["id"] for r in reranked], ["a", "b"])
+        load_in_background.assert_called_once()
+        self.assertEqual(reranker.stats()["fallbacks"], 1)
+
+
+class TestBM25Index(unittest.TestCase):
+    """Test cases for the BM25Index keyword index."""
+    
+    def setUp(self):
+        from app.services.bm25_index import BM25Index
+        
+        self.index = BM25Index()
+        self.index.add_many([
+            ("a", "EHR hosting uptime of 99.95% with monthly uptime reports"),
+            ("b", "PHI encryption at rest and in transit"),
+            ("c", "uptime credits for missed availability targets"),
+        ])
+    
+    def test_ranking_and_delete(self):
+        """Test that term frequency ranks results and deleted documents disappear."""
+        self.assertEqual([key for key, _ in self.index.search("uptime")], ["a", "c"])
+        self.assertEqual(self.index.search("uptime", top_k=1)[0][0], "a")
+        
+        self.assertTrue(self.index.delete("a"))
+        self.assertEqual([key for key, _ in self.index.search("uptime")], ["c"])
+        self.assertEqual(self.index.search("unknown"), [])
+    
+    def test_persistence_is_memory_mapped_and_incremental(self):
+        """Test that a loaded index matches the original and accepts new documents."""
+        import numpy as np
+        from app.services.bm25_index import BM25Index
+        
+        index_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, index_dir, ignore_errors=True)
+        self.index.save(index_dir)
+        
+        loaded = BM25Index.load(index_dir)
+        
+        self.assertIsInstance(loaded._base_docs, np.memmap)
+        self.assertEqual(loaded.search("uptime"), self.index.search("uptime"))
+        loaded.add("d", "encryption key rotation")
+        self.assertEqual({key for key, _ in loaded.search("encryption")}, {"b", "d"})
+        self.assertEqual(len(loaded), 4)
+
+class TestQuantizedEmbeddingIndex(unittest.TestCase):
+    """Test cases for the quantized dense index."""
+    
+    def setUp(self):
+        import numpy as np
+        
+        rng = np.random.default_rng(0)
+        centers = rng.normal(size=(50, 64))
+        self.vectors = centers[rng.integers(0, 50, 2000)] + 0.5 * rng.normal(size=(2000, 64))
+        self.queries = centers[rng.integers(0, 50, 20)] + 0.5 * rng.normal(size=(20, 64))
+    
+    def test_recall_against_float_baseline(self):
+        """Test that int8 and binary search with re-scoring recover the exact top results."""
+        from app.services.quantized_index import QuantizedEmbeddingIndex, measure_recall
+        
+        for mode, min_recall, min_compression in (("int8", 0.98, 3.5), ("binary", 0.9, 20)):
+            index = QuantizedEmbeddingIndex(mode)
+            index.add_many([str(row) for row in range(len(self.vectors))], self.vectors)
+            self.assertGreaterEqual(index.stats()["compression"], min_compression)
+            self.assertGreaterEqual(measure_recall(self.vectors, self.queries, 10, mode), min_recall)
+    
+    def test_delete_and_memory_mapped_load(self):
+        """Test that deleted rows disappear and a saved index is memory-mapped on load."""
+        import numpy as np
+        from app.services.quantized_index import QuantizedEmbeddingIndex
+        
+        index = QuantizedEmbeddingIndex("int8")
+        index.add_many([str(row) for row in range(100)], self.vectors[:100])
+        best = index.search(self.vectors[7], 1, rescore_factor=1)[0][0][0]
+        self.assertEqual(best, "7")
+        
+        self.assertTrue(index.delete("7"))
+        self.assertNotEqual(index.search(self.vectors[7], 1)[0][0][0], "7")
+        
+        index_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, index_dir, ignore_errors=True)
+        index.save(index_dir)
+        loaded = QuantizedEmbeddingIndex.load(index_dir)
+        
+        self.assertIsInstance(loaded._codes, np.memmap)
+        self.assertEqual(len(loaded), 99)
+        self.assertEqual(loaded.search(self.vectors[:3], 5), index.search(self.vectors[:3], 5))
+
+class TestHealthcareRAGSystem(unittest.TestCase):
+    """Test cases for HealthcareRAGSystem indexing and hybrid search."""
+    
+    def setUp(self):
+        self.document_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.document_dir, ignore_errors=True)
+        documents = {
+            "uptime.md": "# Availability\nEHR hosting must reach 99.95% uptime.",
+            "security.md": "# Security\nAll PHI is encrypted at rest and in transit.",
+        }
+        for filename, content in documents.items():
+            with open(os.path.join(self.document_dir, filename), "w") as f:
+                f.write(content)
+    
+    def _mock_vector_store(self):
+        """Embed texts as [mentions availability, mentions encryption]."""
+        def embed(texts):
+            return [[float(any(w in t.lower() for w in ("uptime", "downtime"))), float("encrypt" in t.lower())]
+                    for t in texts]
+        
+        store = mock.MagicMock()
+        store._get_embeddings.side_effect = embed
+        store._embed_queries.side_effect = embed
+        return store
+    
+    @mock.patch('app.services.vector_store.get_vector_store')
+    def test_keyword_index_only_scores_matching_chunks(self, mock_get_store):
+        """Test BM25 search through the inverted index without a dense index."""
+        from app.services.healthcare_rag import HealthcareRAGSystem
+        
+        mock_get_store.side_effect = RuntimeError("no model")
+        rag = HealthcareRAGSystem(self.document_dir)
+        
+        results = rag.search("encrypted PHI", top_k=5)
+        
+        self.assertEqual(len(rag.dense_index), 0)
+        self.assertEqual([r["document_filename"] for r in results], ["security.md"])
+        self.assertEqual(results[0]["relevance_score"], 1.0)
+    
+    @mock.patch('app.services.healthcare_rag.DENSE_INDEX_MODE', "int8")
+    @mock.patch('app.services.vector_store.get_vector_store')
+    def test_hybrid_search_uses_embeddings(self, mock_get_store):
+        """Test that cosine similarity finds chunks without shared keywords."""
+        from app.services.healthcare_rag import HealthcareRAGSystem
+        
+        mock_get_store.return_value = self._mock_vector_store()
+        rag = HealthcareRAGSystem(self.document_dir)
+        
+        # Neither query shares a keyword with the document it should find
+        results = rag.search_many(["downtime", "encrypt"], top_k=1)
+        
+        self.assertEqual(len(rag.dense_index), 2)
+        self.assertEqual(results[0][0]["document_filename"], "uptime.md")
+        self.assertEqual(results[1][0]["document_filename"], "security.md")
+        # Chunks are embedded once at indexing; rescoring reads the stored embeddings
+        self.assertEqual(mock_get_store.return_value._get_embeddings.call_count, 1)
+
 class TestDocumentProcessor(unittest.TestCase):
     """Test cases for the DocumentProcessor class."""
     
+    def setUp(self):
+        """Keep parse results out of the real on-disk parse cache."""
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        for name, value in (("PARSE_CACHE_PATH", os.path.join(cache_dir, "parse_cache.sqlite3")),
+                            ("_parse_cache", None)):
+            patcher = mock.patch(f'app.services.parse_cache.{name}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+    
     def test_extract_metadata(self):
         """Test metadata extraction from document content."""
         from app.services.document_processor import DocumentProcessor
@@ -112,6 +1017,129 @@ class TestDocumentProcessor(unittest.TestCase):
         self.assertEqual(metadata["file_type"], "txt")
         self.assertIn("HIPAA", metadata.get("compliance_frameworks", []))
 
+    def test_parallel_load_quarantines_poison_files(self):
+        """Test that a file crashing a parser worker is quarantined without failing the batch."""
+        from app.services import document_processor
+        from app.services.document_processor import DocumentProcessor
+        
+        doc_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, doc_dir, ignore_errors=True)
+        for name in ("a.txt", "b.txt", "bad.txt", "crash.txt"):
+            with open(os.path.join(doc_dir, name), "w") as f:
+                f.write(f"content of {name}")
+        
+        def fake_partition(filename):
+            if filename.endswith("crash.txt"):
+                os._exit(1)
+            if filename.endswith("bad.txt"):
+                raise ValueError("cannot parse")
+            return [open(filename).read()]
+        
+        processor = DocumentProcessor(doc_dir, quarantine_path=os.path.join(doc_dir, "q", "quarantine.json"))
+        files = processor.list_files(doc_dir)
+        # Forked workers inherit the patched parser; spawned ones would import the real one
+        with mock.patch("unstructured.partition.auto.partition", fake_partition), \
+                mock.patch.object(document_processor, "INGEST_START_METHOD", "fork"):
+            first = {os.path.basename(path): error for path, _, error in processor.iter_load_files(files, max_workers=2)}
+            second = {os.path.basename(path): error for path, _, error in processor.iter_load_files(files, max_workers=2)}
+        
+        self.assertEqual(first, {"a.txt": None, "b.txt": None, "bad.txt": "cannot parse",
+                                 "crash.txt": "quarantined: crashed the parser"})
+        self.assertEqual(second, first)
+
+    def test_parse_cache_skips_unchanged_files(self):
+        """Test that unchanged content is served from the parse cache, even under another path."""
+        from app.services import document_processor
+        from app.services.document_processor import DocumentProcessor
+        
+        doc_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, doc_dir, ignore_errors=True)
+        path = os.path.join(doc_dir, "hipaa.txt")
+        with open(path, "w") as f:
+            f.write("HIPAA compliant hosting")
+        
+        processor = DocumentProcessor(doc_dir)
+        fake_partition = mock.MagicMock(side_effect=lambda filename: [open(filename).read()])
+        with mock.patch("unstructured.partition.auto.partition", fake_partition):
+            first = processor.load_file(path)
+            self.assertEqual(processor.load_file(path), first)
+            self.assertEqual(fake_partition.call_count, 1)
+            
+            copy_path = os.path.join(doc_dir, "copy.txt")
+            shutil.copy(path, copy_path)
+            copy = processor.load_file(copy_path)
+            self.assertEqual(fake_partition.call_count, 1)
+            self.assertEqual(copy["content"], first["content"])
+            self.assertEqual(copy["metadata"]["source"], copy_path)
+            
+            with open(path, "w") as f:
+                f.write("GDPR compliant hosting")
+            self.assertIn("GDPR", processor.load_file(path)["metadata"]["compliance_frameworks"])
+            self.assertEqual(fake_partition.call_count, 2)
+
+    def test_unavailable_parse_cache_falls_back_to_parsing(self):
+        """Test that a cache that cannot be opened only costs a parse, and is opened once per process."""
+        import sqlite3
+        import threading
+        import time
+        from app.services import parse_cache
+        from app.services.document_processor import DocumentProcessor
+        
+        doc_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, doc_dir, ignore_errors=True)
+        path = os.path.join(doc_dir, "hipaa.txt")
+        with open(path, "w") as f:
+            f.write("HIPAA compliant hosting")
+        
+        processor = DocumentProcessor(doc_dir)
+        fake_partition = mock.MagicMock(side_effect=lambda filename: [open(filename).read()])
+        locked = mock.MagicMock(side_effect=sqlite3.OperationalError("database is locked"))
+        with mock.patch("unstructured.partition.auto.partition", fake_partition), \
+                mock.patch.object(parse_cache, "ParsedDocumentCache", locked):
+            self.assertEqual(processor.load_file(path)["content"], "HIPAA compliant hosting")
+        
+        # Concurrent ingest threads share one connection
+        def slow_open(path):
+            time.sleep(0.05)
+            return mock.MagicMock()
+        
+        opened = mock.MagicMock(side_effect=slow_open)
+        with mock.patch.object(parse_cache, "ParsedDocumentCache", opened):
+            threads = [threading.Thread(target=parse_cache.get_parsed_document_cache) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(opened.call_count, 1)
+
+class TestHealthcareDocumentClassifier(unittest.TestCase):
+    """Test cases for the single-pass healthcare term matcher."""
+    
+    def test_single_pass_counts_match_per_term_regexes(self):
+        """Test that overlapping terms are counted exactly as separate regex scans would."""
+        import re
+        from app.services.healthcare_classifier import (
+            HealthcareDocumentClassifier, HEALTHCARE_TERMS, HIGH_SENSITIVITY_PATTERNS
+        )
+        
+        content = ("HIPAA Privacy Officer reviews privacy; the privacy officer's ePHI/PHI audit. "
+                   "Substance   abuse and Mental\nHealth records (medical record, health record). "
+                   "Cardiology and PRIMARY CARE via HL7 FHIR APIs, API-first. Joint Commission survey.")
+        classifier = HealthcareDocumentClassifier()
+        score, category_scores = classifier._calculate_healthcare_score(content)
+        
+        normalized = content.lower()
+        word_count = len(re.findall(r'\w+', normalized))
+        for category, terms in HEALTHCARE_TERMS.items():
+            expected = sum(len(re.findall(r'\b' + re.escape(t.lower()) + r'\b', normalized)) for t in terms)
+            self.assertAlmostEqual(category_scores[category], expected / word_count)
+        
+        self.assertEqual(classifier._detect_compliance_frameworks(content), ["HIPAA", "Joint Commission"])
+        self.assertEqual(classifier._detect_clinical_specialties(content), ["Cardiology", "Primary Care"])
+        self.assertTrue(any(re.search(r'\b' + p, content, re.IGNORECASE) for p in HIGH_SENSITIVITY_PATTERNS))
+        self.assertEqual(classifier._determine_data_sensitivity(content, []), "High")
+        self.assertEqual(classifier._determine_data_sensitivity("uptime and latency", ["HITRUST"]), "Medium")
+
 class TestRAGService(unittest.TestCase):
     """Test cases for the RAG service."""
     
@@ -139,6 +1167,7 @@ class TestRAGService(unittest.TestCase):
                 "score": 0.8
             }
         ]
+        mock_store.keyword_search.return_value = []
         
         # Import and initialize RAG service
         from app.services.rag_service import RAGService
@@ -163,5 +1192,149 @@ class TestRAGService(unittest.TestCase):
         self.assertIn("API calls", context)
         self.assertIn("300ms", context)
 
+    @mock.patch('app.services.rag_service.get_vector_store')
+    @mock.patch('app.services.rag_service.get_document_processor')
+    def test_get_relevant_contexts_batches_search(self, mock_get_processor, mock_get_store):
+        """Test that multiple queries are served by one batched search."""
+        mock_store = mock.MagicMock()
+        mock_store.search_many.return_value = [
+            [{"content": "99.99% uptime", "metadata": {"source": "a.json"}, "score": 0.9}],
+            []
+        ]
+        mock_store.keyword_search_many.return_value = [[], []]
+        mock_get_store.return_value = mock_store
+        
+        from app.services.rag_service import RAGService
+        from app.services.llm_provider import LLMProvider
+        
+        rag_service = RAGService(mock.MagicMock(spec=LLMProvider))
+        contexts = rag_service.get_relevant_contexts(["uptime?", "unrelated"])
+        
+        mock_store.search_many.assert_called_once()
+        mock_store.search.assert_not_called()
+        self.assertEqual(len(contexts), 2)
+        self.assertIn("99.99% uptime", contexts[0])
+        self.assertEqual(contexts[1], "")
+
+    def test_reciprocal_rank_fusion(self):
+        """Test that chunks ranked by both retrievers beat single-retriever hits."""
+        from app.services.rag_service import reciprocal_rank_fusion
+        
+        dense = [{"id": "a", "content": "A", "score": 0.9}, {"id": "b", "content": "B", "score": 0.8}]
+        keyword = [{"id": "c", "content": "42 CFR Part 2", "score": 7.1}, {"id": "b", "content": "B", "score": 3.2}]
+        
+        fused = reciprocal_rank_fusion([dense, keyword], [1.0, 1.0], top_k=2)
+        self.assertEqual([r["id"] for r in fused], ["b", "a"])
+        # The fused score is separate; "score" stays the retriever's own score
+        self.assertEqual(fused[0]["score"], 0.8)
+        self.assertAlmostEqual(fused[0]["rrf_score"], 2 / 62)
+        
+        # Weighting keyword results higher promotes the exact-term match over dense-only hits
+        keyword_weighted = reciprocal_rank_fusion([dense, keyword], [0.5, 2.0], top_k=2)
+        self.assertEqual([r["id"] for r in keyword_weighted], ["b", "c"])
+
+    def test_pack_context_dedupes_overlap_and_respects_budget(self):
+        """Test that packing trims chunk overlap, drops duplicates and never cuts a chunk."""
+        from app.services.context_packer import pack_context
+        
+        shared = "Encryption at rest is required for all PHI. "
+        results = [
+            {"id": "1", "content": "Backups run nightly. " + shared, "metadata": {"source": "policy.pdf"}, "score": 0.9},
+            {"id": "2", "content": shared + "Keys rotate yearly.", "metadata": {"source": "policy.pdf"}, "score": 0.8},
+            {"id": "3", "content": shared, "metadata": {"source": "policy.pdf"}, "score": 0.7},
+            {"id": "4", "content": "x" * 400, "metadata": {"source": "appendix.pdf"}, "score": 0.6},
+        ]
+        
+        packed = pack_context(results, token_budget=60, max_overlap=100)
+        
+        self.assertEqual([r["id"] for r in packed.sources], ["1", "2"])
+        self.assertEqual(packed.text.count(shared.strip()), 1)
+        self.assertIn("[Source 2: policy.pdf]\nKeys rotate yearly.", packed.text)
+        self.assertEqual({d["id"]: d["reason"] for d in packed.dropped}, {"3": "duplicate", "4": "budget"})
+        self.assertLessEqual(packed.tokens, 60)
+
+    @mock.patch('app.services.rag_service.get_vector_store')
+    @mock.patch('app.services.rag_service.get_document_processor')
+    def test_sync_knowledge_base_is_incremental(self, mock_get_processor, mock_get_store):
+        """Test that re-syncing only touches changed and removed files."""
+        from app.services.rag_service import RAGService
+        from app.services.llm_provider import LLMProvider
+        
+        doc_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, doc_dir, ignore_errors=True)
+        manifest_path = os.path.join(doc_dir, "manifest", "indexed_documents.json")
+        for name in ("a.md", "b.md"):
+            with open(os.path.join(doc_dir, name), "w") as f:
+                f.write(f"content of {name}")
+        
+        mock_store = mock.MagicMock()
+        mock_store.get_document_count.return_value = 1
+        mock_store.upsert_document.side_effect = lambda doc_id, *args, **kwargs: [f"{doc_id}_c0"]
+        mock_get_store.return_value = mock_store
+        
+        mock_processor = mock.MagicMock()
+        mock_processor.list_files.side_effect = lambda d: sorted(
+            os.path.join(d, f) for f in os.listdir(d) if f.endswith(".md"))
+        mock_processor.iter_load_files.side_effect = lambda paths: (
+            (path, {"content": open(path).read(), "metadata": {"source": path}}, None) for path in paths)
+        mock_get_processor.return_value = mock_processor
+        
+        rag_service = RAGService(mock.MagicMock(spec=LLMProvider))
+        
+        first = rag_service.sync_knowledge_base(doc_dir, manifest_path)
+        self.assertEqual(first["added"], 2)
+        
+        second = rag_service.sync_knowledge_base(doc_dir, manifest_path)
+        self.assertEqual(second["unchanged"], 2)
+        self.assertEqual(mock_store.upsert_document.call_count, 2)
+        # Positional chunks of an earlier full ingest are only cleaned up by the first sync
+        mock_store.delete_legacy_chunks.assert_called_once()
+        
+        os.remove(os.path.join(doc_dir, "b.md"))
+        third = rag_service.sync_knowledge_base(doc_dir, manifest_path)
+        self.assertEqual(third["removed"], 1)
+        mock_store.delete_chunks.assert_called_once()
+        with open(manifest_path) as f:
+            self.assertEqual(json.load(f)["document_count"], 1)
+
+    @mock.patch('app.services.rag_service.get_vector_store')
+    @mock.patch('app.services.rag_service.get_document_processor')
+    def test_added_document_is_tracked_for_sync(self, mock_get_processor, mock_get_store):
+        """Test that an added document gets a path-derived ID and a later sync leaves it alone."""
+        from app.services.rag_service import RAGService
+        from app.services.vector_store_common import document_id_for_path
+        from app.services.llm_provider import LLMProvider
+        
+        doc_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, doc_dir, ignore_errors=True)
+        manifest_path = os.path.join(doc_dir, "manifest", "indexed_documents.json")
+        
+        mock_store = mock.MagicMock()
+        mock_store.get_document_count.return_value = 1
+        mock_store.upsert_document.side_effect = lambda doc_id, *args, **kwargs: [f"{doc_id}_c0"]
+        mock_get_store.return_value = mock_store
+        
+        def save_document(content, metadata):
+            path = os.path.join(doc_dir, f"sla_{len(os.listdir(doc_dir))}.json")
+            with open(path, "w") as f:
+                json.dump({"content": content, "metadata": metadata}, f)
+            return path
+        
+        mock_processor = mock.MagicMock()
+        mock_processor.save_document.side_effect = save_document
+        mock_processor.list_files.side_effect = lambda d: sorted(
+            os.path.join(d, f) for f in os.listdir(d) if f.endswith(".json"))
+        mock_get_processor.return_value = mock_processor
+        
+        rag_service = RAGService(mock.MagicMock(spec=LLMProvider))
+        first = rag_service.add_document_to_knowledge_base("99.9% uptime", {"industry": "cloud"}, manifest_path)
+        second = rag_service.add_document_to_knowledge_base("RPO of 1 hour", {"industry": "cloud"}, manifest_path)
+        
+        self.assertNotEqual(first, second)
+        self.assertEqual(first, document_id_for_path(os.path.join(doc_dir, "sla_0.json")))
+        summary = rag_service.sync_knowledge_base(doc_dir, manifest_path)
+        self.assertEqual(summary["unchanged"], 2)
+        self.assertEqual(mock_store.upsert_document.call_count, 2)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -9,12 +9,15 @@ requiring the unstructured package or other heavy dependencies.
 import os
 import json
 import logging
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple, Union
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DEFAULT_DOCUMENT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "documents")
+SUPPORTED_EXTENSIONS = ['.pdf', '.docx', '.txt', '.md', '.json']
+
 # Export this function for compatibility with the imported module
 def partition(*args, **kwargs):
     """Mock function for unstructured.partition.auto.partition"""
@@ -153,6 +156,91 @@ class SimpleDocumentProcessor:
             for i, chunk in enumerate(mock_chunks)
         ]
 
+    def load_file(self, file_path: str) -> Dict[str, Any]:
+        """Load a document file as a single document, like the full processor
+        
+        Args:
+            file_path: Path to the document file
+            
+        Returns:
+            Document dictionary with content and metadata
+        """
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+        
+        chunks = self.process_document(file_path)
+        return {
+            "content": "\n\n".join(chunk["text"] for chunk in chunks),
+            "metadata": {
+                "source": file_path,
+                "filename": os.path.basename(file_path),
+                "file_type": os.path.splitext(file_path)[1].lower()
+            }
+        }
+    
+    def list_files(self, dir_path: Optional[str] = None) -> List[str]:
+        """List the supported document files in a directory
+        
+        Args:
+            dir_path: Directory path to list, defaults to the document directory
+            
+        Returns:
+            Sorted list of file paths
+        """
+        dir_path = dir_path or DEFAULT_DOCUMENT_DIR
+        if not os.path.exists(dir_path):
+            return []
+        
+        return sorted(
+            os.path.join(dir_path, f) for f in os.listdir(dir_path)
+            if os.path.isfile(os.path.join(dir_path, f)) and
+            any(f.lower().endswith(ext) for ext in SUPPORTED_EXTENSIONS)
+        )
+    
+    def iter_load_files(self, file_paths: Iterable[str], *args, **kwargs) -> Iterator[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]:
+        """Load files one after another in this process
+        
+        Accepts (and ignores) the full processor's worker and timeout arguments.
+        
+        Args:
+            file_paths: Paths of the files to load
+            
+        Yields:
+            Tuples of (file path, document dictionary or None, error message or None)
+        """
+        for file_path in file_paths:
+            try:
+                yield file_path, self.load_file(file_path), None
+            except Exception as e:
+                logger.error(f"Error loading document {file_path}: {e}")
+                yield file_path, None, str(e)
+
+    def save_document(self, content: str, metadata: Dict[str, Any], file_name: Optional[str] = None) -> str:
+        """Save a document to the document directory
+        
+        Args:
+            content: Document content
+            metadata: Document metadata
+            file_name: Optional file name, will be generated if not provided
+            
+        Returns:
+            Path to the saved document
+        """
+        if file_name is None:
+            industry = metadata.get('industry', 'general')
+            service = metadata.get('service_type', 'service')
+            file_name = f"sla_{industry}_{service}_{hex(hash(content))[-6:]}.json"
+        if not file_name.lower().endswith('.json'):
+            file_name += '.json'
+        
+        os.makedirs(DEFAULT_DOCUMENT_DIR, exist_ok=True)
+        file_path = os.path.join(DEFAULT_DOCUMENT_DIR, file_name)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump({"content": content, "metadata": metadata}, f, indent=2)
+        
+        logger.info(f"Saved document to {file_path}")
+        return file_path
+
 # Factory function to get a document processor
 def get_document_processor() -> SimpleDocumentProcessor:
     """Get a document processor instance
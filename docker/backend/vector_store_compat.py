@@ -11,6 +11,8 @@ import json
 import logging
 from typing import Dict, List, Optional, Any
 
+from app.services.bm25_index import BM25Index
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -28,8 +30,10 @@ class SimpleVectorStore:
         self.collection_name = collection_name
         self.base_path = base_path
         self.collection_path = os.path.join(self.base_path, f"{collection_name}.json")
+        self.index_path = os.path.join(self.base_path, f"{collection_name}_bm25")
         self._ensure_dirs()
         self._load_or_create_collection()
+        self._load_or_build_index()
     
     def _ensure_dirs(self):
         """Ensure the storage directory exists"""
@@ -50,6 +54,21 @@ class SimpleVectorStore:
             self.collection = []
             self._save_collection()
     
+    def _load_or_build_index(self):
+        """Load the persisted BM25 keyword index, rebuilding it if it is missing or stale"""
+        self.items_by_id = {item["id"]: item for item in self.collection}
+        if BM25Index.exists(self.index_path):
+            index = BM25Index.load(self.index_path)
+            if len(index) == len(self.collection) and all(item["id"] in index for item in self.collection[-1:]):
+                self.index = index
+                return
+            logger.warning(f"BM25 index for {self.collection_name} is out of date, rebuilding")
+        
+        self.index = BM25Index()
+        self.index.add_many([(item["id"], item["text"]) for item in self.collection])
+        self.index.save(self.index_path)
+        logger.info(f"Built BM25 index for {self.collection_name} with {len(self.collection)} items")
+    
     def _save_collection(self):
         """Save the collection to disk"""
         with open(self.collection_path, 'w') as f:
@@ -84,16 +103,19 @@ class SimpleVectorStore:
             if embeddings is not None and i < len(embeddings):
                 item["embedding"] = embeddings[i]
             self.collection.append(item)
+            self.items_by_id[id_] = item
+            self.index.add(id_, text)
         
         # Save to disk
         self._save_collection()
+        self.index.save(self.index_path)
         return ids
     
     def similarity_search(self, query: str, k: int = 4) -> List[Dict[str, Any]]:
-        """Search for similar texts using basic keyword matching
+        """Search for similar texts using BM25 keyword matching
         
         In a real vector store, this would use vector similarity.
-        This implementation uses basic substring matching as a fallback.
+        This implementation ranks texts with the BM25 inverted index as a fallback.
         
         Args:
             query: The query text
@@ -102,22 +124,9 @@ class SimpleVectorStore:
         Returns:
             List of documents with text and metadata
         """
-        # Basic implementation: look for substring matches
-        query_terms = query.lower().split()
-        
-        results = []
-        for item in self.collection:
-            text = item["text"].lower()
-            # Simple scoring: count how many query terms appear in the text
-            score = sum(1 for term in query_terms if term in text)
-            if score > 0:
-                results.append((score, item))
-        
-        # Sort by score (descending) and take top k
-        results.sort(reverse=True, key=lambda x: x[0])
         return [
-            {"page_content": item["text"], "metadata": item["metadata"]} 
-            for _, item in results[:k]
+            {"page_content": self.items_by_id[id_]["text"], "metadata": self.items_by_id[id_]["metadata"]} 
+            for id_, _ in self.index.search(query, top_k=k)
         ]
 
 # Compatibility functions that mirror the langchain vector store API
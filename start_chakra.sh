@@ -11,6 +11,9 @@ function cleanup {
     if [ ! -z "$BACKEND_PID" ]; then
         kill $BACKEND_PID 2>/dev/null
     fi
+    if [ ! -z "$VECTOR_STORE_PID" ]; then
+        kill $VECTOR_STORE_PID 2>/dev/null
+    fi
     if [ ! -z "$FRONTEND_PID" ]; then
         kill $FRONTEND_PID 2>/dev/null
     fi
@@ -125,6 +128,27 @@ echo "✓ RAG system initialized"
 # Start the backend server with optimized settings
 echo "Starting FastAPI backend on http://localhost:8000"
 if [ "$PRODUCTION_MODE" = true ]; then
+    # Share one embedding model and vector database between all workers
+    # (set CHAKRA_SHARED_VECTOR_STORE=false to load them in every worker)
+    if [ "${CHAKRA_SHARED_VECTOR_STORE:-true}" = true ]; then
+        export CHAKRA_VECTOR_STORE_SOCKET="${CHAKRA_VECTOR_STORE_SOCKET:-/tmp/chakra-vector-store.sock}"
+        echo "Starting shared vector store server on $CHAKRA_VECTOR_STORE_SOCKET"
+        rm -f "$CHAKRA_VECTOR_STORE_SOCKET"
+        $PYTHON_CMD -m app.services.vector_store_server --socket "$CHAKRA_VECTOR_STORE_SOCKET" &
+        VECTOR_STORE_PID=$!
+        for i in $(seq 1 120); do
+            [ -S "$CHAKRA_VECTOR_STORE_SOCKET" ] && break
+            sleep 1
+        done
+        if [ -S "$CHAKRA_VECTOR_STORE_SOCKET" ]; then
+            echo "✓ Vector store server ready"
+        else
+            echo "Warning: vector store server did not start, workers will load their own"
+            kill $VECTOR_STORE_PID 2>/dev/null
+            VECTOR_STORE_PID=""
+            unset CHAKRA_VECTOR_STORE_SOCKET
+        fi
+    fi
     uvicorn app.main:app \
         --host 0.0.0.0 \
         --port 8000 \
@@ -20,6 +20,12 @@ else
     echo -e "${YELLOW}No running backend service found${NC}"
 fi
 
+# Stop the shared vector store server
+if pgrep -f "app.services.vector_store_server" > /dev/null; then
+    pkill -f "app.services.vector_store_server"
+    echo -e "${GREEN}✓ Vector store server stopped${NC}"
+fi
+
 # Stop frontend service
 echo -e "\n${YELLOW}Stopping frontend services...${NC}"
 if pgrep -f "ng serve" > /dev/null; then